@@ -0,0 +1,99 @@
+"""
+Herramientas para changelists del admin sobre tablas grandes.
+
+- ``ConteoEstimadoPaginator``: evita el COUNT(*) exacto. Sin filtros (PostgreSQL)
+  usa la estimación de ``pg_class.reltuples``; con solo el filtro de sucursal
+  que agrega el manager, la estimación del planificador para esa sucursal
+  (``EXPLAIN``); con filtros del usuario cuenta como máximo ``ADMIN_CONTEO_TOPE``
+  filas.
+- ``FiltroTexto``: filtro lateral que no carga opciones, el usuario escribe el
+  valor (p. ej. número de mesa) y se filtra con un lookup indexable.
+- ``TablaGrandeAdminMixin``: reúne lo anterior y desactiva el conteo total.
+"""
+import json
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def sin_filtros_propios(queryset):
+    """True si el queryset no filtra más que el manager por defecto (p. ej. por la sucursal en curso)"""
+    return queryset.query.where == queryset.model._default_manager.all().query.where
+
+
+def estimar_filas(queryset):
+    """Filas estimadas por el planificador para la tabla (o la sucursal en curso) del queryset, o None."""
+    conexion = connections[queryset.db]
+    if conexion.vendor != 'postgresql' or not sin_filtros_propios(queryset):
+        return None
+    if queryset.query.has_filters():
+        # Solo el filtro de sucursal: EXPLAIN estima sus filas con las estadísticas de la columna
+        plan = json.loads(queryset.order_by().values('pk').explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        fila = cursor.fetchone()
+    # reltuples = -1 si la tabla nunca fue analizada
+    return fila[0] if fila and fila[0] >= 0 else None
+
+
+class ConteoEstimadoPaginator(Paginator):
+    """Paginador con conteo estimado (tabla completa) o acotado (con filtros)"""
+
+    @cached_property
+    def count(self):
+        tope = settings.ADMIN_CONTEO_TOPE
+        estimado = estimar_filas(self.object_list)
+        if estimado is not None and estimado > tope:
+            return estimado
+        # SELECT COUNT(*) FROM (SELECT id FROM ... WHERE ... LIMIT tope)
+        return self.object_list.order_by().values('pk')[:tope].count()
+
+
+class FiltroTexto(admin.SimpleListFilter):
+    """
+    Filtro lateral con un campo de texto en lugar de una lista de opciones.
+    Las subclases definen ``title``, ``parameter_name`` y ``lookup``
+    (p. ej. ``'mesa__numero'``); ``entero = True`` valida valores numéricos.
+    """
+    template = 'admin/filtro_texto.html'
+    lookup = None
+    entero = False
+    placeholder = ''
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        valor = (self.value() or '').strip()
+        if not valor:
+            return queryset
+        if self.entero and not valor.isdigit():
+            return queryset.none()
+        return queryset.filter(**{self.lookup: valor})
+
+    def choices(self, changelist):
+        yield {
+            'parametro': self.parameter_name,
+            'valor': self.value() or '',
+            'placeholder': self.placeholder,
+            'ocultos': [
+                (clave, valor) for clave, valor in changelist.params.items()
+                if clave != self.parameter_name
+            ],
+        }
+
+
+class TablaGrandeAdminMixin:
+    """Mixin para ModelAdmin de tablas con millones de filas"""
+    paginator = ConteoEstimadoPaginator
+    show_full_result_count = False
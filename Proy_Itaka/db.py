@@ -0,0 +1,61 @@
+"""
+Construcción de la configuración de base de datos a partir del entorno.
+
+Variables soportadas:
+    DATABASE_URL       URL de conexión (formato dj-database-url).
+    DB_POOL            '1'/'true' activa el pool nativo de psycopg (solo PostgreSQL).
+    DB_POOL_MIN        Conexiones mínimas por proceso (por defecto 2).
+    DB_POOL_MAX        Conexiones máximas por proceso (por defecto 10).
+    DB_POOL_TIMEOUT    Segundos de espera máxima al pedir una conexión (por defecto 10).
+    DB_POOL_MAX_IDLE   Segundos antes de cerrar una conexión ociosa (por defecto 300).
+    DB_CONN_MAX_AGE    Vida de las conexiones persistentes sin pool (por defecto 600).
+"""
+import os
+
+import dj_database_url
+
+VALORES_VERDADEROS = {'1', 'true', 'yes', 'si', 'sí', 'on'}
+
+
+def env_bool(entorno, nombre, defecto=False):
+    valor = entorno.get(nombre)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() in VALORES_VERDADEROS
+
+
+def opciones_pool(entorno):
+    """Opciones que Django pasa a ``psycopg_pool.ConnectionPool``."""
+    return {
+        'min_size': int(entorno.get('DB_POOL_MIN', 2)),
+        'max_size': int(entorno.get('DB_POOL_MAX', 10)),
+        'timeout': float(entorno.get('DB_POOL_TIMEOUT', 10)),
+        'max_idle': float(entorno.get('DB_POOL_MAX_IDLE', 300)),
+    }
+
+
+def configurar_base_datos(url=None, entorno=None):
+    """
+    Devuelve el diccionario de una conexión para ``settings.DATABASES``.
+
+    Con DB_POOL activo y motor PostgreSQL se usa el pool nativo de Django 5.x
+    (las conexiones persistentes quedan desactivadas, el pool las reutiliza).
+    Con cualquier otro motor se mantienen las conexiones persistentes.
+    En ambos casos se verifica la conexión al tomarla (CONN_HEALTH_CHECKS).
+    """
+    entorno = os.environ if entorno is None else entorno
+    url = entorno.get('DATABASE_URL') if url is None else url
+    if not url:
+        return {}
+
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=int(entorno.get('DB_CONN_MAX_AGE', 600)),
+        conn_health_checks=True,
+    )
+
+    if env_bool(entorno, 'DB_POOL') and config['ENGINE'].endswith('postgresql'):
+        config['CONN_MAX_AGE'] = 0
+        config.setdefault('OPTIONS', {})['pool'] = opciones_pool(entorno)
+
+    return config
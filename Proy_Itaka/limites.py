@@ -0,0 +1,164 @@
+"""
+Límites de solicitudes por IP y por usuario (token bucket) para el login y las
+rutas que escriben.
+
+Cada límite es ``"cantidad/periodo"`` (``"5/m"``: ráfagas de hasta 5 y un
+token nuevo cada 12 segundos); vacío lo desactiva. Se configuran en
+``settings.LIMITE_*``:
+
+- Login (POST a una vista ``login``): por IP y por nombre de usuario intentado.
+- Demás escrituras (POST, PUT, PATCH, DELETE): por IP y por usuario.
+
+``LimiteSolicitudesMiddleware`` va antes de ``SessionMiddleware``: el login
+y los límites por IP se rechazan sin leer la sesión, sin consultar la base y
+sin calcular el hash de la contraseña. El límite por usuario de las
+escrituras se revisa en ``process_view``, con el usuario ya cargado y antes
+de ejecutar la vista.
+
+Los baldes viven en la caché compartida (Redis en producción) con el
+algoritmo GCRA: cada clave guarda un solo entero (la hora teórica en que el
+balde vuelve a estar lleno). Leerla, llevarla a la hora actual si quedó atrás,
+sumar el token y guardarla es una sola operación atómica: en Redis, un script
+Lua que corre en el servidor; con la caché local del proceso (desarrollo y
+tests), bajo un lock. Así dos workers no pueden gastar el mismo token.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import HttpResponse, JsonResponse
+from django.urls import Resolver404, resolve
+
+from .routers import METODOS_SEGUROS
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_CACHE = 'limite:'
+PERIODOS = {'s': 1, 'm': 60, 'h': 3600}
+# Vida mínima de un balde en la caché; uno ocioso se reinicia igual al volver a usarse
+TTL_MINIMO = 3600
+
+# KEYS[1]: balde; ARGV: ahora, paso, ráfaga (ms) y TTL (s). Devuelve los ms de exceso (0 si hubo token)
+SCRIPT_GCRA = """
+local ahora = tonumber(ARGV[1])
+local lleno = math.max(tonumber(redis.call('GET', KEYS[1]) or 0), ahora) + tonumber(ARGV[2])
+local exceso = lleno - ahora - tonumber(ARGV[3])
+if exceso > 0 then
+    return exceso
+end
+redis.call('SET', KEYS[1], lleno, 'EX', ARGV[4])
+return 0
+"""
+_bloqueo_local = threading.Lock()
+
+
+def leer_limite(texto):
+    """``"5/m"`` -> ``(5, 60)``; ``None`` si está vacío"""
+    if not texto:
+        return None
+    cantidad, _, periodo = texto.partition('/')
+    return int(cantidad), PERIODOS[periodo.strip() or 's']
+
+
+def consumir(clave, limite, ahora=None):
+    """
+    Toma un token del balde ``clave``. Devuelve 0 si lo había o los segundos
+    que faltan para el próximo (la solicitud rechazada no gasta token).
+    """
+    cantidad, periodo = limite
+    paso = max(1, round(periodo * 1000 / cantidad))  # ms por token
+    rafaga = paso * cantidad
+    ahora_ms = int((ahora if ahora is not None else time.time()) * 1000)
+    clave = PREFIJO_CACHE + clave
+    ttl = max(periodo, TTL_MINIMO)
+
+    backend = caches['default']
+    if isinstance(backend, RedisCache):
+        # EVAL: un solo viaje y atómico en el servidor
+        clave = backend.make_and_validate_key(clave)
+        exceso = backend._cache.get_client(clave, write=True).eval(SCRIPT_GCRA, 1, clave, ahora_ms, paso, rafaga, ttl)
+    else:
+        exceso = _gcra_local(clave, ahora_ms, paso, rafaga, ttl)
+    return int(exceso) / 1000
+
+
+def _gcra_local(clave, ahora_ms, paso, rafaga, ttl):
+    """Mismo paso que ``SCRIPT_GCRA`` para la caché en memoria del proceso"""
+    with _bloqueo_local:
+        # Hora teórica de balde lleno tras gastar este token; si quedó atrás, el balde estaba lleno
+        lleno = max(cache.get(clave) or 0, ahora_ms) + paso
+        exceso = lleno - ahora_ms - rafaga
+        if exceso > 0:
+            return exceso  # La solicitud rechazada no gasta token
+        cache.set(clave, lleno, ttl)
+        return 0
+
+
+def ip_cliente(request):
+    cabecera = settings.LIMITE_CABECERA_IP
+    if cabecera and request.META.get(cabecera):
+        # El último valor lo agrega el proxy de confianza; los anteriores los manda el cliente
+        return request.META[cabecera].split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _identificador(valor):
+    return hashlib.sha1(str(valor).encode()).hexdigest()
+
+
+def es_login(request):
+    try:
+        return resolve(request.path_info).url_name == 'login'
+    except Resolver404:
+        return False
+
+
+class LimiteSolicitudesMiddleware:
+    """Responde 429 (con ``Retry-After``) cuando un balde se queda sin tokens."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in METODOS_SEGUROS:
+            if es_login(request):
+                baldes = [
+                    ('login_ip', ip_cliente(request), settings.LIMITE_LOGIN_IP),
+                    ('login_usuario', request.POST.get('username', '').lower(), settings.LIMITE_LOGIN_USUARIO),
+                ]
+            else:
+                baldes = [('escritura_ip', ip_cliente(request), settings.LIMITE_ESCRITURA_IP)]
+            rechazo = self._consumir(request, baldes)
+            if rechazo is not None:
+                return rechazo
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in METODOS_SEGUROS or not request.user.is_authenticated:
+            return None
+        return self._consumir(request, [('escritura_usuario', request.user.pk, settings.LIMITE_ESCRITURA_USUARIO)])
+
+    def _consumir(self, request, baldes):
+        for nombre, identificador, limite in baldes:
+            limite = leer_limite(limite)
+            if limite is None or identificador in ('', None):
+                continue
+            espera = consumir(f'{nombre}:{_identificador(identificador)}', limite)
+            if espera:
+                logger.info('Límite %s excedido por %s en %s', nombre, ip_cliente(request), request.path)
+                return self._respuesta(request, espera)
+        return None
+
+    def _respuesta(self, request, espera):
+        mensaje = f'Demasiadas solicitudes. Intente de nuevo en {math.ceil(espera)} segundos.'
+        if request.path.startswith('/api/') or request.content_type == 'application/json':
+            response = JsonResponse({'error': mensaje}, status=429)
+        else:
+            response = HttpResponse(mensaje, status=429, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(math.ceil(espera))
+        return response
@@ -0,0 +1,123 @@
+"""
+Enrutamiento de lecturas pesadas hacia la réplica de la base de datos.
+
+Las vistas optan explícitamente con ``LecturaReplicaMixin`` (vistas de clase),
+``@usar_replica`` (vistas de función) o ``ReplicaAdminMixin`` (changelists del
+admin). Todo lo demás, y cualquier escritura, va a la base primaria.
+
+Tras una escritura exitosa ``ReplicaMiddleware`` fija al usuario a la primaria
+durante ``REPLICA_VENTANA_PRIMARIA`` segundos para que lea sus propios cambios
+aunque la réplica tenga retraso.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+REPLICA = 'replica'
+COOKIE_PRIMARIA = 'itaka_primaria'
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_usar_replica = ContextVar('usar_replica', default=False)
+_fijado_primaria = ContextVar('fijado_primaria', default=False)
+
+
+def replica_configurada():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def leer_desde_replica():
+    """Envía las lecturas del bloque a la réplica (si existe y no hay fijación)."""
+    token = _usar_replica.set(True)
+    try:
+        yield
+    finally:
+        _usar_replica.reset(token)
+
+
+def _renderizar(response):
+    # Las TemplateResponse se evalúan después de dispatch(); se renderizan aquí
+    # para que las consultas de la plantilla también usen la réplica.
+    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+        response.render()
+    return response
+
+
+def usar_replica(vista):
+    """Decorador para vistas de función de solo lectura."""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        with leer_desde_replica():
+            return _renderizar(vista(request, *args, **kwargs))
+    return envoltura
+
+
+class LecturaReplicaMixin:
+    """Mixin para vistas de clase de solo lectura (listados, reportes)."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in METODOS_SEGUROS:
+            return super().dispatch(request, *args, **kwargs)
+        with leer_desde_replica():
+            return _renderizar(super().dispatch(request, *args, **kwargs))
+
+
+class ReplicaAdminMixin:
+    """Mixin para ModelAdmin: el changelist (con sus COUNT y anotaciones) lee de la réplica."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method not in METODOS_SEGUROS:
+            return super().changelist_view(request, extra_context)
+        with leer_desde_replica():
+            return _renderizar(super().changelist_view(request, extra_context))
+
+
+class ReplicaRouter:
+    """Router: lecturas opt-in a la réplica, escrituras y migraciones a la primaria."""
+
+    def db_for_read(self, model, **hints):
+        if _usar_replica.get() and not _fijado_primaria.get() and replica_configurada():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y primaria contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaMiddleware:
+    """Fija la solicitud a la primaria si el usuario escribió hace poco (read-your-writes)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        escritura = request.method not in METODOS_SEGUROS
+        token = _fijado_primaria.set(escritura or self._fijado(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _fijado_primaria.reset(token)
+
+        if escritura and response.status_code < 400 and replica_configurada():
+            ventana = settings.REPLICA_VENTANA_PRIMARIA
+            response.set_cookie(
+                COOKIE_PRIMARIA, str(time.time() + ventana),
+                max_age=ventana, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def _fijado(self, request):
+        try:
+            return float(request.COOKIES.get(COOKIE_PRIMARIA, 0)) > time.time()
+        except ValueError:
+            return False
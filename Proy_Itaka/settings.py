@@ -12,7 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
-import dj_database_url
+
+from .db import configurar_base_datos
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -34,9 +35,11 @@ ALLOWED_HOSTS = ['.onrender.com', 'localhost', '127.0.0.1']
 
 INSTALLED_APPS = [
     'index',
+    'sucursales',
     'comedor',
     'cocina',
     'app_usuarios',
+    'tareas',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -48,10 +51,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'Proy_Itaka.limites.LimiteSolicitudesMiddleware',
+    'Proy_Itaka.routers.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'sucursales.middleware.SucursalMiddleware',
+    'index.idempotencia.IdempotenciaMiddleware',
+    'comedor.eventos.EventosMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,13 +98,107 @@ WSGI_APPLICATION = 'Proy_Itaka.wsgi.application'
     }
 }"""
 
+# Ver Proy_Itaka/db.py para las variables de entorno (DB_POOL, DB_POOL_MAX, ...)
 DATABASES = {
-    'default': dj_database_url.config(
-        default=os.environ.get('DATABASE_URL'),
-        conn_max_age=600
-    )
+    'default': configurar_base_datos(),
+}
+
+# Réplica de solo lectura opcional para listados, changelists y reportes
+_REPLICA = configurar_base_datos(url=os.environ.get('DATABASE_REPLICA_URL', ''))
+if _REPLICA:
+    _REPLICA['TEST'] = {'MIRROR': 'default'}
+    DATABASES['replica'] = _REPLICA
+
+DATABASE_ROUTERS = ['Proy_Itaka.routers.ReplicaRouter']
+
+# Segundos que un usuario lee de la primaria después de escribir
+REPLICA_VENTANA_PRIMARIA = int(os.environ.get('REPLICA_VENTANA_PRIMARIA', 10))
+
+# Token opcional para que el monitoreo consulte /main/metricas/db/ sin sesión
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
+
+
+# Sucursales (sucursales/contexto.py): todas comparten este despliegue y esta
+# base. Las solicitudes sin sucursal elegida y las filas creadas fuera de una
+# solicitud van a esta; la migración inicial la crea con id 1.
+SUCURSAL_POR_DEFECTO = int(os.environ.get('SUCURSAL_POR_DEFECTO', 1))
+
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Con REDIS_URL la caché es compartida por todos los workers; sin ella cada
+# proceso mantiene su propia caché en memoria.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'itaka',
+        }
+    }
+
+# Segundos que se reutilizan los KPI del panel del comedor
+DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 15))
+
+# Máximo de filas que cuenta el admin en changelists filtrados (Proy_Itaka.admin_tablas)
+ADMIN_CONTEO_TOPE = int(os.environ.get('ADMIN_CONTEO_TOPE', 10000))
+
+# Claves de idempotencia (index/idempotencia.py): segundos que se guarda cada
+# respuesta y segundos que una repetición espera a que termine la original
+IDEMPOTENCIA_TTL = int(os.environ.get('IDEMPOTENCIA_TTL', 86400))
+IDEMPOTENCIA_ESPERA = float(os.environ.get('IDEMPOTENCIA_ESPERA', 10))
+
+# Límites de solicitudes (Proy_Itaka/limites.py): "cantidad/periodo" con periodo
+# s, m u h; vacío desactiva el límite. Todas las tablets de un local suelen
+# salir por la misma IP, por eso el límite de escritura por IP es holgado.
+LIMITE_LOGIN_IP = os.environ.get('LIMITE_LOGIN_IP', '20/m')
+LIMITE_LOGIN_USUARIO = os.environ.get('LIMITE_LOGIN_USUARIO', '5/m')
+LIMITE_ESCRITURA_IP = os.environ.get('LIMITE_ESCRITURA_IP', '600/m')
+LIMITE_ESCRITURA_USUARIO = os.environ.get('LIMITE_ESCRITURA_USUARIO', '120/m')
+# Cabecera con la IP real detrás de un proxy (p. ej. HTTP_X_FORWARDED_FOR); vacía usa REMOTE_ADDR
+LIMITE_CABECERA_IP = os.environ.get('LIMITE_CABECERA_IP', '')
+
+
+# Cola de tareas en base de datos (python manage.py procesar_tareas)
+# Máximo de tareas simultáneas por cola, sumando todos los workers
+TAREAS_CONCURRENCIA = {
+    'default': int(os.environ.get('TAREAS_CONCURRENCIA_DEFAULT', 2)),
+    'tickets': 1,  # Una sola impresión a la vez: los tickets salen en orden
 }
+TAREAS_BACKOFF_BASE = 5        # segundos antes del primer reintento
+TAREAS_BACKOFF_MAX = 3600      # tope del backoff exponencial
+TAREAS_TIMEOUT = 900           # segundos tras los que una tarea 'en_proceso' se considera abandonada
+TAREAS_INTERVALO = 1.0         # espera del worker cuando no hay trabajo
+
 
+# Reservas pendientes/confirmadas se marcan 'no_asistio' pasados estos minutos
+RESERVA_GRACIA_MINUTOS = int(os.environ.get('RESERVA_GRACIA_MINUTOS', 60))
+BARRIDO_NO_SHOW_INTERVALO = int(os.environ.get('BARRIDO_NO_SHOW_INTERVALO', 300))
+
+# Duración inicial de una mesa ocupada (minutos) y peso de cada nueva observación
+# en la media móvil exponencial de rotación (comedor/rotacion.py)
+ROTACION_MINUTOS_INICIAL = int(os.environ.get('ROTACION_MINUTOS_INICIAL', 90))
+ROTACION_ALFA = float(os.environ.get('ROTACION_ALFA', 0.2))
+
+# Impresoras de comandas y cuentas (comedor/tickets.py). Cada estación imprime en
+# la impresora de su nombre (cocina, bar) y las cuentas en 'caja'; las que no
+# figuran usan 'default'.
+TICKETS_IMPRESORAS = {
+    'default': {
+        'BACKEND': 'comedor.tickets.ArchivoBackend',
+        'OPTIONS': {'directorio': os.environ.get('TICKETS_DIRECTORIO', BASE_DIR / 'tickets')},
+    },
+}
+TICKETS_ANCHO = int(os.environ.get('TICKETS_ANCHO', 42))  # Caracteres por línea (42: papel de 80 mm)
 
 
 # Password validation
@@ -0,0 +1,66 @@
+"""
+Trabajo diferido al confirmar la transacción, acumulado y sin duplicar.
+
+``al_confirmar(clave, funcion, **conjuntos)`` registra con
+``transaction.on_commit`` una sola función por ``clave`` y transacción; las
+llamadas siguientes con la misma clave solo suman sus valores a los conjuntos
+pendientes, y al confirmar se ejecuta una vez ``funcion(**conjuntos)``.
+Fuera de una transacción se ejecuta de inmediato, como ``on_commit``.
+
+Las funciones pendientes se guardan en un ContextVar (el mismo alcance que las
+conexiones de Django) por ``(alias, clave)`` y solo como referencia débil: la
+única referencia fuerte es la que guarda ``on_commit``. Si la transacción (o
+el savepoint donde se registró) se revierte, Django descarta la función, la
+referencia muere y la próxima llamada registra una nueva.
+"""
+import weakref
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+_pendientes = ContextVar('pendientes_al_confirmar', default=None)
+
+
+class _AlConfirmar:
+    """Función registrada con ``on_commit`` que acumula los valores hasta ejecutarse"""
+
+    def __init__(self, funcion, llave):
+        self.funcion = funcion
+        self.llave = llave
+        self.conjuntos = {}
+
+    def sumar(self, conjuntos):
+        for nombre, valores in conjuntos.items():
+            self.conjuntos.setdefault(nombre, set()).update(valores)
+
+    def __call__(self):
+        pendientes = _pendientes.get() or {}
+        referencia = pendientes.get(self.llave)
+        if referencia is not None and referencia() is self:
+            del pendientes[self.llave]  # Lo que se programe desde aquí ya va en otra transacción
+        self.funcion(**self.conjuntos)
+
+
+def al_confirmar(clave, funcion, using=None, **conjuntos):
+    """
+    Ejecuta ``funcion(**conjuntos)`` al confirmar la transacción en curso, una
+    sola vez por ``clave``: los conjuntos de todas las llamadas con la misma
+    clave se unen.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    llave = (using, clave)
+    pendientes = _pendientes.get()
+    if pendientes is None:
+        pendientes = {}
+        _pendientes.set(pendientes)
+    referencia = pendientes.get(llave)
+    pendiente = referencia() if referencia is not None else None
+    if pendiente is not None:
+        pendiente.sumar(conjuntos)
+        return
+
+    pendiente = _AlConfirmar(funcion, llave)
+    pendiente.sumar(conjuntos)
+    if transaction.get_connection(using).in_atomic_block:
+        pendientes[llave] = weakref.ref(pendiente)
+    transaction.on_commit(pendiente, using=using)
@@ -22,8 +22,10 @@ urlpatterns = [
     path('', include('app_usuarios.urls')),
     path('comedor/', include('comedor.urls')),
     path('cocina/', include('cocina.urls')),
+    path('api/v1/', include('comedor.api.urls')),
     path('accounts/', include('app_usuarios.urls')),
     path('main/', include('index.urls')),
+    path('sucursal/', include('sucursales.urls')),
 ]
 
 handler404 = 'index.views.handler404'
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.db.models import Count
 from django.utils.html import format_html
-from .models import CategoriaItem, Item
+from .models import CategoriaItem, Item, EstacionCocina, Ingrediente, IngredienteItem
 
 
 # ============================================
@@ -33,15 +33,24 @@ class CategoriaItemAdmin(admin.ModelAdmin):
     total_items.admin_order_field = '_total_items'
 
 
+class IngredienteItemInline(admin.TabularInline):
+    """Receta del item"""
+    model = IngredienteItem
+    extra = 1
+    autocomplete_fields = ['ingrediente']
+
+
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
     """Administración de Items del Menú"""
     list_display = ['nombre', 'categoria', 'precio', 'disponible', 'tiempo_preparacion', 'disponibilidad_badge']
     list_filter = ['disponible', 'categoria', 'tiempo_preparacion']
+    list_select_related = ['categoria']
     search_fields = ['nombre', 'descripcion']
     ordering = ['categoria', 'nombre']
     list_per_page = 20
     list_editable = ['precio', 'disponible']
+    inlines = [IngredienteItemInline]
     
     fieldsets = (
         ('Información del Item', {
@@ -57,3 +66,19 @@ class ItemAdmin(admin.ModelAdmin):
             return format_html('<span style="color: green; font-weight: bold;">✓ Disponible</span>')
         return format_html('<span style="color: red; font-weight: bold;">✗ No Disponible</span>')
     disponibilidad_badge.short_description = 'Disponibilidad'
+
+
+@admin.register(EstacionCocina)
+class EstacionCocinaAdmin(admin.ModelAdmin):
+    """Administración de Estaciones de Cocina"""
+    list_display = ['nombre', 'capacidad']
+    list_editable = ['capacidad']
+
+
+@admin.register(Ingrediente)
+class IngredienteAdmin(admin.ModelAdmin):
+    """Administración de Ingredientes y su stock"""
+    list_display = ['nombre', 'stock', 'unidad', 'fecha_actualizacion']
+    list_filter = ['unidad']
+    search_fields = ['nombre']
+    list_editable = ['stock']
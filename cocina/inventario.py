@@ -0,0 +1,116 @@
+"""
+Descuento de ingredientes al agregar, editar y quitar líneas de un pedido.
+
+El consumo de todas las líneas nuevas de un pedido se descuenta con un único
+``UPDATE ... SET stock = CASE id WHEN ... THEN stock - %s ... END``; editar
+una línea descuenta o devuelve la diferencia y borrarla (o cancelar su
+pedido) devuelve lo consumido, con la misma sentencia. El
+``CHECK (stock >= 0)`` de ``Ingrediente`` hace que, entre pedidos simultáneos,
+el que dejaría el stock negativo falle en la base de datos en vez de vender de
+más; ese error se traduce en ``StockInsuficiente``. Los items que ya no
+alcanzan para una porción se marcan no disponibles en bloque y se publica una
+versión nueva del menú. Las recetas solo usan ingredientes de la sucursal
+de su item, así que cada línea mueve el stock de su propia sucursal.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, Value, When
+
+from .menu import invalidar_menu
+from .models import Ingrediente, IngredienteItem, Item
+
+
+class StockInsuficiente(ValidationError):
+    """No hay stock de algún ingrediente para las líneas pedidas"""
+
+
+def consumo_lineas(lineas):
+    """
+    ``{ingrediente_id: cantidad}`` que consumen las ``lineas`` ``(item_id,
+    cantidad)``; una cantidad negativa devuelve stock. Se omiten los
+    ingredientes cuyo consumo neto es cero.
+    """
+    unidades = defaultdict(int)
+    for item_id, cantidad in lineas:
+        unidades[item_id] += cantidad
+    unidades = {item_id: cantidad for item_id, cantidad in unidades.items() if cantidad}
+    if not unidades:
+        return {}
+    consumo = defaultdict(Decimal)
+    # SELECT item_id, ingrediente_id, cantidad FROM cocina_ingredienteitem WHERE item_id IN (...)
+    recetas = IngredienteItem.objects.filter(item_id__in=unidades).values_list('item_id', 'ingrediente_id', 'cantidad')
+    for item_id, ingrediente_id, cantidad in recetas:
+        consumo[ingrediente_id] += cantidad * unidades[item_id]
+    return {pk: cantidad for pk, cantidad in consumo.items() if cantidad}
+
+
+def diferencia_linea(anterior, nueva):
+    """
+    Líneas ``(item_id, cantidad)`` que ajustan el stock al pasar de
+    ``anterior`` a ``nueva`` (cada una ``(item_id, cantidad)`` o ``None``):
+    la diferencia si es el mismo item; si cambió, se devuelve el anterior y
+    se descuenta el nuevo.
+    """
+    if anterior and nueva and anterior[0] == nueva[0]:
+        return [(nueva[0], nueva[1] - anterior[1])]
+    return [*([(anterior[0], -anterior[1])] if anterior else []), *([nueva] if nueva else [])]
+
+
+def descontar_stock(lineas):
+    """
+    Descuenta el stock que consumen las ``lineas`` ``(item_id, cantidad)`` en una
+    sola sentencia; las cantidades negativas lo devuelven. Lanza
+    ``StockInsuficiente`` (sin descontar nada) si algún ingrediente no alcanza.
+    Devuelve la cantidad de items que pasaron a no disponibles.
+    """
+    consumo = consumo_lineas(lineas)
+    if not consumo:
+        return 0
+
+    descuento = Case(
+        *[When(pk=pk, then=F('stock') - Value(cantidad)) for pk, cantidad in consumo.items()],
+        default=F('stock'), output_field=DecimalField(max_digits=12, decimal_places=3),
+    )
+    try:
+        with transaction.atomic():
+            # UPDATE cocina_ingrediente SET stock = CASE ... END WHERE id IN (...)
+            # Por id y sin filtrar por la sucursal en curso: son los de la sucursal de cada item
+            Ingrediente.todas.filter(pk__in=consumo).update(stock=descuento)
+    except IntegrityError:
+        # SELECT nombre, stock FROM cocina_ingrediente WHERE id IN (...)
+        faltantes = [
+            nombre for pk, nombre, stock in Ingrediente.todas.filter(pk__in=consumo).values_list('pk', 'nombre', 'stock')
+            if stock < consumo[pk]
+        ]
+        raise StockInsuficiente(
+            f'Stock insuficiente de: {", ".join(faltantes) or "ingredientes"}.', code='stock_insuficiente',
+        )
+    return marcar_agotados([pk for pk, cantidad in consumo.items() if cantidad > 0])
+
+
+def devolver_stock(lineas):
+    """Devuelve al inventario lo que consumieron las ``lineas`` ``(item_id, cantidad)`` (borradas o canceladas)"""
+    return descontar_stock([(item_id, -cantidad) for item_id, cantidad in lineas])
+
+
+def marcar_agotados(ingrediente_ids):
+    """
+    Marca no disponibles, en un UPDATE, los items cuya receta usa alguno de
+    estos ingredientes y ya no alcanza para una porción. Solo los items de la
+    sucursal de cada ingrediente.
+    """
+    if not ingrediente_ids:
+        return 0
+    agotados = IngredienteItem.objects.filter(
+        ingrediente_id__in=ingrediente_ids, ingrediente__stock__lt=F('cantidad'),
+        item__sucursal_id=F('ingrediente__sucursal_id'),
+    ).values('item_id')
+    # UPDATE cocina_item SET disponible = false WHERE disponible AND id IN (SELECT item_id FROM ...
+    #   WHERE item.sucursal_id = ingrediente.sucursal_id)
+    marcados = Item.todas.filter(disponible=True, pk__in=agotados).update(disponible=False)
+    if marcados:
+        transaction.on_commit(invalidar_menu)
+    return marcados
@@ -0,0 +1,37 @@
+"""
+Menú disponible en caché, versionado.
+
+La lista de items disponibles se guarda en la caché bajo una clave que incluye
+la versión del menú. Cualquier cambio de items (guardar/borrar un Item, o el
+paso masivo a no disponible por falta de stock) publica una versión nueva con
+``invalidar_menu()``, y la próxima lectura arma la lista de nuevo. Cada
+sucursal tiene su menú bajo su propia clave (la versión es una sola).
+"""
+import time
+
+from django.core.cache import cache
+
+from sucursales.contexto import sucursal_por_defecto
+
+CLAVE_VERSION = 'menu:version'
+VIGENCIA_MENU = 3600
+
+
+def version_menu():
+    return cache.get_or_set(CLAVE_VERSION, time.time_ns, None)
+
+
+def invalidar_menu():
+    """Publica una versión nueva del menú (las claves anteriores quedan huérfanas)"""
+    cache.set(CLAVE_VERSION, time.time_ns(), None)
+
+
+def items_disponibles():
+    """``[(id, nombre, precio), ...]`` de los items disponibles en la sucursal en curso, desde la caché"""
+    from .models import Item
+
+    def armar():
+        # SELECT id, nombre, precio FROM cocina_item WHERE sucursal_id = %s AND disponible ORDER BY categoria, nombre
+        return list(Item.objects.filter(disponible=True).values_list('pk', 'nombre', 'precio'))
+
+    return cache.get_or_set(f'menu:items:{sucursal_por_defecto()}:{version_menu()}', armar, VIGENCIA_MENU)
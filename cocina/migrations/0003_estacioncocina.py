@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocina', '0002_categoriaitem_lugar_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstacionCocina',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(choices=[('bar', 'Bar'), ('cocina', 'Cocina')], max_length=100, unique=True, verbose_name='Estación')),
+                ('capacidad', models.PositiveSmallIntegerField(default=1, help_text='Preparaciones simultáneas', verbose_name='Capacidad')),
+                ('slots_libres', models.JSONField(blank=True, default=list, editable=False, verbose_name='Slots libres desde')),
+            ],
+            options={
+                'verbose_name': 'Estación de Cocina',
+                'verbose_name_plural': 'Estaciones de Cocina',
+                'ordering': ['nombre'],
+            },
+        ),
+    ]
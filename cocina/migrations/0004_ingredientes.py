@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocina', '0003_estacioncocina'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingrediente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('unidad', models.CharField(choices=[('g', 'Gramos'), ('ml', 'Mililitros'), ('unidad', 'Unidades')], default='unidad', max_length=10, verbose_name='Unidad')),
+                ('stock', models.DecimalField(decimal_places=3, default=0, max_digits=12, verbose_name='Stock')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+            ],
+            options={
+                'verbose_name': 'Ingrediente',
+                'verbose_name_plural': 'Ingredientes',
+                'ordering': ['nombre'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('stock__gte', 0)), name='ingrediente_stock_no_negativo')],
+            },
+        ),
+        migrations.CreateModel(
+            name='IngredienteItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=3, max_digits=10, verbose_name='Cantidad por Unidad')),
+                ('ingrediente', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='usos', to='cocina.ingrediente', verbose_name='Ingrediente')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receta', to='cocina.item', verbose_name='Item')),
+            ],
+            options={
+                'verbose_name': 'Ingrediente de Item',
+                'verbose_name_plural': 'Receta',
+                'constraints': [models.UniqueConstraint(fields=('item', 'ingrediente'), name='receta_item_ingrediente_unico'), models.CheckConstraint(condition=models.Q(('cantidad__gt', 0)), name='receta_cantidad_positiva')],
+            },
+        ),
+    ]
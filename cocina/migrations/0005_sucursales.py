@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:02
+
+import django.db.models.deletion
+import sucursales.contexto
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocina', '0004_ingredientes'),
+        ('sucursales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoriaitem',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='estacioncocina',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AlterField(
+            model_name='categoriaitem',
+            name='nombre',
+            field=models.CharField(max_length=100, verbose_name='Nombre'),
+        ),
+        migrations.AlterField(
+            model_name='estacioncocina',
+            name='nombre',
+            field=models.CharField(choices=[('bar', 'Bar'), ('cocina', 'Cocina')], max_length=100, verbose_name='Estación'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['sucursal', 'disponible'], name='item_sucursal_disponible_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='categoriaitem',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'nombre'), name='categoria_sucursal_nombre_unico', violation_error_message='Ya existe una categoría con ese nombre en esta sucursal.'),
+        ),
+        migrations.AddConstraint(
+            model_name='estacioncocina',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'nombre'), name='estacion_sucursal_nombre_unico'),
+        ),
+    ]
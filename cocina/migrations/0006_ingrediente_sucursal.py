@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:32
+
+import django.db.models.deletion
+import sucursales.contexto
+from django.db import migrations, models
+from django.db.models import F
+
+
+def separar_por_sucursal(apps, schema_editor):
+    """
+    Los ingredientes existentes quedan en la sucursal por defecto; las recetas
+    de items de otra sucursal pasan a una copia del ingrediente en la sucursal
+    del item, con el mismo stock (a revisar con un conteo del local).
+    """
+    Ingrediente = apps.get_model('cocina', 'Ingrediente')
+    IngredienteItem = apps.get_model('cocina', 'IngredienteItem')
+    copias = {}
+    recetas = IngredienteItem.objects.exclude(item__sucursal_id=F('ingrediente__sucursal_id')).select_related('item', 'ingrediente')
+    for receta in recetas:
+        clave = (receta.ingrediente_id, receta.item.sucursal_id)
+        if clave not in copias:
+            original = receta.ingrediente
+            copias[clave] = Ingrediente.objects.create(
+                sucursal_id=receta.item.sucursal_id, nombre=original.nombre, unidad=original.unidad, stock=original.stock,
+            )
+        receta.ingrediente = copias[clave]
+        receta.save(update_fields=['ingrediente'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocina', '0005_sucursales'),
+        ('sucursales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingrediente',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AlterField(
+            model_name='ingrediente',
+            name='nombre',
+            field=models.CharField(max_length=100, verbose_name='Nombre'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingrediente',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'nombre'), name='ingrediente_sucursal_nombre_unico', violation_error_message='Ya existe un ingrediente con ese nombre en esta sucursal.'),
+        ),
+        migrations.RunPython(separar_por_sucursal, migrations.RunPython.noop),
+    ]
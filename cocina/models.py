@@ -1,23 +1,36 @@
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
 from django.db import models
 
+from sucursales.models import PorSucursal
+from .menu import invalidar_menu
+
 # Create your models here.
 
-class CategoriaItem(models.Model):
+LUGAR_CHOICES = [('bar', 'Bar'), ('cocina', 'Cocina')]
+
+
+class CategoriaItem(PorSucursal):
     """Categorías de items del menú (platos, bebidas, cocteles, etc.)"""
-    nombre = models.CharField(max_length=100, unique=True, verbose_name='Nombre')
+    nombre = models.CharField(max_length=100, verbose_name='Nombre')
     descripcion = models.TextField(verbose_name='Descripción', blank=True)
-    lugar_item = models.CharField(max_length=100, choices=[('bar', 'Bar'), ('cocina', 'Cocina')], verbose_name='Proveniencia del Item', default='cocina')
+    lugar_item = models.CharField(max_length=100, choices=LUGAR_CHOICES, verbose_name='Proveniencia del Item', default='cocina')
     
     class Meta:
         verbose_name = 'Categoría de Item'
         verbose_name_plural = 'Categorías de Items'
         ordering = ['nombre']
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'nombre'], name='categoria_sucursal_nombre_unico',
+                                    violation_error_message='Ya existe una categoría con ese nombre en esta sucursal.'),
+        ]
     
     def __str__(self):
         return self.nombre
 
 
-class Item(models.Model):
+class Item(PorSucursal):
     """Modelo para los items del menú (platos, bebidas, cocteles, mocktails, etc.)"""
     nombre = models.CharField(max_length=200, verbose_name='Nombre del Item')
     descripcion = models.TextField(verbose_name='Descripción')
@@ -30,7 +43,108 @@ class Item(models.Model):
         verbose_name = 'Item'
         verbose_name_plural = 'Items'
         ordering = ['categoria', 'nombre']
+        indexes = [
+            # Menú de la sucursal: WHERE sucursal_id = %s AND disponible
+            models.Index(fields=['sucursal', 'disponible'], name='item_sucursal_disponible_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} - ${self.precio}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidar_menu()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        invalidar_menu()
+        return resultado
+
+
+class Ingrediente(PorSucursal):
+    """Insumo de cocina con el stock de su sucursal; las recetas (IngredienteItem) lo consumen"""
+    UNIDAD_CHOICES = [
+        ('g', 'Gramos'),
+        ('ml', 'Mililitros'),
+        ('unidad', 'Unidades'),
+    ]
+
+    nombre = models.CharField(max_length=100, verbose_name='Nombre')
+    unidad = models.CharField(max_length=10, choices=UNIDAD_CHOICES, default='unidad', verbose_name='Unidad')
+    stock = models.DecimalField(max_digits=12, decimal_places=3, default=0, verbose_name='Stock')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name='Última Actualización')
+
+    class Meta:
+        verbose_name = 'Ingrediente'
+        verbose_name_plural = 'Ingredientes'
+        ordering = ['nombre']
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'nombre'], name='ingrediente_sucursal_nombre_unico',
+                                    violation_error_message='Ya existe un ingrediente con ese nombre en esta sucursal.'),
+            # El descuento concurrente nunca deja stock negativo: el UPDATE que lo haría falla
+            models.CheckConstraint(condition=models.Q(stock__gte=0), name='ingrediente_stock_no_negativo'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.stock} {self.unidad})"
+
+
+class IngredienteItem(models.Model):
+    """Receta: cantidad de un ingrediente que consume una unidad del item (de la misma sucursal)"""
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='receta', verbose_name='Item')
+    ingrediente = models.ForeignKey(Ingrediente, on_delete=models.PROTECT, related_name='usos', verbose_name='Ingrediente')
+    cantidad = models.DecimalField(max_digits=10, decimal_places=3, verbose_name='Cantidad por Unidad')
+
+    class Meta:
+        verbose_name = 'Ingrediente de Item'
+        verbose_name_plural = 'Receta'
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'ingrediente'], name='receta_item_ingrediente_unico'),
+            models.CheckConstraint(condition=models.Q(cantidad__gt=0), name='receta_cantidad_positiva'),
+        ]
+
+    def __str__(self):
+        return f"{self.item.nombre}: {self.cantidad} {self.ingrediente.unidad} de {self.ingrediente.nombre}"
+
+    def clean(self):
+        # Un item solo descuenta stock de su propia sucursal
+        if self.item_id and self.ingrediente_id and self.item.sucursal_id != self.ingrediente.sucursal_id:
+            raise ValidationError({'ingrediente': 'El ingrediente es de otra sucursal que el item.'})
+
+    def save(self, *args, **kwargs):
+        self.clean()
+        super().save(*args, **kwargs)
+
+
+class EstacionCocina(PorSucursal):
+    """
+    Estación de preparación (bar o cocina) con su capacidad en paralelo.
+    ``slots_libres`` guarda, por cada slot, cuándo termina lo que tiene en cola;
+    lo mantiene comedor.planificacion al asignar y completar líneas.
+    """
+    nombre = models.CharField(max_length=100, choices=LUGAR_CHOICES, verbose_name='Estación')
+    capacidad = models.PositiveSmallIntegerField(default=1, verbose_name='Capacidad',
+                                                 help_text='Preparaciones simultáneas')
+    slots_libres = models.JSONField(default=list, blank=True, editable=False, verbose_name='Slots libres desde')
+
+    class Meta:
+        verbose_name = 'Estación de Cocina'
+        verbose_name_plural = 'Estaciones de Cocina'
+        ordering = ['nombre']
+        constraints = [
+            # Cada sucursal tiene su bar y su cocina
+            models.UniqueConstraint(fields=['sucursal', 'nombre'], name='estacion_sucursal_nombre_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_nombre_display()} ({self.capacidad} en paralelo)"
+
+    def libres(self, ahora):
+        """Momento en que queda libre cada slot (nunca antes de ``ahora``)"""
+        libres = [max(datetime.fromisoformat(valor), ahora) for valor in self.slots_libres[:self.capacidad]]
+        return libres + [ahora] * (self.capacidad - len(libres))
+
+    def guardar_libres(self, libres):
+        self.slots_libres = [momento.isoformat() for momento in libres]
+        self.save(update_fields=['slots_libres'])
+
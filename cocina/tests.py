@@ -1,8 +1,19 @@
-from django.test import TestCase, Client as TestClient
+import threading
+from unittest import skipIf
+
+from django.test import TestCase, TransactionTestCase, Client as TestClient
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.forms import inlineformset_factory
 from decimal import Decimal
-from .models import CategoriaItem, Item
+from comedor.models import Pedido, DetallePedido
+from comedor.operaciones import cambiar_estado_pedidos, guardar_detalles
+from .inventario import StockInsuficiente, descontar_stock
+from .menu import items_disponibles, version_menu
+from .models import CategoriaItem, Item, Ingrediente, IngredienteItem
 from .forms import CategoriaItemForm, ItemForm
 
 
@@ -315,3 +326,162 @@ class IntegracionCocinaTest(TestCase):
         item_db = Item.objects.get(nombre='Ensalada César')
         self.assertEqual(item_db.precio, Decimal('6500'))
         self.assertFalse(item_db.disponible)
+
+
+# ============================================
+# TESTS DE INVENTARIO
+# ============================================
+
+class InventarioTest(TestCase):
+    """Tests para el descuento de ingredientes al pedir"""
+
+    def setUp(self):
+        cache.clear()
+        self.pan = Ingrediente.objects.create(nombre='Pan', stock=Decimal('3'))
+        self.carne = Ingrediente.objects.create(nombre='Carne', unidad='g', stock=Decimal('1000'))
+        self.burger = Item.objects.create(nombre='Burger', descripcion='-', precio=Decimal('8000'))
+        self.sandwich = Item.objects.create(nombre='Sándwich', descripcion='-', precio=Decimal('5000'))
+        IngredienteItem.objects.create(item=self.burger, ingrediente=self.pan, cantidad=Decimal('1'))
+        IngredienteItem.objects.create(item=self.burger, ingrediente=self.carne, cantidad=Decimal('200'))
+        IngredienteItem.objects.create(item=self.sandwich, ingrediente=self.pan, cantidad=Decimal('2'))
+        self.pedido = Pedido.objects.create()
+
+    def test_descuento_en_una_sentencia(self):
+        """Test: Todas las líneas de un pedido descuentan stock con un único UPDATE"""
+        with CaptureQueriesContext(connection) as consultas:
+            descontar_stock([(self.burger.pk, 1), (self.burger.pk, 1)])
+        updates = [q['sql'] for q in consultas if q['sql'].startswith('UPDATE "cocina_ingrediente"')]
+        self.assertEqual(len(updates), 1)
+        self.pan.refresh_from_db()
+        self.carne.refresh_from_db()
+        self.assertEqual(self.pan.stock, Decimal('1'))
+        self.assertEqual(self.carne.stock, Decimal('600'))
+
+    def test_agota_items_en_bloque(self):
+        """Test: Cuando un ingrediente no alcanza para una porción, sus items pasan a no disponibles"""
+        version = version_menu()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(descontar_stock([(self.burger.pk, 2)]), 1)  # Queda 1 pan: el sándwich necesita 2
+        self.sandwich.refresh_from_db()
+        self.burger.refresh_from_db()
+        self.assertFalse(self.sandwich.disponible)
+        self.assertTrue(self.burger.disponible)
+        self.assertNotEqual(version_menu(), version)
+        self.assertNotIn(self.sandwich.pk, [pk for pk, _, _ in items_disponibles()])
+
+    def test_stock_insuficiente_no_descuenta(self):
+        """Test: Si no alcanza, se lanza StockInsuficiente y el stock queda intacto"""
+        with self.assertRaises(StockInsuficiente) as contexto:
+            descontar_stock([(self.sandwich.pk, 1), (self.burger.pk, 2)])
+        self.assertIn('Pan', contexto.exception.message)
+        self.pan.refresh_from_db()
+        self.carne.refresh_from_db()
+        self.assertEqual(self.pan.stock, Decimal('3'))
+        self.assertEqual(self.carne.stock, Decimal('1000'))
+
+    def test_linea_de_pedido_descuenta(self):
+        """Test: Agregar una línea descuenta stock y una línea sin stock no se guarda"""
+        self.pedido.agregar_item(self.sandwich)
+        self.pan.refresh_from_db()
+        self.assertEqual(self.pan.stock, Decimal('1'))
+        with self.assertRaises(StockInsuficiente):
+            self.pedido.agregar_item(self.burger, cantidad=2)
+        self.assertEqual(self.pedido.detalles.count(), 1)
+
+    def _stock(self):
+        self.pan.refresh_from_db()
+        self.carne.refresh_from_db()
+        return self.pan.stock, self.carne.stock
+
+    def test_editar_linea_ajusta_diferencia(self):
+        """Test: Cambiar la cantidad o el item de una línea descuenta o devuelve solo la diferencia"""
+        self.pedido.agregar_item(self.burger)
+        self.pedido.actualizar_item(self.burger, 3)
+        self.assertEqual(self._stock(), (Decimal('0'), Decimal('400')))
+        detalle = self.pedido.detalles.get()
+        detalle.cantidad = 1
+        detalle.save()
+        self.assertEqual(self._stock(), (Decimal('2'), Decimal('800')))
+        detalle.item, detalle.cantidad = self.sandwich, 1
+        detalle.save()  # Devuelve la burger y descuenta el sándwich
+        self.assertEqual(self._stock(), (Decimal('1'), Decimal('1000')))
+        detalle.cantidad = 3
+        with self.assertRaises(StockInsuficiente):
+            detalle.save()
+        self.assertEqual(self._stock(), (Decimal('1'), Decimal('1000')))
+
+    def test_borrar_y_cancelar_devuelven(self):
+        """Test: Borrar una línea o cancelar el pedido devuelve su stock una sola vez"""
+        linea = self.pedido.agregar_item(self.burger, cantidad=2)
+        linea.delete()
+        self.assertEqual(self._stock(), (Decimal('3'), Decimal('1000')))
+
+        linea = self.pedido.agregar_item(self.burger, cantidad=2)
+        cambiar_estado_pedidos(Pedido.objects.filter(pk=self.pedido.pk), 'cancelado')
+        self.assertEqual(self._stock(), (Decimal('3'), Decimal('1000')))
+        DetallePedido.objects.get(pk=linea.pk).delete()  # Ya se devolvió al cancelar
+        self.assertEqual(self._stock(), (Decimal('3'), Decimal('1000')))
+
+    def test_formset_ajusta_en_una_sentencia(self):
+        """Test: Editar y borrar líneas en el formset ajusta el stock con un único UPDATE"""
+        burger = self.pedido.agregar_item(self.burger)
+        sandwich = self.pedido.agregar_item(self.sandwich)
+        Formset = inlineformset_factory(Pedido, DetallePedido, fields=['item', 'cantidad', 'precio_unitario'], extra=0)
+        datos = {
+            'detalles-TOTAL_FORMS': '2', 'detalles-INITIAL_FORMS': '2',
+            'detalles-0-id': str(burger.pk), 'detalles-0-item': str(self.burger.pk),
+            'detalles-0-cantidad': '3', 'detalles-0-precio_unitario': '8000',
+            'detalles-1-id': str(sandwich.pk), 'detalles-1-item': str(self.sandwich.pk),
+            'detalles-1-cantidad': '1', 'detalles-1-precio_unitario': '5000', 'detalles-1-DELETE': 'on',
+        }
+        formset = Formset(datos, instance=self.pedido)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        with CaptureQueriesContext(connection) as consultas:
+            guardar_detalles(formset)
+        updates = [q['sql'] for q in consultas if q['sql'].startswith('UPDATE "cocina_ingrediente"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self._stock(), (Decimal('0'), Decimal('400')))
+
+    def test_item_sin_receta(self):
+        """Test: Los items sin receta no tocan el inventario"""
+        agua = Item.objects.create(nombre='Agua', descripcion='-', precio=Decimal('1000'))
+        with self.assertNumQueries(1):
+            self.assertEqual(descontar_stock([(agua.pk, 5)]), 0)
+
+
+@skipIf(connection.vendor == 'sqlite', 'SQLite serializa las escrituras con bloqueos de tabla')
+class InventarioConcurrenciaTest(TransactionTestCase):
+    """Pedidos simultáneos que consumen el mismo ingrediente"""
+
+    def test_no_vende_de_mas(self):
+        """Test: Con stock para 5, de 10 pedidos simultáneos solo 5 se guardan"""
+        pan = Ingrediente.objects.create(nombre='Pan', stock=Decimal('5'))
+        burger = Item.objects.create(nombre='Burger', descripcion='-', precio=Decimal('8000'))
+        IngredienteItem.objects.create(item=burger, ingrediente=pan, cantidad=Decimal('1'))
+        pedidos = [Pedido.objects.create() for _ in range(10)]
+        barrera = threading.Barrier(len(pedidos))
+        resultados = []
+
+        def pedir(pedido):
+            try:
+                barrera.wait()
+                pedido.agregar_item(burger)
+                resultados.append('ok')
+            except StockInsuficiente:
+                resultados.append('sin_stock')
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=pedir, args=(pedido,)) for pedido in pedidos]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(resultados.count('ok'), 5)
+        self.assertEqual(resultados.count('sin_stock'), 5)
+        pan.refresh_from_db()
+        burger.refresh_from_db()
+        self.assertEqual(pan.stock, 0)
+        self.assertFalse(burger.disponible)
+        self.assertEqual(DetallePedido.objects.count(), 5)
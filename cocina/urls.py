@@ -6,6 +6,10 @@ app_name = 'cocina'
 urlpatterns = [
     # Vista principal de cocina
     path('', views.CocinaIndexView.as_view(), name='cocina_index'),
+
+    # Tablero de estaciones
+    path('tablero/', views.tablero_cocina, name='tablero_cocina'),
+    path('tablero/lineas/<int:pk>/listo/', views.completar_linea_cocina, name='completar_linea_cocina'),
     
     # URLs de Items
     path('items/', views.ItemListView.as_view(), name='listar_items'),
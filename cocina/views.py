@@ -4,7 +4,11 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView, DetailView
 from django.contrib import messages
 from django.urls import reverse_lazy
-from .models import CategoriaItem, Item
+from django.views.decorators.http import require_POST
+from Proy_Itaka.routers import LecturaReplicaMixin
+from comedor.models import DetallePedido, Pedido
+from comedor.planificacion import completar_linea
+from .models import CategoriaItem, Item, EstacionCocina
 from .forms import CategoriaItemForm, ItemForm
 
 # Create your views here.
@@ -17,11 +21,48 @@ class CocinaIndexView(LoginRequiredMixin, TemplateView):
     template_name = 'index_cocina.html'
 
 
+# ============================================
+# TABLERO DE ESTACIONES
+# ============================================
+
+@login_required
+def tablero_cocina(request):
+    """Líneas pendientes de pedidos abiertos por estación, en el orden planificado"""
+    # SELECT ... FROM cocina_estacioncocina WHERE sucursal_id = %s ORDER BY nombre
+    estaciones = list(EstacionCocina.objects.all())
+    # SELECT detalle.*, item.nombre, pedido.*, mesa.numero FROM comedor_detallepedido JOIN ...
+    # WHERE estado_preparacion = 'pendiente' AND pedido.estado IN (...) AND estacion_id IN (<estaciones de la sucursal>)
+    # ORDER BY estacion_id, inicio_estimado
+    lineas = (
+        DetallePedido.objects
+        .filter(estado_preparacion='pendiente', pedido__estado__in=Pedido.ESTADOS_ABIERTOS,
+                estacion_id__in=[estacion.pk for estacion in estaciones])
+        .select_related('item', 'pedido__mesa')
+        .order_by('estacion_id', 'inicio_estimado')
+    )
+    por_estacion = {estacion.pk: [] for estacion in estaciones}
+    for linea in lineas:
+        por_estacion[linea.estacion_id].append(linea)
+    return render(request, 'tablero_cocina.html', {
+        'columnas': [(estacion, por_estacion[estacion.pk]) for estacion in estaciones],
+    })
+
+
+@login_required
+@require_POST
+def completar_linea_cocina(request, pk):
+    # SELECT * FROM comedor_detallepedido JOIN comedor_pedido ... WHERE id = pk AND pedido.sucursal_id = %s LIMIT 1
+    linea = get_object_or_404(DetallePedido, pk=pk)
+    completar_linea(linea)
+    messages.success(request, f'{linea.item} marcado como listo.')
+    return redirect('cocina:tablero_cocina')
+
+
 # ============================================
 # VISTAS PARA ITEMS
 # ============================================
 
-class ItemListView(LoginRequiredMixin, ListView):
+class ItemListView(LoginRequiredMixin, LecturaReplicaMixin, ListView):
     model = Item
     template_name = 'list_items.html'
     context_object_name = 'items'
@@ -101,7 +142,7 @@ def item_delete(request, pk):
 # VISTAS PARA CATEGORÍAS DE ITEMS
 # ============================================
 
-class CategoriaItemListView(ListView):
+class CategoriaItemListView(LecturaReplicaMixin, ListView):
     model = CategoriaItem
     template_name = 'list_categorias.html'
     context_object_name = 'categorias'
@@ -1,19 +1,58 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.db.models import Count
 from django.utils.html import format_html
-from .models import Mesa, Cliente, Reserva, Pedido, DetallePedido
+from Proy_Itaka.admin_tablas import FiltroTexto, TablaGrandeAdminMixin
+from Proy_Itaka.routers import ReplicaAdminMixin
+from .models import Mesa, Cliente, GrupoReserva, Reserva, Pedido, DetallePedido, EventoEstado, Promocion, Pago, Pronostico, RotacionMesa, EsperaMesa, OperacionCliente, Ticket, CierreCaja
+from cocina.inventario import StockInsuficiente
+from .operaciones import cambiar_estado_reservas, cambiar_estado_pedidos, guardar_detalles
+from .tickets import programar_impresion
+
+
+# ============================================
+# FILTROS
+# ============================================
+
+class FiltroNumeroMesa(FiltroTexto):
+    """Filtra por número de mesa sin cargar la tabla de mesas"""
+    title = 'número de mesa'
+    parameter_name = 'mesa_numero'
+    lookup = 'mesa__numero'
+    entero = True
+    placeholder = 'Ej: 12'
+
+
+class FiltroNombreItem(FiltroTexto):
+    """Filtra por el comienzo del nombre del item"""
+    title = 'item'
+    parameter_name = 'item_nombre'
+    lookup = 'item__nombre__istartswith'
+    placeholder = 'Nombre del item'
 
 
 # ============================================
 # INLINE ADMIN CLASSES
 # ============================================
 
+class PagoInline(admin.TabularInline):
+    """Pagos del pedido (solo lectura: se registran con el cobro)"""
+    model = Pago
+    extra = 0
+    fields = ['fecha', 'monto', 'propina', 'metodo', 'asiento', 'registrado_por']
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 class DetallePedidoInline(admin.TabularInline):
     """Inline para mostrar detalles de pedidos dentro del pedido"""
     model = DetallePedido
     extra = 1
-    fields = ['item', 'cantidad', 'precio_unitario', 'subtotal', 'observaciones']
-    readonly_fields = ['subtotal']
+    fields = ['item', 'cantidad', 'precio_unitario', 'descuento', 'promocion', 'subtotal', 'asiento', 'observaciones']
+    readonly_fields = ['descuento', 'promocion', 'subtotal']
+    autocomplete_fields = ['item']
 
 
 # ============================================
@@ -28,15 +67,20 @@ class MesaAdmin(admin.ModelAdmin):
     search_fields = ['numero', 'ubicacion']
     ordering = ['numero']
     list_per_page = 20
+    filter_horizontal = ['adyacentes']
     
     fieldsets = (
         ('Información Básica', {
             'fields': ('numero', 'capacidad', 'ubicacion')
         }),
+        ('Mesas que se pueden juntar', {
+            'fields': ('adyacentes',)
+        }),
         ('Estado', {
-            'fields': ('estado',)
+            'fields': ('estado', 'ocupada_desde', 'liberacion_estimada')
         }),
     )
+    readonly_fields = ['ocupada_desde', 'liberacion_estimada']
     
     def estado_badge(self, obj):
         colors = {
@@ -51,7 +95,7 @@ class MesaAdmin(admin.ModelAdmin):
 
 
 @admin.register(Cliente)
-class ClienteAdmin(admin.ModelAdmin):
+class ClienteAdmin(ReplicaAdminMixin, TablaGrandeAdminMixin, admin.ModelAdmin):
     """Administración de Clientes"""
     list_display = ['nombre', 'telefono', 'email', 'fecha_registro', 'total_reservas', 'total_pedidos']
     list_filter = ['fecha_registro']
@@ -90,16 +134,44 @@ class ClienteAdmin(admin.ModelAdmin):
     total_pedidos.admin_order_field = '_total_pedidos'
 
 
+class ReservaGrupoInline(admin.TabularInline):
+    """Mesas reservadas por el grupo"""
+    model = Reserva
+    fields = ['mesa', 'numero_personas', 'estado']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(GrupoReserva)
+class GrupoReservaAdmin(admin.ModelAdmin):
+    """Reservas de grupo (las mesas se asignan desde la vista de reserva de grupo)"""
+    list_display = ['id', 'cliente', 'fecha_reserva', 'numero_personas', 'ubicacion', 'creada_por']
+    list_filter = ['ubicacion', 'fecha_reserva']
+    list_select_related = ['cliente', 'creada_por']
+    autocomplete_fields = ['cliente']
+    search_fields = ['cliente__nombre']
+    readonly_fields = ['creada_por', 'fecha_creacion']
+    date_hierarchy = 'fecha_reserva'
+    inlines = [ReservaGrupoInline]
+
+
 @admin.register(Reserva)
-class ReservaAdmin(admin.ModelAdmin):
+class ReservaAdmin(ReplicaAdminMixin, TablaGrandeAdminMixin, admin.ModelAdmin):
     """Administración de Reservas"""
     list_display = ['id', 'cliente', 'mesa', 'fecha_reserva', 'numero_personas', 'estado', 'creada_por']
-    list_filter = ['estado', 'fecha_reserva', 'mesa']
+    list_filter = ['estado', 'fecha_reserva', FiltroNumeroMesa]
+    list_select_related = ['cliente', 'mesa', 'creada_por']
+    autocomplete_fields = ['cliente', 'mesa']
     search_fields = ['cliente__nombre', 'cliente__telefono', 'mesa__numero']
     ordering = ['-fecha_reserva']
     list_per_page = 20
     readonly_fields = ['creada_por', 'fecha_creacion', 'fecha_actualizacion']
     date_hierarchy = 'fecha_reserva'
+    actions = ['confirmar_reservas', 'cancelar_reservas', 'marcar_no_asistio']
     
     fieldsets = (
         ('Información de Reserva', {
@@ -120,25 +192,49 @@ class ReservaAdmin(admin.ModelAdmin):
             obj.creada_por = request.user
         super().save_model(request, obj, form, change)
 
+    def _cambiar_estado(self, request, queryset, estado, etiqueta):
+        reservas, mesas = cambiar_estado_reservas(queryset, estado)
+        omitidas = queryset.count() - reservas
+        self.message_user(request, f'{reservas} reserva(s) {etiqueta}; {mesas} mesa(s) actualizada(s).')
+        if omitidas:
+            self.message_user(
+                request, f'{omitidas} reserva(s) omitida(s) por su estado actual.', messages.WARNING,
+            )
+
+    def confirmar_reservas(self, request, queryset):
+        self._cambiar_estado(request, queryset, 'confirmada', 'confirmada(s)')
+    confirmar_reservas.short_description = 'Confirmar reservas seleccionadas'
+
+    def cancelar_reservas(self, request, queryset):
+        self._cambiar_estado(request, queryset, 'cancelada', 'cancelada(s)')
+    cancelar_reservas.short_description = 'Cancelar reservas seleccionadas'
+
+    def marcar_no_asistio(self, request, queryset):
+        self._cambiar_estado(request, queryset, 'no_asistio', 'marcada(s) como no asistió')
+    marcar_no_asistio.short_description = 'Marcar como "No asistió"'
+
 
 @admin.register(Pedido)
-class PedidoAdmin(admin.ModelAdmin):
+class PedidoAdmin(ReplicaAdminMixin, TablaGrandeAdminMixin, admin.ModelAdmin):
     """Administración de Pedidos"""
     list_display = ['id', 'mesa', 'cliente', 'estado', 'total', 'fecha_pedido', 'atendido_por']
-    list_filter = ['estado', 'fecha_pedido']
+    list_filter = ['estado', 'fecha_pedido', FiltroNumeroMesa]
+    list_select_related = ['mesa', 'cliente', 'atendido_por']
+    autocomplete_fields = ['mesa', 'cliente']
     search_fields = ['id', 'cliente__nombre', 'mesa__numero']
     ordering = ['-fecha_pedido']
     list_per_page = 20
-    readonly_fields = ['total', 'atendido_por', 'fecha_pedido', 'fecha_actualizacion']
+    readonly_fields = ['total', 'monto_pagado', 'propinas', 'listo_estimado', 'atendido_por', 'fecha_pedido', 'fecha_actualizacion']
     date_hierarchy = 'fecha_pedido'
-    inlines = [DetallePedidoInline]
+    inlines = [DetallePedidoInline, PagoInline]
+    actions = ['cancelar_pedidos', 'cerrar_pedidos']
     
     fieldsets = (
         ('Información del Pedido', {
-            'fields': ('mesa', 'cliente', 'estado')
+            'fields': ('mesa', 'cliente', 'estado', 'comensales')
         }),
         ('Detalles', {
-            'fields': ('observaciones', 'total')
+            'fields': ('observaciones', 'total', 'monto_pagado', 'propinas', 'listo_estimado')
         }),
         ('Información del Sistema', {
             'fields': ('atendido_por', 'fecha_pedido', 'fecha_actualizacion'),
@@ -152,25 +248,203 @@ class PedidoAdmin(admin.ModelAdmin):
             obj.atendido_por = request.user
         super().save_model(request, obj, form, change)
 
+    def save_formset(self, request, form, formset, change):
+        """Guarda las líneas del pedido en bloque y recalcula el total una vez"""
+        if formset.model is DetallePedido:
+            try:
+                guardar_detalles(formset)
+            except StockInsuficiente as error:
+                self.message_user(request, f'{error.message} Las líneas no se guardaron.', messages.ERROR)
+        else:
+            super().save_formset(request, form, formset, change)
+
+    def _cambiar_estado(self, request, queryset, estado, etiqueta, motivo='ya estaban cerrados'):
+        pedidos = cambiar_estado_pedidos(queryset, estado)
+        omitidos = queryset.count() - pedidos
+        self.message_user(request, f'{pedidos} pedido(s) {etiqueta}.')
+        if omitidos:
+            self.message_user(
+                request, f'{omitidos} pedido(s) omitido(s): {motivo}.', messages.WARNING,
+            )
+
+    def cancelar_pedidos(self, request, queryset):
+        self._cambiar_estado(request, queryset, 'cancelado', 'cancelado(s)')
+    cancelar_pedidos.short_description = 'Cancelar pedidos seleccionados'
+
+    def cerrar_pedidos(self, request, queryset):
+        self._cambiar_estado(
+            request, queryset, 'pagado', 'cerrado(s) como pagado(s)',
+            motivo='ya estaban cerrados o tienen saldo pendiente (regístrelo como pago)',
+        )
+    cerrar_pedidos.short_description = 'Cerrar pedidos seleccionados sin saldo (pagado)'
+
 
 @admin.register(DetallePedido)
-class DetallePedidoAdmin(admin.ModelAdmin):
+class DetallePedidoAdmin(ReplicaAdminMixin, TablaGrandeAdminMixin, admin.ModelAdmin):
     """Administración de Detalles de Pedidos"""
-    list_display = ['pedido', 'item', 'cantidad', 'precio_unitario', 'subtotal', 'observaciones']
-    list_filter = ['pedido__fecha_pedido', 'item']
+    list_display = ['pedido', 'item', 'cantidad', 'precio_unitario', 'descuento', 'subtotal', 'observaciones']
+    list_filter = ['pedido__fecha_pedido', FiltroNombreItem]
+    list_select_related = ['pedido__mesa', 'item']
+    autocomplete_fields = ['pedido', 'item']
     search_fields = ['pedido__id', 'item__nombre']
     ordering = ['-pedido__fecha_pedido']
-    readonly_fields = ['subtotal']
+    readonly_fields = ['descuento', 'promocion', 'subtotal', 'estacion', 'slot', 'inicio_estimado', 'listo_estimado']
     
     fieldsets = (
         ('Pedido', {
             'fields': ('pedido',)
         }),
         ('Item', {
-            'fields': ('item', 'cantidad', 'precio_unitario', 'subtotal')
+            'fields': ('item', 'cantidad', 'precio_unitario', 'descuento', 'promocion', 'subtotal')
+        }),
+        ('Preparación', {
+            'fields': ('estado_preparacion', 'estacion', 'slot', 'inicio_estimado', 'listo_estimado')
         }),
         ('Observaciones', {
             'fields': ('observaciones',)
         }),
     )
 
+
+@admin.register(Promocion)
+class PromocionAdmin(admin.ModelAdmin):
+    """Administración de Promociones"""
+    list_display = ['nombre', 'tipo', 'valor', 'item', 'categoria', 'tipo_pedido', 'hora_inicio', 'hora_fin',
+                    'fecha_inicio', 'fecha_fin', 'prioridad', 'activa']
+    list_filter = ['activa', 'tipo', 'tipo_pedido', 'categoria']
+    search_fields = ['nombre']
+    list_select_related = ['item', 'categoria']
+    autocomplete_fields = ['item']
+    list_editable = ['activa', 'prioridad']
+
+    fieldsets = (
+        ('Promoción', {
+            'fields': ('nombre', 'tipo', 'valor', ('lleva', 'paga'), 'prioridad', 'activa')
+        }),
+        ('Aplica a', {
+            'fields': ('item', 'categoria', 'tipo_pedido')
+        }),
+        ('Vigencia', {
+            'fields': ('dias', ('hora_inicio', 'hora_fin'), ('fecha_inicio', 'fecha_fin'))
+        }),
+    )
+
+
+@admin.register(Pronostico)
+class PronosticoAdmin(TablaGrandeAdminMixin, admin.ModelAdmin):
+    """Pronósticos de demanda (los genera el comando pronosticar_demanda)"""
+    list_display = ['fecha_hora', 'item', 'cantidad', 'generado']
+    list_filter = [FiltroNombreItem]
+    list_select_related = ['item']
+    date_hierarchy = 'fecha_hora'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EsperaMesa)
+class EsperaMesaAdmin(admin.ModelAdmin):
+    """Lista de espera de grupos sin reserva"""
+    list_display = ['nombre', 'numero_personas', 'estado', 'fecha_llegada', 'hora_estimada', 'mesa']
+    list_filter = ['estado']
+    search_fields = ['nombre', 'telefono']
+    list_select_related = ['mesa']
+    date_hierarchy = 'fecha_llegada'
+    raw_id_fields = ['cliente']
+    readonly_fields = ['hora_estimada']
+
+
+@admin.register(RotacionMesa)
+class RotacionMesaAdmin(admin.ModelAdmin):
+    """Duración promedio de las mesas ocupadas (se actualiza al liberarlas)"""
+    list_display = ['capacidad', 'minutos', 'muestras']
+    readonly_fields = ['muestras']
+
+
+@admin.register(EventoEstado)
+class EventoEstadoAdmin(ReplicaAdminMixin, TablaGrandeAdminMixin, admin.ModelAdmin):
+    """Bitácora de transiciones de estado (solo lectura)"""
+    list_display = ['fecha', 'entidad', 'entidad_id', 'estado_anterior', 'estado_nuevo', 'actor']
+    list_filter = ['entidad', 'estado_nuevo']
+    search_fields = ['entidad_id']
+    list_select_related = ['actor']
+    date_hierarchy = 'fecha'
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OperacionCliente)
+class OperacionClienteAdmin(ReplicaAdminMixin, TablaGrandeAdminMixin, admin.ModelAdmin):
+    """Operaciones sincronizadas desde las tablets (solo lectura)"""
+    list_display = ['fecha', 'dispositivo', 'id_cliente', 'recurso', 'accion', 'objeto_id', 'estado', 'usuario']
+    list_filter = ['estado', 'recurso', 'accion']
+    search_fields = ['dispositivo', 'id_cliente']
+    list_select_related = ['usuario']
+    date_hierarchy = 'fecha'
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Ticket)
+class TicketAdmin(ReplicaAdminMixin, TablaGrandeAdminMixin, admin.ModelAdmin):
+    """Comandas y cuentas enviadas a las impresoras (solo lectura)"""
+    list_display = ['fecha_creacion', 'tipo', 'pedido', 'impresora', 'estado', 'intentos', 'fecha_impresion']
+    list_filter = ['estado', 'tipo', 'impresora']
+    search_fields = ['pedido__id']
+    fields = ['tipo', 'pedido', 'impresora', 'estado', 'intentos', 'ultimo_error', 'fecha_creacion', 'fecha_impresion', 'texto']
+    readonly_fields = fields
+    date_hierarchy = 'fecha_creacion'
+    list_per_page = 50
+    actions = ['reimprimir']
+
+    def texto(self, obj):
+        return format_html('<pre>{}</pre>', obj.como_texto())
+    texto.short_description = 'Ticket'
+
+    def reimprimir(self, request, queryset):
+        tickets = queryset.update(estado='pendiente', fecha_impresion=None)
+        programar_impresion()
+        self.message_user(request, f'{tickets} ticket(s) enviado(s) de nuevo a imprimir.')
+    reimprimir.short_description = 'Volver a imprimir los tickets seleccionados'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CierreCaja)
+class CierreCajaAdmin(admin.ModelAdmin):
+    """Cierres de caja diarios (solo lectura: se crean con cerrar_caja)"""
+    list_display = ['fecha', 'ventas_netas', 'descuentos', 'propinas', 'pedidos_pagados', 'pedidos_cancelados', 'pedidos_abiertos', 'cerrado_por']
+    list_select_related = ['cerrado_por']
+    date_hierarchy = 'fecha'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,7 @@
+"""
+API JSON versionada (``/api/v1/``) para las tablets del salón.
+
+- ``recursos.py``: campos expuestos y formularios de cada modelo.
+- ``lote.py``: mutaciones en lote en una sola transacción.
+- ``views.py``: lecturas con ``fields``/``ids``, el trabajo completo y el lote.
+"""
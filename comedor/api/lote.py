@@ -0,0 +1,159 @@
+"""
+Mutaciones en lote: muchas operaciones en una sola solicitud y una sola
+transacción. Si una falla, no se aplica ninguna.
+
+Cada operación es ``{"recurso", "accion", "id"?, "datos"?}``; ``accion`` es
+``crear``, ``actualizar`` (parcial: solo los campos enviados), ``eliminar`` o
+``estado`` (``{"ids": [...], "estado": ...}``, con las transiciones masivas
+de ``operaciones.py``). Un valor ``"$N"`` en ``id``, ``ids`` o ``datos`` se
+reemplaza por el id que resultó de la operación N del mismo lote, así una
+tablet puede abrir un pedido y cargarle líneas en la misma solicitud.
+
+Los datos se validan con los mismos formularios que las pantallas. Las líneas
+de pedido se guardan sin recalcular el total y cada pedido tocado se
+recalcula una sola vez al final.
+"""
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import transaction
+from django.forms import model_to_dict
+
+from ..models import Pedido, DetallePedido
+from ..operaciones import TRANSICIONES_PEDIDO, TRANSICIONES_RESERVA, cambiar_estado_pedidos, cambiar_estado_reservas
+from .recursos import RECURSOS
+
+MAXIMO_OPERACIONES = 200
+
+CAMBIOS_DE_ESTADO = {
+    'reservas': (TRANSICIONES_RESERVA, cambiar_estado_reservas),
+    'pedidos': (TRANSICIONES_PEDIDO, cambiar_estado_pedidos),
+}
+
+
+class ErrorLote(Exception):
+    """Una operación del lote no se pudo aplicar; ``indice`` es su posición"""
+
+    def __init__(self, indice, errores):
+        super().__init__(errores)
+        self.indice = indice
+        self.errores = errores
+
+
+def _errores(error):
+    return error.message_dict if hasattr(error, 'error_dict') else {'__all__': error.messages}
+
+
+def _resolver(valor, resultados):
+    """``"$N"`` -> id resultante de la operación N"""
+    if isinstance(valor, str) and valor.startswith('$') and valor[1:].isdigit():
+        indice = int(valor[1:])
+        if indice >= len(resultados) or 'id' not in resultados[indice]:
+            raise ValidationError(f'La referencia {valor} no apunta a una operación anterior con id.')
+        return resultados[indice]['id']
+    return valor
+
+
+def _objeto(recurso, operacion, resultados):
+    try:
+        # SELECT ... WHERE id = %s FOR UPDATE
+        return recurso.queryset().select_for_update(of=('self',)).get(pk=_resolver(operacion.get('id'), resultados))
+    except (ObjectDoesNotExist, ValueError, TypeError):
+        raise ValidationError(f'No existe {recurso.nombre} con id {operacion.get("id")!r}.')
+
+
+def _guardar(recurso, operacion, resultados, usuario, pedidos):
+    instancia = _objeto(recurso, operacion, resultados) if operacion['accion'] == 'actualizar' else None
+    datos = operacion.get('datos') or {}
+    if not isinstance(datos, dict):
+        raise ValidationError('datos debe ser un objeto.')
+    # Los campos no enviados conservan su valor (o el default del modelo al crear)
+    base = model_to_dict(instancia or recurso.modelo(), fields=recurso.campos_escritura)
+    datos = {**base, **{campo: _resolver(valor, resultados) for campo, valor in datos.items()}}
+
+    form = recurso.formulario_api()(datos, instance=instancia)
+    if not form.is_valid():
+        raise ValidationError(form.errors.as_data())
+    objeto = form.save(commit=False)
+    if instancia is None and recurso.modelo is Pedido:
+        objeto.atendido_por = usuario
+    elif instancia is None and hasattr(objeto, 'creada_por'):
+        objeto.creada_por = usuario
+
+    if isinstance(objeto, DetallePedido):
+        objeto.precio_unitario = objeto.item.precio  # Precio vigente del item
+        objeto.save(recalcular=False)  # -> UPDATE cocina_ingrediente + INSERT (o UPDATE) comedor_detallepedido
+        pedidos.add(objeto.pedido_id)
+        if instancia is not None and instancia.pedido_id != objeto.pedido_id:
+            pedidos.add(instancia.pedido_id)
+    else:
+        objeto.save()
+    return {'id': objeto.pk}
+
+
+def _eliminar(recurso, operacion, resultados, pedidos):
+    objeto = _objeto(recurso, operacion, resultados)
+    if isinstance(objeto, DetallePedido):
+        pedidos.add(objeto.pedido_id)
+    pk = objeto.pk
+    objeto.delete()
+    return {'id': pk}
+
+
+def _cambiar_estado(recurso, operacion, resultados):
+    transiciones, cambiar = CAMBIOS_DE_ESTADO[recurso.nombre]
+    estado = operacion.get('estado')
+    if estado not in transiciones:
+        raise ValidationError(f'Estado no permitido para {recurso.nombre}: {estado!r}.')
+    ids = operacion.get('ids')
+    if not isinstance(ids, list):
+        raise ValidationError('ids debe ser una lista.')
+    ids = [_resolver(pk, resultados) for pk in ids]
+    resultado = cambiar(recurso.modelo.objects.filter(pk__in=ids), estado)
+    actualizados = resultado[0] if isinstance(resultado, tuple) else resultado
+    return {'ids': ids, 'actualizados': actualizados}
+
+
+def aplicar_operacion(operacion, resultados, usuario, pedidos):
+    """Aplica una operación; ``pedidos`` acumula los pedidos cuyo total hay que recalcular"""
+    if not isinstance(operacion, dict):
+        raise ValidationError('Cada operación debe ser un objeto.')
+    recurso = RECURSOS.get(operacion.get('recurso'))
+    if recurso is None:
+        raise ValidationError(f'Recurso desconocido: {operacion.get("recurso")!r}.')
+    accion = operacion.get('accion')
+    if accion not in recurso.acciones:
+        raise ValidationError(f'Acción no permitida sobre {recurso.nombre}: {accion!r}.')
+
+    if accion == 'estado':
+        resultado = _cambiar_estado(recurso, operacion, resultados)
+    elif accion == 'eliminar':
+        resultado = _eliminar(recurso, operacion, resultados, pedidos)
+    else:
+        resultado = _guardar(recurso, operacion, resultados, usuario, pedidos)
+    return {'recurso': recurso.nombre, 'accion': accion, **resultado}
+
+
+def recalcular_pedidos(pedidos):
+    # SELECT ... FROM comedor_pedido WHERE id IN (...); un recálculo por pedido tocado
+    for pedido in Pedido.objects.filter(pk__in=pedidos):
+        pedido.calcular_total()
+
+
+def aplicar_lote(operaciones, usuario=None):
+    """
+    Aplica las ``operaciones`` en una transacción y devuelve un resultado por
+    operación. Lanza ``ErrorLote`` (sin aplicar nada) en la primera que falle.
+    """
+    if not isinstance(operaciones, list) or not operaciones:
+        raise ErrorLote(None, {'__all__': ['operaciones debe ser una lista no vacía.']})
+    if len(operaciones) > MAXIMO_OPERACIONES:
+        raise ErrorLote(None, {'__all__': [f'Como mucho {MAXIMO_OPERACIONES} operaciones por lote.']})
+
+    resultados, pedidos = [], set()
+    with transaction.atomic():
+        for indice, operacion in enumerate(operaciones):
+            try:
+                resultados.append(aplicar_operacion(operacion, resultados, usuario, pedidos))
+            except ValidationError as error:
+                raise ErrorLote(indice, _errores(error))
+        recalcular_pedidos(pedidos)
+    return resultados
@@ -0,0 +1,117 @@
+"""
+Recursos de la API: qué campos se exponen de cada modelo, con qué formulario
+se validan las escrituras y qué filas forman el "trabajo" de una tablet.
+
+Las lecturas usan ``values(*campos)``: una sola consulta por recurso, sin
+instanciar modelos, y solo con las columnas que el cliente pidió en
+``fields``. Las claves foráneas salen como ids con el nombre del campo
+(``"mesa": 3``).
+"""
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.forms import modelform_factory
+
+from ..forms import MesaForm, ReservaForm, PedidoForm, DetallePedidoForm
+from ..models import Mesa, Reserva, Pedido, DetallePedido
+
+MAXIMO_IDS = 500
+
+
+@dataclass(frozen=True)
+class Recurso:
+    nombre: str
+    modelo: type
+    campos: tuple
+    formulario: type
+    campos_escritura: tuple
+    acciones: frozenset
+    # Filtro de las filas que una tablet necesita tener al día (vacío: todas)
+    trabajo: dict = field(default_factory=dict)
+
+    def queryset(self):
+        """
+        Filas de la sucursal en curso: los modelos por sucursal filtran en su
+        manager; las líneas de pedido, por la sucursal de su pedido.
+        """
+        return self.modelo.objects.all()
+
+    def queryset_trabajo(self):
+        return self.queryset().filter(**self.trabajo)
+
+    def formulario_api(self):
+        return modelform_factory(self.modelo, form=self.formulario, fields=self.campos_escritura)
+
+
+RECURSOS = {
+    recurso.nombre: recurso for recurso in [
+        Recurso(
+            'mesas', Mesa,
+            campos=('id', 'numero', 'capacidad', 'ubicacion', 'estado', 'ocupada_desde', 'liberacion_estimada',
+                    'fecha_actualizacion'),
+            formulario=MesaForm, campos_escritura=('numero', 'capacidad', 'ubicacion', 'estado'),
+            acciones=frozenset({'actualizar'}),
+        ),
+        Recurso(
+            'reservas', Reserva,
+            campos=('id', 'cliente', 'mesa', 'grupo', 'fecha_reserva', 'numero_personas', 'estado',
+                    'observaciones', 'fecha_actualizacion'),
+            formulario=ReservaForm,
+            campos_escritura=('cliente', 'mesa', 'fecha_reserva', 'numero_personas', 'observaciones'),
+            acciones=frozenset({'crear', 'actualizar', 'estado'}),
+            trabajo={'estado__in': Reserva.ESTADOS_ACTIVOS},
+        ),
+        Recurso(
+            'pedidos', Pedido,
+            campos=('id', 'mesa', 'cliente', 'tipo_pedido', 'comensales', 'estado', 'observaciones', 'total',
+                    'monto_pagado', 'listo_estimado', 'fecha_pedido', 'fecha_actualizacion'),
+            formulario=PedidoForm,
+            campos_escritura=('mesa', 'cliente', 'tipo_pedido', 'comensales', 'estado', 'observaciones'),
+            acciones=frozenset({'crear', 'actualizar', 'estado'}),
+            trabajo={'estado__in': Pedido.ESTADOS_ABIERTOS},
+        ),
+        Recurso(
+            'detalles', DetallePedido,
+            campos=('id', 'pedido', 'item', 'cantidad', 'precio_unitario', 'descuento', 'subtotal', 'asiento',
+                    'estado_preparacion', 'listo_estimado', 'observaciones'),
+            formulario=DetallePedidoForm,
+            campos_escritura=('pedido', 'item', 'cantidad', 'asiento', 'observaciones'),
+            acciones=frozenset({'crear', 'actualizar', 'eliminar'}),
+            trabajo={'pedido__estado__in': Pedido.ESTADOS_ABIERTOS},
+        ),
+    ]
+}
+
+
+def campos_pedidos(recurso, texto):
+    """
+    Campos de ``fields=a,b,c`` (siempre con ``id``); todos si viene vacío.
+    Lanza ``ValidationError`` con los campos desconocidos.
+    """
+    if not texto:
+        return list(recurso.campos)
+    pedidos = [campo.strip() for campo in texto.split(',') if campo.strip()]
+    desconocidos = sorted(set(pedidos) - set(recurso.campos))
+    if desconocidos:
+        raise ValidationError(f'Campos desconocidos en {recurso.nombre}: {", ".join(desconocidos)}.')
+    return ['id'] + [campo for campo in pedidos if campo != 'id']
+
+
+def ids_pedidos(texto):
+    """Ids de ``ids=1,2,3`` (como mucho ``MAXIMO_IDS``)"""
+    try:
+        ids = sorted({int(valor) for valor in texto.split(',') if valor.strip()})
+    except ValueError:
+        raise ValidationError('ids debe ser una lista de enteros separados por comas.')
+    if len(ids) > MAXIMO_IDS:
+        raise ValidationError(f'Se pueden pedir como mucho {MAXIMO_IDS} ids por solicitud.')
+    return ids
+
+
+def leer(recurso, campos, ids=None, queryset=None):
+    """Filas del recurso como diccionarios (una consulta)"""
+    queryset = recurso.queryset_trabajo() if queryset is None else queryset
+    if ids is not None:
+        queryset = recurso.queryset().filter(pk__in=ids)
+    # SELECT <campos> FROM ... WHERE ... ORDER BY id
+    return list(queryset.order_by('pk').values(*campos))
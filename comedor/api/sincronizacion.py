@@ -0,0 +1,204 @@
+"""
+Sincronización de tablets que trabajan sin conexión.
+
+La tablet encola sus operaciones mientras no hay Wi-Fi. Son las mismas del
+lote (``comedor/api/lote.py``) más un ``id_cliente`` propio (único en el
+dispositivo) y la ``fecha`` en que se hicieron. Al volver la conexión las
+envía todas juntas y se procesan en orden, en una sola transacción:
+
+- Una operación ya procesada (mismo dispositivo e ``id_cliente``) no se vuelve a
+  aplicar; se responde con el resultado guardado en ``OperacionCliente``.
+- ``"@<id_cliente>"`` en ``id``, ``ids`` o ``datos`` apunta al objeto creado por otra
+  operación del dispositivo, en este envío o en uno anterior. Así se cargan
+  líneas a un pedido abierto sin conexión.
+- Conflictos: una actualización con ``version`` (la ``fecha_actualizacion``
+  que vio la tablet) no se aplica si el servidor cambió la fila después de
+  esa versión y también después de la ``fecha`` de la operación; gana el
+  cambio más reciente. Tampoco se agregan líneas a pedidos ya cerrados. En
+  ambos casos se devuelve la fila del servidor.
+- Cada operación corre en su propio savepoint: una rechazada no deshace las
+  demás.
+
+La respuesta trae además los cambios del servidor desde el ``cursor`` de la
+sincronización anterior y el cursor nuevo.
+"""
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import Pedido, OperacionCliente
+from .lote import ErrorLote, MAXIMO_OPERACIONES, _errores, aplicar_operacion, recalcular_pedidos
+from .recursos import RECURSOS, leer
+
+# Margen hacia atrás del cursor: cubre transacciones que confirmaron después
+# de la sincronización anterior con una fecha_actualizacion más vieja. Las
+# filas repetidas no molestan, la tablet las reemplaza por id.
+SOLAPAMIENTO = timedelta(seconds=5)
+
+
+def leer_fecha(valor):
+    """Fecha ISO 8601 o ``None``; lanza ``ValidationError`` si no se entiende"""
+    if valor in (None, ''):
+        return None
+    fecha = parse_datetime(str(valor))
+    if fecha is None:
+        raise ValidationError(f'Fecha inválida: {valor!r}.')
+    return fecha if timezone.is_aware(fecha) else timezone.make_aware(fecha)
+
+
+def _referencias(valor, ids_servidor):
+    """Reemplaza ``"@<id_cliente>"`` por el id en el servidor del objeto que creó esa operación"""
+    if isinstance(valor, dict):
+        return {clave: _referencias(v, ids_servidor) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [_referencias(v, ids_servidor) for v in valor]
+    if isinstance(valor, str) and valor.startswith('@'):
+        if ids_servidor.get(valor[1:]) is None:
+            raise ValidationError(f'La referencia {valor} no corresponde a un objeto creado por este dispositivo.')
+        return ids_servidor[valor[1:]]
+    return valor
+
+
+def _buscar_referencias(valor, encontradas):
+    if isinstance(valor, dict):
+        for v in valor.values():
+            _buscar_referencias(v, encontradas)
+    elif isinstance(valor, list):
+        for v in valor:
+            _buscar_referencias(v, encontradas)
+    elif isinstance(valor, str) and valor.startswith('@'):
+        encontradas.add(valor[1:])
+    return encontradas
+
+
+def _conflicto(operacion, fecha_cliente):
+    """
+    Fila del servidor que impide aplicar la operación, o ``None``. Los ids
+    inválidos no son conflicto: los rechaza ``aplicar_operacion``.
+    """
+    recurso = RECURSOS.get(operacion.get('recurso'))
+    if recurso is None:
+        return None
+    try:
+        return _fila_en_conflicto(recurso, operacion, fecha_cliente)
+    except (ValueError, TypeError):
+        return None
+
+
+def _fila_en_conflicto(recurso, operacion, fecha_cliente):
+    accion = operacion.get('accion')
+    if accion == 'actualizar' and 'fecha_actualizacion' in recurso.campos and operacion.get('version'):
+        version = leer_fecha(operacion['version'])
+        # SELECT <campos> FROM ... WHERE id = %s
+        fila = recurso.queryset().filter(pk=operacion.get('id')).values(*recurso.campos).first()
+        if fila and fila['fecha_actualizacion'] > version and fila['fecha_actualizacion'] > fecha_cliente:
+            return fila
+    if recurso.nombre == 'detalles' and accion == 'crear':
+        pedidos = RECURSOS['pedidos']
+        # SELECT <campos> FROM comedor_pedido WHERE id = %s
+        pedido = Pedido.objects.filter(pk=(operacion.get('datos') or {}).get('pedido')).values(*pedidos.campos).first()
+        if pedido and pedido['estado'] not in Pedido.ESTADOS_ABIERTOS:
+            return pedido
+    return None
+
+
+def cambios_desde(cursor):
+    """
+    Filas cambiadas desde ``cursor``: mesas, reservas y pedidos por
+    ``fecha_actualizacion`` y todas las líneas de esos pedidos (así la tablet
+    también se entera de las líneas borradas). Sin cursor, el trabajo completo.
+    """
+    if cursor is None:
+        return {nombre: leer(recurso, list(recurso.campos)) for nombre, recurso in RECURSOS.items()}
+    desde = cursor - SOLAPAMIENTO
+    cambios = {
+        nombre: leer(recurso, list(recurso.campos), queryset=recurso.modelo.objects.filter(fecha_actualizacion__gt=desde))
+        for nombre, recurso in RECURSOS.items() if nombre != 'detalles'
+    }
+    detalles = RECURSOS['detalles']
+    cambios['detalles'] = leer(
+        detalles, list(detalles.campos),
+        queryset=detalles.queryset().filter(pedido_id__in=[pedido['id'] for pedido in cambios['pedidos']]),
+    )
+    return cambios
+
+
+def sincronizar(dispositivo, operaciones, cursor=None, usuario=None):
+    """
+    Procesa las ``operaciones`` encoladas por ``dispositivo`` y devuelve
+    ``{'resultados': [...], 'cambios': {...}, 'cursor': ...}``. Cada resultado
+    tiene el ``id_cliente`` de la tablet, su ``estado`` (aplicada, conflicto o
+    rechazada) y el ``objeto_id`` en el servidor.
+    """
+    if not dispositivo or len(dispositivo) > 64:
+        raise ErrorLote(None, {'dispositivo': ['Indique el identificador del dispositivo (hasta 64 caracteres).']})
+    operaciones = operaciones or []
+    if not isinstance(operaciones, list) or len(operaciones) > MAXIMO_OPERACIONES:
+        raise ErrorLote(None, {'operaciones': [f'Debe ser una lista de hasta {MAXIMO_OPERACIONES} operaciones.']})
+    cursor_nuevo = timezone.now()
+
+    ids = [str(op.get('id_cliente')) for op in operaciones if isinstance(op, dict) and op.get('id_cliente')]
+    # SELECT ... FROM comedor_operacioncliente WHERE dispositivo = %s AND id_cliente IN (...)
+    procesadas = {
+        previa.id_cliente: previa
+        for previa in OperacionCliente.objects.filter(dispositivo=dispositivo, id_cliente__in=ids)
+    }
+    referencias = set()
+    for op in operaciones:
+        _buscar_referencias(op, referencias)
+    # SELECT id_cliente, objeto_id FROM comedor_operacioncliente WHERE dispositivo = %s AND id_cliente IN (...)
+    ids_servidor = dict(
+        OperacionCliente.objects.filter(dispositivo=dispositivo, id_cliente__in=referencias)
+        .values_list('id_cliente', 'objeto_id')
+    )
+
+    resultados, nuevas, pedidos = [], [], set()
+    with transaction.atomic():
+        for op in operaciones:
+            id_cliente = str(op.get('id_cliente') or '') if isinstance(op, dict) else ''
+            if not id_cliente or len(id_cliente) > 64:
+                resultados.append({
+                    'id_cliente': id_cliente, 'estado': 'rechazada',
+                    'errores': {'id_cliente': ['Indique el id de la operación (hasta 64 caracteres).']},
+                })
+                continue
+            if id_cliente in procesadas:
+                resultados.append({**procesadas[id_cliente].resultado, 'repetida': True})
+                continue
+
+            resultado, objeto_id, fecha_cliente = {'id_cliente': id_cliente}, None, cursor_nuevo
+            try:
+                fecha_cliente = leer_fecha(op.get('fecha')) or cursor_nuevo
+                with transaction.atomic():
+                    operacion = _referencias(op, ids_servidor)
+                    servidor = _conflicto(operacion, fecha_cliente)
+                    if servidor is not None:
+                        resultado.update(estado='conflicto', servidor=servidor)
+                    else:
+                        aplicada = aplicar_operacion(operacion, [], usuario, pedidos)
+                        objeto_id = aplicada.get('id')
+                        resultado.update(estado='aplicada', objeto_id=objeto_id)
+            except ValidationError as error:
+                resultado.update(estado='rechazada', errores=_errores(error))
+
+            resultados.append(resultado)
+            ids_servidor[id_cliente] = objeto_id
+            procesadas[id_cliente] = nueva = OperacionCliente(
+                dispositivo=dispositivo, id_cliente=id_cliente, recurso=str(op.get('recurso', ''))[:20],
+                accion=str(op.get('accion', ''))[:20], objeto_id=objeto_id, estado=resultado['estado'],
+                resultado=resultado, fecha_cliente=fecha_cliente, usuario=usuario,
+            )
+            nuevas.append(nueva)
+
+        recalcular_pedidos(pedidos)
+        # INSERT INTO comedor_operacioncliente ... (una sola sentencia)
+        OperacionCliente.objects.bulk_create(nuevas)
+
+    return {
+        'resultados': resultados,
+        'cambios': cambios_desde(cursor),
+        'cursor': cursor_nuevo.isoformat(),
+    }
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('trabajo/', views.trabajo, name='trabajo'),
+    path('lote/', views.lote, name='lote'),
+    path('sync/', views.sincronizar, name='sincronizar'),
+    path('<str:recurso>/', views.leer_recurso, name='leer_recurso'),
+]
@@ -0,0 +1,121 @@
+import json
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_POST
+from Proy_Itaka.routers import usar_replica
+from cocina.menu import items_disponibles
+from . import sincronizacion
+from .lote import ErrorLote, aplicar_lote
+from .recursos import RECURSOS, campos_pedidos, ids_pedidos, leer
+
+
+def api(vista):
+    """Sesión obligatoria (401 en JSON, sin redirigir al login) y respuesta comprimida"""
+    @gzip_page
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Autenticación requerida.'}, status=401)
+        return vista(request, *args, **kwargs)
+    return envoltura
+
+
+def _error(mensaje, status=400, **extra):
+    return JsonResponse({'error': mensaje, **extra}, status=status)
+
+
+@api
+@require_GET
+@usar_replica
+def leer_recurso(request, recurso):
+    """
+    ``GET /api/v1/<recurso>/?fields=a,b&ids=1,2``: con ``ids`` esas filas (una
+    consulta), sin ``ids`` las del trabajo en curso.
+    """
+    recurso = RECURSOS.get(recurso)
+    if recurso is None:
+        return _error('Recurso desconocido.', status=404)
+    try:
+        campos = campos_pedidos(recurso, request.GET.get('fields', ''))
+        ids = ids_pedidos(request.GET['ids']) if 'ids' in request.GET else None
+    except ValidationError as error:
+        return _error(error.messages[0])
+    return JsonResponse({'data': leer(recurso, campos, ids=ids)})
+
+
+@api
+@require_GET
+@usar_replica
+def trabajo(request):
+    """
+    ``GET /api/v1/trabajo/``: todo lo que una tablet necesita en una solicitud:
+    mesas, reservas activas, pedidos abiertos con sus líneas y el menú
+    disponible. ``fields[<recurso>]=a,b`` limita los campos de cada recurso.
+    """
+    try:
+        campos = {
+            nombre: campos_pedidos(recurso, request.GET.get(f'fields[{nombre}]', ''))
+            for nombre, recurso in RECURSOS.items()
+        }
+    except ValidationError as error:
+        return _error(error.messages[0])
+    datos = {nombre: leer(recurso, campos[nombre]) for nombre, recurso in RECURSOS.items()}
+    datos['items'] = [
+        {'id': pk, 'nombre': nombre, 'precio': precio} for pk, nombre, precio in items_disponibles()
+    ]
+    return JsonResponse(datos)
+
+
+@api
+@require_POST
+def lote(request):
+    """
+    ``POST /api/v1/lote/`` con ``{"operaciones": [...]}``: aplica todas en una
+    transacción (ver ``comedor/api/lote.py``). 400 con el índice de la
+    operación que falló; en ese caso no se aplica ninguna.
+    """
+    try:
+        cuerpo = json.loads(request.body or b'{}')
+    except ValueError:
+        return _error('El cuerpo no es JSON válido.')
+    if not isinstance(cuerpo, dict):
+        return _error('El cuerpo debe ser un objeto JSON.')
+    try:
+        resultados = aplicar_lote(cuerpo.get('operaciones'), usuario=request.user)
+    except ErrorLote as error:
+        return _error('No se aplicó ninguna operación.', indice=error.indice, errores=error.errores)
+    return JsonResponse({'resultados': resultados})
+
+
+@api
+@require_POST
+def sincronizar(request):
+    """
+    ``POST /api/v1/sync/`` con ``{"dispositivo", "cursor", "operaciones"}``:
+    aplica las operaciones que la tablet encoló sin conexión y devuelve su
+    resultado, los cambios desde ``cursor`` y el cursor para la próxima vez
+    (ver ``comedor/api/sincronizacion.py``).
+    """
+    try:
+        cuerpo = json.loads(request.body or b'{}')
+    except ValueError:
+        return _error('El cuerpo no es JSON válido.')
+    if not isinstance(cuerpo, dict):
+        return _error('El cuerpo debe ser un objeto JSON.')
+    try:
+        cursor = sincronizacion.leer_fecha(cuerpo.get('cursor'))
+        respuesta = sincronizacion.sincronizar(
+            str(cuerpo.get('dispositivo') or ''), cuerpo.get('operaciones'), cursor=cursor, usuario=request.user,
+        )
+    except ValidationError as error:
+        return _error(error.messages[0])
+    except ErrorLote as error:
+        return _error('Sincronización inválida.', errores=error.errores)
+    except IntegrityError:
+        # Otra sincronización del mismo dispositivo registró las mismas operaciones a la vez
+        return _error('Sincronización concurrente del dispositivo; reintente.', status=409)
+    return JsonResponse(respuesta)
@@ -0,0 +1,138 @@
+"""
+Cierre de caja diario.
+
+``calcular_cierre`` recorre una sola vez los pedidos del día con sus líneas
+(una consulta, un ``values_list`` sin instanciar modelos) y suma a la vez:
+ventas brutas, descuentos, ventas netas y propinas de los pedidos pagados;
+ventas por tipo de pedido, por mesero y por categoría; pedidos cancelados y
+pedidos que siguen abiertos. Una venta cuenta el día en que se pagó
+(``Pedido.fecha_pago``), aunque el pedido se haya tomado antes de medianoche;
+los cancelados y abiertos, el día en que se tomaron.
+
+``cerrar_caja`` guarda el resultado en ``CierreCaja``, una foto inmutable:
+consultar un día ya cerrado es leer una fila, aunque después se borren o
+archiven sus pedidos. Cada sucursal cierra su caja por separado (la sucursal
+en curso o, fuera de una solicitud, la por defecto).
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from sucursales.contexto import sucursal_por_defecto, usar_sucursal
+from .models import Pedido, CierreCaja
+
+SIN_MESERO = 'Sin asignar'
+SIN_CATEGORIA = 'Sin categoría'
+CERO = Decimal('0')
+
+
+def rango_dia(fecha):
+    """Inicio y fin (exclusivo) del día local ``fecha``"""
+    inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+    return inicio, timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+
+
+def _ordenado(grupos):
+    """Desglose como lista ordenada por ventas (mayor primero)"""
+    return sorted(
+        ({'nombre': nombre, **valores} for nombre, valores in grupos.items()),
+        key=lambda fila: (-fila['ventas'], fila['nombre']),
+    )
+
+
+def calcular_cierre(fecha):
+    """
+    Totales y desgloses de los pedidos pagados el día ``fecha`` y de los
+    tomados ese día que no se pagaron (una consulta). Devuelve un dict con las
+    mismas claves que los campos de ``CierreCaja``.
+    """
+    inicio, fin = rango_dia(fecha)
+    etiquetas_tipo = dict(Pedido.TIPO_CHOICES)
+    pagados, cancelados, abiertos = set(), set(), set()
+    totales = {'ventas_brutas': CERO, 'descuentos': CERO, 'ventas_netas': CERO, 'propinas': CERO,
+               'monto_cancelado': CERO, 'monto_abierto': CERO}
+    por_tipo = defaultdict(lambda: {'pedidos': 0, 'ventas': CERO})
+    por_mesero = defaultdict(lambda: {'pedidos': 0, 'ventas': CERO, 'propinas': CERO})
+    por_categoria = defaultdict(lambda: {'cantidad': 0, 'ventas': CERO})
+
+    # SELECT pedido.id, estado, tipo_pedido, auth_user.username, total, propinas,
+    #        detalle.cantidad, detalle.precio_unitario, detalle.descuento, detalle.subtotal, categoria.nombre
+    # FROM comedor_pedido LEFT JOIN auth_user LEFT JOIN comedor_detallepedido
+    #   LEFT JOIN cocina_item LEFT JOIN cocina_categoriaitem
+    # WHERE sucursal_id = %s AND ((estado = 'pagado' AND fecha_pago >= %s AND fecha_pago < %s)
+    #   OR (estado <> 'pagado' AND fecha_pedido >= %s AND fecha_pedido < %s)) ORDER BY pedido.id
+    # (cada rama usa su índice: pedido_sucursal_pago_idx y pedido_sucursal_fecha_idx)
+    del_dia = (
+        Q(estado='pagado', fecha_pago__gte=inicio, fecha_pago__lt=fin)
+        | (Q(fecha_pedido__gte=inicio, fecha_pedido__lt=fin) & ~Q(estado='pagado'))
+    )
+    filas = Pedido.objects.filter(del_dia).order_by('pk').values_list(
+        'pk', 'estado', 'tipo_pedido', 'atendido_por__username', 'total', 'propinas',
+        'detalles__cantidad', 'detalles__precio_unitario', 'detalles__descuento', 'detalles__subtotal',
+        'detalles__item__categoria__nombre',
+    )
+    for (pk, estado, tipo, mesero, total, propinas,
+         cantidad, precio, descuento, subtotal, categoria) in filas.iterator(chunk_size=2000):
+        if estado != 'pagado':
+            # Un pedido no pagado solo cuenta una vez, no por línea
+            if estado == 'cancelado' and pk not in cancelados:
+                cancelados.add(pk)
+                totales['monto_cancelado'] += total
+            elif estado in Pedido.ESTADOS_ABIERTOS and pk not in abiertos:
+                abiertos.add(pk)
+                totales['monto_abierto'] += total
+            continue
+
+        if pk not in pagados:
+            pagados.add(pk)
+            totales['ventas_netas'] += total
+            totales['propinas'] += propinas
+            grupo = por_tipo[etiquetas_tipo.get(tipo, tipo)]
+            grupo['pedidos'] += 1
+            grupo['ventas'] += total
+            grupo = por_mesero[mesero or SIN_MESERO]
+            grupo['pedidos'] += 1
+            grupo['ventas'] += total
+            grupo['propinas'] += propinas
+        if cantidad is not None:
+            totales['ventas_brutas'] += cantidad * precio
+            totales['descuentos'] += descuento
+            grupo = por_categoria[categoria or SIN_CATEGORIA]
+            grupo['cantidad'] += cantidad
+            grupo['ventas'] += subtotal
+
+    return {
+        'fecha': fecha,
+        **totales,
+        'pedidos_pagados': len(pagados),
+        'pedidos_cancelados': len(cancelados),
+        'pedidos_abiertos': len(abiertos),
+        'resumen': {
+            'por_tipo': _ordenado(por_tipo),
+            'por_mesero': _ordenado(por_mesero),
+            'por_categoria': _ordenado(por_categoria),
+        },
+    }
+
+
+def cerrar_caja(fecha, usuario=None):
+    """
+    Calcula y guarda el cierre del día ``fecha`` en la sucursal en curso.
+    Lanza ``ValidationError`` si ese día ya se cerró: un cierre no se rehace.
+    """
+    error = ValidationError(f'La caja del {fecha:%d/%m/%Y} ya está cerrada.')
+    with usar_sucursal(sucursal_por_defecto()):
+        # SELECT 1 FROM comedor_cierrecaja WHERE sucursal_id = %s AND fecha = %s LIMIT 1
+        if CierreCaja.objects.filter(fecha=fecha).exists():
+            raise error
+        try:
+            with transaction.atomic():
+                # INSERT INTO comedor_cierrecaja ... (sucursal y fecha son únicas: dos cierres simultáneos no pasan)
+                return CierreCaja.objects.create(cerrado_por=usuario, **calcular_cierre(fecha))
+        except IntegrityError:
+            raise error from None
@@ -0,0 +1,164 @@
+"""
+Combinación de mesas para grupos grandes.
+
+Las mesas que se pueden juntar se declaran en ``Mesa.adyacentes``. Para un
+grupo se buscan, dentro de una ubicación, los conjuntos conexos de mesas
+libres en el horario (cada conjunto se enumera una sola vez, creciendo desde
+su mesa de menor índice) y se elige el que desperdicia menos asientos; a
+igual desperdicio, el de menos mesas. La búsqueda poda las ramas que no
+pueden mejorar la mejor solución encontrada o que ya no alcanzan la
+capacidad pedida con las mesas que quedan.
+"""
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Mesa, Reserva, GrupoReserva
+
+VENTANA_CONFLICTO = timedelta(hours=2)
+MAXIMO_MESAS = 6
+
+
+def _conflicto(fecha):
+    """Reservas activas de la mesa a menos de ``VENTANA_CONFLICTO`` de ``fecha``"""
+    return Reserva.objects.filter(
+        mesa=OuterRef('pk'), estado__in=Reserva.ESTADOS_ACTIVOS,
+        fecha_reserva__range=[fecha - VENTANA_CONFLICTO, fecha + VENTANA_CONFLICTO],
+    )
+
+
+def mesas_libres(fecha, ubicacion=None, bloquear=False):
+    """
+    Mesas sin reserva activa cerca de ``fecha`` (excluye mantenimiento) y su
+    grafo de adyacencia restringido a ellas: ``(mesas, {id: {ids vecinas}})``.
+    Con ``bloquear`` primero bloquea todas las mesas candidatas (en orden de
+    id, sin mirar las reservas) y recién después busca los conflictos: esa
+    consulta ya ve las reservas de quien tuvo el bloqueo antes.
+    """
+    candidatas = Mesa.objects.exclude(estado='mantenimiento')
+    if ubicacion:
+        candidatas = candidatas.filter(ubicacion=ubicacion)
+    if bloquear:
+        # SELECT id FROM comedor_mesa WHERE estado <> 'mantenimiento' ORDER BY id FOR UPDATE
+        list(candidatas.select_for_update().order_by('pk').values_list('pk', flat=True))
+    # SELECT ... FROM comedor_mesa WHERE estado <> 'mantenimiento' AND NOT EXISTS (reserva activa cercana)
+    mesas = list(candidatas.exclude(Exists(_conflicto(fecha))).order_by('numero'))
+    ids = [mesa.pk for mesa in mesas]
+    adyacencia = {pk: set() for pk in ids}
+    # SELECT from_mesa_id, to_mesa_id FROM comedor_mesa_adyacentes WHERE ambos libres
+    pares = Mesa.adyacentes.through.objects.filter(from_mesa_id__in=ids, to_mesa_id__in=ids)
+    for origen, destino in pares.values_list('from_mesa_id', 'to_mesa_id'):
+        adyacencia[origen].add(destino)
+        adyacencia[destino].add(origen)
+    return mesas, adyacencia
+
+
+def mejor_combinacion(mesas, adyacencia, personas, maximo_mesas=MAXIMO_MESAS):
+    """
+    Conjunto conexo de mesas con capacidad >= ``personas`` que minimiza
+    ``(asientos sobrantes, cantidad de mesas)``, sin mesas superfluas.
+    Devuelve la lista de mesas o ``None`` si no hay combinación posible.
+    """
+    if not mesas:
+        return None
+    indice = {mesa.pk: i for i, mesa in enumerate(mesas)}
+    capacidad = [mesa.capacidad for mesa in mesas]
+    vecinos = [{indice[pk] for pk in adyacencia.get(mesa.pk, ())} for mesa in mesas]
+    mejor = [None, (float('inf'), float('inf'))]  # (índices, (sobrante, mesas))
+
+    def considerar(conjunto, total):
+        # Sin mesas superfluas: quitar la más chica debe dejar al grupo sin lugar
+        if total - min(capacidad[i] for i in conjunto) >= personas:
+            return
+        costo = (total - personas, len(conjunto))
+        if costo < mejor[1]:
+            mejor[0], mejor[1] = tuple(conjunto), costo
+
+    def extender(conjunto, total, extension, raiz, cercanas):
+        if total >= personas:
+            considerar(conjunto, total)
+            return  # Agregar mesas solo aumenta el sobrante
+        if not extension or len(conjunto) >= maximo_mesas:
+            return
+        sobrante, cantidad = mejor[1]
+        if sobrante == 0 and len(conjunto) + 1 >= cantidad:
+            return  # No se puede mejorar un sobrante cero con más mesas
+        if total + min(capacidad[i] for i in extension) - personas > sobrante:
+            return  # Incluso la mesa más chica deja más sobrante que la mejor solución
+        alcanzables = _alcanzables(extension, raiz, cercanas | conjunto)
+        if total + sum(sorted((capacidad[i] for i in alcanzables), reverse=True)[:maximo_mesas - len(conjunto)]) < personas:
+            return  # Con las mesas que quedan no se llega a la capacidad pedida
+        extension = set(extension)
+        while extension:
+            siguiente = extension.pop()
+            exclusivas = {u for u in vecinos[siguiente] if u > raiz and u not in conjunto and u not in cercanas}
+            extender(conjunto | {siguiente}, total + capacidad[siguiente], extension | exclusivas,
+                     raiz, cercanas | vecinos[siguiente])
+
+    def _alcanzables(frontera, raiz, vistos):
+        """Mesas (índice > raiz) conectadas a la frontera fuera de ``vistos``"""
+        alcanzadas, pendientes = set(frontera), list(frontera)
+        while pendientes:
+            for u in vecinos[pendientes.pop()]:
+                if u > raiz and u not in vistos and u not in alcanzadas:
+                    alcanzadas.add(u)
+                    pendientes.append(u)
+        return alcanzadas
+
+    # Las raíces de mayor capacidad primero encuentran antes buenas cotas
+    for raiz in sorted(range(len(mesas)), key=lambda i: -capacidad[i]):
+        extender({raiz}, capacidad[raiz], {u for u in vecinos[raiz] if u > raiz}, raiz, vecinos[raiz] | {raiz})
+
+    return [mesas[i] for i in sorted(mejor[0], key=lambda i: mesas[i].numero)] if mejor[0] else None
+
+
+def buscar_mesas(fecha, personas, ubicacion=None, bloquear=False):
+    """
+    Mejor combinación de mesas libres para el grupo. Sin ``ubicacion`` se
+    prueba cada una y gana la de menor costo. Devuelve la lista de mesas o ``None``.
+    """
+    mesas, adyacencia = mesas_libres(fecha, ubicacion, bloquear=bloquear)
+    por_ubicacion = {}
+    for mesa in mesas:
+        por_ubicacion.setdefault(mesa.ubicacion, []).append(mesa)
+    candidatas = [
+        combinacion for combinacion in (
+            mejor_combinacion(grupo, adyacencia, personas) for grupo in por_ubicacion.values()
+        ) if combinacion
+    ]
+    if not candidatas:
+        return None
+    return min(candidatas, key=lambda combinacion: (sum(m.capacidad for m in combinacion) - personas, len(combinacion)))
+
+
+def reservar_grupo(fecha, personas, cliente=None, ubicacion=None, observaciones='', usuario=None):
+    """
+    Reserva atómicamente la mejor combinación de mesas: crea el GrupoReserva y
+    una Reserva por mesa (los comensales se reparten llenando primero las
+    mesas más grandes). Las mesas candidatas se bloquean antes de buscar
+    conflictos y quedan bloqueadas durante la transacción: un segundo grupo
+    simultáneo espera y luego ve las reservas del primero, así no pueden
+    tomar la misma mesa.
+    Lanza ``ValidationError`` si no hay combinación disponible.
+    """
+    with transaction.atomic():
+        mesas = buscar_mesas(fecha, personas, ubicacion, bloquear=True)
+        if not mesas:
+            raise ValidationError(
+                f'No hay mesas libres que se puedan juntar para {personas} personas en ese horario.'
+            )
+        grupo = GrupoReserva.objects.create(
+            cliente=cliente, fecha_reserva=fecha, numero_personas=personas,
+            ubicacion=mesas[0].ubicacion, observaciones=observaciones, creada_por=usuario,
+        )
+        pendientes = personas
+        for mesa in sorted(mesas, key=lambda m: -m.capacidad):
+            sentados = min(mesa.capacidad, pendientes)
+            pendientes -= sentados
+            Reserva(
+                grupo=grupo, cliente=cliente, mesa=mesa, fecha_reserva=fecha, numero_personas=sentados,
+                observaciones=observaciones, creada_por=usuario,
+            ).save()  # -> INSERT comedor_reserva + mesa 'reservada'
+    return grupo
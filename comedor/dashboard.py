@@ -0,0 +1,123 @@
+"""
+Indicadores en vivo del comedor.
+
+Todos los KPI salen de cinco consultas agregadas y se guardan en caché
+``DASHBOARD_CACHE_TTL`` segundos: las pantallas que muestran el panel comparten
+el mismo resultado en vez de recalcularlo en cada solicitud. Cada sucursal
+tiene su propia clave.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from sucursales.contexto import sucursal_por_defecto
+from .models import Mesa, Reserva, Pedido, Pronostico
+
+CLAVE_CACHE = 'comedor:kpis'
+HORAS_PROXIMAS_RESERVAS = 3
+HORAS_PRONOSTICO = 3
+ITEMS_PRONOSTICO = 5
+
+
+def _ocupacion_por_ubicacion():
+    # SELECT ubicacion, COUNT(id), COUNT(id) FILTER (WHERE estado = 'ocupada'), ...
+    # FROM comedor_mesa GROUP BY ubicacion
+    etiquetas = dict(Mesa.UBICACION_CHOICES)
+    filas = Mesa.objects.values('ubicacion').annotate(
+        total=Count('id'),
+        ocupadas=Count('id', filter=Q(estado='ocupada')),
+        reservadas=Count('id', filter=Q(estado='reservada')),
+        disponibles=Count('id', filter=Q(estado='disponible')),
+    ).order_by('ubicacion')
+    ocupacion = []
+    for fila in filas:
+        fila['nombre'] = etiquetas.get(fila['ubicacion'], fila['ubicacion'])
+        fila['porcentaje'] = round(100 * fila['ocupadas'] / fila['total']) if fila['total'] else 0
+        ocupacion.append(fila)
+    return ocupacion
+
+
+def _pedidos(inicio_dia):
+    # Una sola consulta con agregación condicional: abiertos por estado + ventas del día
+    hoy_pagado = Q(estado='pagado', fecha_pago__gte=inicio_dia)  # Ventas de hoy: lo que se pagó hoy
+    agregados = {
+        estado: Count('id', filter=Q(estado=estado)) for estado in Pedido.ESTADOS_ABIERTOS
+    }
+    resultado = Pedido.objects.aggregate(
+        **agregados,
+        ventas_hoy=Sum('total', filter=hoy_pagado),
+        ticket_promedio=Avg('total', filter=hoy_pagado),
+        pagados_hoy=Count('id', filter=hoy_pagado),
+    )
+    etiquetas = dict(Pedido.ESTADO_CHOICES)
+    return {
+        'abiertos': [
+            {'estado': estado, 'nombre': etiquetas[estado], 'total': resultado[estado]}
+            for estado in Pedido.ESTADOS_ABIERTOS
+        ],
+        'ventas_hoy': resultado['ventas_hoy'] or 0,
+        'ticket_promedio': round(resultado['ticket_promedio'] or 0, 2),
+        'pagados_hoy': resultado['pagados_hoy'],
+    }
+
+
+def _proximas_reservas(ahora):
+    # SELECT ... FROM comedor_reserva LEFT JOIN comedor_cliente, comedor_mesa
+    # WHERE estado IN ('pendiente', 'confirmada') AND fecha_reserva BETWEEN ahora AND ahora + 3h
+    return list(
+        Reserva.objects.filter(
+            estado__in=['pendiente', 'confirmada'],
+            fecha_reserva__range=[ahora, ahora + timedelta(hours=HORAS_PROXIMAS_RESERVAS)],
+        ).order_by('fecha_reserva').values(
+            'id', 'fecha_reserva', 'numero_personas', 'estado', 'cliente__nombre', 'mesa__numero',
+        )[:10]
+    )
+
+
+def _pronostico(ahora):
+    """Cubiertos por hora e items más pedidos esperados en las próximas horas (ver pronosticos.py)"""
+    hora = ahora.replace(minute=0, second=0, microsecond=0)
+    # SELECT fecha_hora, item.nombre, cantidad FROM comedor_pronostico LEFT JOIN cocina_item
+    # WHERE sucursal_id = %s AND fecha_hora >= %s AND fecha_hora < %s
+    filas = Pronostico.todas.filter(
+        sucursal_id=sucursal_por_defecto(), fecha_hora__gte=hora, fecha_hora__lt=hora + timedelta(hours=HORAS_PRONOSTICO),
+    ).order_by('fecha_hora').values_list('fecha_hora', 'item__nombre', 'cantidad')
+    cubiertos, items = [], {}
+    for fecha_hora, nombre, cantidad in filas:
+        if nombre is None:
+            cubiertos.append({'hora': fecha_hora, 'cantidad': round(cantidad)})
+        else:
+            items[nombre] = items.get(nombre, 0) + cantidad
+    mas_pedidos = sorted(items.items(), key=lambda par: par[1], reverse=True)[:ITEMS_PRONOSTICO]
+    return {
+        'cubiertos': cubiertos,
+        'items': [{'nombre': nombre, 'cantidad': round(cantidad)} for nombre, cantidad in mas_pedidos],
+    }
+
+
+def calcular_kpis(ahora=None):
+    """Calcula los KPI sin caché (5 consultas)."""
+    ahora = ahora or timezone.now()
+    inicio_dia = timezone.localtime(ahora).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    cubiertos = Reserva.objects.filter(estado='en_curso').aggregate(total=Sum('numero_personas'))
+    return {
+        'ocupacion': _ocupacion_por_ubicacion(),
+        'cubiertos_sentados': cubiertos['total'] or 0,
+        'pedidos': _pedidos(inicio_dia),
+        'proximas_reservas': _proximas_reservas(ahora),
+        'pronostico': _pronostico(ahora),
+        'generado': ahora,
+    }
+
+
+def clave_kpis():
+    return f'{CLAVE_CACHE}:{sucursal_por_defecto()}'
+
+
+def obtener_kpis():
+    """KPI de la sucursal en curso desde caché; se recalculan como máximo una vez por TTL."""
+    return cache.get_or_set(clave_kpis(), calcular_kpis, settings.DASHBOARD_CACHE_TTL)
@@ -0,0 +1,109 @@
+"""
+Bitácora append-only de transiciones de estado (Mesa, Reserva, Pedido).
+
+Los modelos con ``RegistraTransicionesMixin`` llaman a ``registrar_transicion``
+al guardar un cambio de ``estado``. Los eventos no se insertan uno por uno:
+
+- Dentro de una transacción se encolan con ``transaction.on_commit`` (si la
+  transacción se revierte, sus eventos se descartan con ella).
+- Dentro de ``buffer_eventos()`` (cada solicitud HTTP vía ``EventosMiddleware``)
+  se acumulan y se insertan con un único ``bulk_create`` al final.
+- Fuera de ambos se insertan de inmediato.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+
+from sucursales.contexto import sucursal_por_defecto
+
+_buffer = ContextVar('buffer_eventos', default=None)
+_actor = ContextVar('actor_eventos', default=None)
+
+
+def _actor_actual():
+    actor = _actor.get()
+    return actor() if callable(actor) else actor
+
+
+def _insertar(eventos):
+    from .models import EventoEstado
+    EventoEstado.objects.bulk_create(eventos)
+
+
+def _encolar(eventos):
+    buffer = _buffer.get()
+    if buffer is None:
+        _insertar(eventos)
+    else:
+        buffer.extend(eventos)
+
+
+def registrar_transiciones(transiciones, fecha=None, sucursal=None):
+    """
+    Registra varias transiciones ``(entidad, entidad_id, anterior, nuevo)`` de
+    ``sucursal`` (por defecto, la en curso).
+
+    Usado directamente por las operaciones masivas que actualizan ``estado``
+    con ``QuerySet.update()`` y no pasan por ``save()``.
+    """
+    from .models import EventoEstado
+
+    fecha = fecha or timezone.now()
+    actor_id = _actor_actual()
+    sucursal = sucursal or sucursal_por_defecto()
+    eventos = [
+        EventoEstado(
+            entidad=entidad, entidad_id=entidad_id,
+            estado_anterior=anterior or '', estado_nuevo=nuevo,
+            actor_id=actor_id, fecha=fecha, sucursal_id=sucursal,
+        )
+        for entidad, entidad_id, anterior, nuevo in transiciones
+    ]
+    if not eventos:
+        return
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(_encolar, eventos))
+    else:
+        _encolar(eventos)
+
+
+def registrar_transicion(entidad, entidad_id, anterior, nuevo, sucursal=None):
+    registrar_transiciones([(entidad, entidad_id, anterior, nuevo)], sucursal=sucursal)
+
+
+@contextmanager
+def buffer_eventos(actor=None):
+    """
+    Acumula los eventos del bloque y los inserta juntos al salir.
+
+    ``actor`` puede ser un id de usuario o un callable que lo devuelva; se
+    evalúa solo cuando ocurre una transición.
+    """
+    buffer = []
+    token_buffer = _buffer.set(buffer)
+    token_actor = _actor.set(actor)
+    try:
+        yield buffer
+    finally:
+        _buffer.reset(token_buffer)
+        _actor.reset(token_actor)
+        if buffer:
+            _insertar(buffer)
+
+
+class EventosMiddleware:
+    """Agrupa las transiciones de cada solicitud en un solo INSERT y registra al usuario."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        def actor():
+            user = getattr(request, 'user', None)
+            return user.pk if user is not None and user.is_authenticated else None
+
+        with buffer_eventos(actor=actor):
+            return self.get_response(request)
@@ -1,10 +1,10 @@
-from datetime import timedelta
-
 from django import forms
 from django.utils import timezone
 
-from utils import BootstrapFormMixin
-from .models import Mesa, Cliente, Reserva, Pedido, DetallePedido
+from utils import AutocompletarSelect, BootstrapFormMixin
+from .combinaciones import VENTANA_CONFLICTO
+from .models import Mesa, Cliente, Reserva, Pedido, DetallePedido, Pago, GrupoReserva, EsperaMesa
+from cocina.menu import items_disponibles
 from cocina.models import Item
 
 
@@ -47,8 +47,8 @@ class ReservaForm(BootstrapFormMixin, forms.ModelForm):
         model = Reserva
         fields = ['cliente', 'mesa', 'fecha_reserva', 'numero_personas', 'observaciones']
         widgets = {
-            'cliente': forms.Select(),
-            'mesa': forms.Select(),
+            'cliente': AutocompletarSelect('comedor:autocompletar_clientes'),
+            'mesa': AutocompletarSelect('comedor:autocompletar_mesas', filtros={'personas': '#id_numero_personas'}),
             'fecha_reserva': forms.DateTimeInput(attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'),
             'numero_personas': forms.NumberInput(attrs={'min': '1', 'max': '20'}),
             'observaciones': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Notas adicionales sobre la reserva'}),
@@ -67,10 +67,11 @@ class ReservaForm(BootstrapFormMixin, forms.ModelForm):
         if mesa and numero_personas and numero_personas > mesa.capacidad:
             self.add_error('numero_personas',
                 f'La mesa {mesa.numero} tiene capacidad para {mesa.capacidad} personas. '
-                f'No puede reservar para {numero_personas} personas.'
+                f'No puede reservar para {numero_personas} personas; use una reserva de grupo para juntar mesas.'
             )
 
-        if fecha_reserva and fecha_reserva < timezone.now():
+        # Al editar, una reserva cuya hora ya pasó se puede guardar sin moverla
+        if fecha_reserva and 'fecha_reserva' in self.changed_data and fecha_reserva < timezone.now():
             self.add_error('fecha_reserva',
                 'La fecha y hora de la reserva no pueden ser en el pasado.'
             )
@@ -81,8 +82,8 @@ class ReservaForm(BootstrapFormMixin, forms.ModelForm):
         return cleaned_data
 
     def _validar_sin_conflictos(self, mesa, fecha_reserva):
-        inicio_rango = fecha_reserva - timedelta(hours=2)
-        fin_rango = fecha_reserva + timedelta(hours=2)
+        inicio_rango = fecha_reserva - VENTANA_CONFLICTO
+        fin_rango = fecha_reserva + VENTANA_CONFLICTO
 
         reservas_conflicto = Reserva.objects.filter(
             mesa=mesa,
@@ -102,14 +103,61 @@ class ReservaForm(BootstrapFormMixin, forms.ModelForm):
             )
 
 
+class GrupoReservaForm(BootstrapFormMixin, forms.ModelForm):
+    """Reserva de grupo: las mesas las elige ``reservar_grupo``"""
+    ubicacion = forms.ChoiceField(
+        choices=[('', 'Cualquier ubicación')] + Mesa.UBICACION_CHOICES, required=False, label='Ubicación',
+    )
+
+    class Meta:
+        model = GrupoReserva
+        fields = ['cliente', 'fecha_reserva', 'numero_personas', 'observaciones']
+        widgets = {
+            'cliente': AutocompletarSelect('comedor:autocompletar_clientes'),
+            'fecha_reserva': forms.DateTimeInput(attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'),
+            'numero_personas': forms.NumberInput(attrs={'min': '1'}),
+            'observaciones': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Notas adicionales sobre la reserva'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['fecha_reserva'].input_formats = ['%Y-%m-%dT%H:%M']
+
+    def clean_fecha_reserva(self):
+        fecha_reserva = self.cleaned_data['fecha_reserva']
+        if fecha_reserva < timezone.now():
+            raise forms.ValidationError('La fecha y hora de la reserva no pueden ser en el pasado.')
+        return fecha_reserva
+
+
+class EsperaMesaForm(BootstrapFormMixin, forms.ModelForm):
+    """Alta de un grupo walk-in en la lista de espera"""
+    class Meta:
+        model = EsperaMesa
+        fields = ['nombre', 'telefono', 'cliente', 'numero_personas']
+        widgets = {
+            'nombre': forms.TextInput(attrs={'placeholder': 'Nombre para llamar al grupo'}),
+            'telefono': forms.TextInput(attrs={'placeholder': 'Para avisar cuando haya mesa'}),
+            'cliente': AutocompletarSelect('comedor:autocompletar_clientes'),
+            'numero_personas': forms.NumberInput(attrs={'min': '1'}),
+        }
+
+    def clean_numero_personas(self):
+        personas = self.cleaned_data['numero_personas']
+        if personas < 1:
+            raise forms.ValidationError('El grupo debe tener al menos una persona.')
+        return personas
+
+
 class PedidoForm(BootstrapFormMixin, forms.ModelForm):
     class Meta:
         model = Pedido
-        fields = ['mesa', 'cliente', 'tipo_pedido', 'estado', 'observaciones']
+        fields = ['mesa', 'cliente', 'tipo_pedido', 'comensales', 'estado', 'observaciones']
         widgets = {
-            'mesa': forms.Select(),
-            'cliente': forms.Select(),
+            'mesa': AutocompletarSelect('comedor:autocompletar_mesas'),
+            'cliente': AutocompletarSelect('comedor:autocompletar_clientes'),
             'tipo_pedido': forms.Select(),
+            'comensales': forms.NumberInput(attrs={'min': '1', 'placeholder': 'Solo si no hay reserva'}),
             'estado': forms.Select(),
             'observaciones': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Notas adicionales sobre el pedido'}),
         }
@@ -118,14 +166,50 @@ class PedidoForm(BootstrapFormMixin, forms.ModelForm):
 class DetallePedidoForm(BootstrapFormMixin, forms.ModelForm):
     class Meta:
         model = DetallePedido
-        fields = ['item', 'cantidad', 'observaciones']
+        fields = ['item', 'cantidad', 'asiento', 'observaciones']
         widgets = {
             'item': forms.Select(),
             'cantidad': forms.NumberInput(attrs={'min': '1', 'value': '1'}),
+            'asiento': forms.NumberInput(attrs={'min': '1', 'placeholder': 'Opcional: 1, 2, 3...'}),
             'observaciones': forms.TextInput(attrs={'placeholder': 'Ej: Sin sal, término medio, sin hielo, etc.'}),
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # SELECT * FROM cocina_item WHERE disponible = 1
+        # La validación consulta la tabla (SELECT ... WHERE disponible AND id = %s);
+        # las opciones del select salen del menú en caché
         self.fields['item'].queryset = Item.objects.filter(disponible=True)
+        self.fields['item'].choices = [('', '---------')] + [
+            (pk, f'{nombre} - ${precio}') for pk, nombre, precio in items_disponibles()
+        ]
+
+
+class PagoForm(BootstrapFormMixin, forms.ModelForm):
+    """Cobro de un pedido: por monto, por asiento o marcando las líneas que se pagan"""
+
+    class Meta:
+        model = Pago
+        fields = ['monto', 'propina', 'metodo', 'asiento', 'detalles']
+        widgets = {
+            'monto': forms.NumberInput(attrs={'min': '0', 'step': '0.01', 'placeholder': 'Vacío: se calcula por asiento o líneas'}),
+            'propina': forms.NumberInput(attrs={'min': '0', 'step': '0.01'}),
+            'metodo': forms.Select(),
+            'asiento': forms.NumberInput(attrs={'min': '1'}),
+            'detalles': forms.CheckboxSelectMultiple(),
+        }
+
+    def __init__(self, *args, pedido=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['monto'].required = False
+        self.fields['propina'].required = False
+        # Solo las líneas de este pedido que aún no se pagaron
+        self.fields['detalles'].queryset = pedido.detalles.filter(pagos__isnull=True).select_related('item')
+        self.fields['detalles'].label_from_instance = (
+            lambda detalle: f"{detalle.cantidad}x {detalle.item.nombre} - ${detalle.subtotal}"
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not (cleaned_data.get('monto') or cleaned_data.get('detalles') or cleaned_data.get('asiento')):
+            raise forms.ValidationError('Indique un monto, un asiento o las líneas que se pagan.')
+        return cleaned_data
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from comedor.operaciones import marcar_reservas_no_show
+from comedor.tareas import programar_barrido
+
+
+class Command(BaseCommand):
+    help = "Marca como 'no_asistio' las reservas vencidas y libera sus mesas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gracia', type=int, default=settings.RESERVA_GRACIA_MINUTOS,
+                            help='Minutos de tolerancia después de la hora de la reserva')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Reservas actualizadas por sentencia')
+        parser.add_argument('--programar', action='store_true',
+                            help='Además, deja el barrido periódico encolado en la cola de tareas')
+
+    def handle(self, *args, **options):
+        resumen = marcar_reservas_no_show(
+            gracia=timedelta(minutes=options['gracia']), lote=options['lote'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['reservas']} reservas marcadas como no asistió en {resumen['lotes']} lotes; "
+            f"{resumen['mesas']} mesas actualizadas."
+        ))
+        if options['programar'] and programar_barrido():
+            self.stdout.write('Barrido periódico programado.')
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from comedor.cierres import cerrar_caja
+from sucursales.contexto import sucursales, usar_sucursal
+
+
+class Command(BaseCommand):
+    help = 'Cierra la caja de un día en cada sucursal: guarda ventas, descuentos, propinas y desgloses del día'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=date.fromisoformat, default=None,
+                            help='Día a cerrar (AAAA-MM-DD); por defecto, hoy')
+        parser.add_argument('--sucursal', default=None,
+                            help='Código de la sucursal a cerrar; por defecto, todas las activas')
+
+    def handle(self, *args, **options):
+        fecha = options['fecha'] or timezone.localdate()
+        activas = sucursales()
+        elegidas = [pk for pk, (codigo, _) in activas.items() if options['sucursal'] in (None, codigo)]
+        if not elegidas:
+            raise CommandError(f"Sucursal desconocida: {options['sucursal']}")
+
+        fallidas = []
+        for sucursal in elegidas:
+            nombre = activas[sucursal][1]
+            try:
+                with usar_sucursal(sucursal):
+                    cierre = cerrar_caja(fecha)
+            except ValidationError as error:
+                self.stderr.write(f'{nombre}: {error.messages[0]}')
+                fallidas.append(nombre)
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"{nombre}: caja del {fecha:%d/%m/%Y} cerrada: ${cierre.ventas_netas} en {cierre.pedidos_pagados} "
+                f"pedidos (descuentos ${cierre.descuentos}, propinas ${cierre.propinas})."
+            ))
+            if cierre.pedidos_abiertos:
+                self.stdout.write(self.style.WARNING(
+                    f'{nombre}: {cierre.pedidos_abiertos} pedido(s) seguían abiertos por ${cierre.monto_abierto}.'
+                ))
+        if fallidas:
+            raise CommandError(f'No se cerró la caja de: {", ".join(fallidas)}.')
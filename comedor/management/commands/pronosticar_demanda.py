@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from comedor.pronosticos import pronosticar_demanda
+
+
+class Command(BaseCommand):
+    help = 'Pronostica cubiertos y demanda por item para los próximos días a partir del historial'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semanas', type=int, default=8, help='Semanas de historial usadas en el ajuste')
+        parser.add_argument('--horizonte', type=int, default=7, help='Días a pronosticar')
+        parser.add_argument('--semivida', type=float, default=4,
+                            help='Semanas tras las que una observación pesa la mitad')
+
+    def handle(self, *args, **options):
+        if options['semanas'] < 1 or options['horizonte'] < 1 or options['semivida'] <= 0:
+            raise CommandError('--semanas, --horizonte y --semivida deben ser positivos.')
+        resumen = pronosticar_demanda(
+            semanas=options['semanas'], horizonte=options['horizonte'], semivida=options['semivida'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['filas']} pronósticos guardados ({resumen['items']} items, "
+            f"{resumen['observaciones']} observaciones)."
+        ))
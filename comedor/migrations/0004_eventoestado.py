@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0003_alter_pedido_estado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidad', models.CharField(choices=[('mesa', 'Mesa'), ('reserva', 'Reserva'), ('pedido', 'Pedido')], max_length=10, verbose_name='Entidad')),
+                ('entidad_id', models.PositiveBigIntegerField(verbose_name='ID de la Entidad')),
+                ('estado_anterior', models.CharField(blank=True, max_length=20, verbose_name='Estado Anterior')),
+                ('estado_nuevo', models.CharField(max_length=20, verbose_name='Estado Nuevo')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Actor')),
+            ],
+            options={
+                'verbose_name': 'Evento de Estado',
+                'verbose_name_plural': 'Eventos de Estado',
+                'ordering': ['fecha', 'id'],
+                'indexes': [models.Index(fields=['entidad', 'entidad_id', 'fecha'], name='evento_entidad_fecha_idx'), models.Index(fields=['entidad', 'estado_nuevo', 'fecha'], name='evento_estado_fecha_idx')],
+            },
+        ),
+    ]
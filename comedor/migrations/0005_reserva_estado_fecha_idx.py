@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0004_eventoestado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['estado', 'fecha_reserva'], name='reserva_estado_fecha_idx'),
+        ),
+    ]
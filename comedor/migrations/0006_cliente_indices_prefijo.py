@@ -0,0 +1,38 @@
+# Índices para el autocompletado de clientes (búsqueda por prefijo).
+#
+# Django traduce nombre__istartswith a UPPER("nombre"::text) LIKE UPPER('x%') en
+# PostgreSQL; para que el planificador use un índice en esa expresión con LIKE,
+# el índice debe ser sobre la misma expresión y con text_pattern_ops. Como no
+# hay equivalente portable, se crean solo en PostgreSQL.
+
+from django.db import migrations
+
+INDICES = [
+    ('cliente_nombre_prefijo_idx', '(UPPER("nombre"::text) text_pattern_ops)'),
+    ('cliente_telefono_prefijo_idx', '(("telefono"::text) text_pattern_ops)'),
+]
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, expresion in INDICES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {nombre} ON comedor_cliente {expresion}')
+
+
+def borrar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, _ in INDICES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0005_reserva_estado_fecha_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
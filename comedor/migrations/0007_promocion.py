@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocina', '0002_categoriaitem_lugar_item'),
+        ('comedor', '0006_cliente_indices_prefijo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallepedido',
+            name='descuento',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Descuento'),
+        ),
+        migrations.CreateModel(
+            name='Promocion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('tipo', models.CharField(choices=[('porcentaje', 'Porcentaje'), ('monto', 'Monto por unidad'), ('nxm', 'Lleve N, pague M')], default='porcentaje', max_length=20, verbose_name='Tipo')),
+                ('valor', models.DecimalField(decimal_places=2, default=0, help_text='Porcentaje o monto por unidad, según el tipo', max_digits=10, verbose_name='Valor')),
+                ('lleva', models.PositiveIntegerField(default=2, verbose_name='Lleve (N)')),
+                ('paga', models.PositiveIntegerField(default=1, verbose_name='Pague (M)')),
+                ('tipo_pedido', models.CharField(blank=True, choices=[('comedor', 'Comedor'), ('llevar', 'Para Llevar'), ('delivery', 'Delivery')], help_text='Vacío: aplica a todos', max_length=20, verbose_name='Tipo de Pedido')),
+                ('dias', models.JSONField(blank=True, default=list, help_text='Lista de días (0=lunes ... 6=domingo). Vacío: todos', verbose_name='Días')),
+                ('hora_inicio', models.TimeField(blank=True, null=True, verbose_name='Desde (hora)')),
+                ('hora_fin', models.TimeField(blank=True, null=True, verbose_name='Hasta (hora)')),
+                ('fecha_inicio', models.DateField(blank=True, null=True, verbose_name='Vigente desde')),
+                ('fecha_fin', models.DateField(blank=True, null=True, verbose_name='Vigente hasta')),
+                ('prioridad', models.IntegerField(default=0, help_text='A igual descuento gana la de mayor prioridad', verbose_name='Prioridad')),
+                ('activa', models.BooleanField(default=True, verbose_name='Activa')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promociones', to='cocina.categoriaitem', verbose_name='Categoría')),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promociones', to='cocina.item', verbose_name='Item')),
+            ],
+            options={
+                'verbose_name': 'Promoción',
+                'verbose_name_plural': 'Promociones',
+                'ordering': ['-prioridad', 'nombre'],
+            },
+        ),
+        migrations.AddField(
+            model_name='detallepedido',
+            name='promocion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='detalles', to='comedor.promocion', verbose_name='Promoción'),
+        ),
+    ]
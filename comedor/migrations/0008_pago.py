@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0007_promocion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallepedido',
+            name='asiento',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Comensal al que corresponde (para dividir la cuenta)', null=True, verbose_name='Asiento'),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='monto_pagado',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Monto Pagado'),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='propinas',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Propinas'),
+        ),
+        migrations.CreateModel(
+            name='Pago',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto')),
+                ('propina', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Propina')),
+                ('metodo', models.CharField(choices=[('efectivo', 'Efectivo'), ('debito', 'Débito'), ('credito', 'Crédito'), ('transferencia', 'Transferencia')], default='efectivo', max_length=20, verbose_name='Método de Pago')),
+                ('asiento', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Asiento')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('detalles', models.ManyToManyField(blank=True, related_name='pagos', to='comedor.detallepedido', verbose_name='Líneas pagadas')),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pagos', to='comedor.pedido', verbose_name='Pedido')),
+                ('registrado_por', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Registrado por')),
+            ],
+            options={
+                'verbose_name': 'Pago',
+                'verbose_name_plural': 'Pagos',
+                'ordering': ['fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocina', '0003_estacioncocina'),
+        ('comedor', '0008_pago'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallepedido',
+            name='estacion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lineas', to='cocina.estacioncocina', verbose_name='Estación'),
+        ),
+        migrations.AddField(
+            model_name='detallepedido',
+            name='estado_preparacion',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('listo', 'Listo')], default='pendiente', max_length=20, verbose_name='Preparación'),
+        ),
+        migrations.AddField(
+            model_name='detallepedido',
+            name='inicio_estimado',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Inicio (estimado)'),
+        ),
+        migrations.AddField(
+            model_name='detallepedido',
+            name='listo_estimado',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Listo (estimado)'),
+        ),
+        migrations.AddField(
+            model_name='detallepedido',
+            name='slot',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Slot'),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='listo_estimado',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Listo (estimado)'),
+        ),
+        migrations.AddIndex(
+            model_name='detallepedido',
+            index=models.Index(fields=['estacion', 'slot', 'estado_preparacion', 'inicio_estimado'], name='detalle_cola_estacion_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocina', '0003_estacioncocina'),
+        ('comedor', '0009_planificacion_cocina'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='comensales',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Solo para clientes sin reserva (walk-in)', null=True, verbose_name='Comensales'),
+        ),
+        migrations.CreateModel(
+            name='Pronostico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_hora', models.DateTimeField(verbose_name='Hora')),
+                ('cantidad', models.FloatField(verbose_name='Cantidad Esperada')),
+                ('generado', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Generado')),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pronosticos', to='cocina.item', verbose_name='Item')),
+            ],
+            options={
+                'verbose_name': 'Pronóstico',
+                'verbose_name_plural': 'Pronósticos',
+                'ordering': ['fecha_hora'],
+                'constraints': [models.UniqueConstraint(fields=('fecha_hora', 'item'), name='pronostico_hora_item_unico'), models.UniqueConstraint(condition=models.Q(('item__isnull', True)), fields=('fecha_hora',), name='pronostico_hora_cubiertos_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0010_pronostico'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mesa',
+            name='adyacentes',
+            field=models.ManyToManyField(blank=True, help_text='Mesas que se pueden juntar con esta para grupos grandes', to='comedor.mesa', verbose_name='Mesas adyacentes'),
+        ),
+        migrations.CreateModel(
+            name='GrupoReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_reserva', models.DateTimeField(verbose_name='Fecha y Hora de Reserva')),
+                ('numero_personas', models.PositiveIntegerField(verbose_name='Número de Personas')),
+                ('ubicacion', models.CharField(choices=[('salon_principal', 'Salón Principal'), ('terraza', 'Terraza'), ('vip', 'VIP'), ('barra', 'Barra')], max_length=100, verbose_name='Ubicación')),
+                ('observaciones', models.TextField(blank=True, verbose_name='Observaciones')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='grupos', to='comedor.cliente', verbose_name='Cliente')),
+                ('creada_por', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Creada por')),
+            ],
+            options={
+                'verbose_name': 'Reserva de Grupo',
+                'verbose_name_plural': 'Reservas de Grupo',
+                'ordering': ['-fecha_reserva'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='grupo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='comedor.gruporeserva', verbose_name='Grupo'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0011_grupo_reserva'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RotacionMesa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('capacidad', models.PositiveIntegerField(unique=True, verbose_name='Capacidad')),
+                ('minutos', models.FloatField(verbose_name='Minutos promedio')),
+                ('muestras', models.PositiveIntegerField(default=0, verbose_name='Muestras')),
+            ],
+            options={
+                'verbose_name': 'Rotación de Mesas',
+                'verbose_name_plural': 'Rotación de Mesas',
+                'ordering': ['capacidad'],
+            },
+        ),
+        migrations.AddField(
+            model_name='mesa',
+            name='liberacion_estimada',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Liberación estimada'),
+        ),
+        migrations.AddField(
+            model_name='mesa',
+            name='ocupada_desde',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Ocupada desde'),
+        ),
+        migrations.CreateModel(
+            name='EsperaMesa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('telefono', models.CharField(blank=True, max_length=15, verbose_name='Teléfono')),
+                ('numero_personas', models.PositiveIntegerField(verbose_name='Número de Personas')),
+                ('estado', models.CharField(choices=[('esperando', 'Esperando'), ('sentada', 'Sentada'), ('cancelada', 'Se fue')], default='esperando', max_length=20, verbose_name='Estado')),
+                ('hora_estimada', models.DateTimeField(blank=True, null=True, verbose_name='Mesa estimada para')),
+                ('fecha_llegada', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Llegada')),
+                ('fecha_sentada', models.DateTimeField(blank=True, null=True, verbose_name='Sentada')),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='esperas', to='comedor.cliente', verbose_name='Cliente')),
+                ('mesa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='esperas', to='comedor.mesa', verbose_name='Mesa')),
+            ],
+            options={
+                'verbose_name': 'Lista de Espera',
+                'verbose_name_plural': 'Lista de Espera',
+                'ordering': ['fecha_llegada'],
+                'indexes': [models.Index(fields=['estado', 'fecha_llegada'], name='espera_estado_llegada_idx')],
+            },
+        ),
+    ]
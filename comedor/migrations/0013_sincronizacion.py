@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:39
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0012_lista_espera'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperacionCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dispositivo', models.CharField(max_length=64, verbose_name='Dispositivo')),
+                ('id_cliente', models.CharField(max_length=64, verbose_name='Id en el dispositivo')),
+                ('recurso', models.CharField(max_length=20, verbose_name='Recurso')),
+                ('accion', models.CharField(max_length=20, verbose_name='Acción')),
+                ('objeto_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='Id en el servidor')),
+                ('estado', models.CharField(choices=[('aplicada', 'Aplicada'), ('conflicto', 'Conflicto'), ('rechazada', 'Rechazada')], max_length=20, verbose_name='Estado')),
+                ('resultado', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Resultado')),
+                ('fecha_cliente', models.DateTimeField(verbose_name='Fecha en el dispositivo')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Procesada')),
+            ],
+            options={
+                'verbose_name': 'Operación de Tablet',
+                'verbose_name_plural': 'Operaciones de Tablets',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.AddField(
+            model_name='mesa',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última Actualización'),
+        ),
+        migrations.AddIndex(
+            model_name='mesa',
+            index=models.Index(fields=['fecha_actualizacion'], name='mesa_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_actualizacion'], name='pedido_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['fecha_actualizacion'], name='reserva_actualizacion_idx'),
+        ),
+        migrations.AddField(
+            model_name='operacioncliente',
+            name='usuario',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuario'),
+        ),
+        migrations.AddConstraint(
+            model_name='operacioncliente',
+            constraint=models.UniqueConstraint(fields=('dispositivo', 'id_cliente'), name='operacion_cliente_unica'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def marcar_enviadas(apps, schema_editor):
+    """Las líneas de pedidos que ya salieron de 'pendiente' no vuelven a imprimirse"""
+    DetallePedido = apps.get_model('comedor', 'DetallePedido')
+    DetallePedido.objects.exclude(pedido__estado='pendiente').update(comanda_enviada=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0013_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallepedido',
+            name='comanda_enviada',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Comanda enviada'),
+        ),
+        migrations.RunPython(marcar_enviadas, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='Ticket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('comanda', 'Comanda'), ('cuenta', 'Cuenta')], max_length=20, verbose_name='Tipo')),
+                ('impresora', models.CharField(max_length=50, verbose_name='Impresora')),
+                ('lineas', models.JSONField(default=list, verbose_name='Líneas')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('impreso', 'Impreso')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('ultimo_error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_impresion', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Impresión')),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='comedor.pedido', verbose_name='Pedido')),
+            ],
+            options={
+                'verbose_name': 'Ticket',
+                'verbose_name_plural': 'Tickets',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'impresora'], name='ticket_pendiente_idx')],
+            },
+        ),
+    ]
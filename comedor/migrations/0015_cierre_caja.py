@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:56
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0014_tickets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreCaja',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True, verbose_name='Fecha')),
+                ('ventas_brutas', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ventas Brutas')),
+                ('descuentos', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Descuentos')),
+                ('ventas_netas', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ventas Netas')),
+                ('propinas', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Propinas')),
+                ('pedidos_pagados', models.PositiveIntegerField(default=0, verbose_name='Pedidos Pagados')),
+                ('pedidos_cancelados', models.PositiveIntegerField(default=0, verbose_name='Pedidos Cancelados')),
+                ('monto_cancelado', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Monto Cancelado')),
+                ('pedidos_abiertos', models.PositiveIntegerField(default=0, verbose_name='Pedidos Abiertos')),
+                ('monto_abierto', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Monto Abierto')),
+                ('resumen', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Resumen')),
+                ('fecha_cierre', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Cierre')),
+                ('cerrado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Cerrado por')),
+            ],
+            options={
+                'verbose_name': 'Cierre de Caja',
+                'verbose_name_plural': 'Cierres de Caja',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:02
+
+import django.db.models.deletion
+import sucursales.contexto
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0015_cierre_caja'),
+        ('sucursales', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='esperamesa',
+            name='espera_estado_llegada_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='mesa',
+            name='mesa_actualizacion_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='pedido',
+            name='pedido_actualizacion_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reserva',
+            name='reserva_estado_fecha_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reserva',
+            name='reserva_actualizacion_idx',
+        ),
+        migrations.AddField(
+            model_name='cierrecaja',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='esperamesa',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='gruporeserva',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='mesa',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AlterField(
+            model_name='cierrecaja',
+            name='fecha',
+            field=models.DateField(verbose_name='Fecha'),
+        ),
+        migrations.AlterField(
+            model_name='mesa',
+            name='numero',
+            field=models.PositiveIntegerField(verbose_name='Número de Mesa'),
+        ),
+        migrations.AddIndex(
+            model_name='esperamesa',
+            index=models.Index(fields=['sucursal', 'estado', 'fecha_llegada'], name='espera_estado_llegada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gruporeserva',
+            index=models.Index(fields=['sucursal', 'fecha_reserva'], name='grupo_sucursal_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mesa',
+            index=models.Index(fields=['sucursal', 'fecha_actualizacion'], name='mesa_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['sucursal', 'fecha_actualizacion'], name='pedido_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['sucursal', 'fecha_pedido'], name='pedido_sucursal_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['sucursal', 'estado', 'fecha_reserva'], name='reserva_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['sucursal', 'fecha_actualizacion'], name='reserva_actualizacion_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cierrecaja',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'fecha'), name='cierre_sucursal_fecha_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='mesa',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'numero'), name='mesa_sucursal_numero_unico', violation_error_message='Ya existe una mesa con ese número en esta sucursal.'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:15
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fijar_tasacion(apps, schema_editor):
+    """Las líneas existentes toman la fecha de su pedido y conservan el descuento con que se tasaron"""
+    DetallePedido = apps.get_model('comedor', 'DetallePedido')
+    Pedido = apps.get_model('comedor', 'Pedido')
+    fecha = Pedido.objects.filter(pk=OuterRef('pedido_id')).values('fecha_pedido')[:1]
+    DetallePedido.objects.update(fecha_creacion=Subquery(fecha), tasado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0016_sucursales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallepedido',
+            name='fecha_creacion',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Fecha de Creación'),
+        ),
+        migrations.AddField(
+            model_name='detallepedido',
+            name='tasado',
+            field=models.BooleanField(default=False, editable=False, help_text='Las promociones ya se aplicaron; el descuento no cambia salvo que se edite la línea', verbose_name='Tasado'),
+        ),
+        migrations.RunPython(fijar_tasacion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:27
+
+import django.db.models.deletion
+import sucursales.contexto
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0017_detalle_tasado'),
+        ('sucursales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rotacionmesa',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AlterField(
+            model_name='rotacionmesa',
+            name='capacidad',
+            field=models.PositiveIntegerField(verbose_name='Capacidad'),
+        ),
+        migrations.AddConstraint(
+            model_name='rotacionmesa',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'capacidad'), name='rotacion_sucursal_capacidad_unica'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:30
+
+import django.db.models.deletion
+import sucursales.contexto
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocina', '0005_sucursales'),
+        ('comedor', '0018_rotacion_sucursal'),
+        ('sucursales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='pronostico',
+            name='pronostico_hora_item_unico',
+        ),
+        migrations.RemoveConstraint(
+            model_name='pronostico',
+            name='pronostico_hora_cubiertos_unico',
+        ),
+        migrations.AddField(
+            model_name='pronostico',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AddConstraint(
+            model_name='pronostico',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'fecha_hora', 'item'), name='pronostico_hora_item_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='pronostico',
+            constraint=models.UniqueConstraint(condition=models.Q(('item__isnull', True)), fields=('sucursal', 'fecha_hora'), name='pronostico_hora_cubiertos_unico'),
+        ),
+    ]
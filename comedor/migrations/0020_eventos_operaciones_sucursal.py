@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:48
+
+import django.db.models.deletion
+import sucursales.contexto
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def asignar_sucursal_eventos(apps, schema_editor):
+    """Cada evento existente pasa a la sucursal de su mesa, reserva o pedido (si ya no existe, a la por defecto)"""
+    EventoEstado = apps.get_model('comedor', 'EventoEstado')
+    for entidad, modelo in [('mesa', 'Mesa'), ('reserva', 'Reserva'), ('pedido', 'Pedido')]:
+        sucursal = apps.get_model('comedor', modelo).objects.filter(pk=OuterRef('entidad_id')).values('sucursal_id')[:1]
+        EventoEstado.objects.filter(entidad=entidad).update(
+            sucursal_id=Coalesce(Subquery(sucursal), Value(settings.SUCURSAL_POR_DEFECTO)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0019_pronostico_sucursal'),
+        ('sucursales', '0002_usuarios'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='operacioncliente',
+            name='operacion_cliente_unica',
+        ),
+        migrations.RemoveIndex(
+            model_name='eventoestado',
+            name='evento_entidad_fecha_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='eventoestado',
+            name='evento_estado_fecha_idx',
+        ),
+        migrations.AddField(
+            model_name='eventoestado',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='operacioncliente',
+            name='sucursal',
+            field=models.ForeignKey(db_index=False, default=sucursales.contexto.sucursal_por_defecto, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sucursales.sucursal', verbose_name='Sucursal'),
+        ),
+        migrations.RunPython(asignar_sucursal_eventos, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='eventoestado',
+            index=models.Index(fields=['sucursal', 'entidad', 'entidad_id', 'fecha'], name='evento_entidad_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoestado',
+            index=models.Index(fields=['sucursal', 'entidad', 'estado_nuevo', 'fecha'], name='evento_estado_fecha_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='operacioncliente',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'dispositivo', 'id_cliente'), name='operacion_cliente_unica'),
+        ),
+    ]
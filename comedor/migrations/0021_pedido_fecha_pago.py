@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 20:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def completar_fecha_pago(apps, schema_editor):
+    """Los pedidos ya pagados toman la fecha de su último paso a 'pagado' en la bitácora (o su última actualización)"""
+    Pedido = apps.get_model('comedor', 'Pedido')
+    EventoEstado = apps.get_model('comedor', 'EventoEstado')
+    pagado = EventoEstado.objects.filter(
+        entidad='pedido', entidad_id=OuterRef('pk'), estado_nuevo='pagado',
+    ).order_by('-fecha').values('fecha')[:1]
+    Pedido.objects.filter(estado='pagado').update(fecha_pago=Coalesce(Subquery(pagado), F('fecha_actualizacion')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0020_eventos_operaciones_sucursal'),
+        ('sucursales', '0002_usuarios'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='fecha_pago',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Cuándo pasó a pagado; el cierre de caja atribuye la venta a este día', null=True, verbose_name='Fecha de Pago'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['sucursal', 'fecha_pago'], name='pedido_sucursal_pago_idx'),
+        ),
+        migrations.RunPython(completar_fecha_pago, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,49 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from cocina.models import CategoriaItem, Item
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from cocina.inventario import descontar_stock, devolver_stock, diferencia_linea
+from cocina.models import CategoriaItem, Item, EstacionCocina
+from sucursales.models import DeSucursalManager, PorSucursal, PorSucursalManager
+from .eventos import registrar_transicion
+from .planificacion import liberar_estaciones, liberar_pedidos, planificar_lineas
+from .promociones import invalidar_promociones, precio_pedido
+from .rotacion import actualizar_ocupacion
+from .tickets import programar_tickets
 
 # Create your models here.
 
-class Mesa(models.Model):
+class RegistraTransicionesMixin:
+    """Registra en EventoEstado cada cambio del campo ``estado`` al guardar"""
+    ENTIDAD_EVENTO = None
+    _estado_registrado = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._estado_registrado = instancia.__dict__.get('estado')
+        return instancia
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._estado_registrado = self.__dict__.get('estado')
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        campos = kwargs.get('update_fields')
+        if campos is not None and 'estado' not in campos:
+            return
+        if self.estado != self._estado_registrado:
+            registrar_transicion(self.ENTIDAD_EVENTO, self.pk, self._estado_registrado, self.estado, self.sucursal_id)
+            self._estado_registrado = self.estado
+
+    def linea_de_tiempo(self):
+        """Transiciones de estado de esta instancia en orden cronológico"""
+        return EventoEstado.objects.linea_de_tiempo(self.ENTIDAD_EVENTO, self.pk)
+
+
+class Mesa(RegistraTransicionesMixin, PorSucursal):
     """Modelo para representar las mesas del restaurante"""
     ESTADO_CHOICES = [
         ('disponible', 'Disponible'),
@@ -12,6 +51,7 @@ class Mesa(models.Model):
         ('reservada', 'Reservada'),
         ('mantenimiento', 'Mantenimiento'),
     ]
+    ENTIDAD_EVENTO = 'mesa'
     
     UBICACION_CHOICES = [
         ('salon_principal', 'Salón Principal'),
@@ -20,19 +60,41 @@ class Mesa(models.Model):
         ('barra', 'Barra'),
     ]
     
-    numero = models.PositiveIntegerField(unique=True, verbose_name='Número de Mesa')
+    numero = models.PositiveIntegerField(verbose_name='Número de Mesa')
     capacidad = models.PositiveIntegerField(verbose_name='Capacidad (personas)')
     ubicacion = models.CharField(max_length=100, choices=UBICACION_CHOICES, verbose_name='Ubicación')
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='disponible', verbose_name='Estado')
+    adyacentes = models.ManyToManyField('self', blank=True, verbose_name='Mesas adyacentes',
+                                        help_text='Mesas que se pueden juntar con esta para grupos grandes')
+    ocupada_desde = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Ocupada desde')
+    liberacion_estimada = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Liberación estimada')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name='Última Actualización')
     
     class Meta:
         verbose_name = 'Mesa'
         verbose_name_plural = 'Mesas'
         ordering = ['numero']
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'numero'], name='mesa_sucursal_numero_unico',
+                                    violation_error_message='Ya existe una mesa con ese número en esta sucursal.'),
+        ]
+        indexes = [
+            # Feed de cambios de la sincronización: WHERE sucursal_id = %s AND fecha_actualizacion > %s
+            models.Index(fields=['sucursal', 'fecha_actualizacion'], name='mesa_actualizacion_idx'),
+        ]
     
     def __str__(self):
         return f"Mesa {self.numero} - {self.ubicacion} ({self.capacidad} personas)"
     
+    def save(self, *args, **kwargs):
+        """Al entrar o salir de 'ocupada' actualiza la hora estimada de liberación y la rotación"""
+        if self.estado != self._estado_registrado and 'ocupada' in (self.estado, self._estado_registrado):
+            actualizar_ocupacion(self)
+            campos = kwargs.get('update_fields')
+            if campos is not None:
+                kwargs['update_fields'] = {*campos, 'ocupada_desde', 'liberacion_estimada'}
+        super().save(*args, **kwargs)
+
     def get_reservas_activas_count(self):
         return self.reservas.filter(estado__in=['pendiente', 'confirmada', 'en_curso']).count() # -> SELECT COUNT(*) FROM comedor_reserva WHERE estado IN (...) AND mesa_id = self.id
 
@@ -53,7 +115,89 @@ class Cliente(models.Model):
         return f"{self.nombre} - {self.telefono}"
 
 
-class Reserva(models.Model):
+class GrupoReserva(PorSucursal):
+    """Reserva de un grupo que ocupa varias mesas juntas (una Reserva por mesa)"""
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name='grupos', verbose_name='Cliente')
+    fecha_reserva = models.DateTimeField(verbose_name='Fecha y Hora de Reserva')
+    numero_personas = models.PositiveIntegerField(verbose_name='Número de Personas')
+    ubicacion = models.CharField(max_length=100, choices=Mesa.UBICACION_CHOICES, verbose_name='Ubicación')
+    observaciones = models.TextField(verbose_name='Observaciones', blank=True)
+    creada_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name='Creada por')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+
+    class Meta:
+        verbose_name = 'Reserva de Grupo'
+        verbose_name_plural = 'Reservas de Grupo'
+        ordering = ['-fecha_reserva']
+        indexes = [
+            models.Index(fields=['sucursal', 'fecha_reserva'], name='grupo_sucursal_fecha_idx'),
+        ]
+
+    def __str__(self):
+        cliente_info = self.cliente.nombre if self.cliente else 'Cliente no asignado'
+        return f"Grupo de {self.numero_personas} - {cliente_info} ({self.fecha_reserva.strftime('%d/%m/%Y %H:%M')})"
+
+
+class RotacionMesa(PorSucursal):
+    """Media móvil de cuánto dura ocupada una mesa, por sucursal y capacidad (comedor/rotacion.py)"""
+    capacidad = models.PositiveIntegerField(verbose_name='Capacidad')
+    minutos = models.FloatField(verbose_name='Minutos promedio')
+    muestras = models.PositiveIntegerField(default=0, verbose_name='Muestras')
+
+    class Meta:
+        verbose_name = 'Rotación de Mesas'
+        verbose_name_plural = 'Rotación de Mesas'
+        ordering = ['capacidad']
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'capacidad'], name='rotacion_sucursal_capacidad_unica'),
+        ]
+
+    def __str__(self):
+        return f"Mesas de {self.capacidad}: {self.minutos:.0f} min ({self.muestras} muestras)"
+
+
+class EsperaMesa(PorSucursal):
+    """Grupo sin reserva (walk-in) en la lista de espera"""
+    ESTADO_CHOICES = [
+        ('esperando', 'Esperando'),
+        ('sentada', 'Sentada'),
+        ('cancelada', 'Se fue'),
+    ]
+
+    nombre = models.CharField(max_length=100, verbose_name='Nombre')
+    telefono = models.CharField(max_length=15, blank=True, verbose_name='Teléfono')
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name='esperas', verbose_name='Cliente')
+    numero_personas = models.PositiveIntegerField(verbose_name='Número de Personas')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='esperando', verbose_name='Estado')
+    hora_estimada = models.DateTimeField(null=True, blank=True, verbose_name='Mesa estimada para')
+    mesa = models.ForeignKey(Mesa, on_delete=models.SET_NULL, null=True, blank=True, related_name='esperas', verbose_name='Mesa')
+    fecha_llegada = models.DateTimeField(default=timezone.now, verbose_name='Llegada')
+    fecha_sentada = models.DateTimeField(null=True, blank=True, verbose_name='Sentada')
+
+    class Meta:
+        verbose_name = 'Lista de Espera'
+        verbose_name_plural = 'Lista de Espera'
+        ordering = ['fecha_llegada']
+        indexes = [
+            models.Index(fields=['sucursal', 'estado', 'fecha_llegada'], name='espera_estado_llegada_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.numero_personas} pers.) - {self.get_estado_display()}"
+
+    @property
+    def minutos_esperando(self):
+        return int((timezone.now() - self.fecha_llegada).total_seconds() // 60)
+
+    @property
+    def minutos_restantes(self):
+        """Minutos hasta la mesa estimada (0 si ya debería haber una libre)"""
+        if self.hora_estimada is None:
+            return None
+        return max(0, int((self.hora_estimada - timezone.now()).total_seconds() // 60))
+
+
+class Reserva(RegistraTransicionesMixin, PorSucursal):
     """Modelo para gestionar las reservas de mesas"""
     ESTADO_CHOICES = [
         ('pendiente', 'Pendiente'),
@@ -63,9 +207,12 @@ class Reserva(models.Model):
         ('cancelada', 'Cancelada'),
         ('no_asistio', 'No Asistió'),
     ]
+    ESTADOS_ACTIVOS = ['pendiente', 'confirmada', 'en_curso']
+    ENTIDAD_EVENTO = 'reserva'
     
     cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name='reservas', verbose_name='Cliente')
     mesa = models.ForeignKey(Mesa, on_delete=models.SET_NULL, null=True, blank=True, related_name='reservas', verbose_name='Mesa')
+    grupo = models.ForeignKey(GrupoReserva, on_delete=models.CASCADE, null=True, blank=True, related_name='reservas', verbose_name='Grupo')
     fecha_reserva = models.DateTimeField(verbose_name='Fecha y Hora de Reserva')
     numero_personas = models.IntegerField(verbose_name='Número de Personas')
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name='Estado')
@@ -78,6 +225,11 @@ class Reserva(models.Model):
         verbose_name = 'Reserva'
         verbose_name_plural = 'Reservas'
         ordering = ['-fecha_reserva']
+        indexes = [
+            # Barrido de no-shows (por sucursal) y búsqueda de reservas activas por fecha
+            models.Index(fields=['sucursal', 'estado', 'fecha_reserva'], name='reserva_estado_fecha_idx'),
+            models.Index(fields=['sucursal', 'fecha_actualizacion'], name='reserva_actualizacion_idx'),
+        ]
     
     def __str__(self):
         cliente_info = self.cliente.nombre if self.cliente else 'Cliente no asignado'
@@ -110,7 +262,7 @@ class Reserva(models.Model):
         self.save()
 
 
-class Pedido(models.Model):
+class Pedido(RegistraTransicionesMixin, PorSucursal):
     """Modelo para gestionar los pedidos"""
     ESTADO_CHOICES = [
         ('pendiente', 'Pendiente'),
@@ -119,6 +271,8 @@ class Pedido(models.Model):
         ('pagado', 'Pagado'),
         ('cancelado', 'Cancelado'),
     ]
+    ESTADOS_ABIERTOS = ['pendiente', 'en_curso', 'cuenta']
+    ENTIDAD_EVENTO = 'pedido'
     
     TIPO_CHOICES = [
         ('comedor', 'Comedor'),
@@ -129,27 +283,82 @@ class Pedido(models.Model):
     mesa = models.ForeignKey(Mesa, on_delete=models.SET_NULL, null=True, blank=True, related_name='pedidos', verbose_name='Mesa')
     cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name='pedidos', verbose_name='Cliente')
     tipo_pedido = models.CharField(max_length=20, choices=TIPO_CHOICES, default='comedor', verbose_name='Tipo de Pedido')
+    comensales = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Comensales',
+                                                  help_text='Solo para clientes sin reserva (walk-in)')
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name='Estado')
     observaciones = models.TextField(verbose_name='Observaciones', blank=True)
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Total')
+    monto_pagado = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Monto Pagado')
+    propinas = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Propinas')
+    listo_estimado = models.DateTimeField(null=True, blank=True, verbose_name='Listo (estimado)')
     atendido_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name='Atendido por')
     fecha_pedido = models.DateTimeField(auto_now_add=True, verbose_name='Fecha del Pedido')
+    fecha_pago = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Fecha de Pago',
+                                      help_text='Cuándo pasó a pagado; el cierre de caja atribuye la venta a este día')
     fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name='Última Actualización')
     
     class Meta:
         verbose_name = 'Pedido'
         verbose_name_plural = 'Pedidos'
         ordering = ['-fecha_pedido']
+        indexes = [
+            models.Index(fields=['sucursal', 'fecha_actualizacion'], name='pedido_actualizacion_idx'),
+            # Panel del comedor y cierre de caja: WHERE sucursal_id = %s AND fecha_pedido >= %s
+            models.Index(fields=['sucursal', 'fecha_pedido'], name='pedido_sucursal_fecha_idx'),
+            # Ventas del día por fecha de pago (cierre de caja y panel): WHERE sucursal_id = %s AND fecha_pago >= %s
+            models.Index(fields=['sucursal', 'fecha_pago'], name='pedido_sucursal_pago_idx'),
+        ]
     
     def __str__(self):
         mesa_info = f"Mesa {self.mesa.numero}" if self.mesa else "Sin mesa"
         return f"Pedido #{self.id} - {mesa_info} ({self.estado})"
+
+    def save(self, *args, **kwargs):
+        """
+        Al pasar a 'en_curso' se imprimen las comandas y al pasar a 'cuenta', la
+        cuenta; al cancelarse, sus líneas devuelven el stock que consumieron (si
+        se reabre, se vuelve a descontar) y al cancelarse o pagarse las
+        pendientes dejan su lugar en cocina. Al pasar a 'pagado' se guarda
+        ``fecha_pago`` (y se borra si se reabre).
+        """
+        anterior = self._estado_registrado
+        campos = kwargs.get('update_fields')
+        if self.estado == anterior or (campos is not None and 'estado' not in campos):
+            super().save(*args, **kwargs)
+            return
+        self.fecha_pago = timezone.now() if self.estado == 'pagado' else None
+        if campos is not None:
+            kwargs['update_fields'] = {*campos, 'fecha_pago'}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if 'cancelado' in (anterior, self.estado) and anterior is not None:
+                # SELECT item_id, cantidad FROM comedor_detallepedido WHERE pedido_id = %s
+                lineas = list(self.detalles.values_list('item_id', 'cantidad'))
+                if self.estado == 'cancelado':
+                    devolver_stock(lineas)
+                else:
+                    descontar_stock(lineas)
+        if self.estado in ('cancelado', 'pagado'):
+            liberar_pedidos([self.pk])
+        elif self.estado == 'en_curso':
+            programar_tickets(comandas=[self.pk])
+        elif self.estado == 'cuenta':
+            programar_tickets(cuentas=[self.pk])
     
+    @property
+    def saldo(self):
+        """Monto pendiente de pago (mantenido con los pagos registrados)"""
+        return self.total - self.monto_pagado
+
     def calcular_total(self):
-        """Calcula el total del pedido sumando todos los detalles"""
-        total = sum([detalle.subtotal for detalle in self.detalles.all()])
+        """
+        Calcula el total del pedido en una sola pasada por sus detalles. Las
+        líneas nuevas o editadas se tasan con las promociones vigentes cuando
+        se agregaron; las demás conservan su descuento.
+        """
+        total = precio_pedido(self)
         self.total = total
-        self.save()
+        self.save(update_fields=['total', 'fecha_actualizacion'])
         return total
     
     def agregar_item(self, item, cantidad=1, observaciones=''):
@@ -160,8 +369,7 @@ class Pedido(models.Model):
             cantidad=cantidad,
             precio_unitario=item.precio,
             observaciones=observaciones
-        )
-        self.calcular_total()
+        )  # DetallePedido.save() recalcula el total
         return detalle
     
     def eliminar_item(self, item):
@@ -179,38 +387,439 @@ class Pedido(models.Model):
         if detalle:
             detalle.cantidad = cantidad
             detalle.precio_unitario = item.precio
-            detalle.save()
-            self.calcular_total()
+            detalle.save()  # Recalcula el total
             return detalle
         return None
     
     def generar_descuento(self, porcentaje):
-        """Aplica un descuento al total del pedido"""
+        """
+        Aplica un descuento manual al total del pedido. No queda registrado por
+        línea y se pierde al recalcular; para descuentos por regla usar Promocion.
+        """
         descuento = (self.total * porcentaje) / 100
         self.total -= descuento
         self.save()
         return self.total
 
 
+class Promocion(models.Model):
+    """Regla de precio: descuento sobre items/categorías en una ventana de tiempo"""
+    TIPO_CHOICES = [
+        ('porcentaje', 'Porcentaje'),
+        ('monto', 'Monto por unidad'),
+        ('nxm', 'Lleve N, pague M'),
+    ]
+    DIAS_CHOICES = [
+        (0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'),
+        (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo'),
+    ]
+
+    nombre = models.CharField(max_length=100, verbose_name='Nombre')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, default='porcentaje', verbose_name='Tipo')
+    valor = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Valor',
+                                help_text='Porcentaje o monto por unidad, según el tipo')
+    lleva = models.PositiveIntegerField(default=2, verbose_name='Lleve (N)')
+    paga = models.PositiveIntegerField(default=1, verbose_name='Pague (M)')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, null=True, blank=True, related_name='promociones', verbose_name='Item')
+    categoria = models.ForeignKey(CategoriaItem, on_delete=models.CASCADE, null=True, blank=True, related_name='promociones', verbose_name='Categoría')
+    tipo_pedido = models.CharField(max_length=20, choices=Pedido.TIPO_CHOICES, blank=True, verbose_name='Tipo de Pedido',
+                                   help_text='Vacío: aplica a todos')
+    dias = models.JSONField(default=list, blank=True, verbose_name='Días',
+                            help_text='Lista de días (0=lunes ... 6=domingo). Vacío: todos')
+    hora_inicio = models.TimeField(null=True, blank=True, verbose_name='Desde (hora)')
+    hora_fin = models.TimeField(null=True, blank=True, verbose_name='Hasta (hora)')
+    fecha_inicio = models.DateField(null=True, blank=True, verbose_name='Vigente desde')
+    fecha_fin = models.DateField(null=True, blank=True, verbose_name='Vigente hasta')
+    prioridad = models.IntegerField(default=0, verbose_name='Prioridad',
+                                    help_text='A igual descuento gana la de mayor prioridad')
+    activa = models.BooleanField(default=True, verbose_name='Activa')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name='Última Actualización')
+
+    class Meta:
+        verbose_name = 'Promoción'
+        verbose_name_plural = 'Promociones'
+        ordering = ['-prioridad', 'nombre']
+
+    def __str__(self):
+        return self.nombre
+
+    def clean(self):
+        if self.item_id and self.categoria_id:
+            raise ValidationError('Una promoción aplica a un item o a una categoría, no a ambos.')
+        if self.tipo == 'porcentaje' and not (0 < self.valor <= 100):
+            raise ValidationError({'valor': 'El porcentaje debe estar entre 0 y 100.'})
+        if self.tipo == 'nxm' and not (0 <= self.paga < self.lleva):
+            raise ValidationError({'paga': 'M debe ser menor que N.'})
+        if any(dia not in range(7) for dia in self.dias or []):
+            raise ValidationError({'dias': 'Los días van de 0 (lunes) a 6 (domingo).'})
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidar_promociones()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        invalidar_promociones()
+        return resultado
+
+
 class DetallePedido(models.Model):
-    """Detalles de cada pedido (items ordenados)"""
+    """Detalles de cada pedido (items ordenados); su sucursal es la de su pedido"""
+    PREPARACION_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('listo', 'Listo'),
+    ]
+
     pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='detalles', verbose_name='Pedido')
     item = models.ForeignKey(Item, on_delete=models.CASCADE, verbose_name='Item')
     cantidad = models.IntegerField(default=1, verbose_name='Cantidad')
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Precio Unitario')
+    descuento = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Descuento')
+    promocion = models.ForeignKey(Promocion, on_delete=models.SET_NULL, null=True, blank=True, related_name='detalles', verbose_name='Promoción')
     subtotal = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Subtotal')
+    asiento = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Asiento',
+                                               help_text='Comensal al que corresponde (para dividir la cuenta)')
+    estacion = models.ForeignKey(EstacionCocina, on_delete=models.SET_NULL, null=True, blank=True, related_name='lineas', verbose_name='Estación')
+    slot = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Slot')
+    inicio_estimado = models.DateTimeField(null=True, blank=True, verbose_name='Inicio (estimado)')
+    listo_estimado = models.DateTimeField(null=True, blank=True, verbose_name='Listo (estimado)')
+    estado_preparacion = models.CharField(max_length=20, choices=PREPARACION_CHOICES, default='pendiente', verbose_name='Preparación')
+    comanda_enviada = models.BooleanField(default=False, editable=False, verbose_name='Comanda enviada')
+    tasado = models.BooleanField(default=False, editable=False, verbose_name='Tasado',
+                                 help_text='Las promociones ya se aplicaron; el descuento no cambia salvo que se edite la línea')
     observaciones = models.TextField(blank=True, verbose_name='Observaciones')
+    fecha_creacion = models.DateTimeField(default=timezone.now, editable=False, verbose_name='Fecha de Creación')
+
+    # Sin columna propia: ``objects`` ve las líneas de los pedidos de la sucursal en curso
+    RUTA_SUCURSAL = 'pedido__sucursal'
+    objects = DeSucursalManager()
+    todas = models.Manager()
+
+    CAMPOS_TASACION = ('item_id', 'cantidad', 'precio_unitario')
+    _tasacion_guardada = None
     
     class Meta:
         verbose_name = 'Detalle de Pedido'
         verbose_name_plural = 'Detalles de Pedidos'
+        indexes = [
+            # Cola de cada slot: WHERE estacion_id = %s AND slot = %s AND estado_preparacion = 'pendiente' ORDER BY inicio_estimado
+            models.Index(fields=['estacion', 'slot', 'estado_preparacion', 'inicio_estimado'], name='detalle_cola_estacion_idx'),
+        ]
     
-    def save(self, *args, **kwargs):
-        """Calcula el subtotal antes de guardar"""
-        self.subtotal = self.cantidad * self.precio_unitario
-        super().save(*args, **kwargs)
-        # Actualizar el total del pedido
-        self.pedido.calcular_total()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._tasacion_guardada = instancia.valores_tasacion()
+        return instancia
+
+    def valores_tasacion(self):
+        return tuple(self.__dict__.get(campo) for campo in self.CAMPOS_TASACION)
+
+    def valor_guardado(self, campo):
+        """Valor de ``campo`` (uno de ``CAMPOS_TASACION``) la última vez que se leyó o guardó"""
+        return dict(zip(self.CAMPOS_TASACION, self._tasacion_guardada or ())).get(campo)
+
+    def preparar_tasacion(self):
+        """
+        Calcula el subtotal. Si la línea es nueva o cambió su item, cantidad o
+        precio, pierde el descuento y queda para tasar en el próximo
+        ``calcular_total``; si no, conserva el descuento con que se tasó.
+        """
+        if self._state.adding or self.valores_tasacion() != self._tasacion_guardada:
+            self.descuento, self.promocion_id, self.tasado = 0, None, False
+        self.subtotal = max(self.cantidad * self.precio_unitario - self.descuento, 0)
+
+    def save(self, *args, recalcular=True, **kwargs):
+        """
+        Calcula el subtotal (neto del descuento) antes de guardar. Con
+        ``recalcular=False`` no toca el total del pedido ni aplica las
+        promociones (para guardar varias líneas y recalcularlo una sola vez).
+        Una línea nueva descuenta el stock de sus ingredientes (si no alcanza
+        lanza ``StockInsuficiente`` y no se guarda) y, si el pedido ya está en
+        curso, sale en una comanda; una editada descuenta o devuelve la
+        diferencia de cantidad (o de item).
+        """
+        self.preparar_tasacion()
+        if not self._state.adding:
+            estacion_anterior = self.estacion_id
+            cambio_item = self.item_id != self.valor_guardado('item_id') and self.estado_preparacion == 'pendiente'
+            with transaction.atomic():
+                if self._tasacion_guardada is not None and self.pedido.estado != 'cancelado':
+                    # Cambió la cantidad o el item: se descuenta (o devuelve) solo la diferencia
+                    descontar_stock(diferencia_linea(
+                        (self.valor_guardado('item_id'), self.valor_guardado('cantidad')), (self.item_id, self.cantidad),
+                    ))
+                super().save(*args, **kwargs)
+                if cambio_item:
+                    # Otro item puede ir a otra estación o tardar distinto: se vuelve a encolar y se libera su lugar
+                    planificar_lineas([self])
+                    liberar_estaciones({estacion_anterior})
+        else:
+            with transaction.atomic():
+                if self.pedido.estado != 'cancelado':  # Las líneas de un pedido cancelado no consumen stock
+                    descontar_stock([(self.item_id, self.cantidad)])
+                super().save(*args, **kwargs)
+            planificar_lineas([self])
+            if self.pedido.estado == 'en_curso':
+                programar_tickets(comandas=[self.pedido_id])  # Comanda de la línea agregada
+        self._tasacion_guardada = self.valores_tasacion()
+        if recalcular:
+            self.pedido.calcular_total()
     
+    def delete(self, *args, **kwargs):
+        """
+        Borra la línea y devuelve el stock que consumió (si su pedido no estaba
+        cancelado: ya se devolvió); si estaba en cola en cocina, su estación se
+        replanifica sin ella.
+        """
+        consumo = (
+            (self.valor_guardado('item_id'), self.valor_guardado('cantidad'))
+            if self._tasacion_guardada is not None else (self.item_id, self.cantidad)
+        )
+        with transaction.atomic():
+            if self.pedido.estado != 'cancelado':
+                devolver_stock([consumo])
+            resultado = super().delete(*args, **kwargs)
+            if self.estado_preparacion == 'pendiente':
+                liberar_estaciones({self.estacion_id})
+        return resultado
+
     def __str__(self):
         return f"{self.cantidad}x {self.item.nombre} - ${self.subtotal}"
+
+
+class Pago(models.Model):
+    """Pago (total o parcial) de un pedido; se registra con comedor.pagos.registrar_pago"""
+    METODO_CHOICES = [
+        ('efectivo', 'Efectivo'),
+        ('debito', 'Débito'),
+        ('credito', 'Crédito'),
+        ('transferencia', 'Transferencia'),
+    ]
+
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='pagos', verbose_name='Pedido')
+    monto = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Monto')
+    propina = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Propina')
+    metodo = models.CharField(max_length=20, choices=METODO_CHOICES, default='efectivo', verbose_name='Método de Pago')
+    asiento = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Asiento')
+    detalles = models.ManyToManyField(DetallePedido, blank=True, related_name='pagos', verbose_name='Líneas pagadas')
+    registrado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+', verbose_name='Registrado por')
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name='Fecha')
+
+    RUTA_SUCURSAL = 'pedido__sucursal'
+    objects = DeSucursalManager()
+    todas = models.Manager()
+
+    class Meta:
+        verbose_name = 'Pago'
+        verbose_name_plural = 'Pagos'
+        ordering = ['fecha']
+
+    def __str__(self):
+        return f"Pago ${self.monto} - Pedido #{self.pedido_id} ({self.get_metodo_display()})"
+
+
+class EventoEstadoQuerySet(models.QuerySet):
+    def linea_de_tiempo(self, entidad, entidad_id):
+        # SELECT * FROM comedor_eventoestado WHERE entidad = %s AND entidad_id = %s ORDER BY fecha, id
+        # (cubierta por el índice evento_entidad_fecha_idx)
+        return self.filter(entidad=entidad, entidad_id=entidad_id).order_by('fecha', 'id')
+
+    def transiciones_a(self, entidad, estado, desde=None, hasta=None):
+        """Eventos que llevaron una entidad a ``estado`` (índice evento_estado_fecha_idx)"""
+        queryset = self.filter(entidad=entidad, estado_nuevo=estado)
+        if desde:
+            queryset = queryset.filter(fecha__gte=desde)
+        if hasta:
+            queryset = queryset.filter(fecha__lt=hasta)
+        return queryset
+
+    def update(self, **kwargs):
+        raise ValidationError('La bitácora de estados es de solo inserción.')
+
+    def delete(self):
+        raise ValidationError('La bitácora de estados es de solo inserción.')
+
+
+class EventoEstado(PorSucursal):
+    """Bitácora append-only de transiciones de estado de mesas, reservas y pedidos (en la sucursal de cada uno)"""
+    ENTIDAD_CHOICES = [
+        ('mesa', 'Mesa'),
+        ('reserva', 'Reserva'),
+        ('pedido', 'Pedido'),
+    ]
+
+    entidad = models.CharField(max_length=10, choices=ENTIDAD_CHOICES, verbose_name='Entidad')
+    entidad_id = models.PositiveBigIntegerField(verbose_name='ID de la Entidad')
+    estado_anterior = models.CharField(max_length=20, blank=True, verbose_name='Estado Anterior')
+    estado_nuevo = models.CharField(max_length=20, verbose_name='Estado Nuevo')
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='Actor')
+    fecha = models.DateTimeField(default=timezone.now, verbose_name='Fecha')
+
+    objects = PorSucursalManager.from_queryset(EventoEstadoQuerySet)()
+    todas = EventoEstadoQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Evento de Estado'
+        verbose_name_plural = 'Eventos de Estado'
+        ordering = ['fecha', 'id']
+        indexes = [
+            models.Index(fields=['sucursal', 'entidad', 'entidad_id', 'fecha'], name='evento_entidad_fecha_idx'),
+            models.Index(fields=['sucursal', 'entidad', 'estado_nuevo', 'fecha'], name='evento_estado_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entidad_display()} #{self.entidad_id}: {self.estado_anterior or '-'} → {self.estado_nuevo}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValidationError('La bitácora de estados es de solo inserción.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError('La bitácora de estados es de solo inserción.')
+
+
+class Pronostico(PorSucursal):
+    """
+    Demanda pronosticada por sucursal y hora: cubiertos (sin item) o unidades de
+    un item. La escribe el comando ``pronosticar_demanda`` (comedor/pronosticos.py).
+    """
+    fecha_hora = models.DateTimeField(verbose_name='Hora')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, null=True, blank=True, related_name='pronosticos', verbose_name='Item')
+    cantidad = models.FloatField(verbose_name='Cantidad Esperada')
+    generado = models.DateTimeField(default=timezone.now, verbose_name='Generado')
+
+    class Meta:
+        verbose_name = 'Pronóstico'
+        verbose_name_plural = 'Pronósticos'
+        ordering = ['fecha_hora']
+        constraints = [
+            # También sirve al panel: WHERE sucursal_id = %s AND fecha_hora >= %s AND fecha_hora < %s
+            models.UniqueConstraint(fields=['sucursal', 'fecha_hora', 'item'], name='pronostico_hora_item_unico'),
+            models.UniqueConstraint(fields=['sucursal', 'fecha_hora'], condition=models.Q(item__isnull=True),
+                                    name='pronostico_hora_cubiertos_unico'),
+        ]
+
+    def __str__(self):
+        que = self.item.nombre if self.item_id else 'Cubiertos'
+        return f"{que} {timezone.localtime(self.fecha_hora):%d/%m %H:%M}: {self.cantidad:.1f}"
+
+
+class OperacionCliente(PorSucursal):
+    """
+    Operación encolada por una tablet sin conexión y ya procesada por la
+    sincronización (comedor/api/sincronizacion.py). Garantiza que reenviar la
+    misma operación no la aplique dos veces.
+    """
+    ESTADO_CHOICES = [
+        ('aplicada', 'Aplicada'),
+        ('conflicto', 'Conflicto'),
+        ('rechazada', 'Rechazada'),
+    ]
+
+    dispositivo = models.CharField(max_length=64, verbose_name='Dispositivo')
+    id_cliente = models.CharField(max_length=64, verbose_name='Id en el dispositivo')
+    recurso = models.CharField(max_length=20, verbose_name='Recurso')
+    accion = models.CharField(max_length=20, verbose_name='Acción')
+    objeto_id = models.PositiveIntegerField(null=True, blank=True, verbose_name='Id en el servidor')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, verbose_name='Estado')
+    resultado = models.JSONField(default=dict, encoder=DjangoJSONEncoder, verbose_name='Resultado')
+    fecha_cliente = models.DateTimeField(verbose_name='Fecha en el dispositivo')
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name='Usuario')
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name='Procesada')
+
+    class Meta:
+        verbose_name = 'Operación de Tablet'
+        verbose_name_plural = 'Operaciones de Tablets'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'dispositivo', 'id_cliente'], name='operacion_cliente_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.dispositivo}:{self.id_cliente} {self.accion} {self.recurso} ({self.estado})"
+
+
+class Ticket(models.Model):
+    """
+    Comanda (por estación) o cuenta lista para imprimir (comedor/tickets.py).
+    ``lineas`` guarda el ticket ya armado como pares ``[estilo, texto]``; cada
+    backend lo convierte a texto plano o ESC/POS al enviarlo.
+    """
+    TIPO_CHOICES = [
+        ('comanda', 'Comanda'),
+        ('cuenta', 'Cuenta'),
+    ]
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('impreso', 'Impreso'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name='Tipo')
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='tickets', verbose_name='Pedido')
+    impresora = models.CharField(max_length=50, verbose_name='Impresora')
+    lineas = models.JSONField(default=list, verbose_name='Líneas')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name='Estado')
+    intentos = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    ultimo_error = models.TextField(blank=True, verbose_name='Último Error')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_impresion = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Impresión')
+
+    RUTA_SUCURSAL = 'pedido__sucursal'
+    objects = DeSucursalManager()
+    todas = models.Manager()
+
+    class Meta:
+        verbose_name = 'Ticket'
+        verbose_name_plural = 'Tickets'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            # Tanda de una impresora: WHERE estado = 'pendiente' AND impresora = %s ORDER BY id
+            models.Index(fields=['estado', 'impresora'], name='ticket_pendiente_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} pedido #{self.pedido_id} -> {self.impresora} ({self.estado})"
+
+    def como_texto(self):
+        from .tickets import a_texto
+        return a_texto(self.lineas)
+
+
+class CierreCaja(PorSucursal):
+    """
+    Cierre de caja de un día y una sucursal (comedor/cierres.py). Es una foto de los pedidos
+    al momento de cerrar: no se modifica ni se recalcula, y se lee sin volver
+    a consultar los pedidos. ``resumen`` guarda los desgloses por tipo de
+    pedido, mesero y categoría.
+    """
+    fecha = models.DateField(verbose_name='Fecha')
+    ventas_brutas = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Ventas Brutas')
+    descuentos = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Descuentos')
+    ventas_netas = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Ventas Netas')
+    propinas = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Propinas')
+    pedidos_pagados = models.PositiveIntegerField(default=0, verbose_name='Pedidos Pagados')
+    pedidos_cancelados = models.PositiveIntegerField(default=0, verbose_name='Pedidos Cancelados')
+    monto_cancelado = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Monto Cancelado')
+    pedidos_abiertos = models.PositiveIntegerField(default=0, verbose_name='Pedidos Abiertos')
+    monto_abierto = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Monto Abierto')
+    resumen = models.JSONField(default=dict, encoder=DjangoJSONEncoder, verbose_name='Resumen')
+    cerrado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='Cerrado por')
+    fecha_cierre = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Cierre')
+
+    class Meta:
+        verbose_name = 'Cierre de Caja'
+        verbose_name_plural = 'Cierres de Caja'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'fecha'], name='cierre_sucursal_fecha_unico'),
+        ]
+
+    def __str__(self):
+        return f"Cierre {self.fecha:%d/%m/%Y} - ${self.ventas_netas}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValidationError('Un cierre de caja no se puede modificar.')
+        super().save(*args, **kwargs)
@@ -0,0 +1,251 @@
+"""
+Operaciones masivas sobre reservas, pedidos y mesas.
+
+A diferencia de ``Reserva.save()``, que actualiza la mesa fila por fila, estas
+funciones trabajan por conjuntos: un UPDATE por lote y un único UPDATE para
+recalcular el estado de todas las mesas afectadas. Las transiciones se
+registran igualmente en la bitácora (``registrar_transiciones``).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.db.models import Case, DecimalField, Exists, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from cocina.inventario import descontar_stock, devolver_stock, diferencia_linea
+from sucursales.contexto import en_cada_sucursal, sucursal_actual
+
+from .eventos import registrar_transiciones
+from .planificacion import liberar_estaciones, liberar_pedidos, planificar_lineas
+from .tickets import programar_tickets
+from .models import Mesa, Reserva, Pedido, DetallePedido
+
+ESTADOS_RESERVA_PENDIENTE = ['pendiente', 'confirmada']
+
+# Estado destino -> estados desde los que se permite la transición masiva
+# (a 'pagado' solo pasan además los pedidos sin saldo: ver cambiar_estado_pedidos)
+TRANSICIONES_RESERVA = {
+    'confirmada': ['pendiente'],
+    'cancelada': ['pendiente', 'confirmada'],
+    'no_asistio': ['pendiente', 'confirmada'],
+}
+TRANSICIONES_PEDIDO = {
+    'cancelado': Pedido.ESTADOS_ABIERTOS,
+    'pagado': Pedido.ESTADOS_ABIERTOS,
+}
+
+
+def recalcular_estado_mesas(mesa_ids):
+    """
+    Recalcula en un solo UPDATE el estado de las mesas indicadas según sus
+    reservas: 'reservada' si tienen alguna pendiente/confirmada, si no
+    'disponible'. Las mesas ocupadas o en mantenimiento no se tocan.
+    Devuelve la cantidad de mesas que cambiaron.
+    """
+    if not mesa_ids:
+        return 0
+    pendientes = Reserva.objects.filter(mesa=OuterRef('pk'), estado__in=ESTADOS_RESERVA_PENDIENTE)
+    objetivo = Case(
+        When(Exists(pendientes), then=Value('reservada')),
+        default=Value('disponible'),
+    )
+    mesas = Mesa.objects.filter(pk__in=mesa_ids).exclude(estado__in=['ocupada', 'mantenimiento'])
+
+    # SELECT id, estado, CASE WHEN EXISTS(...) ... FROM comedor_mesa WHERE ... AND estado <> objetivo
+    cambios = list(
+        mesas.annotate(objetivo=objetivo).exclude(estado=F('objetivo')).values_list('pk', 'estado', 'objetivo')
+    )
+    if not cambios:
+        return 0
+    # UPDATE comedor_mesa SET estado = CASE WHEN EXISTS(...) THEN 'reservada' ELSE 'disponible' END WHERE id IN (...)
+    Mesa.objects.filter(pk__in=[pk for pk, _, _ in cambios]).update(estado=objetivo, fecha_actualizacion=timezone.now())
+    registrar_transiciones([('mesa', pk, anterior, nuevo) for pk, anterior, nuevo in cambios])
+    return len(cambios)
+
+
+def recalcular_totales(pedido_ids):
+    """
+    Recalcula en un solo UPDATE el total de los pedidos indicados:
+    UPDATE comedor_pedido SET total = COALESCE((SELECT SUM(subtotal) ...), 0) WHERE id IN (...)
+    """
+    if not pedido_ids:
+        return 0
+    suma = DetallePedido.objects.filter(pedido=OuterRef('pk')).values('pedido').annotate(
+        suma=Sum('subtotal'),
+    ).values('suma')
+    return Pedido.objects.filter(pk__in=pedido_ids).update(
+        total=Coalesce(Subquery(suma), Value(Decimal('0')), output_field=DecimalField()),
+        fecha_actualizacion=timezone.now(),
+    )
+
+
+def guardar_detalles(formset):
+    """
+    Guarda un formset de DetallePedido en bloque: un DELETE para las líneas
+    eliminadas, un ``bulk_create`` para las nuevas (un INSERT por línea si la base
+    no devuelve los pk del INSERT en bloque) y un ``bulk_update`` para las
+    modificadas; el stock se ajusta en un solo UPDATE (las nuevas descuentan,
+    las editadas la diferencia y las borradas devuelven), las nuevas se
+    planifican en cocina de una vez (también las que cambiaron de item), las estaciones de las borradas
+    se replanifican sin ellas y el total del pedido se recalcula una sola vez
+    al final.
+    Reemplaza a ``formset.save()``, que guardaría (y recalcularía) línea a línea.
+    """
+    pedido = formset.instance
+    formset.save(commit=False)  # Rellena new_objects / changed_objects / deleted_objects
+    nuevos = list(formset.new_objects)
+    modificados = [detalle for detalle, _ in formset.changed_objects]
+    # Líneas que dejan libre su lugar en cocina: las borradas y las que cambiaron de item (se vuelven a encolar)
+    replanificar = [
+        detalle for detalle in modificados
+        if detalle.item_id != detalle.valor_guardado('item_id') and detalle.estado_preparacion == 'pendiente'
+    ]
+    liberadas = {
+        detalle.estacion_id for detalle in [*formset.deleted_objects, *replanificar]
+        if detalle.estado_preparacion == 'pendiente'
+    }
+    # Stock: las nuevas descuentan, las editadas ajustan la diferencia y las borradas devuelven (un solo UPDATE)
+    ajustes = [] if pedido.estado == 'cancelado' else [
+        *[(detalle.item_id, detalle.cantidad) for detalle in nuevos],
+        *[
+            ajuste for detalle in modificados for ajuste in diferencia_linea(
+                (detalle.valor_guardado('item_id'), detalle.valor_guardado('cantidad')), (detalle.item_id, detalle.cantidad),
+            )
+        ],
+        *[(detalle.valor_guardado('item_id'), -detalle.valor_guardado('cantidad')) for detalle in formset.deleted_objects],
+    ]
+    for detalle in nuevos + modificados:
+        detalle.preparar_tasacion()  # Las nuevas y las que cambiaron de item, cantidad o precio se vuelven a tasar
+
+    with transaction.atomic():
+        descontar_stock(ajustes)
+        if formset.deleted_objects:
+            DetallePedido.objects.filter(pk__in=[d.pk for d in formset.deleted_objects]).delete()
+        if nuevos and connections[DetallePedido.objects.db].features.can_return_rows_from_bulk_insert:
+            DetallePedido.objects.bulk_create(nuevos)
+        elif nuevos:
+            # Sin INSERT ... RETURNING (p. ej. MySQL) bulk_create no asigna los pk y planificar_lineas
+            # omitiría las líneas: un INSERT por línea con el save() base, sin los efectos de DetallePedido.save()
+            for detalle in nuevos:
+                models.Model.save(detalle, force_insert=True)
+        if modificados:
+            DetallePedido.objects.bulk_update(
+                modificados, ['item', 'cantidad', 'precio_unitario', 'descuento', 'promocion', 'subtotal', 'tasado',
+                              'asiento', 'observaciones'],
+            )
+        if nuevos or replanificar:
+            planificar_lineas(nuevos + replanificar)
+        liberar_estaciones(liberadas)
+        if nuevos and pedido.estado == 'en_curso':
+            programar_tickets(comandas=[pedido.pk])
+        pedido.calcular_total()
+    return nuevos + modificados
+
+
+def _aplicar_estado_reservas(filas, estado, ahora):
+    """UPDATE de las reservas ``filas`` (pk, estado, mesa_id) + recálculo de sus mesas."""
+    Reserva.objects.filter(pk__in=[pk for pk, _, _ in filas]).update(estado=estado, fecha_actualizacion=ahora)
+    registrar_transiciones([('reserva', pk, anterior, estado) for pk, anterior, _ in filas])
+    return recalcular_estado_mesas({mesa_id for _, _, mesa_id in filas if mesa_id})
+
+
+def cambiar_estado_reservas(queryset, estado):
+    """
+    Cambia ``estado`` de todas las reservas del queryset que lo admitan, en una
+    transacción: un UPDATE de reservas y un UPDATE de mesas.
+    Devuelve ``(reservas_actualizadas, mesas_actualizadas)``.
+    """
+    origenes = TRANSICIONES_RESERVA[estado]
+    with transaction.atomic():
+        filas = list(
+            queryset.filter(estado__in=origenes).select_for_update()
+            .order_by().values_list('pk', 'estado', 'mesa_id')
+        )
+        if not filas:
+            return 0, 0
+        mesas = _aplicar_estado_reservas(filas, estado, timezone.now())
+    return len(filas), mesas
+
+
+def cambiar_estado_pedidos(queryset, estado):
+    """
+    Cancela o cierra en bloque los pedidos abiertos del queryset: recalcula sus
+    totales en un UPDATE y cambia el estado en otro, dentro de una transacción.
+    Solo se cierran como 'pagado' los que quedan sin saldo (total = monto
+    pagado): lo pendiente se cobra con ``registrar_pago``, que ya cierra el
+    pedido al saldarlo. Al cancelar, las líneas devuelven su stock (un UPDATE);
+    al cancelar o cerrar, las pendientes liberan su lugar en cocina.
+    Devuelve la cantidad de pedidos actualizados.
+    """
+    origenes = TRANSICIONES_PEDIDO[estado]
+    with transaction.atomic():
+        filas = list(
+            queryset.filter(estado__in=origenes).select_for_update()
+            .order_by().values_list('pk', 'estado')
+        )
+        if not filas:
+            return 0
+        ids = [pk for pk, _ in filas]
+        recalcular_totales(ids)
+        if estado == 'pagado':
+            # SELECT id FROM comedor_pedido WHERE id IN (...) AND total = monto_pagado
+            saldados = set(Pedido.objects.filter(pk__in=ids, total=F('monto_pagado')).values_list('pk', flat=True))
+            filas = [(pk, anterior) for pk, anterior in filas if pk in saldados]
+            ids = [pk for pk, _ in filas]
+            if not filas:
+                return 0
+        ahora = timezone.now()
+        Pedido.objects.filter(pk__in=ids).update(
+            estado=estado, fecha_pago=ahora if estado == 'pagado' else None, fecha_actualizacion=ahora,
+        )
+        registrar_transiciones([('pedido', pk, anterior, estado) for pk, anterior in filas])
+        if estado == 'cancelado':
+            # SELECT item_id, cantidad FROM comedor_detallepedido WHERE pedido_id IN (...)
+            devolver_stock(DetallePedido.objects.filter(pedido_id__in=ids).values_list('item_id', 'cantidad'))
+        liberar_pedidos(ids)  # Lo que quedaba en cola en cocina deja de ocupar sus estaciones
+    return len(filas)
+
+
+def marcar_reservas_no_show(gracia=None, lote=500, ahora=None):
+    """
+    Marca 'no_asistio' las reservas pendientes/confirmadas cuya hora pasó hace
+    más de ``gracia``. Procesa en lotes de ``lote`` filas, cada uno en su propia
+    transacción: un UPDATE de reservas + un UPDATE de mesas por lote.
+    Sin sucursal en curso (tarea, comando) barre cada sucursal por separado.
+    Devuelve ``{'reservas': n, 'mesas': n, 'lotes': n}``.
+    """
+    if sucursal_actual() is None:
+        # Una pasada por sucursal: cada SELECT usa el índice (sucursal, estado, fecha_reserva)
+        resumen = {'reservas': 0, 'mesas': 0, 'lotes': 0}
+        for _ in en_cada_sucursal():
+            for clave, valor in marcar_reservas_no_show(gracia, lote, ahora).items():
+                resumen[clave] += valor
+        return resumen
+
+    ahora = ahora or timezone.now()
+    gracia = gracia if gracia is not None else timedelta(minutes=settings.RESERVA_GRACIA_MINUTOS)
+    limite = ahora - gracia
+    resumen = {'reservas': 0, 'mesas': 0, 'lotes': 0}
+
+    while True:
+        with transaction.atomic():
+            # SELECT id, estado, mesa_id FROM comedor_reserva
+            # WHERE sucursal_id = %s AND estado IN ('pendiente', 'confirmada') AND fecha_reserva < limite
+            # ORDER BY fecha_reserva LIMIT lote FOR UPDATE SKIP LOCKED
+            filas = list(
+                Reserva.objects.select_for_update(skip_locked=True)
+                .filter(estado__in=ESTADOS_RESERVA_PENDIENTE, fecha_reserva__lt=limite)
+                .order_by('fecha_reserva')
+                .values_list('pk', 'estado', 'mesa_id')[:lote]
+            )
+            if not filas:
+                break
+            resumen['mesas'] += _aplicar_estado_reservas(filas, 'no_asistio', ahora)
+        resumen['reservas'] += len(filas)
+        resumen['lotes'] += 1
+        if len(filas) < lote:
+            break
+    return resumen
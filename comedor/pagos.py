@@ -0,0 +1,162 @@
+"""
+Pagos y división de cuentas.
+
+El saldo de cada pedido se mantiene de forma incremental: ``registrar_pago``
+bloquea la fila del pedido, suma el monto con
+``UPDATE ... SET monto_pagado = monto_pagado + %s`` y, si el saldo llega a cero,
+pasa el pedido a 'pagado' en la misma transacción. Si al editar las líneas el
+total queda por debajo de lo pagado (saldo negativo), ``registrar_devolucion``
+registra el vuelto como un pago negativo y cierra el pedido. Las funciones
+``dividir_*`` solo proponen montos; no escriben nada.
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Sum
+from django.utils import timezone
+
+from .models import Pedido, Pago
+
+CENTAVOS = Decimal('0.01')
+# Partes iguales como máximo al dividir la cuenta (o los comensales del pedido, si son más)
+MAXIMO_PARTES = 20
+
+
+def dividir_equitativo(monto, partes):
+    """Divide ``monto`` en ``partes`` cuotas que suman exactamente el monto"""
+    if partes < 1:
+        raise ValueError('La cuenta se divide en al menos una parte.')
+    centavos = int((Decimal(monto) / CENTAVOS).to_integral_value())
+    base, resto = divmod(centavos, partes)
+    # Los centavos que sobran se reparten entre las primeras cuotas
+    return [(base + (1 if i < resto else 0)) * CENTAVOS for i in range(partes)]
+
+
+def lineas_pendientes(pedido):
+    """Detalles del pedido que todavía no se pagaron por línea ni por asiento"""
+    return pedido.detalles.filter(pagos__isnull=True)
+
+
+def pagos_sin_desglose(pedido):
+    """Pagos por monto libre (ni por asiento ni por líneas), que no se pueden atribuir a un asiento"""
+    return pedido.pagos.filter(asiento__isnull=True, detalles__isnull=True)
+
+
+def dividir_por_asiento(pedido):
+    """
+    Monto pendiente por asiento: lo consumido en el asiento más una parte igual
+    de las líneas sin asiento (compartidas), menos lo ya pagado por ese asiento.
+    Las líneas pagadas por línea no cuentan. Devuelve ``{asiento: monto}``;
+    vacío si ninguna línea tiene asiento o si ya hay pagos por monto libre
+    (partes iguales, abonos), porque no se sabe a qué asiento corresponden.
+    """
+    # SELECT 1 FROM comedor_pago LEFT JOIN comedor_pago_detalles
+    # WHERE pedido_id = %s AND asiento IS NULL AND detallepedido_id IS NULL LIMIT 1
+    if pagos_sin_desglose(pedido).exists():
+        return {}
+    # SELECT asiento, SUM(subtotal) FROM comedor_detallepedido
+    # WHERE pedido_id = %s AND NOT EXISTS(<pago por línea>) GROUP BY asiento
+    pagadas_por_linea = Pago.objects.filter(asiento__isnull=True, detalles=OuterRef('pk'))
+    consumos = dict(
+        pedido.detalles.exclude(Exists(pagadas_por_linea)).order_by().values_list('asiento').annotate(total=Sum('subtotal'))
+    )
+    compartido = consumos.pop(None, Decimal('0'))
+    # SELECT DISTINCT asiento FROM comedor_detallepedido WHERE pedido_id = %s AND asiento IS NOT NULL
+    asientos = sorted(pedido.detalles.filter(asiento__isnull=False).order_by().values_list('asiento', flat=True).distinct())
+    if not asientos:
+        return {}
+    cuotas = dividir_equitativo(compartido, len(asientos))
+    # SELECT asiento, SUM(monto) FROM comedor_pago WHERE pedido_id = %s AND asiento IS NOT NULL GROUP BY asiento
+    pagado = dict(
+        pedido.pagos.filter(asiento__isnull=False).order_by().values_list('asiento').annotate(total=Sum('monto'))
+    )
+    return {
+        asiento: max(consumos.get(asiento, Decimal('0')) + cuota - pagado.get(asiento, 0), Decimal('0'))
+        for asiento, cuota in zip(asientos, cuotas)
+    }
+
+
+def registrar_pago(pedido, monto=None, propina=0, metodo='efectivo', asiento=None, detalles=None, usuario=None):
+    """
+    Registra un pago del pedido y actualiza su saldo en la misma transacción.
+
+    El monto se toma de ``detalles`` (pago por líneas), de ``monto`` o, si solo
+    se indica ``asiento``, de lo pendiente para ese asiento; un pago por asiento
+    no puede superar lo pendiente del asiento y, si lo salda, marca pagadas sus
+    líneas. Cuando el saldo llega a cero el pedido pasa a 'pagado'. Devuelve el Pago creado; su
+    ``pedido`` queda con los valores actualizados.
+    """
+    propina = Decimal(propina or 0)
+    with transaction.atomic():
+        # SELECT ... FROM comedor_pedido WHERE id = %s FOR UPDATE: serializa los cobros del mismo pedido
+        pedido = Pedido.objects.select_for_update().get(pk=pedido.pk)
+        if pedido.estado not in Pedido.ESTADOS_ABIERTOS:
+            raise ValidationError('El pedido ya está cerrado.')
+
+        if detalles:
+            detalles = list(lineas_pendientes(pedido).filter(pk__in=[d.pk for d in detalles]))
+            if not detalles:
+                raise ValidationError('Las líneas seleccionadas ya fueron pagadas.')
+            monto = sum(detalle.subtotal for detalle in detalles)
+        elif asiento is not None:
+            por_asiento = dividir_por_asiento(pedido)
+            if asiento not in por_asiento:
+                if pagos_sin_desglose(pedido).exists():
+                    raise ValidationError('La cuenta ya tiene pagos que no son por asiento; cobre por monto o por líneas.')
+                raise ValidationError(f'No hay consumo en el asiento {asiento}.')
+            if monto is None:
+                monto = por_asiento[asiento]
+            elif monto > por_asiento[asiento]:
+                raise ValidationError(f'El monto excede lo pendiente del asiento {asiento} (${por_asiento[asiento]}).')
+
+        if monto is None or monto <= 0:
+            raise ValidationError('El monto a pagar debe ser mayor a cero.')
+        if monto > pedido.saldo:
+            raise ValidationError(f'El monto excede el saldo pendiente (${pedido.saldo}).')
+        if propina < 0:
+            raise ValidationError('La propina no puede ser negativa.')
+
+        pago = Pago.objects.create(
+            pedido=pedido, monto=monto, propina=propina, metodo=metodo,
+            asiento=asiento, registrado_por=usuario,
+        )
+        if detalles:
+            pago.detalles.set(detalles)
+        elif asiento is not None and monto == por_asiento[asiento]:
+            # El asiento queda al día: sus líneas pendientes quedan pagadas (no se pueden volver a cobrar por línea)
+            pago.detalles.set(lineas_pendientes(pedido).filter(asiento=asiento))
+
+        Pedido.objects.filter(pk=pedido.pk).update(
+            monto_pagado=F('monto_pagado') + monto, propinas=F('propinas') + propina,
+            fecha_actualizacion=timezone.now(),
+        )
+        pedido.monto_pagado += monto
+        pedido.propinas += propina
+        if pedido.saldo <= 0:
+            pedido.estado = 'pagado'
+            pedido.save(update_fields=['estado', 'fecha_actualizacion'])
+    return pago
+
+
+def registrar_devolucion(pedido, metodo='efectivo', usuario=None):
+    """
+    Devuelve al cliente lo pagado de más (saldo negativo, p. ej. tras quitar
+    una línea ya cobrada): registra un Pago por el saldo, que es negativo,
+    deja el saldo en cero y pasa el pedido a 'pagado'. Devuelve el Pago creado.
+    """
+    with transaction.atomic():
+        # SELECT ... FROM comedor_pedido WHERE id = %s FOR UPDATE
+        pedido = Pedido.objects.select_for_update().get(pk=pedido.pk)
+        if pedido.saldo >= 0:
+            raise ValidationError('El pedido no tiene saldo a favor del cliente.')
+        monto = pedido.saldo
+        pago = Pago.objects.create(pedido=pedido, monto=monto, metodo=metodo, registrado_por=usuario)
+        Pedido.objects.filter(pk=pedido.pk).update(
+            monto_pagado=F('monto_pagado') + monto, fecha_actualizacion=timezone.now(),
+        )
+        pedido.monto_pagado += monto
+        if pedido.estado in Pedido.ESTADOS_ABIERTOS:
+            pedido.estado = 'pagado'
+            pedido.save(update_fields=['estado', 'fecha_actualizacion'])
+    return pago
@@ -0,0 +1,225 @@
+"""
+Planificación de la cocina: estación, slot y hora estimada de cada línea.
+
+Cada línea de un pedido abierto se asigna a la estación de su categoría
+(``CategoriaItem.lugar_item``: bar o cocina) y, dentro de ella, al slot que
+queda libre antes; ``EstacionCocina.capacidad`` es la cantidad de slots que
+trabajan en paralelo. La estación guarda hasta cuándo está ocupado cada slot,
+así que planificar una línea nueva no recorre los pedidos abiertos: basta
+con bloquear la fila de la estación. Al completar una línea solo se corren
+las que venían detrás en el mismo slot. Al borrar líneas pendientes o
+cancelar su pedido se recalculan las colas de sus estaciones
+(``liberar_estaciones``), para no dejar tiempo reservado a lo que ya no se
+prepara.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Max, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+
+from sucursales.contexto import sucursal_por_defecto
+
+LUGAR_POR_DEFECTO = 'cocina'
+
+
+def _estaciones(lugares):
+    """Estaciones de la sucursal en curso para los lugares indicados, bloqueadas; crea las que falten"""
+    from cocina.models import EstacionCocina
+
+    # SELECT ... FROM cocina_estacioncocina WHERE sucursal_id = %s AND nombre IN (...) FOR UPDATE
+    estaciones = {
+        e.nombre: e for e in EstacionCocina.objects.select_for_update()
+        .filter(sucursal_id=sucursal_por_defecto(), nombre__in=lugares)
+    }
+    for lugar in set(lugares) - set(estaciones):
+        estaciones[lugar], _ = EstacionCocina.objects.get_or_create(nombre=lugar)
+    return estaciones
+
+
+def _subir_listo_pedidos(listos):
+    """
+    ``listos`` = {pedido_id: hora}: sube ``Pedido.listo_estimado`` a esa hora si
+    la actual es menor (o nula), en un solo UPDATE.
+    """
+    from .models import Pedido
+
+    condiciones = [
+        When(Q(pk=pk) & (Q(listo_estimado__isnull=True) | Q(listo_estimado__lt=hora)), then=Value(hora))
+        for pk, hora in listos.items()
+    ]
+    Pedido.objects.filter(pk__in=listos).update(
+        listo_estimado=Case(*condiciones, default=F('listo_estimado')), fecha_actualizacion=timezone.now(),
+    )
+
+
+def recalcular_listo_pedidos(pedido_ids):
+    """Recalcula ``listo_estimado`` de los pedidos como el máximo de sus líneas (un UPDATE)"""
+    from .models import Pedido, DetallePedido
+
+    if not pedido_ids:
+        return 0
+    # UPDATE comedor_pedido SET listo_estimado = (SELECT MAX(listo_estimado) FROM comedor_detallepedido
+    #   WHERE pedido_id = comedor_pedido.id) WHERE id IN (...)
+    maximo = (
+        DetallePedido.objects.filter(pedido=OuterRef('pk')).order_by()
+        .values('pedido').annotate(maximo=Max('listo_estimado')).values('maximo')
+    )
+    return Pedido.objects.filter(pk__in=pedido_ids).update(listo_estimado=Subquery(maximo), fecha_actualizacion=timezone.now())
+
+
+def planificar_lineas(detalles, ahora=None):
+    """
+    Asigna estación, slot e inicio/listo estimados a las líneas nuevas de
+    pedidos abiertos. Cada línea ocupa el slot que se libera antes durante el
+    ``tiempo_preparacion`` de su item (las unidades de una misma línea se
+    preparan juntas). Devuelve las líneas planificadas.
+    """
+    from .models import Pedido, DetallePedido
+
+    ahora = ahora or timezone.now()
+    por_pk = {detalle.pk: detalle for detalle in detalles if detalle.pk}
+    if not por_pk:
+        return []
+
+    with transaction.atomic():
+        # SELECT detalle.id, detalle.pedido_id, item.tiempo_preparacion, categoria.lugar_item
+        # FROM comedor_detallepedido JOIN cocina_item ... LEFT JOIN cocina_categoriaitem ...
+        # WHERE detalle.id IN (...) AND pedido.estado IN (...) ORDER BY detalle.id
+        filas = list(
+            DetallePedido.objects.filter(pk__in=por_pk, pedido__estado__in=Pedido.ESTADOS_ABIERTOS)
+            .order_by('pk').values_list('pk', 'pedido_id', 'item__tiempo_preparacion', 'item__categoria__lugar_item')
+        )
+        if not filas:
+            return []
+        estaciones = _estaciones({lugar or LUGAR_POR_DEFECTO for *_, lugar in filas})
+        libres = {nombre: estacion.libres(ahora) for nombre, estacion in estaciones.items()}
+
+        planificadas, listos = [], {}
+        for pk, pedido_id, minutos, lugar in filas:
+            lugar = lugar or LUGAR_POR_DEFECTO
+            slots = libres[lugar]
+            slot = min(range(len(slots)), key=slots.__getitem__)
+            detalle = por_pk[pk]
+            detalle.estacion = estaciones[lugar]
+            detalle.slot = slot
+            detalle.inicio_estimado = slots[slot]
+            detalle.listo_estimado = slots[slot] + timedelta(minutes=minutos or 0)
+            slots[slot] = detalle.listo_estimado
+            listos[pedido_id] = max(listos.get(pedido_id, detalle.listo_estimado), detalle.listo_estimado)
+            planificadas.append(detalle)
+
+        DetallePedido.objects.bulk_update(planificadas, ['estacion', 'slot', 'inicio_estimado', 'listo_estimado'])
+        for nombre, estacion in estaciones.items():
+            estacion.guardar_libres(libres[nombre])
+        _subir_listo_pedidos(listos)
+    return planificadas
+
+
+def completar_linea(detalle, ahora=None):
+    """
+    Marca la línea como lista. Si terminó antes o después de lo estimado, las
+    líneas pendientes que venían detrás en el mismo slot (y el slot de la
+    estación) se corren esa diferencia con un UPDATE ``F() + delta``; luego se
+    recalcula la hora estimada de los pedidos afectados.
+    """
+    from cocina.models import EstacionCocina
+    from .models import DetallePedido
+
+    ahora = ahora or timezone.now()
+    with transaction.atomic():
+        # SELECT ... FROM comedor_detallepedido WHERE id = %s FOR UPDATE
+        detalle = DetallePedido.objects.select_for_update().get(pk=detalle.pk)
+        if detalle.estado_preparacion == 'listo':
+            return detalle
+        anterior = detalle.listo_estimado
+        DetallePedido.objects.filter(pk=detalle.pk).update(estado_preparacion='listo', listo_estimado=ahora)
+        detalle.estado_preparacion, detalle.listo_estimado = 'listo', ahora
+        pedido_ids = {detalle.pedido_id}
+
+        if detalle.estacion_id is not None and anterior is not None and anterior != ahora:
+            delta = ahora - anterior
+            estacion = EstacionCocina.objects.select_for_update().get(pk=detalle.estacion_id)
+            siguientes = DetallePedido.objects.filter(
+                estacion_id=detalle.estacion_id, slot=detalle.slot,
+                estado_preparacion='pendiente', inicio_estimado__gte=anterior,
+            )
+            pedido_ids.update(siguientes.order_by().values_list('pedido_id', flat=True).distinct())
+            # UPDATE comedor_detallepedido SET inicio_estimado = inicio_estimado + %s,
+            #   listo_estimado = listo_estimado + %s WHERE estacion_id = %s AND slot = %s AND ...
+            siguientes.update(inicio_estimado=F('inicio_estimado') + delta, listo_estimado=F('listo_estimado') + delta)
+
+            libres = estacion.libres(ahora)
+            if detalle.slot is not None and detalle.slot < len(libres) and libres[detalle.slot] >= anterior:
+                libres[detalle.slot] = max(libres[detalle.slot] + delta, ahora)
+                estacion.guardar_libres(libres)
+
+        recalcular_listo_pedidos(pedido_ids)
+    return detalle
+
+
+def liberar_estaciones(estacion_ids, ahora=None):
+    """
+    Recalcula las colas de las estaciones tras quitar líneas (borradas, de
+    pedidos cancelados o que cambiaron de item): cada slot vuelve a encadenar
+    sus líneas pendientes de pedidos abiertos desde ``ahora``, sin mover las
+    que ya empezaron, y la estación guarda el nuevo fin de cada slot.
+    Devuelve la cantidad de líneas que cambiaron de hora.
+    """
+    from cocina.models import EstacionCocina
+    from .models import Pedido, DetallePedido
+
+    ahora = ahora or timezone.now()
+    estacion_ids = {pk for pk in estacion_ids if pk is not None}
+    if not estacion_ids:
+        return 0
+
+    with transaction.atomic():
+        # SELECT ... FROM cocina_estacioncocina WHERE id IN (...) FOR UPDATE
+        estaciones = list(EstacionCocina.objects.select_for_update().filter(pk__in=estacion_ids))
+        libres = {estacion.pk: [ahora] * estacion.capacidad for estacion in estaciones}
+        # SELECT id, pedido_id, estacion_id, slot, inicio_estimado, listo_estimado FROM comedor_detallepedido
+        # WHERE estacion_id IN (...) AND estado_preparacion = 'pendiente' AND pedido.estado IN (...)
+        # ORDER BY estacion_id, slot, inicio_estimado (índice detalle_cola_estacion_idx)
+        lineas = (
+            DetallePedido.objects.filter(
+                estacion_id__in=libres, slot__isnull=False, estado_preparacion='pendiente',
+                pedido__estado__in=Pedido.ESTADOS_ABIERTOS,
+            )
+            .order_by('estacion_id', 'slot', 'inicio_estimado', 'pk')
+            .only('pk', 'pedido_id', 'estacion_id', 'slot', 'inicio_estimado', 'listo_estimado')
+        )
+
+        movidas = []
+        for linea in lineas:
+            slots = libres[linea.estacion_id]
+            if linea.slot >= len(slots) or linea.inicio_estimado is None or linea.listo_estimado is None:
+                continue
+            if linea.inicio_estimado > ahora:
+                # Aún no empieza: se encadena detrás de lo que queda antes en su slot
+                duracion = linea.listo_estimado - linea.inicio_estimado
+                inicio = slots[linea.slot]
+                if inicio != linea.inicio_estimado:
+                    linea.inicio_estimado, linea.listo_estimado = inicio, inicio + duracion
+                    movidas.append(linea)
+            slots[linea.slot] = max(slots[linea.slot], linea.listo_estimado)
+
+        if movidas:
+            DetallePedido.objects.bulk_update(movidas, ['inicio_estimado', 'listo_estimado'])
+        for estacion in estaciones:
+            estacion.guardar_libres(libres[estacion.pk])
+        recalcular_listo_pedidos({linea.pedido_id for linea in movidas})
+    return len(movidas)
+
+
+def liberar_pedidos(pedido_ids, ahora=None):
+    """Libera en cocina el lugar de las líneas pendientes de pedidos que se cancelaron"""
+    from .models import DetallePedido
+
+    if not pedido_ids:
+        return 0
+    # SELECT DISTINCT estacion_id FROM comedor_detallepedido WHERE pedido_id IN (...) AND estado_preparacion = 'pendiente'
+    estaciones = DetallePedido.objects.filter(
+        pedido_id__in=pedido_ids, estado_preparacion='pendiente', estacion__isnull=False,
+    ).order_by().values_list('estacion_id', flat=True).distinct()
+    return liberar_estaciones(set(estaciones), ahora)
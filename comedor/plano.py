@@ -0,0 +1,98 @@
+"""
+Foto del salón: cada mesa con su reserva activa, su pedido abierto, el total
+acumulado y los minutos que lleva ocupada.
+
+Son tres SELECT sin importar cuántas mesas haya: las mesas, las reservas
+activas (con su cliente) y los pedidos abiertos. Las reservas y pedidos se
+cargan con ``Prefetch(..., to_attr=...)`` y se eligen en memoria, en vez de
+filtrar mesa por mesa como hacía ``MesaDetailView``.
+"""
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Mesa, Reserva, Pedido
+
+PRIORIDAD_RESERVA = {'en_curso': 0, 'confirmada': 1, 'pendiente': 2}
+
+
+def reserva_actual(reservas):
+    """La reserva que importa en la mesa: la en curso, si no la próxima"""
+    return min(
+        reservas, key=lambda r: (PRIORIDAD_RESERVA.get(r.estado, 3), r.fecha_reserva), default=None,
+    )
+
+
+def prefetch_actividad():
+    """Prefetch de las reservas activas y pedidos abiertos de cada mesa (dos SELECT)"""
+    return (
+        # SELECT ... FROM comedor_reserva LEFT JOIN comedor_cliente
+        #   WHERE estado IN ('pendiente', 'confirmada', 'en_curso') AND mesa_id IN (...) ORDER BY fecha_reserva
+        Prefetch(
+            'reservas', to_attr='reservas_activas',
+            queryset=Reserva.objects.filter(estado__in=Reserva.ESTADOS_ACTIVOS)
+            .select_related('cliente').order_by('fecha_reserva'),
+        ),
+        # SELECT ... FROM comedor_pedido WHERE estado IN ('pendiente', 'en_curso', 'cuenta') AND mesa_id IN (...)
+        Prefetch(
+            'pedidos', to_attr='pedidos_abiertos',
+            queryset=Pedido.objects.filter(estado__in=Pedido.ESTADOS_ABIERTOS).order_by('-fecha_pedido'),
+        ),
+    )
+
+
+def mesas_con_actividad(queryset=None):
+    """
+    Mesas con ``reservas_activas`` y ``pedidos_abiertos`` precargados
+    (listas) y ``reserva_actual`` / ``pedido_actual`` resueltos.
+    """
+    queryset = Mesa.objects.all() if queryset is None else queryset
+    mesas = list(queryset.prefetch_related(*prefetch_actividad()))
+    for mesa in mesas:
+        mesa.reserva_actual = reserva_actual(mesa.reservas_activas)
+        mesa.pedido_actual = mesa.pedidos_abiertos[0] if mesa.pedidos_abiertos else None
+    return mesas
+
+
+def minutos_sentados(mesa, ahora):
+    """Minutos desde que se ocupó la mesa (o desde su pedido abierto)"""
+    if mesa.estado != 'ocupada':
+        return None
+    desde = mesa.ocupada_desde or (mesa.pedido_actual.fecha_pedido if mesa.pedido_actual else None)
+    return int((ahora - desde).total_seconds() // 60) if desde else None
+
+
+def plano_salon(ahora=None):
+    """Foto de todas las mesas del salón (tres consultas)"""
+    ahora = ahora or timezone.now()
+    mesas = mesas_con_actividad(Mesa.objects.order_by('numero'))
+    for mesa in mesas:
+        mesa.minutos_sentados = minutos_sentados(mesa, ahora)
+    return mesas
+
+
+def mesa_a_dict(mesa):
+    """Representación JSON de una mesa de ``plano_salon``"""
+    reserva, pedido = mesa.reserva_actual, mesa.pedido_actual
+    return {
+        'id': mesa.pk,
+        'numero': mesa.numero,
+        'capacidad': mesa.capacidad,
+        'ubicacion': mesa.ubicacion,
+        'estado': mesa.estado,
+        'minutos_sentados': mesa.minutos_sentados,
+        'liberacion_estimada': mesa.liberacion_estimada,
+        'reserva': reserva and {
+            'id': reserva.pk,
+            'estado': reserva.estado,
+            'fecha_reserva': reserva.fecha_reserva,
+            'numero_personas': reserva.numero_personas,
+            'cliente': reserva.cliente and {'id': reserva.cliente.pk, 'nombre': reserva.cliente.nombre},
+        },
+        'pedido': pedido and {
+            'id': pedido.pk,
+            'estado': pedido.estado,
+            'total': pedido.total,
+            'saldo': pedido.saldo,
+            'listo_estimado': pedido.listo_estimado,
+        },
+    }
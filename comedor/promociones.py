@@ -0,0 +1,173 @@
+"""
+Motor de promociones (reglas de precio por item, categoría, horario y tipo de pedido).
+
+Las promociones activas se compilan una vez por versión del conjunto de reglas
+en tablas de búsqueda: por item, por categoría y generales. La versión vive en
+la caché y cambia al guardar o borrar una ``Promocion``, así que cada proceso
+recompila solo cuando algo cambió (o, a lo sumo, cada ``VIGENCIA_VERSION``
+segundos si la caché es local al proceso). Tasar un pedido es una pasada por
+sus detalles con búsquedas por diccionario en esas tablas; cada línea se tasa
+una vez, a la hora en que se agregó, y su descuento queda fijo.
+"""
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import chain
+
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+CLAVE_VERSION = 'promociones:version'
+VIGENCIA_VERSION = 300
+CENTAVOS = Decimal('0.01')
+CERO = Decimal('0')
+
+_compiladas = (None, None)  # (versión, TablaPromociones) de este proceso
+
+
+@dataclass(frozen=True)
+class Regla:
+    """Promoción compilada: solo los datos necesarios para evaluar una línea"""
+    id: int
+    tipo: str
+    valor: Decimal
+    lleva: int
+    paga: int
+    prioridad: int
+    tipo_pedido: str
+    dias: frozenset
+    hora_inicio: object
+    hora_fin: object
+    fecha_inicio: object
+    fecha_fin: object
+
+    def vigente(self, momento, tipo_pedido):
+        if self.tipo_pedido and self.tipo_pedido != tipo_pedido:
+            return False
+        fecha = momento.date()
+        if (self.fecha_inicio and fecha < self.fecha_inicio) or (self.fecha_fin and fecha > self.fecha_fin):
+            return False
+        if self.dias and momento.weekday() not in self.dias:
+            return False
+        hora = momento.time()
+        if self.hora_inicio and self.hora_fin and self.hora_inicio > self.hora_fin:
+            # Ventana que cruza la medianoche (ej: 22:00 a 02:00)
+            return hora >= self.hora_inicio or hora < self.hora_fin
+        if self.hora_inicio and hora < self.hora_inicio:
+            return False
+        if self.hora_fin and hora >= self.hora_fin:
+            return False
+        return True
+
+    def descuento(self, cantidad, precio):
+        bruto = cantidad * precio
+        if self.tipo == 'porcentaje':
+            descuento = bruto * self.valor / 100
+        elif self.tipo == 'monto':
+            descuento = self.valor * cantidad
+        else:  # nxm: por cada N unidades se pagan M
+            descuento = (cantidad // self.lleva) * (self.lleva - self.paga) * precio
+        return min(descuento, bruto).quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+class TablaPromociones:
+    """Reglas activas indexadas por item y por categoría"""
+
+    def __init__(self, filas=()):
+        self.por_item = defaultdict(list)
+        self.por_categoria = defaultdict(list)
+        self.generales = []
+        for regla, item_id, categoria_id in filas:
+            if item_id:
+                self.por_item[item_id].append(regla)
+            elif categoria_id:
+                self.por_categoria[categoria_id].append(regla)
+            else:
+                self.generales.append(regla)
+
+    def __bool__(self):
+        return bool(self.por_item or self.por_categoria or self.generales)
+
+    def mejor(self, item_id, categoria_id, tipo_pedido, momento, cantidad, precio):
+        """Devuelve ``(regla, descuento)`` con el mayor descuento para la línea"""
+        elegida, mayor = None, CERO
+        candidatas = chain(
+            self.por_item.get(item_id, ()), self.por_categoria.get(categoria_id, ()), self.generales,
+        )
+        for regla in candidatas:
+            if not regla.vigente(momento, tipo_pedido):
+                continue
+            descuento = regla.descuento(cantidad, precio)
+            if descuento > mayor or (descuento == mayor and elegida and regla.prioridad > elegida.prioridad):
+                elegida, mayor = regla, descuento
+        return (elegida, mayor) if mayor > 0 else (None, CERO)
+
+
+def invalidar_promociones():
+    """Marca una nueva versión del conjunto de reglas (se llama al guardar/borrar)"""
+    cache.set(CLAVE_VERSION, time.time_ns(), VIGENCIA_VERSION)
+
+
+def compilar_promociones():
+    from .models import Promocion
+
+    # SELECT ... FROM comedor_promocion WHERE activa
+    filas = Promocion.objects.filter(activa=True).values(
+        'id', 'tipo', 'valor', 'lleva', 'paga', 'prioridad', 'tipo_pedido', 'dias',
+        'hora_inicio', 'hora_fin', 'fecha_inicio', 'fecha_fin', 'item_id', 'categoria_id',
+    )
+    return TablaPromociones(
+        (
+            Regla(
+                id=fila['id'], tipo=fila['tipo'], valor=fila['valor'], lleva=max(fila['lleva'], 1),
+                paga=fila['paga'], prioridad=fila['prioridad'], tipo_pedido=fila['tipo_pedido'],
+                dias=frozenset(fila['dias'] or ()), hora_inicio=fila['hora_inicio'], hora_fin=fila['hora_fin'],
+                fecha_inicio=fila['fecha_inicio'], fecha_fin=fila['fecha_fin'],
+            ),
+            fila['item_id'], fila['categoria_id'],
+        )
+        for fila in filas
+    )
+
+
+def tabla_promociones():
+    """Tabla compilada de la versión vigente (recompila solo si la versión cambió)"""
+    global _compiladas
+    version = cache.get_or_set(CLAVE_VERSION, time.time_ns, VIGENCIA_VERSION)
+    if _compiladas[0] != version:
+        _compiladas = (version, compilar_promociones())
+    return _compiladas[1]
+
+
+def precio_pedido(pedido):
+    """
+    Tasa las líneas del pedido que aún no se tasaron (nuevas o editadas) con
+    las promociones vigentes en el momento en que se agregó cada una, guarda
+    su descuento y promoción (bulk_update) y devuelve el total neto. Las
+    líneas ya tasadas conservan su descuento aunque las reglas cambien
+    después.
+    """
+    from .models import DetallePedido
+
+    tabla = tabla_promociones()
+    # SELECT detalle.*, item.categoria_id FROM comedor_detallepedido JOIN cocina_item ...
+    detalles = pedido.detalles.annotate(categoria_id=F('item__categoria_id'))
+
+    total, tasados = CERO, []
+    for detalle in detalles:
+        if not detalle.tasado:
+            regla, descuento = tabla.mejor(
+                detalle.item_id, detalle.categoria_id, pedido.tipo_pedido, timezone.localtime(detalle.fecha_creacion),
+                detalle.cantidad, detalle.precio_unitario,
+            )
+            detalle.descuento, detalle.promocion_id = descuento, regla.id if regla else None
+            detalle.subtotal = max(detalle.cantidad * detalle.precio_unitario - descuento, CERO)
+            detalle.tasado = True
+            tasados.append(detalle)
+        total += detalle.subtotal
+
+    if tasados:
+        DetallePedido.objects.bulk_update(tasados, ['descuento', 'promocion', 'subtotal', 'tasado'])
+    return total
@@ -0,0 +1,145 @@
+"""
+Pronóstico de demanda por hora: cubiertos y unidades por item.
+
+El historial se extrae en columnas (``values_list``) y se lleva a una grilla de
+horas con ``numpy.bincount``: una serie de cubiertos (reservas atendidas más
+``Pedido.comensales`` de los walk-in) y una matriz items × horas con las
+cantidades de ``DetallePedido``. La línea base estacional es el promedio de
+cada (día de la semana, hora local), ponderado para que las semanas recientes
+pesen más. El resultado reemplaza los pronósticos futuros en ``Pronostico``.
+Cada sucursal se pronostica con su propio historial.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from sucursales.contexto import en_cada_sucursal, sucursal_actual
+from .models import Reserva, Pedido, DetallePedido, Pronostico
+
+HORAS_SEMANA = 7 * 24
+SEGUNDOS_HORA = 3600
+ESTADOS_RESERVA_ATENDIDA = ['en_curso', 'terminada']
+MINIMO_ITEM = 0.05  # unidades/hora bajo las que no se guarda el pronóstico de un item
+
+
+def _columnas(queryset, *campos):
+    """Extrae ``campos`` como columnas (tuplas), sin instanciar modelos"""
+    filas = list(queryset.order_by().values_list(*campos))
+    return list(zip(*filas)) if filas else [() for _ in campos]
+
+
+def _segundos(fechas):
+    return np.fromiter((fecha.timestamp() for fecha in fechas), dtype=np.float64, count=len(fechas))
+
+
+def serie_horaria(inicio, horas, fechas, cantidades, grupos=None, n_grupos=1):
+    """
+    Suma ``cantidades`` por hora desde ``inicio``: matriz ``n_grupos × horas``.
+    ``grupos`` (índices 0..n_grupos-1) separa las filas, ej. un item por fila.
+    """
+    indices = ((_segundos(fechas) - inicio.timestamp()) // SEGUNDOS_HORA).astype(np.int64)
+    pesos = np.asarray(cantidades, dtype=np.float64)
+    grupos = np.zeros(len(indices), dtype=np.int64) if grupos is None else np.asarray(grupos, dtype=np.int64)
+    dentro = (indices >= 0) & (indices < horas)
+    planos = grupos[dentro] * horas + indices[dentro]
+    return np.bincount(planos, weights=pesos[dentro], minlength=n_grupos * horas).reshape(n_grupos, horas)
+
+
+def claves_estacionales(inicio, horas):
+    """Día de la semana × 24 + hora local de cada hora de la grilla (0..167)"""
+    return np.fromiter(
+        (
+            (local.weekday() * 24 + local.hour)
+            for local in (timezone.localtime(inicio + timedelta(hours=h)) for h in range(horas))
+        ),
+        dtype=np.int64, count=horas,
+    )
+
+
+def linea_base(series, claves, pesos):
+    """Promedio ponderado de cada serie por clave estacional: matriz ``filas × 168``"""
+    indicadora = np.zeros((len(claves), HORAS_SEMANA))
+    indicadora[np.arange(len(claves)), claves] = pesos
+    conteo = indicadora.sum(axis=0)
+    sumas = series @ indicadora
+    return np.divide(sumas, conteo, out=np.zeros_like(sumas), where=conteo > 0)
+
+
+def pronosticar_demanda(ahora=None, semanas=8, horizonte=7, semivida=4):
+    """
+    Ajusta la línea base con las últimas ``semanas`` y guarda el pronóstico de
+    las próximas ``horizonte`` días (desde la hora en curso). ``semivida`` (en
+    semanas) es cuánto tarda una observación en pesar la mitad. Sin sucursal
+    en curso (tarea, comando) pronostica cada sucursal por separado.
+    Devuelve un resumen con las filas escritas.
+    """
+    if sucursal_actual() is None:
+        resumen = {'observaciones': 0, 'items': 0, 'filas': 0}
+        for _ in en_cada_sucursal():
+            for clave, valor in pronosticar_demanda(ahora, semanas, horizonte, semivida).items():
+                resumen[clave] += valor
+        return resumen
+
+    ahora = ahora or timezone.now()
+    corte = ahora.replace(minute=0, second=0, microsecond=0)
+    inicio = corte - timedelta(weeks=semanas)
+    horas = semanas * HORAS_SEMANA
+
+    # SELECT fecha_reserva, numero_personas FROM comedor_reserva
+    # WHERE sucursal_id = %s AND estado IN (...) AND fecha_reserva ...
+    fechas_reserva, personas = _columnas(
+        Reserva.objects.filter(estado__in=ESTADOS_RESERVA_ATENDIDA, fecha_reserva__gte=inicio, fecha_reserva__lt=corte),
+        'fecha_reserva', 'numero_personas',
+    )
+    # SELECT fecha_pedido, comensales FROM comedor_pedido WHERE sucursal_id = %s AND comensales IS NOT NULL AND ...
+    fechas_walkin, comensales = _columnas(
+        Pedido.objects.exclude(estado='cancelado')
+        .filter(comensales__isnull=False, fecha_pedido__gte=inicio, fecha_pedido__lt=corte),
+        'fecha_pedido', 'comensales',
+    )
+    # SELECT pedido.fecha_pedido, item_id, cantidad FROM comedor_detallepedido JOIN comedor_pedido
+    # WHERE pedido.sucursal_id = %s AND ...
+    fechas_linea, items, cantidades = _columnas(
+        DetallePedido.objects.exclude(pedido__estado='cancelado')
+        .filter(pedido__fecha_pedido__gte=inicio, pedido__fecha_pedido__lt=corte),
+        'pedido__fecha_pedido', 'item_id', 'cantidad',
+    )
+
+    cubiertos = serie_horaria(inicio, horas, fechas_reserva + fechas_walkin, personas + comensales)
+    item_ids, grupos = np.unique(np.asarray(items, dtype=np.int64), return_inverse=True)
+    por_item = serie_horaria(inicio, horas, fechas_linea, cantidades, grupos, len(item_ids))
+
+    claves = claves_estacionales(inicio, horas)
+    edad = (horas - 1 - np.arange(horas)) / HORAS_SEMANA
+    pesos = 0.5 ** (edad / semivida)
+    base_cubiertos = linea_base(cubiertos, claves, pesos)[0]
+    base_items = linea_base(por_item, claves, pesos)
+
+    futuras = claves_estacionales(corte, horizonte * 24)
+    fechas = [corte + timedelta(hours=h) for h in range(len(futuras))]
+    pronostico_cubiertos = base_cubiertos[futuras]
+    pronostico_items = base_items[:, futuras]
+
+    generado = timezone.now()
+    nuevos = [
+        Pronostico(fecha_hora=fecha, cantidad=round(float(valor), 2), generado=generado)
+        for fecha, valor in zip(fechas, pronostico_cubiertos)
+    ]
+    filas, columnas = np.nonzero(pronostico_items >= MINIMO_ITEM)
+    nuevos += [
+        Pronostico(fecha_hora=fechas[h], item_id=int(item_ids[i]),
+                   cantidad=round(float(pronostico_items[i, h]), 2), generado=generado)
+        for i, h in zip(filas, columnas)
+    ]
+
+    with transaction.atomic():
+        # DELETE FROM comedor_pronostico WHERE sucursal_id = %s AND fecha_hora >= %s; INSERT ... (en lotes)
+        Pronostico.objects.filter(fecha_hora__gte=corte).delete()
+        Pronostico.objects.bulk_create(nuevos, batch_size=1000)
+    return {
+        'observaciones': len(fechas_reserva) + len(fechas_walkin) + len(fechas_linea),
+        'items': len(item_ids),
+        'filas': len(nuevos),
+    }
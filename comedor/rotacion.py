@@ -0,0 +1,140 @@
+"""
+Rotación de mesas y espera estimada de la lista de espera (walk-in).
+
+Cada mesa ocupada guarda desde cuándo lo está y a qué hora se estima que se
+libera: la hora de ocupación más la duración promedio de las mesas de su
+capacidad (``RotacionMesa``). Al liberarse, la duración real entra en ese
+promedio como media móvil exponencial con un único ``UPDATE ... SET minutos =
+minutos + alfa * (x - minutos)``, así el promedio nunca se recalcula desde el
+historial. Cada sucursal lleva su propio promedio. Con esas horas ya guardadas, estimar la espera de toda la lista es
+un par de SELECT y una simulación en memoria: cada grupo, por orden de
+llegada, toma la mesa adecuada que se libera antes.
+
+Ocupar o liberar una mesa no recalcula la lista dentro de la solicitud: al
+confirmar se encola la tarea ``estimar_esperas_sucursal`` (comedor/tareas.py),
+una por sucursal mientras no se haya ejecutado. Agregar o cancelar un grupo sí
+la recalcula en el momento, porque la recepción muestra la hora estimada.
+"""
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from Proy_Itaka.transacciones import al_confirmar
+from sucursales.contexto import sucursal_por_defecto
+
+MINUTOS_MINIMO = 5  # ocupaciones más cortas (errores de carga) no se promedian
+MINUTOS_MAXIMO = 6 * 60
+
+
+def minutos_promedio(capacidad, sucursal=None):
+    """Duración promedio (minutos) de una mesa de esta capacidad en ``sucursal`` (por defecto, la en curso)"""
+    from .models import RotacionMesa
+
+    sucursal = sucursal or sucursal_por_defecto()
+    # SELECT minutos FROM comedor_rotacionmesa WHERE sucursal_id = %s AND capacidad = %s
+    minutos = (RotacionMesa.todas.filter(sucursal_id=sucursal, capacidad=capacidad)
+               .values_list('minutos', flat=True).first())
+    return minutos if minutos is not None else settings.ROTACION_MINUTOS_INICIAL
+
+
+def registrar_duracion(capacidad, minutos, sucursal=None):
+    """Suma una ocupación de ``minutos`` a la media móvil de su capacidad en ``sucursal``"""
+    from .models import RotacionMesa
+
+    if not MINUTOS_MINIMO <= minutos <= MINUTOS_MAXIMO:
+        return
+    sucursal = sucursal or sucursal_por_defecto()
+    alfa = settings.ROTACION_ALFA
+    # UPDATE comedor_rotacionmesa SET minutos = minutos + alfa * (%s - minutos), muestras = muestras + 1
+    #   WHERE sucursal_id = %s AND capacidad = %s
+    actualizadas = RotacionMesa.todas.filter(sucursal_id=sucursal, capacidad=capacidad).update(
+        minutos=F('minutos') + alfa * (minutos - F('minutos')), muestras=F('muestras') + 1,
+    )
+    if not actualizadas:
+        # La primera observación parte del valor inicial, igual que las siguientes
+        inicial = settings.ROTACION_MINUTOS_INICIAL
+        _, creada = RotacionMesa.todas.get_or_create(
+            sucursal_id=sucursal, capacidad=capacidad,
+            defaults={'minutos': inicial + alfa * (minutos - inicial), 'muestras': 1},
+        )
+        if not creada:
+            registrar_duracion(capacidad, minutos, sucursal)
+
+
+def actualizar_ocupacion(mesa, ahora=None):
+    """
+    Lo llama ``Mesa.save`` cuando la mesa entra o sale de 'ocupada' (antes de
+    guardar): fija o limpia ``ocupada_desde``/``liberacion_estimada``, registra la
+    duración y encola el recálculo de la lista de espera de su sucursal al confirmar la transacción.
+    """
+    ahora = ahora or timezone.now()
+    if mesa.estado == 'ocupada':
+        mesa.ocupada_desde = ahora
+        mesa.liberacion_estimada = ahora + timedelta(minutes=minutos_promedio(mesa.capacidad, mesa.sucursal_id))
+    else:
+        if mesa.ocupada_desde is not None:
+            registrar_duracion(mesa.capacidad, (ahora - mesa.ocupada_desde).total_seconds() / 60, mesa.sucursal_id)
+        mesa.ocupada_desde = mesa.liberacion_estimada = None
+    programar_estimacion(mesa.sucursal_id)
+
+
+def programar_estimacion(sucursal=None):
+    """Encola el recálculo de la lista de espera de ``sucursal`` al confirmar, una sola vez por transacción"""
+    sucursal = sucursal or sucursal_por_defecto()
+    al_confirmar(('estimar_esperas', sucursal), partial(encolar_estimacion, sucursal))
+
+
+def encolar_estimacion(sucursal):
+    """Encola ``estimar_esperas_sucursal`` si no hay ya una pendiente para esa sucursal"""
+    from tareas.cola import encolar
+    from tareas.models import Tarea
+    from .tareas import estimar_esperas_sucursal
+
+    argumentos = {'args': [sucursal], 'kwargs': {}}
+    # SELECT 1 FROM tareas_tarea WHERE nombre = %s AND estado = 'pendiente' AND argumentos = %s LIMIT 1
+    if not Tarea.objects.filter(
+        nombre=estimar_esperas_sucursal.nombre_tarea, estado='pendiente', argumentos=argumentos,
+    ).exists():
+        encolar(estimar_esperas_sucursal, args=[sucursal])
+
+
+def estimar_esperas(ahora=None):
+    """
+    Recalcula ``hora_estimada`` de los grupos que esperan en la sucursal en curso. Las mesas disponibles
+    se liberan ya, las ocupadas a su ``liberacion_estimada`` (o ya, si se pasó);
+    las reservadas y en mantenimiento no cuentan. Por orden de llegada, cada
+    grupo toma la mesa con capacidad suficiente que se libera antes (a igual
+    hora, la más chica) y esa mesa vuelve a quedar ocupada una rotación
+    promedio. Devuelve los grupos actualizados.
+    """
+    from .models import Mesa, EsperaMesa, RotacionMesa
+
+    ahora = ahora or timezone.now()
+    # SELECT ... FROM comedor_esperamesa WHERE estado = 'esperando' ORDER BY fecha_llegada
+    esperas = list(EsperaMesa.objects.filter(estado='esperando').order_by('fecha_llegada', 'pk'))
+    if not esperas:
+        return []
+    # SELECT id, capacidad, estado, liberacion_estimada FROM comedor_mesa WHERE estado IN ('disponible', 'ocupada')
+    mesas = [
+        [max(liberacion or ahora, ahora) if estado == 'ocupada' else ahora, capacidad]
+        for capacidad, estado, liberacion in Mesa.objects.filter(estado__in=['disponible', 'ocupada'])
+        .values_list('capacidad', 'estado', 'liberacion_estimada')
+    ]
+    # SELECT capacidad, minutos FROM comedor_rotacionmesa WHERE sucursal_id = %s
+    rotacion = dict(RotacionMesa.objects.values_list('capacidad', 'minutos'))
+
+    for espera in esperas:
+        adecuadas = [mesa for mesa in mesas if mesa[1] >= espera.numero_personas]
+        if not adecuadas:
+            espera.hora_estimada = None
+            continue
+        mesa = min(adecuadas, key=lambda m: (m[0], m[1]))
+        espera.hora_estimada = mesa[0]
+        minutos = rotacion.get(mesa[1], settings.ROTACION_MINUTOS_INICIAL)
+        mesa[0] = mesa[0] + timedelta(minutes=minutos)
+
+    EsperaMesa.objects.bulk_update(esperas, ['hora_estimada'])
+    return esperas
@@ -0,0 +1,49 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+
+from tareas.cola import encolar, tarea
+from tareas.models import Tarea
+from sucursales.contexto import usar_sucursal
+from .operaciones import marcar_reservas_no_show
+from .rotacion import estimar_esperas
+from .tickets import imprimir_pendientes
+
+logger = logging.getLogger(__name__)
+
+
+@tarea(cola='default')
+def barrer_reservas_vencidas(reprogramar=True):
+    """Barrido periódico de no-shows; se vuelve a encolar cada BARRIDO_NO_SHOW_INTERVALO segundos"""
+    resumen = marcar_reservas_no_show()
+    logger.info('Barrido de reservas vencidas: %s', resumen)
+    if reprogramar:
+        programar_barrido()
+    return resumen
+
+
+def programar_barrido():
+    """Encola la próxima ejecución del barrido si no hay una pendiente."""
+    nombre = barrer_reservas_vencidas.nombre_tarea
+    if Tarea.objects.filter(nombre=nombre, estado='pendiente').exists():
+        return None
+    return encolar(
+        barrer_reservas_vencidas,
+        retraso=timedelta(seconds=settings.BARRIDO_NO_SHOW_INTERVALO),
+    )
+
+
+@tarea(cola='tickets', max_intentos=10)
+def imprimir_tickets():
+    """Envía los tickets pendientes, una tanda por impresora (comedor/tickets.py)"""
+    enviados = imprimir_pendientes()
+    logger.info('Tickets impresos: %s', enviados)
+    return enviados
+
+
+@tarea(cola='default')
+def estimar_esperas_sucursal(sucursal):
+    """Recalcula la hora estimada de la lista de espera de ``sucursal`` (se encola al ocupar o liberar mesas)"""
+    with usar_sucursal(sucursal):
+        return len(estimar_esperas())
@@ -1,12 +1,39 @@
-from django.test import TestCase, Client as TestClient
+from django.test import TestCase, Client as TestClient, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.forms import inlineformset_factory
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-from datetime import timedelta
+import gzip
+import json
+import random
+from datetime import datetime, time, timedelta
+from itertools import combinations
 from decimal import Decimal
-from .models import Mesa, Cliente, Reserva, Pedido, DetallePedido
+from io import StringIO
+from unittest import mock
+from .dashboard import calcular_kpis, clave_kpis
+from .eventos import buffer_eventos, registrar_transicion
+from .models import Mesa, Cliente, GrupoReserva, Reserva, Pedido, DetallePedido, EventoEstado, Promocion, Pago, Pronostico, RotacionMesa, EsperaMesa, OperacionCliente, Ticket, CierreCaja
+from .combinaciones import mejor_combinacion, reservar_grupo
+from .planificacion import completar_linea, liberar_estaciones, planificar_lineas
+from .pronosticos import pronosticar_demanda
+from .rotacion import encolar_estimacion, estimar_esperas, registrar_duracion
+from .plano import plano_salon
+from .cierres import calcular_cierre, cerrar_caja, rango_dia
+from . import tickets
+from .pagos import MAXIMO_PARTES, dividir_equitativo, dividir_por_asiento, registrar_devolucion, registrar_pago
+from .promociones import tabla_promociones
+from .tareas import estimar_esperas_sucursal
+from .operaciones import cambiar_estado_pedidos, cambiar_estado_reservas, guardar_detalles, marcar_reservas_no_show
 from .forms import MesaForm, ClienteForm, ReservaForm, PedidoForm
-from cocina.models import CategoriaItem, Item
+from cocina.models import CategoriaItem, Item, EstacionCocina
+from tareas.cola import procesar_lote
+from tareas.models import Tarea
 
 
 # ============================================
@@ -452,4 +479,1493 @@ class ReservaModelLogicTest(TestCase):
         # Cancelar la segunda reserva debería liberar la mesa
         reserva2.cancel()
         self.mesa.refresh_from_db()
-        self.assertEqual(self.mesa.estado, 'disponible')
\ No newline at end of file
+        self.assertEqual(self.mesa.estado, 'disponible')
+
+# ============================================
+# TESTS DEL PANEL DE KPI
+# ============================================
+
+class DashboardKPITest(TestCase):
+    """Tests para los indicadores agregados del índice del comedor"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = TestClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+        self.mesa1 = Mesa.objects.create(numero=1, capacidad=4, ubicacion='terraza', estado='ocupada')
+        self.mesa2 = Mesa.objects.create(numero=2, capacidad=2, ubicacion='terraza')
+        self.mesa3 = Mesa.objects.create(numero=3, capacidad=6, ubicacion='vip')
+        self.cliente = Cliente.objects.create(nombre='Cliente KPI')
+        Reserva.objects.create(
+            cliente=self.cliente, mesa=self.mesa1, numero_personas=3,
+            fecha_reserva=timezone.now(), estado='en_curso',
+        )
+        Reserva.objects.create(
+            cliente=self.cliente, mesa=self.mesa3, numero_personas=5,
+            fecha_reserva=timezone.now() + timedelta(hours=1),
+        )
+        Pedido.objects.create(mesa=self.mesa1, estado='pagado', total=Decimal('10000'))
+        Pedido.objects.create(mesa=self.mesa1, estado='pagado', total=Decimal('20000'))
+        Pedido.objects.create(mesa=self.mesa1, estado='en_curso', total=Decimal('5000'))
+
+    def test_calculo_en_consultas_fijas(self):
+        """Test: Los KPI se calculan con un número fijo de consultas agregadas"""
+        with self.assertNumQueries(5):
+            kpis = calcular_kpis()
+        self.assertEqual(kpis['cubiertos_sentados'], 3)
+        self.assertEqual(kpis['pedidos']['ventas_hoy'], Decimal('30000'))
+        self.assertEqual(kpis['pedidos']['ticket_promedio'], Decimal('15000'))
+        abiertos = {fila['estado']: fila['total'] for fila in kpis['pedidos']['abiertos']}
+        self.assertEqual(abiertos['en_curso'], 1)
+        self.assertEqual(len(kpis['proximas_reservas']), 1)
+
+    def test_ocupacion_por_ubicacion(self):
+        """Test: La ocupación se agrupa por ubicación"""
+        ocupacion = {fila['ubicacion']: fila for fila in calcular_kpis()['ocupacion']}
+        self.assertEqual(ocupacion['terraza']['total'], 2)
+        self.assertEqual(ocupacion['terraza']['ocupadas'], 1)
+        self.assertEqual(ocupacion['terraza']['porcentaje'], 50)
+        self.assertEqual(ocupacion['vip']['reservadas'], 1)
+
+    def test_index_usa_cache(self):
+        """Test: Visitas repetidas al índice reutilizan los KPI en caché"""
+        response = self.client.get(reverse('comedor:comedor_index'))
+        self.assertContains(response, 'Cubiertos sentados')
+        self.assertIsNotNone(cache.get(clave_kpis()))
+
+        Pedido.objects.create(mesa=self.mesa1, estado='pendiente')
+        response = self.client.get(reverse('comedor:comedor_index'))
+        abiertos = {fila['estado']: fila['total'] for fila in response.context['kpis']['pedidos']['abiertos']}
+        self.assertEqual(abiertos['pendiente'], 0)  # Aún dentro del TTL
+
+
+# ============================================
+# TESTS DE LA BITÁCORA DE ESTADOS
+# ============================================
+
+class EventoEstadoTest(TestCase):
+    """Tests para el registro append-only de transiciones"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.cliente = Cliente.objects.create(nombre='Cliente Bitácora')
+
+    def test_transiciones_se_registran_al_confirmar(self):
+        """Test: Los cambios de estado de mesa y reserva quedan en la bitácora al hacer commit"""
+        with self.captureOnCommitCallbacks(execute=True):
+            mesa = Mesa.objects.create(numero=30, capacidad=4, ubicacion='vip')
+            reserva = Reserva.objects.create(
+                cliente=self.cliente, mesa=mesa, numero_personas=2,
+                fecha_reserva=timezone.now() + timedelta(days=1),
+            )
+            reserva.cancel()
+
+        estados_mesa = [(e.estado_anterior, e.estado_nuevo) for e in mesa.linea_de_tiempo()]
+        self.assertEqual(estados_mesa, [('', 'disponible'), ('disponible', 'reservada'), ('reservada', 'disponible')])
+        estados_reserva = list(reserva.linea_de_tiempo().values_list('estado_nuevo', flat=True))
+        self.assertEqual(estados_reserva, ['pendiente', 'cancelada'])
+
+    def test_sin_cambio_no_registra(self):
+        """Test: Guardar sin cambiar el estado no genera eventos"""
+        with self.captureOnCommitCallbacks(execute=True):
+            mesa = Mesa.objects.create(numero=31, capacidad=2, ubicacion='terraza')
+            mesa = Mesa.objects.get(pk=mesa.pk)
+            mesa.capacidad = 3
+            mesa.save()
+        self.assertEqual(mesa.linea_de_tiempo().count(), 1)
+
+    def test_buffer_inserta_en_lote(self):
+        """Test: Dentro de buffer_eventos las transiciones se insertan con un solo INSERT"""
+        mesas = [Mesa.objects.create(numero=40 + i, capacidad=2, ubicacion='terraza') for i in range(3)]
+        # 3 x (SELECT rotación + UPDATE mesa) + 1 INSERT de la bitácora + SELECT e INSERT de la tarea de la lista de espera
+        with self.assertNumQueries(9):
+            with buffer_eventos(actor=self.user.pk):
+                with self.captureOnCommitCallbacks(execute=True):
+                    for mesa in mesas:
+                        mesa.estado = 'ocupada'
+                        mesa.save()
+        self.assertEqual(EventoEstado.objects.transiciones_a('mesa', 'ocupada').filter(actor=self.user).count(), 3)
+
+    def test_actor_desde_la_solicitud(self):
+        """Test: El middleware registra al usuario que provocó la transición"""
+        mesa = Mesa.objects.create(numero=32, capacidad=4, ubicacion='vip')
+        reserva = Reserva.objects.create(
+            cliente=self.cliente, mesa=mesa, numero_personas=2,
+            fecha_reserva=timezone.now() + timedelta(days=1),
+        )
+        client = TestClient()
+        client.login(username='testuser', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            client.get(reverse('comedor:confirmar_reserva', args=[reserva.pk]))
+        evento = reserva.linea_de_tiempo().get(estado_nuevo='confirmada')
+        self.assertEqual(evento.actor, self.user)
+
+    def test_solo_insercion(self):
+        """Test: Los eventos no se pueden modificar ni borrar"""
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_transicion('mesa', 1, 'disponible', 'ocupada')
+        evento = EventoEstado.objects.get()
+        with self.assertRaises(ValidationError):
+            evento.save()
+        with self.assertRaises(ValidationError):
+            EventoEstado.objects.all().delete()
+
+
+# ============================================
+# TESTS DEL BARRIDO DE NO-SHOWS
+# ============================================
+
+class BarridoNoShowTest(TestCase):
+    """Tests para el barrido masivo de reservas vencidas"""
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nombre='Cliente Ausente')
+        self.mesa_libre = Mesa.objects.create(numero=60, capacidad=4, ubicacion='terraza')
+        self.mesa_con_otra = Mesa.objects.create(numero=61, capacidad=4, ubicacion='terraza')
+        self.pasado = timezone.now() - timedelta(hours=3)
+        self.vencidas = [
+            Reserva.objects.create(cliente=self.cliente, mesa=self.mesa_libre, numero_personas=2, fecha_reserva=self.pasado),
+            Reserva.objects.create(cliente=self.cliente, mesa=self.mesa_con_otra, numero_personas=2,
+                                   fecha_reserva=self.pasado, estado='confirmada'),
+        ]
+        self.futura = Reserva.objects.create(
+            cliente=self.cliente, mesa=self.mesa_con_otra, numero_personas=2,
+            fecha_reserva=timezone.now() + timedelta(days=1),
+        )
+        self.reciente = Reserva.objects.create(
+            cliente=self.cliente, mesa=self.mesa_con_otra, numero_personas=2,
+            fecha_reserva=timezone.now() - timedelta(minutes=10),
+        )
+
+    def test_marca_vencidas_y_libera_mesas(self):
+        """Test: Las reservas vencidas pasan a no_asistio y sus mesas se recalculan"""
+        resumen = marcar_reservas_no_show(gracia=timedelta(minutes=60))
+        self.assertEqual(resumen, {'reservas': 2, 'mesas': 1, 'lotes': 1})
+        for reserva in self.vencidas:
+            reserva.refresh_from_db()
+            self.assertEqual(reserva.estado, 'no_asistio')
+        self.reciente.refresh_from_db()
+        self.assertEqual(self.reciente.estado, 'pendiente')  # Dentro de la gracia
+
+        self.mesa_libre.refresh_from_db()
+        self.mesa_con_otra.refresh_from_db()
+        self.assertEqual(self.mesa_libre.estado, 'disponible')
+        self.assertEqual(self.mesa_con_otra.estado, 'reservada')  # Conserva reservas activas
+
+    def test_consultas_por_lote(self):
+        """Test: Cada lote usa un UPDATE de reservas y uno de mesas, sin save() por fila"""
+        with CaptureQueriesContext(connection) as consultas:
+            marcar_reservas_no_show(gracia=timedelta(minutes=60), lote=1)
+        updates = [q['sql'] for q in consultas if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len([sql for sql in updates if sql.startswith('UPDATE "comedor_reserva"')]), 2)
+        self.assertEqual(len([sql for sql in updates if sql.startswith('UPDATE "comedor_mesa"')]), 1)
+
+    def test_registra_en_bitacora(self):
+        """Test: El barrido deja las transiciones en la bitácora"""
+        with self.captureOnCommitCallbacks(execute=True):
+            marcar_reservas_no_show(gracia=timedelta(minutes=60))
+        self.assertEqual(EventoEstado.objects.transiciones_a('reserva', 'no_asistio').count(), 2)
+        self.assertEqual(EventoEstado.objects.transiciones_a('mesa', 'disponible').count(), 1)
+
+    def test_comando(self):
+        """Test: El comando reporta lo que cambió"""
+        salida = StringIO()
+        call_command('barrer_reservas_vencidas', gracia=60, stdout=salida)
+        self.assertIn('2 reservas', salida.getvalue())
+
+
+class AccionesMasivasTest(TestCase):
+    """Tests para las acciones masivas del admin sobre reservas y pedidos"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='jefe', password='jefe123')
+        self.cliente = Cliente.objects.create(nombre='Cliente Masivo')
+        self.mesas = [Mesa.objects.create(numero=70 + i, capacidad=4, ubicacion='interior') for i in range(3)]
+        manana = timezone.now() + timedelta(days=1)
+        self.reservas = [
+            Reserva.objects.create(cliente=self.cliente, mesa=mesa, numero_personas=2, fecha_reserva=manana)
+            for mesa in self.mesas
+        ]
+        categoria = CategoriaItem.objects.create(nombre='Bebidas')
+        self.item = Item.objects.create(nombre='Jugo', categoria=categoria, precio=Decimal('2500'))
+        self.pedidos = [Pedido.objects.create(mesa=mesa, cliente=self.cliente) for mesa in self.mesas[:2]]
+        for pedido in self.pedidos:
+            DetallePedido.objects.create(pedido=pedido, item=self.item, cantidad=2, precio_unitario=self.item.precio)
+
+    def test_cancelar_reservas_en_bloque(self):
+        """Test: Cancelar reservas usa un UPDATE de reservas y uno de mesas"""
+        with CaptureQueriesContext(connection) as consultas:
+            reservas, mesas = cambiar_estado_reservas(Reserva.objects.all(), 'cancelada')
+        self.assertEqual((reservas, mesas), (3, 3))
+        updates = [q['sql'] for q in consultas if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertFalse(Reserva.objects.exclude(estado='cancelada').exists())
+        self.assertFalse(Mesa.objects.exclude(estado='disponible').exists())
+
+    def test_confirmar_omite_estados_no_validos(self):
+        """Test: Solo se confirman las reservas pendientes"""
+        Reserva.objects.filter(pk=self.reservas[0].pk).update(estado='cancelada')
+        reservas, _ = cambiar_estado_reservas(Reserva.objects.all(), 'confirmada')
+        self.assertEqual(reservas, 2)
+        self.reservas[0].refresh_from_db()
+        self.assertEqual(self.reservas[0].estado, 'cancelada')
+
+    def test_cerrar_pedidos_recalcula_totales(self):
+        """Test: Cerrar pedidos recalcula el total en bloque, registra la transición y omite los que tienen saldo"""
+        saldado, con_saldo = Pedido.objects.order_by('pk')
+        Pedido.objects.update(total=Decimal('0'))
+        Pedido.objects.filter(pk=saldado.pk).update(monto_pagado=Decimal('5000'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(cambiar_estado_pedidos(Pedido.objects.all(), 'pagado'), 1)
+        saldado.refresh_from_db()
+        con_saldo.refresh_from_db()
+        self.assertEqual((saldado.estado, saldado.total, saldado.saldo), ('pagado', Decimal('5000'), 0))
+        self.assertIsNotNone(saldado.fecha_pago)
+        self.assertEqual(con_saldo.estado, 'pendiente')
+        self.assertEqual(con_saldo.saldo, Decimal('5000'))
+        self.assertEqual(EventoEstado.objects.transiciones_a('pedido', 'pagado').count(), 1)
+        # Un pedido ya cerrado no se vuelve a tocar
+        self.assertEqual(cambiar_estado_pedidos(Pedido.objects.filter(pk=saldado.pk), 'cancelado'), 0)
+
+    def test_accion_desde_admin(self):
+        """Test: La acción del changelist aplica el cambio y avisa al usuario"""
+        client = TestClient()
+        client.login(username='jefe', password='jefe123')
+        response = client.post(reverse('admin:comedor_reserva_changelist'), {
+            'action': 'cancelar_reservas',
+            '_selected_action': [r.pk for r in self.reservas[:2]],
+        }, follow=True)
+        self.assertContains(response, '2 reserva(s) cancelada(s)')
+        self.assertEqual(Reserva.objects.filter(estado='cancelada').count(), 2)
+
+
+class GuardarDetallesFormsetTest(TestCase):
+    """Tests para el guardado en bloque de las líneas de un pedido"""
+
+    def setUp(self):
+        categoria = CategoriaItem.objects.create(nombre='Fondos')
+        self.item = Item.objects.create(nombre='Cazuela', categoria=categoria, precio=Decimal('8000'))
+        self.pedido = Pedido.objects.create()
+        self.existente = DetallePedido.objects.create(
+            pedido=self.pedido, item=self.item, cantidad=1, precio_unitario=Decimal('8000'),
+        )
+        self.Formset = inlineformset_factory(
+            Pedido, DetallePedido, fields=['item', 'cantidad', 'precio_unitario', 'observaciones'], extra=3,
+        )
+
+    def _datos(self, nuevas, cantidad_existente):
+        datos = {
+            'detalles-TOTAL_FORMS': str(1 + nuevas), 'detalles-INITIAL_FORMS': '1',
+            'detalles-0-id': str(self.existente.pk), 'detalles-0-pedido': str(self.pedido.pk),
+            'detalles-0-item': str(self.item.pk), 'detalles-0-cantidad': str(cantidad_existente),
+            'detalles-0-precio_unitario': '8000',
+        }
+        for i in range(1, nuevas + 1):
+            datos.update({
+                f'detalles-{i}-item': str(self.item.pk), f'detalles-{i}-cantidad': '2',
+                f'detalles-{i}-precio_unitario': '8000',
+            })
+        return datos
+
+    def test_total_se_recalcula_una_vez(self):
+        """Test: N líneas nuevas se insertan en bloque y el pedido se actualiza una sola vez"""
+        formset = self.Formset(self._datos(nuevas=3, cantidad_existente=3), instance=self.pedido)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        with CaptureQueriesContext(connection) as consultas:
+            guardar_detalles(formset)
+        sqls = [q['sql'] for q in consultas]
+        self.assertEqual(len([sql for sql in sqls if sql.startswith('INSERT INTO "comedor_detallepedido"')]), 1)
+        self.assertEqual(len([sql for sql in sqls if sql.startswith('UPDATE "comedor_pedido" SET "total"')]), 1)
+
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.detalles.count(), 4)
+        self.assertEqual(self.pedido.total, Decimal('72000'))  # 3 x 8000 + 3 x (2 x 8000)
+
+    def test_sin_pk_del_insert_en_bloque(self):
+        """Test: Si la base no devuelve los pk del bulk_create, las líneas nuevas se insertan una a una y se planifican"""
+        formset = self.Formset(self._datos(nuevas=2, cantidad_existente=1), instance=self.pedido)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        with mock.patch.object(connection.features, 'can_return_columns_from_insert', False), \
+                CaptureQueriesContext(connection) as consultas:
+            nuevas = guardar_detalles(formset)[:2]
+        inserts = [q['sql'] for q in consultas if q['sql'].startswith('INSERT INTO "comedor_detallepedido"')]
+        self.assertEqual(len(inserts), 2)
+        self.assertTrue(all(detalle.pk for detalle in nuevas))
+        self.assertFalse(self.pedido.detalles.filter(estacion__isnull=True).exclude(pk=self.existente.pk).exists())
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.total, Decimal('40000'))  # 8000 + 2 x (2 x 8000)
+
+    def test_elimina_lineas(self):
+        """Test: Las líneas marcadas para borrar se eliminan y el total queda en cero"""
+        datos = self._datos(nuevas=0, cantidad_existente=1)
+        datos['detalles-0-DELETE'] = 'on'
+        formset = self.Formset(datos, instance=self.pedido)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        guardar_detalles(formset)
+        self.pedido.refresh_from_db()
+        self.assertFalse(self.pedido.detalles.exists())
+        self.assertEqual(self.pedido.total, Decimal('0'))
+
+    def test_save_sin_recalcular(self):
+        """Test: DetallePedido.save(recalcular=False) no recalcula el total del pedido"""
+        with CaptureQueriesContext(connection) as consultas:
+            DetallePedido(pedido=self.pedido, item=self.item, cantidad=1, precio_unitario=Decimal('8000')).save(recalcular=False)
+        self.assertFalse([q for q in consultas if q['sql'].startswith('UPDATE "comedor_pedido" SET "total"')])
+
+
+class AutocompletarTest(TestCase):
+    """Tests para el autocompletado de clientes y mesas en los formularios"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='host', password='host123')
+        self.client = TestClient()
+        self.client.login(username='host', password='host123')
+        Cliente.objects.bulk_create([Cliente(nombre=f'Cliente {i:03d}', telefono=f'+5690000{i:04d}') for i in range(50)])
+        self.ana = Cliente.objects.create(nombre='Ana Pérez', telefono='+56912345678')
+        self.mesa_chica = Mesa.objects.create(numero=81, capacidad=2, ubicacion='barra')
+        self.mesa_grande = Mesa.objects.create(numero=82, capacidad=8, ubicacion='salon_principal')
+
+    def test_busqueda_por_prefijo(self):
+        """Test: Busca clientes por comienzo del nombre o teléfono, con límite de resultados"""
+        url = reverse('comedor:autocompletar_clientes')
+        resultados = self.client.get(url, {'q': 'ana'}).json()['resultados']
+        self.assertEqual(resultados, [{'id': self.ana.pk, 'texto': str(self.ana)}])
+        self.assertEqual(len(self.client.get(url, {'q': 'cliente'}).json()['resultados']), 20)
+        self.assertEqual(len(self.client.get(url, {'q': '+569123'}).json()['resultados']), 1)
+        self.assertEqual(self.client.get(url).json()['resultados'], [])
+
+    def test_mesas_filtradas_por_capacidad(self):
+        """Test: Las mesas sugeridas respetan el número de personas"""
+        resultados = self.client.get(reverse('comedor:autocompletar_mesas'), {'personas': 4}).json()['resultados']
+        self.assertEqual([r['id'] for r in resultados], [self.mesa_grande.pk])
+
+    def test_formulario_no_incluye_todas_las_opciones(self):
+        """Test: El select solo trae la opción elegida y el servidor valida el id"""
+        form = ReservaForm(initial={'cliente': self.ana})
+        html = str(form['cliente'])
+        self.assertIn('data-autocompletar', html)
+        self.assertIn('Ana Pérez', html)
+        self.assertNotIn('Cliente 001', html)
+
+        datos = {
+            'cliente': 999999, 'mesa': self.mesa_grande.pk, 'numero_personas': 2,
+            'fecha_reserva': (timezone.now() + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M'),
+        }
+        form = ReservaForm(data=datos)
+        self.assertFalse(form.is_valid())
+        self.assertIn('cliente', form.errors)
+        datos['cliente'] = self.ana.pk
+        self.assertTrue(ReservaForm(data=datos).is_valid())
+
+
+class PromocionesTest(TestCase):
+    """Tests para el motor de promociones"""
+
+    def setUp(self):
+        cache.clear()
+        self.bar = CategoriaItem.objects.create(nombre='Cocteles', lugar_item='bar')
+        self.cocina = CategoriaItem.objects.create(nombre='Fondos')
+        self.pisco = Item.objects.create(nombre='Pisco Sour', categoria=self.bar, precio=Decimal('5000'))
+        self.lomo = Item.objects.create(nombre='Lomo', categoria=self.cocina, precio=Decimal('12000'))
+        self.happy_hour = Promocion.objects.create(
+            nombre='Happy hour', tipo='porcentaje', valor=Decimal('50'), categoria=self.bar,
+            hora_inicio=time(18, 0), hora_fin=time(20, 0), dias=[3, 4],
+        )
+        self.pedido = Pedido.objects.create()
+        # Viernes 16/10/2026 a las 18:30
+        self._fijar_fecha(datetime(2026, 10, 16, 18, 30))
+
+    def _fijar_fecha(self, fecha):
+        """Hora a la que se agregan las líneas siguientes"""
+        self.momento = timezone.make_aware(fecha)
+
+    def _agregar(self, item, cantidad):
+        return DetallePedido.objects.create(pedido=self.pedido, item=item, cantidad=cantidad, precio_unitario=item.precio,
+                                            fecha_creacion=self.momento)
+
+    def test_happy_hour_por_categoria(self):
+        """Test: La promoción de categoría aplica dentro de la ventana y queda registrada por línea"""
+        detalle = self._agregar(self.pisco, 2)
+        self._agregar(self.lomo, 1)
+        detalle.refresh_from_db()
+        self.assertEqual(detalle.descuento, Decimal('5000.00'))
+        self.assertEqual(detalle.promocion, self.happy_hour)
+        self.assertEqual(detalle.subtotal, Decimal('5000.00'))
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.total, Decimal('17000.00'))
+
+    def test_fuera_de_ventana(self):
+        """Test: Fuera del horario o del día no hay descuento"""
+        self._fijar_fecha(datetime(2026, 10, 16, 21, 0))
+        self.assertEqual(self._agregar(self.pisco, 2).descuento, 0)
+        self._fijar_fecha(datetime(2026, 10, 18, 18, 30))  # Domingo
+        self.assertEqual(self._agregar(self.pisco, 1).descuento, 0)
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.total, Decimal('15000'))
+
+    def test_nxm_y_mejor_descuento(self):
+        """Test: Un 2x1 sobre el item gana al porcentaje de la categoría si descuenta más"""
+        dos_por_uno = Promocion.objects.create(nombre='2x1 Pisco', tipo='nxm', lleva=2, paga=1, item=self.pisco)
+        detalle = self._agregar(self.pisco, 3)
+        detalle.refresh_from_db()
+        # Happy hour: 50% de 15000 = 7500; 2x1 sobre 3 unidades: 5000 -> gana happy hour
+        self.assertEqual(detalle.promocion_id, self.happy_hour.pk)
+        self._fijar_fecha(datetime(2026, 10, 16, 12, 0))
+        detalle = self._agregar(self.pisco, 3)
+        detalle.refresh_from_db()
+        self.assertEqual((detalle.promocion_id, detalle.descuento), (dos_por_uno.pk, Decimal('5000.00')))
+
+    def test_tipo_pedido(self):
+        """Test: Una promoción de delivery no aplica a pedidos en comedor"""
+        Promocion.objects.create(nombre='Delivery', tipo='monto', valor=Decimal('1000'), item=self.lomo,
+                                 tipo_pedido='delivery')
+        self.assertEqual(self._agregar(self.lomo, 1).descuento, 0)
+        Pedido.objects.filter(pk=self.pedido.pk).update(tipo_pedido='delivery')
+        self.pedido.tipo_pedido = 'delivery'
+        detalle = self._agregar(self.lomo, 1)
+        detalle.refresh_from_db()
+        self.assertEqual(detalle.subtotal, Decimal('11000.00'))
+
+    def test_cada_linea_a_su_hora(self):
+        """Test: Cada línea se tasa a la hora en que se agregó, no a la de apertura del pedido"""
+        Pedido.objects.filter(pk=self.pedido.pk).update(fecha_pedido=timezone.make_aware(datetime(2026, 10, 16, 17, 0)))
+        en_happy_hour = self._agregar(self.pisco, 2)
+        self._fijar_fecha(datetime(2026, 10, 16, 20, 30))
+        despues = self._agregar(self.pisco, 2)
+        en_happy_hour.refresh_from_db()
+        despues.refresh_from_db()
+        self.assertEqual((en_happy_hour.descuento, despues.descuento), (Decimal('5000.00'), 0))
+
+    def test_descuento_fijo_una_vez_tasado(self):
+        """Test: Cambiar las reglas o agregar otra línea no retasa las líneas ya tasadas; editarla sí"""
+        detalle = self._agregar(self.pisco, 2)
+        self.happy_hour.valor = Decimal('10')
+        self.happy_hour.save()
+        self._agregar(self.lomo, 1)
+        detalle.refresh_from_db()
+        self.assertEqual(detalle.descuento, Decimal('5000.00'))
+
+        self.happy_hour.activa = False
+        self.happy_hour.save()
+        self.pedido.calcular_total()
+        self.assertEqual(self.pedido.total, Decimal('17000.00'))
+
+        self.happy_hour.activa = True
+        self.happy_hour.save()
+        detalle.cantidad = 4
+        detalle.save()
+        detalle.refresh_from_db()
+        self.assertEqual((detalle.descuento, detalle.subtotal), (Decimal('2000.00'), Decimal('18000.00')))
+
+    def test_compilacion_por_version(self):
+        """Test: Las reglas se compilan una vez por versión y se recompilan al cambiar"""
+        tabla = tabla_promociones()
+        with self.assertNumQueries(0):
+            self.assertIs(tabla_promociones(), tabla)
+        self.happy_hour.activa = False
+        self.happy_hour.save()
+        self.assertIsNot(tabla_promociones(), tabla)
+        self.assertFalse(tabla_promociones())
+
+    def test_una_pasada_por_pedido(self):
+        """Test: Tasar un pedido no depende del número de líneas en consultas"""
+        for _ in range(10):
+            DetallePedido(pedido=self.pedido, item=self.pisco, cantidad=1, precio_unitario=self.pisco.precio).save(recalcular=False)
+        tabla_promociones()
+        # SELECT detalles + bulk_update de líneas + UPDATE del pedido
+        with self.assertNumQueries(3):
+            self.pedido.calcular_total()
+        with self.assertNumQueries(2):  # Sin cambios en las líneas no hay bulk_update
+            self.pedido.calcular_total()
+
+
+class PagosTest(TestCase):
+    """Tests para pagos parciales y división de la cuenta"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cajero', password='cajero123')
+        categoria = CategoriaItem.objects.create(nombre='Platos')
+        self.plato = Item.objects.create(nombre='Plato', categoria=categoria, precio=Decimal('10000'))
+        self.postre = Item.objects.create(nombre='Postre', categoria=categoria, precio=Decimal('3000'))
+        self.pedido = Pedido.objects.create(estado='cuenta')
+        self.linea_1 = self._agregar(self.plato, 1)
+        self.linea_2 = self._agregar(self.plato, 1, asiento=2)
+        self.compartida = self._agregar(self.postre, 2, asiento=None)
+        DetallePedido.objects.filter(pk=self.linea_1.pk).update(asiento=1)
+        self.pedido.refresh_from_db()
+
+    def _agregar(self, item, cantidad, asiento=None):
+        return DetallePedido.objects.create(
+            pedido=self.pedido, item=item, cantidad=cantidad, precio_unitario=item.precio, asiento=asiento,
+        )
+
+    def test_dividir_equitativo_cuadra(self):
+        """Test: Las cuotas suman exactamente el total"""
+        cuotas = dividir_equitativo(Decimal('100.00'), 3)
+        self.assertEqual(cuotas, [Decimal('33.34'), Decimal('33.33'), Decimal('33.33')])
+        self.assertEqual(sum(cuotas), Decimal('100.00'))
+
+    def test_dividir_por_asiento(self):
+        """Test: Las líneas compartidas se reparten entre los asientos"""
+        self.assertEqual(self.pedido.total, Decimal('26000'))
+        self.assertEqual(dividir_por_asiento(self.pedido), {1: Decimal('13000'), 2: Decimal('13000')})
+
+    def test_pagos_parciales_hasta_cerrar(self):
+        """Test: El saldo baja con cada pago y el último pasa el pedido a pagado"""
+        with self.captureOnCommitCallbacks(execute=True):
+            pago = registrar_pago(self.pedido, asiento=1, propina=Decimal('1300'), usuario=self.user)
+            self.assertEqual(pago.monto, Decimal('13000'))
+            self.assertEqual(pago.pedido.saldo, Decimal('13000'))
+            self.assertEqual(pago.pedido.estado, 'cuenta')
+            self.assertEqual(dividir_por_asiento(self.pedido), {1: Decimal('0'), 2: Decimal('13000')})
+
+            pago = registrar_pago(self.pedido, monto=Decimal('13000'), metodo='debito')
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.estado, 'pagado')
+        self.assertIsNotNone(self.pedido.fecha_pago)
+        self.assertEqual((self.pedido.monto_pagado, self.pedido.propinas), (Decimal('26000'), Decimal('1300')))
+        self.assertEqual(EventoEstado.objects.transiciones_a('pedido', 'pagado').count(), 1)
+        with self.assertRaises(ValidationError):
+            registrar_pago(self.pedido, monto=Decimal('1'))
+
+    def test_asiento_descuenta_lo_ya_pagado(self):
+        """Test: Las cuotas por asiento no suman más que el saldo tras pagos por línea o libres"""
+        registrar_pago(self.pedido, detalles=[self.linea_1, self.compartida])
+        self.pedido.refresh_from_db()
+        por_asiento = dividir_por_asiento(self.pedido)
+        self.assertEqual(por_asiento, {1: Decimal('0'), 2: Decimal('10000')})
+        self.assertEqual(sum(por_asiento.values()), self.pedido.saldo)
+
+        registrar_pago(self.pedido, monto=Decimal('5000'))
+        self.assertEqual(dividir_por_asiento(self.pedido), {})
+        with self.assertRaisesMessage(ValidationError, 'no son por asiento'):
+            registrar_pago(self.pedido, asiento=2)
+
+    def test_pago_por_asiento_marca_lineas(self):
+        """Test: Saldar un asiento marca sus líneas pagadas; no se cobra más de lo pendiente del asiento"""
+        with self.assertRaisesMessage(ValidationError, 'pendiente del asiento 2'):
+            registrar_pago(self.pedido, asiento=2, monto=Decimal('14000'))
+        pago = registrar_pago(self.pedido, asiento=2)
+        self.assertEqual(list(pago.detalles.all()), [self.linea_2])
+        with self.assertRaises(ValidationError):
+            registrar_pago(self.pedido, detalles=[self.linea_2])
+        self.assertEqual(dividir_por_asiento(self.pedido), {1: Decimal('13000'), 2: Decimal('0')})
+
+    def test_pago_por_lineas(self):
+        """Test: Pagar líneas calcula el monto y no permite pagarlas dos veces"""
+        pago = registrar_pago(self.pedido, detalles=[self.linea_1, self.compartida])
+        self.assertEqual(pago.monto, Decimal('16000'))
+        self.assertEqual(set(pago.detalles.values_list('pk', flat=True)), {self.linea_1.pk, self.compartida.pk})
+        with self.assertRaises(ValidationError):
+            registrar_pago(self.pedido, detalles=[self.linea_1])
+
+    def test_devolucion_de_saldo_negativo(self):
+        """Test: Si el total baja de lo pagado, la vista muestra el vuelto y devolverlo cierra el pedido"""
+        registrar_pago(self.pedido, monto=Decimal('20000'))
+        self.pedido.eliminar_item(self.plato)  # Ya estaba cobrado: el total queda por debajo de lo pagado
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.saldo, Decimal('-4000'))
+        with self.assertRaises(ValidationError):
+            registrar_pago(self.pedido, monto=Decimal('1'))
+
+        client = TestClient()
+        client.login(username='cajero', password='cajero123')
+        url = reverse('comedor:cobrar_pedido', args=[self.pedido.pk])
+        self.assertContains(client.get(url), 'A devolver: $4000')
+        client.post(url, {'devolver': ''})
+        self.pedido.refresh_from_db()
+        self.assertEqual((self.pedido.estado, self.pedido.saldo), ('pagado', 0))
+        self.assertEqual(self.pedido.pagos.last().monto, Decimal('-4000'))
+        with self.assertRaises(ValidationError):
+            registrar_devolucion(self.pedido)
+
+    def test_no_excede_saldo(self):
+        """Test: Un pago mayor al saldo se rechaza sin registrar nada"""
+        with self.assertRaises(ValidationError):
+            registrar_pago(self.pedido, monto=Decimal('30000'))
+        self.assertFalse(Pago.objects.exists())
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.monto_pagado, 0)
+
+    def test_vista_cobrar(self):
+        """Test: La vista de cobro registra el pago y muestra la división"""
+        client = TestClient()
+        client.login(username='cajero', password='cajero123')
+        url = reverse('comedor:cobrar_pedido', args=[self.pedido.pk])
+        response = client.get(url, {'partes': 4})
+        self.assertContains(response, 'data-monto="6500.00"', count=4)
+        response = client.get(url, {'partes': 10 ** 9})  # Se acota: no arma mil millones de cuotas
+        self.assertEqual(response.context['partes'], MAXIMO_PARTES)
+        self.assertContains(response, 'class="btn btn-sm btn-outline-secondary mb-1 btn-monto"', count=MAXIMO_PARTES)
+        response = client.post(url, {'monto': '26000', 'propina': '0', 'metodo': 'efectivo'})
+        self.assertRedirects(response, reverse('comedor:ver_pedido', args=[self.pedido.pk]),
+                             fetch_redirect_response=False)
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.estado, 'pagado')
+
+
+class PlanificacionCocinaTest(TestCase):
+    """Tests para la asignación de líneas a estaciones y las horas estimadas"""
+
+    def setUp(self):
+        self.ahora = timezone.now().replace(microsecond=0)
+        cocina = CategoriaItem.objects.create(nombre='Fondos', lugar_item='cocina')
+        bar = CategoriaItem.objects.create(nombre='Tragos', lugar_item='bar')
+        self.plato = Item.objects.create(nombre='Plato', categoria=cocina, precio=Decimal('10000'), tiempo_preparacion=10)
+        self.trago = Item.objects.create(nombre='Trago', categoria=bar, precio=Decimal('5000'), tiempo_preparacion=4)
+        EstacionCocina.objects.create(nombre='cocina', capacidad=2)
+        self.pedido = Pedido.objects.create(estado='en_curso')
+
+    def _lineas(self, *items, pedido=None):
+        """Crea las líneas sin pasar por save() y las planifica a ``self.ahora``"""
+        lineas = DetallePedido.objects.bulk_create([
+            DetallePedido(pedido=pedido or self.pedido, item=item, cantidad=1,
+                          precio_unitario=item.precio, subtotal=item.precio)
+            for item in items
+        ])
+        planificar_lineas(lineas, ahora=self.ahora)
+        return lineas
+
+    def test_slots_en_paralelo(self):
+        """Test: Con capacidad 2 la tercera línea espera al primer slot libre"""
+        primera, segunda, tercera = self._lineas(self.plato, self.plato, self.plato)
+        self.assertEqual({primera.slot, segunda.slot}, {0, 1})
+        self.assertEqual(primera.inicio_estimado, self.ahora)
+        self.assertEqual(segunda.inicio_estimado, self.ahora)
+        self.assertEqual(tercera.inicio_estimado, self.ahora + timedelta(minutes=10))
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.listo_estimado, self.ahora + timedelta(minutes=20))
+
+    def test_estacion_segun_categoria(self):
+        """Test: Bar y cocina tienen colas independientes; la estación faltante se crea"""
+        plato, trago = self._lineas(self.plato, self.trago)
+        self.assertEqual(plato.estacion.nombre, 'cocina')
+        self.assertEqual(trago.estacion.nombre, 'bar')
+        self.assertEqual(trago.listo_estimado, self.ahora + timedelta(minutes=4))
+        self.assertEqual(EstacionCocina.objects.get(nombre='bar').capacidad, 1)
+
+    def test_incremental_entre_pedidos(self):
+        """Test: Un pedido nuevo se encola detrás de lo ya planificado sin recorrer otros pedidos"""
+        self._lineas(self.plato, self.plato)
+        otro = Pedido.objects.create(estado='pendiente')
+        with CaptureQueriesContext(connection) as consultas:
+            linea, = self._lineas(self.plato, pedido=otro)
+        self.assertEqual(linea.inicio_estimado, self.ahora + timedelta(minutes=10))
+        self.assertLessEqual(len(consultas), 8)
+
+    def test_completar_antes_adelanta_siguientes(self):
+        """Test: Terminar antes de lo estimado corre la cola del mismo slot y el pedido"""
+        primera, segunda, tercera = self._lineas(self.plato, self.plato, self.plato)
+        completar_linea(primera, ahora=self.ahora + timedelta(minutes=6))
+        tercera.refresh_from_db()
+        segunda.refresh_from_db()
+        self.assertEqual(tercera.inicio_estimado, self.ahora + timedelta(minutes=6))
+        self.assertEqual(tercera.listo_estimado, self.ahora + timedelta(minutes=16))
+        self.assertEqual(segunda.listo_estimado, self.ahora + timedelta(minutes=10))
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.listo_estimado, self.ahora + timedelta(minutes=16))
+        siguiente, = self._lineas(self.plato)
+        self.assertEqual(siguiente.inicio_estimado, self.ahora + timedelta(minutes=10))
+
+    def test_borrar_linea_libera_su_lugar(self):
+        """Test: Sin una línea en cola, las que venían detrás en su slot se adelantan y el slot se acorta"""
+        primera, segunda, tercera = self._lineas(self.plato, self.plato, self.plato)
+        delante = primera if primera.slot == tercera.slot else segunda
+        DetallePedido.objects.filter(pk=delante.pk).delete()
+        self.assertEqual(liberar_estaciones({tercera.estacion_id}, ahora=self.ahora), 1)
+        tercera.refresh_from_db()
+        self.assertEqual(tercera.inicio_estimado, self.ahora)
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.listo_estimado, self.ahora + timedelta(minutes=10))
+        siguiente, = self._lineas(self.plato)
+        self.assertEqual(siguiente.inicio_estimado, self.ahora + timedelta(minutes=10))
+
+        siguiente.delete()  # Por el modelo: la estación se replanifica sola
+        estacion = EstacionCocina.objects.get(pk=tercera.estacion_id)
+        self.assertLess(max(estacion.libres(self.ahora)), self.ahora + timedelta(minutes=11))
+
+    def test_cancelar_pedido_libera_la_estacion(self):
+        """Test: Las líneas de un pedido cancelado dejan de ocupar la cocina (en bloque o por el modelo)"""
+        self._lineas(self.plato, self.plato)
+        otro = Pedido.objects.create(estado='en_curso')
+        linea, = self._lineas(self.plato, pedido=otro)
+        self.assertEqual(linea.inicio_estimado, self.ahora + timedelta(minutes=10))
+        cambiar_estado_pedidos(Pedido.objects.filter(pk=self.pedido.pk), 'cancelado')
+        linea.refresh_from_db()
+        self.assertLess(linea.inicio_estimado - self.ahora, timedelta(minutes=1))
+
+        otro.estado = 'cancelado'
+        otro.save()
+        estacion = EstacionCocina.objects.get(pk=linea.estacion_id)
+        self.assertLess(max(estacion.libres(self.ahora)) - self.ahora, timedelta(minutes=1))
+
+    def test_pagar_pedido_libera_la_estacion(self):
+        """Test: Cerrar como pagado (en bloque, sin saldo) libera en cocina las líneas que seguían pendientes"""
+        self._lineas(self.plato, self.plato)
+        otro = Pedido.objects.create(estado='en_curso')
+        linea, = self._lineas(self.plato, pedido=otro)
+        Pedido.objects.filter(pk=self.pedido.pk).update(monto_pagado=self.plato.precio * 2)
+        self.assertEqual(cambiar_estado_pedidos(Pedido.objects.filter(pk=self.pedido.pk), 'pagado'), 1)
+        linea.refresh_from_db()
+        self.assertLess(linea.inicio_estimado - self.ahora, timedelta(minutes=1))
+
+    def test_pedido_cerrado_no_se_planifica(self):
+        """Test: Las líneas de pedidos cerrados no entran a la cola"""
+        cerrado = Pedido.objects.create(estado='pagado')
+        linea, = self._lineas(self.plato, pedido=cerrado)
+        self.assertIsNone(linea.estacion_id)
+        self.assertFalse(DetallePedido.objects.filter(estacion__isnull=False).exists())
+
+    def test_save_planifica_linea_nueva(self):
+        """Test: Crear una línea con save() la asigna a su estación"""
+        linea = DetallePedido.objects.create(pedido=self.pedido, item=self.trago, cantidad=2, precio_unitario=Decimal('5000'))
+        linea.refresh_from_db()
+        self.assertEqual(linea.estacion.nombre, 'bar')
+        self.assertIsNotNone(linea.listo_estimado)
+
+    def test_tablero_y_completar(self):
+        """Test: El tablero lista las líneas pendientes y el botón Listo las completa"""
+        User.objects.create_user(username='cocinero', password='cocinero123')
+        client = TestClient()
+        client.login(username='cocinero', password='cocinero123')
+        linea, = self._lineas(self.plato)
+        response = client.get(reverse('cocina:tablero_cocina'))
+        self.assertContains(response, 'Plato')
+        response = client.post(reverse('cocina:completar_linea_cocina', args=[linea.pk]))
+        self.assertRedirects(response, reverse('cocina:tablero_cocina'), fetch_redirect_response=False)
+        linea.refresh_from_db()
+        self.assertEqual(linea.estado_preparacion, 'listo')
+
+
+class PronosticoDemandaTest(TestCase):
+    """Tests para el pronóstico de cubiertos y demanda por item"""
+
+    def setUp(self):
+        self.ahora = timezone.make_aware(datetime(2026, 10, 19, 10, 0))  # lunes
+        self.item = Item.objects.create(nombre='Plato', precio=Decimal('10000'))
+        for semanas, cantidad in [(1, 3), (2, 1)]:
+            momento = timezone.make_aware(datetime(2026, 10, 19, 12, 0)) - timedelta(weeks=semanas)
+            Reserva.objects.create(fecha_reserva=momento, numero_personas=4, estado='terminada')
+            Reserva.objects.create(fecha_reserva=momento, numero_personas=9, estado='cancelada')
+            self._pedido(momento, 'pagado', cantidad, comensales=2 if semanas == 1 else None)
+        self._pedido(momento, 'cancelado', 10)
+
+    def _pedido(self, momento, estado, cantidad, comensales=None):
+        pedido = Pedido.objects.create(estado=estado, comensales=comensales)
+        DetallePedido.objects.create(pedido=pedido, item=self.item, cantidad=cantidad, precio_unitario=self.item.precio)
+        Pedido.objects.filter(pk=pedido.pk).update(fecha_pedido=momento)
+
+    def _valor(self, hora, item=None):
+        momento = timezone.make_aware(datetime(2026, 10, 19, hora, 0))
+        return Pronostico.objects.get(fecha_hora=momento, item=item).cantidad
+
+    def test_linea_base_por_dia_y_hora(self):
+        """Test: El pronóstico promedia la misma hora de cada semana, con más peso a la reciente"""
+        resumen = pronosticar_demanda(ahora=self.ahora, semanas=2, horizonte=1, semivida=1)
+        self.assertEqual(resumen['items'], 1)
+        # Cubiertos: (4 + 2 walk-in) la semana pasada y 4 la anterior, pesos 2:1
+        self.assertAlmostEqual(self._valor(12), (6 * 2 + 4) / 3, places=2)
+        self.assertAlmostEqual(self._valor(12, self.item), (3 * 2 + 1) / 3, places=2)
+        self.assertEqual(self._valor(11), 0)
+        self.assertEqual(Pronostico.objects.filter(item=self.item).count(), 1)  # Solo la hora con demanda
+
+    def test_reemplaza_pronosticos_futuros(self):
+        """Test: Volver a pronosticar reemplaza las filas futuras en vez de duplicarlas"""
+        pronosticar_demanda(ahora=self.ahora, semanas=2, horizonte=1)
+        total = Pronostico.objects.count()
+        pronosticar_demanda(ahora=self.ahora, semanas=2, horizonte=1)
+        self.assertEqual(Pronostico.objects.count(), total)
+        self.assertEqual(Pronostico.objects.filter(item__isnull=True).count(), 24)
+
+    def test_sin_historial(self):
+        """Test: Sin datos el pronóstico es cero y no falla"""
+        DetallePedido.objects.all().delete()
+        Pedido.objects.all().delete()
+        Reserva.objects.all().delete()
+        resumen = pronosticar_demanda(ahora=self.ahora, semanas=1, horizonte=1)
+        self.assertEqual(resumen['items'], 0)
+        self.assertEqual(resumen['filas'], 24)
+
+    def test_dashboard_lee_pronostico(self):
+        """Test: El panel muestra los cubiertos y los items esperados de las próximas horas"""
+        pronosticar_demanda(ahora=self.ahora, semanas=2, horizonte=1)
+        kpis = calcular_kpis(ahora=self.ahora + timedelta(hours=1, minutes=30))
+        self.assertEqual([fila['cantidad'] for fila in kpis['pronostico']['cubiertos']], [0, 5, 0])
+        self.assertEqual(kpis['pronostico']['items'], [{'nombre': 'Plato', 'cantidad': 2}])
+
+    def test_comando(self):
+        """Test: El comando informa las filas guardadas"""
+        salida = StringIO()
+        call_command('pronosticar_demanda', '--semanas', '2', '--horizonte', '1', stdout=salida)
+        self.assertIn('pronósticos guardados', salida.getvalue())
+
+
+class CombinacionMesasTest(TestCase):
+    """Tests para juntar mesas adyacentes en reservas de grupo"""
+
+    def setUp(self):
+        self.fecha = timezone.now() + timedelta(days=1)
+        capacidades = {1: 4, 2: 4, 3: 2, 4: 6, 5: 3}
+        self.mesas = {
+            numero: Mesa.objects.create(numero=numero, capacidad=capacidad, ubicacion='terraza')
+            for numero, capacidad in capacidades.items()
+        }
+        for a, b in [(1, 2), (2, 3), (3, 4), (4, 5)]:
+            self.mesas[a].adyacentes.add(self.mesas[b])
+        Mesa.objects.create(numero=10, capacidad=4, ubicacion='vip')
+        Mesa.objects.create(numero=11, capacidad=4, ubicacion='vip')
+
+    def _numeros(self, grupo):
+        return sorted(grupo.reservas.values_list('mesa__numero', flat=True))
+
+    def test_minimiza_asientos_sobrantes(self):
+        """Test: Para 10 personas se juntan 1+2+3 (sin sobrantes) y no 2+3+4"""
+        grupo = reservar_grupo(self.fecha, 10)
+        self.assertEqual(self._numeros(grupo), [1, 2, 3])
+        self.assertEqual(sum(grupo.reservas.values_list('numero_personas', flat=True)), 10)
+        self.assertEqual(set(Mesa.objects.filter(numero__in=[1, 2, 3]).values_list('estado', flat=True)), {'reservada'})
+
+    def test_una_mesa_si_alcanza(self):
+        """Test: Si una mesa alcanza justo, no se juntan mesas"""
+        self.assertEqual(self._numeros(reservar_grupo(self.fecha, 6)), [4])
+
+    def test_no_junta_mesas_no_adyacentes(self):
+        """Test: Las mesas de otra ubicación o no adyacentes no se combinan"""
+        with self.assertRaises(ValidationError):
+            reservar_grupo(self.fecha, 8, ubicacion='vip')
+        self.assertFalse(GrupoReserva.objects.exists())
+
+    def test_respeta_reservas_existentes(self):
+        """Test: Una mesa reservada en el horario queda fuera y se busca otra combinación"""
+        Reserva.objects.create(mesa=self.mesas[3], fecha_reserva=self.fecha + timedelta(hours=1), numero_personas=2)
+        self.assertEqual(self._numeros(reservar_grupo(self.fecha, 9)), [4, 5])
+        with self.assertRaises(ValidationError):
+            reservar_grupo(self.fecha, 10)  # Sin la 3, la 1 y la 2 quedan aisladas del resto
+
+    def test_bloquea_antes_de_buscar_conflictos(self):
+        """Test: Las mesas se bloquean sin filtrar por reservas y los conflictos se buscan después"""
+        with CaptureQueriesContext(connection) as consultas:
+            reservar_grupo(self.fecha, 6, ubicacion='terraza')
+        selects = [q['sql'] for q in consultas if q['sql'].startswith('SELECT') and 'FROM "comedor_mesa"' in q['sql']]
+        self.assertNotIn('EXISTS', selects[0])
+        self.assertIn('ORDER BY', selects[0])
+        self.assertIn('EXISTS', selects[1])
+
+    def test_igual_que_busqueda_exhaustiva(self):
+        """Test: La búsqueda con poda encuentra el mismo costo que probar todos los conjuntos conexos"""
+        azar = random.Random(7)
+        for _ in range(30):
+            mesas = [Mesa(pk=i, numero=i, capacidad=azar.choice([2, 4, 6, 8])) for i in range(1, 10)]
+            adyacencia = {mesa.pk: set() for mesa in mesas}
+            for a, b in combinations(range(1, 10), 2):
+                if azar.random() < 0.3:
+                    adyacencia[a].add(b)
+                    adyacencia[b].add(a)
+            personas = azar.randint(5, 24)
+
+            def conexo(conjunto):
+                vistos, pendientes = {conjunto[0]}, [conjunto[0]]
+                while pendientes:
+                    for vecina in adyacencia[pendientes.pop()] & set(conjunto) - vistos:
+                        vistos.add(vecina)
+                        pendientes.append(vecina)
+                return len(vistos) == len(conjunto)
+
+            capacidad = {mesa.pk: mesa.capacidad for mesa in mesas}
+            costos = [
+                (sum(capacidad[i] for i in conjunto) - personas, n)
+                for n in range(1, 7) for conjunto in combinations(capacidad, n)
+                if sum(capacidad[i] for i in conjunto) >= personas and conexo(conjunto)
+                and sum(capacidad[i] for i in conjunto) - min(capacidad[i] for i in conjunto) < personas
+            ]
+            elegida = mejor_combinacion(mesas, adyacencia, personas)
+            if not costos:
+                self.assertIsNone(elegida)
+                continue
+            total = sum(mesa.capacidad for mesa in elegida)
+            self.assertEqual((total - personas, len(elegida)), min(costos))
+            self.assertTrue(conexo([mesa.pk for mesa in elegida]))
+
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_vista_reserva_grupo(self):
+        """Test: La vista crea el grupo o muestra el error si no hay mesas"""
+        User.objects.create_user(username='anfitrion', password='anfitrion123')
+        client = TestClient()
+        client.login(username='anfitrion', password='anfitrion123')
+        url = reverse('comedor:crear_reserva_grupo')
+        datos = {'fecha_reserva': timezone.localtime(self.fecha).strftime('%Y-%m-%dT%H:%M'), 'numero_personas': 10}
+        response = client.post(url, datos)
+        self.assertRedirects(response, reverse('comedor:listar_reservas'), fetch_redirect_response=False)
+        self.assertEqual(GrupoReserva.objects.get().reservas.count(), 3)
+        response = client.post(url, dict(datos, numero_personas=30))
+        self.assertContains(response, 'No hay mesas libres')
+
+
+@override_settings(ROTACION_MINUTOS_INICIAL=60, ROTACION_ALFA=0.5)
+class ListaEsperaTest(TestCase):
+    """Tests para la lista de espera y la rotación de mesas"""
+
+    def setUp(self):
+        self.ahora = timezone.now()
+        self.chica = Mesa.objects.create(numero=1, capacidad=2, ubicacion='terraza')
+        self.grande = Mesa.objects.create(numero=2, capacidad=6, ubicacion='terraza')
+
+    def _ocupar(self, mesa, desde):
+        mesa.estado = 'ocupada'
+        mesa.save()
+        Mesa.objects.filter(pk=mesa.pk).update(ocupada_desde=desde, liberacion_estimada=desde + timedelta(minutes=60))
+        mesa.refresh_from_db()
+
+    def test_ocupar_fija_liberacion_estimada(self):
+        """Test: Al ocupar una mesa se estima su liberación con la rotación de su capacidad"""
+        RotacionMesa.objects.create(capacidad=2, minutos=40, muestras=3)
+        self.chica.estado = 'ocupada'
+        self.chica.save(update_fields=['estado'])
+        self.chica.refresh_from_db()
+        self.assertIsNotNone(self.chica.ocupada_desde)
+        self.assertEqual(self.chica.liberacion_estimada - self.chica.ocupada_desde, timedelta(minutes=40))
+
+    def test_liberar_actualiza_media_movil(self):
+        """Test: La duración real entra en la media móvil exponencial sin leer el historial"""
+        self._ocupar(self.chica, self.ahora - timedelta(minutes=100))
+        self.chica.estado = 'disponible'
+        self.chica.save()
+        rotacion = RotacionMesa.objects.get(capacidad=2)
+        self.assertAlmostEqual(rotacion.minutos, 80, delta=1)  # 60 + 0.5 * (100 - 60)
+        self.assertEqual(rotacion.muestras, 1)
+        self.assertIsNone(Mesa.objects.get(pk=self.chica.pk).liberacion_estimada)
+
+        registrar_duracion(2, 40)
+        registrar_duracion(2, 1)  # Demasiado corta: se ignora
+        rotacion.refresh_from_db()
+        self.assertAlmostEqual(rotacion.minutos, 60, delta=1)
+        self.assertEqual(rotacion.muestras, 2)
+
+    def test_espera_por_orden_de_llegada_y_capacidad(self):
+        """Test: Cada grupo toma la mesa adecuada que se libera antes; los grandes esperan la grande"""
+        self._ocupar(self.chica, self.ahora - timedelta(minutes=50))   # libre en ~10 min
+        self._ocupar(self.grande, self.ahora - timedelta(minutes=30))  # libre en ~30 min
+        EsperaMesa.objects.create(nombre='Ana', numero_personas=2, fecha_llegada=self.ahora - timedelta(minutes=5))
+        EsperaMesa.objects.create(nombre='Beto', numero_personas=2, fecha_llegada=self.ahora - timedelta(minutes=4))
+        EsperaMesa.objects.create(nombre='Carla', numero_personas=5, fecha_llegada=self.ahora - timedelta(minutes=3))
+        EsperaMesa.objects.create(nombre='Dani', numero_personas=12, fecha_llegada=self.ahora)
+
+        with self.assertNumQueries(4):
+            estimar_esperas(self.ahora)
+        esperas = {e.nombre: e.hora_estimada for e in EsperaMesa.objects.all()}
+        self.assertEqual(esperas['Ana'], self.ahora + timedelta(minutes=10))
+        # La chica vuelve a estar ocupada hasta +70: Beto toma la grande, que se libera antes
+        self.assertEqual(esperas['Beto'], self.ahora + timedelta(minutes=30))
+        self.assertEqual(esperas['Carla'], self.ahora + timedelta(minutes=90))
+        self.assertIsNone(esperas['Dani'])
+
+    def test_liberar_mesa_adelanta_esperas(self):
+        """Test: Al liberarse una mesa se encola (una vez) el recálculo de las esperas y la tarea las adelanta"""
+        espera = EsperaMesa.objects.create(nombre='Ana', numero_personas=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._ocupar(self.chica, self.ahora - timedelta(minutes=10))
+            self.grande.estado = 'mantenimiento'
+            self.grande.save()
+        encolar_estimacion(self.chica.sucursal_id)  # Ya hay una pendiente para la sucursal: no se duplica
+        self.assertEqual(Tarea.objects.filter(nombre=estimar_esperas_sucursal.nombre_tarea).count(), 1)
+        procesar_lote(['default'], 'worker-test')
+        espera.refresh_from_db()
+        self.assertGreater(espera.minutos_restantes, 30)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chica.estado = 'disponible'
+            self.chica.save()
+        procesar_lote(['default'], 'worker-test')
+        espera.refresh_from_db()
+        self.assertEqual(espera.minutos_restantes, 0)
+
+    def test_liberar_mesa_responde_antes_de_estimar(self):
+        """Test: La vista que libera una mesa responde sin recalcular la lista de espera; lo hace el worker"""
+        User.objects.create_user(username='anfitrion', password='anfitrion123')
+        client = TestClient()
+        client.login(username='anfitrion', password='anfitrion123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self._ocupar(self.chica, self.ahora - timedelta(minutes=10))
+            self._ocupar(self.grande, self.ahora - timedelta(minutes=10))
+        espera = EsperaMesa.objects.create(nombre='Ana', numero_personas=2)
+        procesar_lote(['default'], 'worker-test')
+        espera.refresh_from_db()
+        antes = espera.hora_estimada
+        self.assertGreater(espera.minutos_restantes, 30)
+
+        with mock.patch('comedor.rotacion.estimar_esperas') as estimar, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse('comedor:liberar_mesa', args=[self.chica.pk]))
+        self.assertRedirects(response, reverse('comedor:listar_mesas'), fetch_redirect_response=False)
+        estimar.assert_not_called()
+        espera.refresh_from_db()
+        self.assertEqual(espera.hora_estimada, antes)
+        tarea_db = Tarea.objects.get(nombre=estimar_esperas_sucursal.nombre_tarea, estado='pendiente')
+        self.assertEqual(tarea_db.argumentos['args'], [self.chica.sucursal_id])
+
+        self.assertEqual(procesar_lote(['default'], 'worker-test'), 1)
+        espera.refresh_from_db()
+        self.assertEqual(espera.minutos_restantes, 0)
+
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_vistas_lista_espera(self):
+        """Test: Agregar, sentar y cancelar grupos desde la pantalla de recepción"""
+        User.objects.create_user(username='anfitrion', password='anfitrion123')
+        client = TestClient()
+        client.login(username='anfitrion', password='anfitrion123')
+        url = reverse('comedor:lista_espera')
+
+        response = client.post(url, {'nombre': 'Ana', 'numero_personas': 4})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        espera = EsperaMesa.objects.get(nombre='Ana')
+        self.assertIsNotNone(espera.hora_estimada)
+        response = client.get(url)
+        self.assertContains(response, 'Mesa 2 (6)')
+        self.assertNotContains(response, 'Mesa 1 (2)')
+
+        client.post(reverse('comedor:sentar_espera', args=[espera.pk]), {'mesa': self.chica.pk})
+        self.assertEqual(EsperaMesa.objects.get(pk=espera.pk).estado, 'esperando')  # No entra en una mesa de 2
+        client.post(reverse('comedor:sentar_espera', args=[espera.pk]), {'mesa': self.grande.pk})
+        espera.refresh_from_db()
+        self.assertEqual((espera.estado, espera.mesa_id), ('sentada', self.grande.pk))
+        self.assertEqual(Mesa.objects.get(pk=self.grande.pk).estado, 'ocupada')
+
+        otra = EsperaMesa.objects.create(nombre='Beto', numero_personas=2)
+        client.post(reverse('comedor:cancelar_espera', args=[otra.pk]))
+        self.assertEqual(EsperaMesa.objects.get(pk=otra.pk).estado, 'cancelada')
+
+
+class PlanoSalonTest(TestCase):
+    """Tests para la foto del salón (mesas con reserva y pedido activos)"""
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nombre='Ana', telefono='123')
+        for numero in range(1, 7):
+            mesa = Mesa.objects.create(numero=numero, capacidad=4, ubicacion='terraza')
+            reserva = Reserva.objects.create(
+                cliente=self.cliente, mesa=mesa, numero_personas=2,
+                fecha_reserva=timezone.now() + timedelta(hours=numero),
+            )
+            if numero % 2:
+                mesa.estado = 'ocupada'
+                mesa.save()
+                reserva.estado = 'en_curso'
+                reserva.save()
+                Pedido.objects.create(mesa=mesa, cliente=self.cliente, estado='en_curso', total=Decimal('1000') * numero)
+        Pedido.objects.create(mesa=Mesa.objects.get(numero=1), estado='pagado', total=5)
+
+    def test_consultas_fijas(self):
+        """Test: La foto usa 3 consultas sin importar la cantidad de mesas"""
+        with self.assertNumQueries(3):
+            mesas = plano_salon()
+        self.assertEqual(len(mesas), 6)
+        primera = mesas[0]
+        self.assertEqual(primera.reserva_actual.estado, 'en_curso')
+        self.assertEqual(primera.reserva_actual.cliente.nombre, 'Ana')
+        self.assertEqual(primera.pedido_actual.total, Decimal('1000'))  # El pedido pagado no cuenta
+        self.assertEqual(primera.minutos_sentados, 0)
+        self.assertIsNone(mesas[1].pedido_actual)
+        self.assertIsNone(mesas[1].minutos_sentados)
+
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_vista_y_json(self):
+        """Test: La vista y el endpoint JSON muestran reserva, cliente, pedido y total por mesa"""
+        User.objects.create_user(username='mozo', password='mozo123')
+        client = TestClient()
+        client.login(username='mozo', password='mozo123')
+        datos = client.get(reverse('comedor:plano_salon_json')).json()['mesas']
+        self.assertEqual([m['numero'] for m in datos], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(datos[2]['pedido']['total'], '3000.00')
+        self.assertEqual(datos[2]['reserva']['cliente']['nombre'], 'Ana')
+        self.assertIsNone(datos[1]['pedido'])
+        self.assertEqual(datos[1]['reserva']['estado'], 'pendiente')
+        self.assertContains(client.get(reverse('comedor:plano_salon')), 'Pedido #')
+
+
+class ApiTest(TestCase):
+    """Tests para la API JSON de las tablets (/api/v1/)"""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username='tablet', password='tablet123')
+        self.client = TestClient()
+        self.client.login(username='tablet', password='tablet123')
+        categoria = CategoriaItem.objects.create(nombre='Platos')
+        self.plato = Item.objects.create(nombre='Plato', categoria=categoria, precio=Decimal('5000'))
+        self.mesas = [Mesa.objects.create(numero=i, capacidad=4, ubicacion='terraza') for i in range(1, 4)]
+        self.abierto = Pedido.objects.create(mesa=self.mesas[0], estado='en_curso')
+        self.cerrado = Pedido.objects.create(mesa=self.mesas[1], estado='pagado')
+        self.reserva = Reserva.objects.create(
+            mesa=self.mesas[2], numero_personas=2, fecha_reserva=timezone.now() + timedelta(hours=3),
+        )
+
+    def _lote(self, operaciones):
+        return self.client.post(
+            reverse('api:lote'), json.dumps({'operaciones': operaciones}), content_type='application/json',
+        )
+
+    def test_requiere_sesion(self):
+        """Test: Sin sesión se responde 401 en JSON, sin redirigir"""
+        response = TestClient().get(reverse('api:trabajo'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_campos_e_ids(self):
+        """Test: fields limita las columnas e ids lee varias filas de una vez"""
+        url = reverse('api:leer_recurso', args=['mesas'])
+        datos = self.client.get(url, {'fields': 'numero,estado'}).json()['data']
+        self.assertEqual(datos[0], {'id': self.mesas[0].pk, 'numero': 1, 'estado': 'disponible'})
+        ids = f'{self.mesas[0].pk},{self.mesas[2].pk}'
+        datos = self.client.get(url, {'fields': 'numero', 'ids': ids}).json()['data']
+        self.assertEqual([fila['numero'] for fila in datos], [1, 3])
+        self.assertEqual(self.client.get(url, {'fields': 'clave'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api:leer_recurso', args=['usuarios'])).status_code, 404)
+
+    def test_trabajo_comprimido(self):
+        """Test: El trabajo trae solo lo activo, el menú, y viaja comprimido"""
+        response = self.client.get(reverse('api:trabajo'), {'fields[mesas]': 'numero'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        datos = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(datos['mesas']), 3)
+        self.assertEqual(set(datos['mesas'][0]), {'id', 'numero'})
+        self.assertEqual([p['id'] for p in datos['pedidos']], [self.abierto.pk])
+        self.assertEqual([r['id'] for r in datos['reservas']], [self.reserva.pk])
+        self.assertEqual(datos['items'][0]['nombre'], 'Plato')
+
+    def test_lote_con_referencias(self):
+        """Test: Un lote abre un pedido, le carga líneas ($0) y el total se calcula una vez"""
+        response = self._lote([
+            {'recurso': 'pedidos', 'accion': 'crear', 'datos': {'mesa': self.mesas[2].pk, 'estado': 'pendiente'}},
+            {'recurso': 'detalles', 'accion': 'crear', 'datos': {'pedido': '$0', 'item': self.plato.pk, 'cantidad': 2}},
+            {'recurso': 'detalles', 'accion': 'crear', 'datos': {'pedido': '$0', 'item': self.plato.pk, 'cantidad': 1}},
+            {'recurso': 'mesas', 'accion': 'actualizar', 'id': self.mesas[2].pk, 'datos': {'estado': 'ocupada'}},
+            {'recurso': 'reservas', 'accion': 'estado', 'ids': [self.reserva.pk], 'estado': 'cancelada'},
+        ])
+        self.assertEqual(response.status_code, 200, response.content)
+        resultados = response.json()['resultados']
+        pedido = Pedido.objects.get(pk=resultados[0]['id'])
+        self.assertEqual(pedido.total, Decimal('15000'))
+        self.assertEqual(pedido.detalles.count(), 2)
+        self.assertEqual(Mesa.objects.get(pk=self.mesas[2].pk).estado, 'ocupada')
+        self.assertEqual(Mesa.objects.get(pk=self.mesas[2].pk).capacidad, 4)  # Actualización parcial
+        self.assertEqual(resultados[4]['actualizados'], 1)
+
+    def test_lote_atomico(self):
+        """Test: Si una operación falla no se aplica ninguna y se indica cuál fue"""
+        response = self._lote([
+            {'recurso': 'detalles', 'accion': 'crear', 'datos': {'pedido': self.abierto.pk, 'item': self.plato.pk}},
+            {'recurso': 'detalles', 'accion': 'crear', 'datos': {'pedido': self.abierto.pk, 'item': 9999}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['indice'], 1)
+        self.assertIn('item', response.json()['errores'])
+        self.assertFalse(DetallePedido.objects.exists())
+        response = self._lote([{'recurso': 'mesas', 'accion': 'eliminar', 'id': self.mesas[0].pk}])
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Mesa.objects.filter(pk=self.mesas[0].pk).exists())
+
+
+class SincronizacionTest(TestCase):
+    """Tests para la sincronización de tablets sin conexión (/api/v1/sync/)"""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username='tablet', password='tablet123')
+        self.client = TestClient()
+        self.client.login(username='tablet', password='tablet123')
+        categoria = CategoriaItem.objects.create(nombre='Platos')
+        self.plato = Item.objects.create(nombre='Plato', categoria=categoria, precio=Decimal('5000'))
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4, ubicacion='interior')
+
+    def _sync(self, operaciones, cursor=None, dispositivo='tablet-1'):
+        cuerpo = {'dispositivo': dispositivo, 'cursor': cursor, 'operaciones': operaciones}
+        return self.client.post(reverse('api:sincronizar'), json.dumps(cuerpo), content_type='application/json')
+
+    def test_operaciones_con_referencias_e_idempotencia(self):
+        """Test: Un pedido abierto sin conexión se carga con @id_cliente y reenviarlo no lo duplica"""
+        operaciones = [
+            {'id_cliente': 'a1', 'fecha': timezone.now().isoformat(), 'recurso': 'pedidos', 'accion': 'crear',
+             'datos': {'mesa': self.mesa.pk, 'estado': 'pendiente'}},
+            {'id_cliente': 'a2', 'recurso': 'detalles', 'accion': 'crear',
+             'datos': {'pedido': '@a1', 'item': self.plato.pk, 'cantidad': 2}},
+        ]
+        response = self._sync(operaciones)
+        self.assertEqual(response.status_code, 200, response.content)
+        resultados = response.json()['resultados']
+        self.assertEqual([r['estado'] for r in resultados], ['aplicada', 'aplicada'])
+        pedido = Pedido.objects.get(pk=resultados[0]['objeto_id'])
+        self.assertEqual(pedido.total, Decimal('10000'))
+
+        # Se perdió la respuesta: la tablet reenvía todo y agrega otra línea al mismo pedido
+        operaciones.append({'id_cliente': 'a3', 'recurso': 'detalles', 'accion': 'crear',
+                            'datos': {'pedido': '@a1', 'item': self.plato.pk, 'cantidad': 1}})
+        resultados = self._sync(operaciones).json()['resultados']
+        self.assertTrue(resultados[0]['repetida'])
+        self.assertEqual(resultados[2]['estado'], 'aplicada')
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertEqual(Pedido.objects.get(pk=pedido.pk).total, Decimal('15000'))
+        # Las referencias son por dispositivo
+        self.assertEqual(self._sync(operaciones[1:], dispositivo='tablet-2').json()['resultados'][0]['estado'], 'rechazada')
+
+    def test_conflictos(self):
+        """Test: Gana el cambio más reciente y no se agregan líneas a pedidos cerrados"""
+        version = Mesa.objects.get(pk=self.mesa.pk).fecha_actualizacion
+        antes = (timezone.now() - timedelta(minutes=5)).isoformat()
+        self.mesa.estado = 'mantenimiento'
+        self.mesa.save()
+        cerrado = Pedido.objects.create(mesa=self.mesa, estado='pagado')
+        resultados = self._sync([
+            {'id_cliente': 'b1', 'fecha': antes, 'recurso': 'mesas', 'accion': 'actualizar', 'id': self.mesa.pk,
+             'version': version.isoformat(), 'datos': {'estado': 'ocupada'}},
+            {'id_cliente': 'b2', 'recurso': 'detalles', 'accion': 'crear',
+             'datos': {'pedido': cerrado.pk, 'item': self.plato.pk}},
+            {'id_cliente': 'b3', 'recurso': 'detalles', 'accion': 'crear', 'datos': {'pedido': cerrado.pk, 'item': 9999}},
+        ]).json()['resultados']
+        self.assertEqual(resultados[0]['estado'], 'conflicto')
+        self.assertEqual(resultados[0]['servidor']['estado'], 'mantenimiento')
+        self.assertEqual(resultados[1]['estado'], 'conflicto')
+        self.assertEqual(Mesa.objects.get(pk=self.mesa.pk).estado, 'mantenimiento')
+        self.assertFalse(DetallePedido.objects.exists())
+        self.assertTrue(OperacionCliente.objects.filter(id_cliente='b1', estado='conflicto').exists())
+
+    def test_cambios_desde_cursor(self):
+        """Test: Sin cursor viaja el trabajo completo; con cursor solo lo que cambió"""
+        otra = Mesa.objects.create(numero=2, capacidad=2, ubicacion='terraza')
+        datos = self._sync([]).json()
+        self.assertEqual(len(datos['cambios']['mesas']), 2)
+        pasado = (timezone.now() - timedelta(minutes=10)).isoformat()
+        Mesa.objects.filter(pk__in=[self.mesa.pk, otra.pk]).update(fecha_actualizacion=pasado)
+        self.mesa.refresh_from_db()
+        self.mesa.estado = 'ocupada'
+        self.mesa.save()
+        pedido = Pedido.objects.create(mesa=self.mesa, estado='en_curso')
+        DetallePedido.objects.create(pedido=pedido, item=self.plato, cantidad=1, precio_unitario=Decimal('5000'))
+        cambios = self._sync([], cursor=datos['cursor']).json()['cambios']
+        self.assertEqual([m['id'] for m in cambios['mesas']], [self.mesa.pk])
+        self.assertEqual([p['id'] for p in cambios['pedidos']], [pedido.pk])
+        self.assertEqual(len(cambios['detalles']), 1)
+        self.assertEqual(self._sync([], cursor='ayer').status_code, 400)
+
+
+@override_settings(TICKETS_IMPRESORAS={'default': {'BACKEND': 'comedor.tickets.MemoriaBackend'}}, TICKETS_ANCHO=32)
+class TicketsTest(TestCase):
+    """Tests para las comandas por estación y las cuentas impresas en tandas"""
+
+    def setUp(self):
+        tickets.bandeja.clear()
+        cocina = CategoriaItem.objects.create(nombre='Fondos', lugar_item='cocina')
+        bar = CategoriaItem.objects.create(nombre='Tragos', lugar_item='bar')
+        self.plato = Item.objects.create(nombre='Lomo a lo pobre', categoria=cocina, precio=Decimal('12000'))
+        self.trago = Item.objects.create(nombre='Pisco sour', categoria=bar, precio=Decimal('4500'))
+        self.mesa = Mesa.objects.create(numero=7, capacidad=4, ubicacion='interior')
+
+    def _pedido(self, *items):
+        pedido = Pedido.objects.create(mesa=self.mesa, estado='pendiente')
+        for item in items:
+            DetallePedido.objects.create(pedido=pedido, item=item, cantidad=2, precio_unitario=item.precio)
+        return pedido
+
+    def _cambiar_estado(self, pedido, estado):
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido.estado = estado
+            pedido.save()
+
+    def test_comanda_por_estacion_sin_repetir(self):
+        """Test: Una comanda por estación; las líneas ya enviadas no se reimprimen"""
+        pedido = self._pedido(self.plato, self.trago)
+        self.assertFalse(Ticket.objects.exists())
+        self._cambiar_estado(pedido, 'en_curso')
+        comandas = {t.impresora: t for t in Ticket.objects.filter(tipo='comanda')}
+        self.assertEqual(set(comandas), {'cocina', 'bar'})
+        self.assertIn('Lomo a lo pobre', comandas['cocina'].como_texto())
+        self.assertNotIn('Pisco sour', comandas['cocina'].como_texto())
+        self.assertIn('Mesa 7', comandas['bar'].como_texto())
+        self.assertFalse(DetallePedido.objects.filter(comanda_enviada=False).exists())
+
+        # Una línea agregada después sale sola en una comanda nueva
+        with self.captureOnCommitCallbacks(execute=True):
+            DetallePedido.objects.create(pedido=pedido, item=self.plato, cantidad=1, precio_unitario=self.plato.precio)
+        nueva = Ticket.objects.filter(impresora='cocina').latest('pk')
+        self.assertIn('  1x Lomo a lo pobre', nueva.como_texto())
+        self.assertNotIn('  2x', nueva.como_texto())
+        self._cambiar_estado(pedido, 'en_curso')
+        self.assertEqual(Ticket.objects.count(), 3)
+
+    def test_tanda_por_impresora(self):
+        """Test: Los tickets pendientes de varios pedidos se envían en una tanda por impresora"""
+        primero, segundo = self._pedido(self.plato, self.trago), self._pedido(self.plato)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for pedido in (primero, segundo):
+                pedido.estado = 'en_curso'
+                pedido.save()
+        # Los dos pedidos de la transacción se arman juntos, con una sola función registrada
+        self.assertEqual(len([c for c in callbacks if getattr(c, 'funcion', None) is tickets.generar_tickets]), 1)
+        self.assertEqual(tickets.imprimir_pendientes(), {'bar': 1, 'cocina': 2})
+        self.assertEqual(sorted((impresora, len(tanda)) for impresora, tanda in tickets.bandeja), [('bar', 1), ('cocina', 2)])
+        self.assertFalse(Ticket.objects.filter(estado='pendiente').exists())
+        self.assertEqual(tickets.imprimir_pendientes(), {})
+
+    def test_cuenta(self):
+        """Test: La cuenta lista las líneas con sus importes y el total del pedido"""
+        pedido = self._pedido(self.plato, self.trago)
+        self._cambiar_estado(pedido, 'cuenta')
+        cuenta = Ticket.objects.get(tipo='cuenta')
+        texto = cuenta.como_texto()
+        self.assertEqual(cuenta.impresora, tickets.IMPRESORA_CUENTAS)
+        self.assertIn('$24.000', texto)
+        self.assertIn('$9.000', texto)
+        self.assertIn('TOTAL', texto)
+        self.assertIn('$33.000', texto)
+        self.assertTrue(all(len(linea) <= 32 for linea in texto.splitlines()))
+
+    def test_formatos_y_archivo(self):
+        """Test: ESC/POS inicia y corta el papel; el backend de archivo agrega los tickets"""
+        import tempfile
+        lineas = [['grande', 'COCINA'], ['normal', 'Ñandú']]
+        datos = tickets.a_escpos(lineas)
+        self.assertTrue(datos.startswith(tickets.ESC_INICIAR))
+        self.assertTrue(datos.endswith(tickets.ESC_CORTE))
+        with tempfile.TemporaryDirectory() as directorio:
+            tickets.ArchivoBackend('cocina', directorio).enviar([lineas, lineas])
+            with open(f'{directorio}/cocina.txt', encoding='utf-8') as archivo:
+                self.assertEqual(archivo.read().count('Ñandú'), 2)
+
+    @override_settings(TICKETS_IMPRESORAS={
+        'default': {'BACKEND': 'comedor.tickets.MemoriaBackend'},
+        'cocina': {'BACKEND': 'comedor.tickets.SocketBackend', 'OPTIONS': {'host': '127.0.0.1', 'puerto': 9, 'timeout': 0.5}},
+    })
+    def test_impresora_caida(self):
+        """Test: Si una impresora falla sus tickets quedan pendientes y las demás imprimen igual"""
+        self._cambiar_estado(self._pedido(self.plato, self.trago), 'en_curso')
+        with self.assertRaises(tickets.ErrorImpresion), self.assertLogs('comedor.tickets', 'ERROR'):
+            tickets.imprimir_pendientes()
+        self.assertEqual([impresora for impresora, _ in tickets.bandeja], ['bar'])
+        pendiente = Ticket.objects.get(estado='pendiente')
+        self.assertEqual((pendiente.impresora, pendiente.intentos), ('cocina', 1))
+        self.assertTrue(pendiente.ultimo_error)
+
+
+class CierreCajaTest(TestCase):
+    """Tests para el cierre de caja diario"""
+
+    def setUp(self):
+        self.mozo = User.objects.create_user(username='mozo', password='mozo123')
+        self.admin = User.objects.create_user(username='jefe', password='jefe123', is_staff=True)
+        fondos = CategoriaItem.objects.create(nombre='Fondos')
+        tragos = CategoriaItem.objects.create(nombre='Tragos')
+        self.plato = Item.objects.create(nombre='Plato', categoria=fondos, precio=Decimal('10000'))
+        self.trago = Item.objects.create(nombre='Trago', categoria=tragos, precio=Decimal('4000'))
+        self.hoy = timezone.localdate()
+
+        pagado = self._pedido('pagado', (self.plato, 2), (self.trago, 1), atendido_por=self.mozo)
+        # 10% de descuento en el plato
+        linea = pagado.detalles.get(item=self.plato)
+        DetallePedido.objects.filter(pk=linea.pk).update(descuento=Decimal('2000'), subtotal=Decimal('18000'))
+        Pedido.objects.filter(pk=pagado.pk).update(total=Decimal('22000'), propinas=Decimal('2200'))
+        self._pedido('pagado', (self.trago, 2), tipo_pedido='llevar')
+        self._pedido('cancelado', (self.plato, 1), (self.trago, 1))
+        self._pedido('en_curso', (self.plato, 1))
+        ayer = self._pedido('pagado', (self.plato, 5))
+        Pedido.objects.filter(pk=ayer.pk).update(
+            fecha_pedido=timezone.now() - timedelta(days=1), fecha_pago=timezone.now() - timedelta(days=1),
+        )
+
+    def _pedido(self, estado, *lineas, **campos):
+        pedido = Pedido.objects.create(**campos)
+        for item, cantidad in lineas:
+            DetallePedido.objects.create(pedido=pedido, item=item, cantidad=cantidad, precio_unitario=item.precio)
+        Pedido.objects.filter(pk=pedido.pk).update(
+            estado=estado, fecha_pago=timezone.now() if estado == 'pagado' else None,
+        )
+        return pedido
+
+    def test_calculo_en_una_consulta(self):
+        """Test: Totales y desgloses del día salen de una sola consulta"""
+        with self.assertNumQueries(1):
+            cierre = calcular_cierre(self.hoy)
+        self.assertEqual(cierre['ventas_brutas'], Decimal('32000'))
+        self.assertEqual(cierre['descuentos'], Decimal('2000'))
+        self.assertEqual(cierre['ventas_netas'], Decimal('30000'))
+        self.assertEqual(cierre['propinas'], Decimal('2200'))
+        self.assertEqual((cierre['pedidos_pagados'], cierre['pedidos_cancelados'], cierre['pedidos_abiertos']), (2, 1, 1))
+        self.assertEqual((cierre['monto_cancelado'], cierre['monto_abierto']), (Decimal('14000'), Decimal('10000')))
+        resumen = cierre['resumen']
+        self.assertEqual([(f['nombre'], f['pedidos'], f['ventas']) for f in resumen['por_tipo']],
+                         [('Comedor', 1, Decimal('22000')), ('Para Llevar', 1, Decimal('8000'))])
+        self.assertEqual([(f['nombre'], f['ventas']) for f in resumen['por_mesero']],
+                         [('mozo', Decimal('22000')), ('Sin asignar', Decimal('8000'))])
+        self.assertEqual([(f['nombre'], f['cantidad'], f['ventas']) for f in resumen['por_categoria']],
+                         [('Fondos', 2, Decimal('18000')), ('Tragos', 3, Decimal('12000'))])
+
+    def test_pedido_pagado_despues_de_medianoche(self):
+        """Test: Un pedido tomado antes de medianoche y pagado después cuenta en el cierre del día del pago"""
+        medianoche, _ = rango_dia(self.hoy)
+        ayer = self.hoy - timedelta(days=1)
+        pedido = self._pedido('en_curso', (self.plato, 3))
+        Pedido.objects.filter(pk=pedido.pk).update(fecha_pedido=medianoche - timedelta(minutes=30))
+        # Al cerrar la caja de ayer (antes de cobrarlo) seguía abierto
+        self.assertEqual((calcular_cierre(ayer)['pedidos_abiertos'], calcular_cierre(ayer)['monto_abierto']),
+                         (1, Decimal('30000')))
+
+        Pedido.objects.filter(pk=pedido.pk).update(estado='pagado', fecha_pago=medianoche + timedelta(minutes=20))
+        cierre_ayer, cierre_hoy = calcular_cierre(ayer), calcular_cierre(self.hoy)
+        self.assertEqual((cierre_ayer['ventas_netas'], cierre_ayer['pedidos_abiertos']), (Decimal('50000'), 0))
+        self.assertEqual(cierre_hoy['ventas_netas'], Decimal('60000'))
+        self.assertEqual(cierre_hoy['pedidos_pagados'], 3)
+        self.assertEqual(cierre_hoy['resumen']['por_categoria'][0], {'nombre': 'Fondos', 'cantidad': 5, 'ventas': Decimal('48000')})
+
+    def test_cierre_inmutable(self):
+        """Test: El cierre guardado no cambia con los pedidos ni se puede rehacer"""
+        cierre = cerrar_caja(self.hoy, usuario=self.admin)
+        Pedido.objects.all().delete()
+        cierre = CierreCaja.objects.get(fecha=self.hoy)
+        self.assertEqual(cierre.ventas_netas, Decimal('30000'))
+        self.assertEqual(cierre.resumen['por_categoria'][0]['nombre'], 'Fondos')
+        with self.assertRaises(ValidationError):
+            cerrar_caja(self.hoy)
+        cierre.ventas_netas = 0
+        with self.assertRaises(ValidationError):
+            cierre.save()
+
+    def test_comando(self):
+        """Test: cerrar_caja cierra el día indicado en cada sucursal y se niega a cerrarlo dos veces"""
+        salida = StringIO()
+        call_command('cerrar_caja', '--fecha', self.hoy.isoformat(), stdout=salida)
+        self.assertIn('$30000.00 en 2 pedidos', salida.getvalue())
+        self.assertIn('1 pedido(s) seguían abiertos', salida.getvalue())
+        errores = StringIO()
+        with self.assertRaisesMessage(CommandError, 'No se cerró la caja de: Principal'):
+            call_command('cerrar_caja', '--fecha', self.hoy.isoformat(), stdout=StringIO(), stderr=errores)
+        self.assertIn('ya está cerrada', errores.getvalue())
+
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_vista(self):
+        """Test: Vista previa para todos; solo el staff cierra, y el día cerrado se lee del cierre"""
+        client = TestClient()
+        client.login(username='mozo', password='mozo123')
+        url = reverse('comedor:cierre_caja')
+        response = client.get(url)
+        self.assertContains(response, 'Vista previa')
+        self.assertContains(response, '$30000')
+        self.assertNotContains(response, 'Cerrar caja')
+        self.assertEqual(client.post(url, {'fecha': self.hoy.isoformat()}).status_code, 403)
+
+        client.login(username='jefe', password='jefe123')
+        response = client.post(url, {'fecha': self.hoy.isoformat()})
+        self.assertRedirects(response, f'{url}?fecha={self.hoy.isoformat()}')
+        with self.assertNumQueries(4):  # sesión, usuario, cierre, cierres anteriores
+            response = client.get(url, {'fecha': self.hoy.isoformat()})
+        self.assertContains(response, 'cerrada el')
+        self.assertContains(response, 'Fondos')
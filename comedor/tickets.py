@@ -0,0 +1,329 @@
+"""
+Comandas y cuentas impresas.
+
+- Al pasar un pedido a 'en_curso' se arma una comanda por estación
+  (``CategoriaItem.lugar_item``: bar o cocina) con las líneas que todavía no
+  se enviaron; las líneas agregadas después a un pedido en curso salen en una
+  comanda nueva. Al pasar a 'cuenta' se arma la cuenta del cliente.
+- Los pedidos se juntan por transacción (``programar_tickets``) y los tickets
+  se arman al confirmarla, una consulta para todas sus líneas. Los formatos de
+  columna se compilan una vez por ancho de papel (``diseno``).
+- Los tickets quedan en ``Ticket`` y la tarea ``imprimir_tickets`` los envía
+  en una tanda por impresora: una conexión o escritura por impresora, no por
+  ticket. Si una impresora falla, sus tickets quedan pendientes y la tarea se
+  reintenta.
+
+Cada estación imprime en la impresora de su nombre y las cuentas en 'caja';
+en las sucursales distintas de ``SUCURSAL_POR_DEFECTO`` el nombre lleva el
+código de la sucursal ('cocina@centro'). ``settings.TICKETS_IMPRESORAS``
+asigna a cada una un backend (las que no figuran usan 'default'):
+
+    TICKETS_IMPRESORAS = {
+        'default': {'BACKEND': 'comedor.tickets.ArchivoBackend', 'OPTIONS': {'directorio': '/var/tickets'}},
+        'cocina': {'BACKEND': 'comedor.tickets.SocketBackend', 'OPTIONS': {'host': '192.168.1.50'}},
+        'cocina@centro': {'BACKEND': 'comedor.tickets.SocketBackend', 'OPTIONS': {'host': '192.168.2.50'}},
+    }
+"""
+import logging
+import socket
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from cocina.models import LUGAR_CHOICES
+from Proy_Itaka.transacciones import al_confirmar
+from sucursales.contexto import codigo_sucursal
+from .planificacion import LUGAR_POR_DEFECTO
+
+logger = logging.getLogger(__name__)
+
+IMPRESORA_CUENTAS = 'caja'
+
+# Comandos ESC/POS
+ESC_INICIAR = b'\x1b@'
+ESC_TABLA_CP858 = b'\x1bt\x13'
+ESC_ESTILOS = {
+    'normal': b'\x1b!\x00\x1ba\x00',
+    'negrita': b'\x1b!\x08\x1ba\x00',
+    'grande': b'\x1b!\x38\x1ba\x01',    # Doble alto y ancho, negrita, centrado
+    'centro': b'\x1b!\x00\x1ba\x01',
+}
+ESC_CORTE = b'\n\n\n\x1dV\x42\x00'  # Avanza y corta el papel
+
+
+class ErrorImpresion(Exception):
+    """Una o más impresoras no recibieron sus tickets; quedan pendientes"""
+
+
+@dataclass(frozen=True)
+class Diseno:
+    """Formatos de columna de un ancho de papel (en caracteres)"""
+    ancho: int
+    linea_comanda: object
+    nota: object
+    linea_cuenta: object
+    importe: object
+    separador: str
+
+
+@cache
+def diseno(ancho):
+    """Compila los formatos una sola vez por ancho; cada ticket solo los aplica"""
+    nombre_cuenta = ancho - 17
+    return Diseno(
+        ancho=ancho,
+        linea_comanda=f'{{cantidad:>3}}x {{nombre:<{ancho - 5}.{ancho - 5}}}'.format,
+        nota=f'     {{texto:<{ancho - 5}.{ancho - 5}}}'.format,
+        linea_cuenta=f'{{cantidad:>3}} {{nombre:<{nombre_cuenta}.{nombre_cuenta}}} {{importe:>12}}'.format,
+        importe=f'{{etiqueta:<{ancho - 14}.{ancho - 14}}}{{importe:>14}}'.format,
+        separador='-' * ancho,
+    )
+
+
+def monto(valor):
+    """12345.00 -> '$12.345'"""
+    return '$' + f'{valor:,.0f}'.replace(',', '.')
+
+
+def _encabezado(pedido, titulo):
+    fecha = timezone.localtime()
+    lugar = f'Mesa {pedido.mesa.numero}' if pedido.mesa_id else pedido.get_tipo_pedido_display()
+    lineas = [['grande', titulo], ['grande', lugar], ['normal', f'Pedido #{pedido.pk} · {fecha:%d/%m %H:%M}']]
+    if pedido.atendido_por_id:
+        lineas.append(['normal', f'Atiende: {pedido.atendido_por.get_username()}'])
+    return lineas
+
+
+def armar_comanda(pedido, lugar, detalles, d):
+    lineas = _encabezado(pedido, dict(LUGAR_CHOICES).get(lugar, lugar).upper())
+    lineas.append(['normal', d.separador])
+    for detalle in detalles:
+        lineas.append(['negrita', d.linea_comanda(cantidad=detalle.cantidad, nombre=detalle.item.nombre)])
+        if detalle.asiento:
+            lineas.append(['normal', d.nota(texto=f'asiento {detalle.asiento}')])
+        if detalle.observaciones:
+            lineas.append(['normal', d.nota(texto=f'> {detalle.observaciones}')])
+    if pedido.observaciones:
+        lineas += [['normal', d.separador], ['normal', pedido.observaciones]]
+    return lineas
+
+
+def armar_cuenta(pedido, detalles, d):
+    lineas = _encabezado(pedido, 'CUENTA')
+    lineas.append(['normal', d.separador])
+    for detalle in detalles:
+        bruto = detalle.cantidad * detalle.precio_unitario
+        lineas.append(['normal', d.linea_cuenta(cantidad=detalle.cantidad, nombre=detalle.item.nombre, importe=monto(bruto))])
+        if detalle.descuento:
+            nombre = detalle.promocion.nombre if detalle.promocion_id else 'Descuento'
+            lineas.append(['normal', d.linea_cuenta(cantidad='', nombre=nombre, importe='-' + monto(detalle.descuento))])
+    lineas += [['normal', d.separador], ['negrita', d.importe(etiqueta='TOTAL', importe=monto(pedido.total))]]
+    if pedido.monto_pagado:
+        lineas += [
+            ['normal', d.importe(etiqueta='Pagado', importe=monto(pedido.monto_pagado))],
+            ['negrita', d.importe(etiqueta='Saldo', importe=monto(pedido.saldo))],
+        ]
+    lineas.append(['centro', '¡Gracias por su visita!'])
+    return lineas
+
+
+def nombre_impresora(nombre, sucursal):
+    """'cocina' en la sucursal por defecto; 'cocina@<código>' en las demás"""
+    if sucursal == settings.SUCURSAL_POR_DEFECTO:
+        return nombre
+    return f'{nombre}@{codigo_sucursal(sucursal)}'
+
+
+def programar_tickets(comandas=(), cuentas=()):
+    """
+    Arma los tickets de estos pedidos al confirmar la transacción; todos los
+    pedidos de una misma transacción se arman juntos.
+    """
+    al_confirmar('generar_tickets', generar_tickets, comandas=comandas, cuentas=cuentas)
+
+
+def generar_tickets(comandas=(), cuentas=()):
+    """
+    Arma las comandas de las líneas sin enviar de los pedidos en curso de
+    ``comandas`` y la cuenta de los pedidos de ``cuentas`` que siguen en
+    'cuenta'. Guarda los tickets y programa su impresión. Devuelve los tickets.
+    """
+    from .models import DetallePedido, Ticket
+
+    d = diseno(settings.TICKETS_ANCHO)
+    with transaction.atomic():
+        # SELECT ... FROM comedor_detallepedido JOIN comedor_pedido ... JOIN cocina_item ... LEFT JOIN ...
+        # WHERE (pedido_id IN (...) AND pedido.estado = 'en_curso' AND NOT comanda_enviada)
+        #    OR (pedido_id IN (...) AND pedido.estado = 'cuenta') ORDER BY pedido_id, id FOR UPDATE OF detalle
+        detalles = list(
+            DetallePedido.objects.select_for_update(of=('self',))
+            .select_related('pedido__mesa', 'pedido__atendido_por', 'item__categoria', 'promocion')
+            .filter(
+                Q(pedido_id__in=list(comandas), pedido__estado='en_curso', comanda_enviada=False)
+                | Q(pedido_id__in=list(cuentas), pedido__estado='cuenta')
+            )
+            .order_by('pedido_id', 'pk')
+        )
+
+        por_comanda, por_cuenta = defaultdict(list), defaultdict(list)
+        for detalle in detalles:
+            if detalle.pedido.estado == 'cuenta':
+                por_cuenta[detalle.pedido].append(detalle)
+            else:
+                lugar = getattr(detalle.item.categoria, 'lugar_item', None) or LUGAR_POR_DEFECTO
+                por_comanda[detalle.pedido, lugar].append(detalle)
+
+        tickets = [
+            Ticket(tipo='comanda', pedido=pedido, impresora=nombre_impresora(lugar, pedido.sucursal_id),
+                   lineas=armar_comanda(pedido, lugar, lineas, d))
+            for (pedido, lugar), lineas in por_comanda.items()
+        ] + [
+            Ticket(tipo='cuenta', pedido=pedido, impresora=nombre_impresora(IMPRESORA_CUENTAS, pedido.sucursal_id),
+                   lineas=armar_cuenta(pedido, lineas, d))
+            for pedido, lineas in por_cuenta.items()
+        ]
+        if not tickets:
+            return []
+        # INSERT INTO comedor_ticket ... (una sola sentencia)
+        Ticket.objects.bulk_create(tickets)
+        enviadas = [detalle.pk for lineas in por_comanda.values() for detalle in lineas]
+        if enviadas:
+            # UPDATE comedor_detallepedido SET comanda_enviada = true WHERE id IN (...)
+            DetallePedido.objects.filter(pk__in=enviadas).update(comanda_enviada=True)
+        programar_impresion()
+    return tickets
+
+
+def programar_impresion():
+    """Encola ``imprimir_tickets`` si no hay ya una impresión pendiente"""
+    from tareas.cola import encolar
+    from tareas.models import Tarea
+    from .tareas import imprimir_tickets
+
+    if not Tarea.objects.filter(nombre=imprimir_tickets.nombre_tarea, estado='pendiente').exists():
+        encolar(imprimir_tickets)
+
+
+# ============================================
+# FORMATOS Y BACKENDS DE IMPRESORA
+# ============================================
+
+def a_texto(lineas):
+    ancho = settings.TICKETS_ANCHO
+    texto = [texto.center(ancho).rstrip() if estilo in ('grande', 'centro') else texto for estilo, texto in lineas]
+    return '\n'.join(texto) + '\n'
+
+
+def a_escpos(lineas):
+    datos = [ESC_INICIAR, ESC_TABLA_CP858]
+    for estilo, texto in lineas:
+        datos += [ESC_ESTILOS.get(estilo, ESC_ESTILOS['normal']), texto.encode('cp858', errors='replace'), b'\n']
+    datos += [ESC_ESTILOS['normal'], ESC_CORTE]
+    return b''.join(datos)
+
+
+class BackendImpresora:
+    """
+    Recibe de una vez todos los tickets pendientes de una impresora (cada uno
+    como lista de ``[estilo, texto]``). Si no puede enviarlos, lanza una
+    excepción y los tickets quedan pendientes.
+    """
+
+    def __init__(self, nombre, **opciones):
+        self.nombre = nombre
+
+    def enviar(self, tickets):
+        raise NotImplementedError
+
+
+class ArchivoBackend(BackendImpresora):
+    """Agrega los tickets a ``<directorio>/<impresora>.txt`` (texto) o ``.bin`` (ESC/POS)"""
+
+    def __init__(self, nombre, directorio, formato='texto'):
+        super().__init__(nombre)
+        self.directorio = Path(directorio)
+        self.formato = formato
+
+    def enviar(self, tickets):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        if self.formato == 'escpos':
+            with open(self.directorio / f'{self.nombre}.bin', 'ab') as archivo:
+                archivo.write(b''.join(a_escpos(lineas) for lineas in tickets))
+        else:
+            separador = '=' * settings.TICKETS_ANCHO + '\n'
+            with open(self.directorio / f'{self.nombre}.txt', 'a', encoding='utf-8') as archivo:
+                archivo.write(''.join(a_texto(lineas) + separador for lineas in tickets))
+
+
+class SocketBackend(BackendImpresora):
+    """Impresora térmica en red (puerto RAW/JetDirect): una conexión por tanda"""
+
+    def __init__(self, nombre, host, puerto=9100, timeout=5):
+        super().__init__(nombre)
+        self.host, self.puerto, self.timeout = host, puerto, timeout
+
+    def enviar(self, tickets):
+        with socket.create_connection((self.host, self.puerto), timeout=self.timeout) as conexion:
+            conexion.sendall(b''.join(a_escpos(lineas) for lineas in tickets))
+
+
+# Tandas recibidas por MemoriaBackend: [(impresora, [ticket, ...]), ...]
+bandeja = []
+
+
+class MemoriaBackend(BackendImpresora):
+    """Guarda las tandas en ``comedor.tickets.bandeja`` (para pruebas)"""
+
+    def enviar(self, tickets):
+        bandeja.append((self.nombre, list(tickets)))
+
+
+def backend(impresora):
+    configuracion = settings.TICKETS_IMPRESORAS
+    config = configuracion.get(impresora) or configuracion['default']
+    return import_string(config['BACKEND'])(impresora, **config.get('OPTIONS', {}))
+
+
+def imprimir_pendientes():
+    """
+    Envía los tickets pendientes, una tanda por impresora, y devuelve
+    ``{impresora: tickets enviados}``. Los de una impresora que falla quedan
+    pendientes con el error y al final se lanza ``ErrorImpresion``.
+    """
+    from .models import Ticket
+
+    # SELECT DISTINCT impresora FROM comedor_ticket WHERE estado = 'pendiente'
+    impresoras = sorted(set(Ticket.objects.filter(estado='pendiente').values_list('impresora', flat=True)))
+    enviados, fallidas = {}, []
+    for impresora in impresoras:
+        with transaction.atomic():
+            # SELECT id, lineas FROM comedor_ticket WHERE estado = 'pendiente' AND impresora = %s
+            #   ORDER BY id FOR UPDATE SKIP LOCKED (otra impresión en curso ya los tiene)
+            tanda = list(
+                Ticket.objects.select_for_update(skip_locked=True)
+                .filter(estado='pendiente', impresora=impresora).order_by('pk').values_list('pk', 'lineas')
+            )
+            if not tanda:
+                continue
+            ids = [pk for pk, _ in tanda]
+            try:
+                backend(impresora).enviar([lineas for _, lineas in tanda])
+            except Exception as error:
+                logger.exception('No se pudo imprimir en %s', impresora)
+                Ticket.objects.filter(pk__in=ids).update(intentos=F('intentos') + 1, ultimo_error=str(error))
+                fallidas.append(impresora)
+                continue
+            Ticket.objects.filter(pk__in=ids).update(
+                estado='impreso', fecha_impresion=timezone.now(), intentos=F('intentos') + 1, ultimo_error='',
+            )
+            enviados[impresora] = len(ids)
+    if fallidas:
+        raise ErrorImpresion(f'Tickets pendientes en: {", ".join(fallidas)}')
+    return enviados
@@ -10,12 +10,19 @@ urlpatterns = [
     # URLs para Mesas
     path('mesas/', MesaListView.as_view(), name='listar_mesas'),
     path('mesas/crear/', MesaCreateView.as_view(), name='crear_mesa'),
+    path('mesas/plano/', PlanoSalonView.as_view(), name='plano_salon'),
+    path('mesas/plano.json', plano_salon_json, name='plano_salon_json'),
     path('mesas/<int:pk>/editar/', MesaUpdateView.as_view(), name='editar_mesa'),
     path('mesas/<int:pk>/eliminar/', mesa_delete, name='eliminar_mesa'),
     path('mesas/<int:pk>/', MesaDetailView.as_view(), name='ver_mesa'),
     path('mesas/<int:pk>/reservar/', reservar_mesa, name='reservar_mesa'),
     path('mesas/<int:pk>/liberar/', liberar_mesa, name='liberar_mesa'),
     path('mesas/<int:pk>/recepcionar/', recepcionar_mesa, name='recepcionar_mesa'),
+
+    # Lista de espera (grupos sin reserva)
+    path('espera/', lista_espera, name='lista_espera'),
+    path('espera/<int:pk>/sentar/', sentar_espera, name='sentar_espera'),
+    path('espera/<int:pk>/cancelar/', cancelar_espera, name='cancelar_espera'),
     
     # URLs para Clientes
     path('clientes/', ClienteListView.as_view(), name='listar_clientes'),
@@ -28,6 +35,7 @@ urlpatterns = [
     # URLs para Reservas
     path('reservas/', ReservaListView.as_view(), name='listar_reservas'),
     path('reservas/crear/', ReservaCreateView.as_view(), name='crear_reserva'),
+    path('reservas/grupo/', crear_reserva_grupo, name='crear_reserva_grupo'),
     path('reservas/<int:pk>/', ReservaDetailView.as_view(), name='ver_reserva'),
     path('reservas/<int:pk>/editar/', ReservaUpdateView.as_view(), name='editar_reserva'),
     path('reservas/<int:pk>/eliminar/', reserva_delete, name='eliminar_reserva'),
@@ -41,10 +49,18 @@ urlpatterns = [
     path('pedidos/<int:pk>/editar/', PedidoUpdateView.as_view(), name='editar_pedido'),
     path('pedidos/<int:pk>/eliminar/', pedido_delete, name='eliminar_pedido'),
     path('pedidos/crear/<int:mesa_id>/', crear_pedido_mesa, name='crear_pedido_mesa'),
+    path('pedidos/<int:pk>/cobrar/', cobrar_pedido, name='cobrar_pedido'),
+
+    # Cierre de caja diario
+    path('caja/cierre/', cierre_caja, name='cierre_caja'),
 
 
     # URLs para Items en Pedidos (DetallePedido)
     path('pedidos/<int:pedido_id>/agregar-item/', agregar_item_pedido, name='agregar_item_pedido'),
     path('detalles/<int:detalle_id>/editar/', editar_item_pedido, name='editar_item_pedido'),
     path('detalles/<int:detalle_id>/eliminar/', eliminar_item_pedido, name='eliminar_item_pedido'),
+
+    # Autocompletado (JSON) para los selectores de cliente y mesa
+    path('autocompletar/clientes/', autocompletar_clientes, name='autocompletar_clientes'),
+    path('autocompletar/mesas/', autocompletar_mesas, name='autocompletar_mesas'),
 ]
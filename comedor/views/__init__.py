@@ -1,6 +1,7 @@
 from .mesas import (
     ComedorIndexView,
-    MesaListView, MesaCreateView, MesaUpdateView, MesaDetailView,
+    MesaListView, MesaCreateView, MesaUpdateView, MesaDetailView, PlanoSalonView,
+    plano_salon_json,
     liberar_mesa, mesa_delete, reservar_mesa, recepcionar_mesa,
 )
 from .clientes import (
@@ -9,10 +10,14 @@ from .clientes import (
 )
 from .reservas import (
     ReservaListView, ReservaCreateView, ReservaUpdateView, ReservaDetailView,
-    reserva_cancel, reserva_delete, confirmar_reserva,
+    reserva_cancel, reserva_delete, confirmar_reserva, crear_reserva_grupo,
 )
 from .pedidos import (
     PedidoListView, PedidoCreateView, PedidoUpdateView, PedidoDetailView,
     pedido_delete, crear_pedido_mesa,
     agregar_item_pedido, editar_item_pedido, eliminar_item_pedido,
 )
+from .autocompletar import autocompletar_clientes, autocompletar_mesas
+from .pagos import cobrar_pedido
+from .esperas import lista_espera, sentar_espera, cancelar_espera
+from .caja import cierre_caja
@@ -0,0 +1,45 @@
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.http import JsonResponse
+from Proy_Itaka.routers import usar_replica
+from ..models import Mesa, Cliente
+
+LIMITE_RESULTADOS = 20
+
+
+def _resultados(objetos):
+    # El texto coincide con la etiqueta del ModelChoiceField (str del objeto)
+    return JsonResponse({'resultados': [{'id': obj.pk, 'texto': str(obj)} for obj in objetos]})
+
+
+@login_required
+@usar_replica
+def autocompletar_clientes(request):
+    termino = request.GET.get('q', '').strip()
+    if not termino:
+        return _resultados([])
+    # SELECT id, nombre, telefono FROM comedor_cliente
+    # WHERE UPPER(nombre) LIKE UPPER('termino%') [OR telefono LIKE 'termino%']
+    # ORDER BY nombre LIMIT 20  (índices de prefijo de la migración 0006)
+    filtro = Q(nombre__istartswith=termino)
+    if termino.lstrip('+').isdigit():
+        filtro |= Q(telefono__startswith=termino)
+    clientes = Cliente.objects.filter(filtro).only('nombre', 'telefono').order_by('nombre')[:LIMITE_RESULTADOS]
+    return _resultados(clientes)
+
+
+@login_required
+@usar_replica
+def autocompletar_mesas(request):
+    termino = request.GET.get('q', '').strip()
+    personas = request.GET.get('personas', '')
+    # SELECT ... FROM comedor_mesa WHERE estado <> 'mantenimiento'
+    # [AND numero::text LIKE 'q%'] [AND capacidad >= personas]  (tabla pequeña)
+    mesas = Mesa.objects.exclude(estado='mantenimiento').order_by('numero')
+    if termino:
+        if not termino.isdigit():
+            return _resultados([])
+        mesas = mesas.filter(numero__startswith=termino)
+    if personas.isdigit():
+        mesas = mesas.filter(capacidad__gte=int(personas))
+    return _resultados(mesas[:LIMITE_RESULTADOS])
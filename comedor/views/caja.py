@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from ..cierres import calcular_cierre, cerrar_caja
+from ..models import CierreCaja
+
+CIERRES_RECIENTES = 31
+
+
+@login_required
+def cierre_caja(request):
+    """
+    Cierre del día elegido: el guardado si ya se cerró o una vista previa
+    (calculada en el momento) si no. El staff cierra la caja con un POST.
+    """
+    try:
+        fecha = date.fromisoformat(request.POST.get('fecha') or request.GET.get('fecha') or '')
+    except ValueError:
+        fecha = timezone.localdate()
+
+    if request.method == 'POST':
+        if not request.user.is_staff:
+            raise PermissionDenied
+        try:
+            cerrar_caja(fecha, usuario=request.user)
+        except ValidationError as error:
+            messages.error(request, error.messages[0])
+        else:
+            messages.success(request, f'Caja del {fecha:%d/%m/%Y} cerrada.')
+        return redirect(f"{reverse('comedor:cierre_caja')}?fecha={fecha.isoformat()}")
+
+    # SELECT ... FROM comedor_cierrecaja LEFT JOIN auth_user WHERE fecha = %s
+    cierre = CierreCaja.objects.select_related('cerrado_por').filter(fecha=fecha).first()
+    # SELECT fecha, ventas_netas, pedidos_pagados FROM comedor_cierrecaja ORDER BY fecha DESC LIMIT 31
+    recientes = CierreCaja.objects.values('fecha', 'ventas_netas', 'pedidos_pagados')[:CIERRES_RECIENTES]
+    return render(request, 'cierre_caja.html', {
+        'fecha': fecha,
+        'cierre': cierre,
+        'datos': cierre if cierre else calcular_cierre(fecha),
+        'recientes': recientes,
+    })
@@ -5,11 +5,12 @@ from django.views.generic import ListView, CreateView, UpdateView, DetailView
 from django.contrib import messages
 from django.db.models import Q
 from django.urls import reverse_lazy
+from Proy_Itaka.routers import LecturaReplicaMixin
 from ..models import Cliente
 from ..forms import ClienteForm, ReservaForm
 
 
-class ClienteListView(LoginRequiredMixin, ListView):
+class ClienteListView(LoginRequiredMixin, LecturaReplicaMixin, ListView):
     model = Cliente
     template_name = 'list_clientes.html'
     context_object_name = 'clientes'
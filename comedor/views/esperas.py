@@ -0,0 +1,74 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+from ..forms import EsperaMesaForm
+from ..models import Mesa, EsperaMesa
+from ..rotacion import estimar_esperas
+
+
+@login_required
+def lista_espera(request):
+    """Pantalla de la recepción: grupos sin reserva esperando mesa"""
+    form = EsperaMesaForm(request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        espera = form.save()
+        estimar_esperas()
+        espera.refresh_from_db(fields=['hora_estimada'])
+        if espera.hora_estimada is None:
+            messages.warning(request, f'{espera.nombre} agregado a la lista, pero no hay mesas para {espera.numero_personas} personas.')
+        else:
+            messages.success(request, f'{espera.nombre} agregado a la lista. Espera estimada: {espera.minutos_restantes} min.')
+        return redirect('comedor:lista_espera')
+
+    # SELECT ... FROM comedor_esperamesa LEFT JOIN comedor_cliente WHERE estado = 'esperando' ORDER BY fecha_llegada
+    esperas = list(EsperaMesa.objects.filter(estado='esperando').select_related('cliente'))
+    # SELECT id, numero, capacidad FROM comedor_mesa WHERE estado = 'disponible' ORDER BY capacidad, numero
+    libres = list(Mesa.objects.filter(estado='disponible').order_by('capacidad', 'numero').only('numero', 'capacidad'))
+    for espera in esperas:
+        espera.mesas_libres = [mesa for mesa in libres if mesa.capacidad >= espera.numero_personas]
+    # SELECT numero, capacidad, liberacion_estimada FROM comedor_mesa WHERE estado = 'ocupada' ORDER BY liberacion_estimada
+    ocupadas = Mesa.objects.filter(estado='ocupada').order_by('liberacion_estimada').only('numero', 'capacidad', 'liberacion_estimada')
+    return render(request, 'lista_espera.html', {
+        'form': form, 'esperas': esperas, 'ocupadas': ocupadas, 'ahora': timezone.now(),
+    })
+
+
+@login_required
+@require_POST
+def sentar_espera(request, pk):
+    """Sienta al grupo en la mesa elegida: la mesa pasa a 'ocupada'"""
+    with transaction.atomic():
+        # SELECT ... FROM comedor_esperamesa WHERE id = pk FOR UPDATE
+        espera = get_object_or_404(EsperaMesa.objects.select_for_update(), pk=pk)
+        if espera.estado != 'esperando':
+            messages.error(request, f'{espera.nombre} ya no está en la lista de espera.')
+            return redirect('comedor:lista_espera')
+        # SELECT ... FROM comedor_mesa WHERE id = %s FOR UPDATE
+        mesa = Mesa.objects.select_for_update().filter(pk=request.POST.get('mesa') or None).first()
+        if mesa is None or mesa.estado != 'disponible' or mesa.capacidad < espera.numero_personas:
+            messages.error(request, 'Elige una mesa disponible con capacidad suficiente.')
+            return redirect('comedor:lista_espera')
+
+        mesa.estado = 'ocupada'
+        mesa.save()  # -> UPDATE comedor_mesa SET estado = 'ocupada', ocupada_desde = ..., liberacion_estimada = ...
+        espera.estado, espera.mesa, espera.fecha_sentada = 'sentada', mesa, timezone.now()
+        espera.save(update_fields=['estado', 'mesa', 'fecha_sentada'])
+
+    messages.success(request, f'{espera.nombre} sentado en la mesa {mesa.numero}.')
+    return redirect('comedor:lista_espera')
+
+
+@login_required
+@require_POST
+def cancelar_espera(request, pk):
+    """El grupo se fue sin sentarse; los que venían detrás se adelantan"""
+    # UPDATE comedor_esperamesa SET estado = 'cancelada' WHERE id = pk AND estado = 'esperando'
+    if EsperaMesa.objects.filter(pk=pk, estado='esperando').update(estado='cancelada', hora_estimada=None):
+        estimar_esperas()
+        messages.success(request, 'Grupo quitado de la lista de espera.')
+    else:
+        messages.error(request, 'El grupo ya no está en la lista de espera.')
+    return redirect('comedor:lista_espera')
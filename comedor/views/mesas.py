@@ -1,9 +1,15 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DetailView
 from django.contrib import messages
+from django.http import JsonResponse
 from django.urls import reverse_lazy
+from Proy_Itaka.routers import LecturaReplicaMixin, usar_replica
+from sucursales.contexto import sucursales
+from ..dashboard import obtener_kpis
+from ..plano import mesa_a_dict, plano_salon, prefetch_actividad, reserva_actual
 from ..models import Mesa, Reserva, Pedido
 from ..forms import MesaForm, ReservaForm
 
@@ -11,8 +17,18 @@ from ..forms import MesaForm, ReservaForm
 class ComedorIndexView(LoginRequiredMixin, TemplateView):
     template_name = 'index_comedor.html'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # KPI agregados, compartidos en caché por todas las pantallas
+        context['kpis'] = obtener_kpis()
+        context['kpis_ttl'] = settings.DASHBOARD_CACHE_TTL
+        # Selector de sucursal (desde la caché; solo se muestra si hay más de una)
+        context['sucursales'] = sucursales()
+        context['sucursal_id'] = self.request.sucursal_id
+        return context
 
-class MesaListView(LoginRequiredMixin, ListView):
+
+class MesaListView(LoginRequiredMixin, LecturaReplicaMixin, ListView):
     model = Mesa
     template_name = 'list_mesas.html'
     context_object_name = 'mesas'
@@ -54,26 +70,33 @@ class MesaDetailView(LoginRequiredMixin, DetailView):
     template_name = 'detail_mesa.html'
     context_object_name = 'mesa'
 
+    def get_queryset(self):
+        # Reserva activa (con cliente) y pedido abierto precargados: 3 SELECT en total
+        return super().get_queryset().prefetch_related(*prefetch_actividad())
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['reserva_activa'] = reserva_actual(self.object.reservas_activas)
+        context['pedido_activo'] = self.object.pedidos_abiertos[0] if self.object.pedidos_abiertos else None
+        return context
 
-        # Buscar la reserva activa asociada a la mesa
-        reserva_activa = Reserva.objects.filter(
-            mesa=self.object,
-            estado__in=['pendiente', 'confirmada', 'en_curso']
-        ).first()
 
-        # Buscar si hay un pedido activo para esta mesa
-        pedido_activo = Pedido.objects.filter(
-            mesa=self.object,
-            estado__in=['pendiente', 'en_preparacion', 'listo', 'servido']
-        ).first()
+class PlanoSalonView(LoginRequiredMixin, LecturaReplicaMixin, TemplateView):
+    """Todas las mesas con su reserva, pedido, total y tiempo sentados"""
+    template_name = 'plano_salon.html'
 
-        context['reserva_activa'] = reserva_activa
-        context['pedido_activo'] = pedido_activo
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['mesas'] = plano_salon()
         return context
 
 
+@login_required
+@usar_replica
+def plano_salon_json(request):
+    return JsonResponse({'mesas': [mesa_a_dict(mesa) for mesa in plano_salon()]})
+
+
 @login_required
 def liberar_mesa(request, pk):
     mesa = get_object_or_404(Mesa, pk=pk)  # -> SELECT * FROM comedor_mesa WHERE id = pk LIMIT 1
@@ -0,0 +1,59 @@
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from ..models import Pedido
+from ..forms import PagoForm
+from ..pagos import MAXIMO_PARTES, dividir_equitativo, dividir_por_asiento, registrar_devolucion, registrar_pago
+
+
+@login_required
+def cobrar_pedido(request, pk):
+    pedido = get_object_or_404(Pedido.objects.select_related('mesa', 'cliente'), pk=pk)
+
+    if request.method == 'POST' and 'devolver' in request.POST:
+        form = PagoForm(pedido=pedido)
+        try:
+            pago = registrar_devolucion(pedido, usuario=request.user)
+        except ValidationError as error:
+            messages.error(request, error.messages[0])
+        else:
+            messages.success(request, f'Vuelto de ${-pago.monto} registrado. Pedido #{pedido.pk} pagado.')
+            return redirect('comedor:ver_pedido', pk=pedido.pk)
+    elif request.method == 'POST':
+        form = PagoForm(request.POST, pedido=pedido)
+        if form.is_valid():
+            datos = form.cleaned_data
+            try:
+                pago = registrar_pago(
+                    pedido, monto=datos['monto'], propina=datos['propina'], metodo=datos['metodo'],
+                    asiento=datos['asiento'], detalles=list(datos['detalles']), usuario=request.user,
+                )
+            except ValidationError as error:
+                form.add_error(None, error)
+            else:
+                if pago.pedido.estado == 'pagado':
+                    messages.success(request, f'Pago de ${pago.monto} registrado. Pedido #{pedido.pk} pagado.')
+                    return redirect('comedor:ver_pedido', pk=pedido.pk)
+                messages.success(request, f'Pago de ${pago.monto} registrado. Saldo pendiente: ${pago.pedido.saldo}.')
+                return redirect('comedor:cobrar_pedido', pk=pedido.pk)
+        messages.error(request, 'Por favor, corrige los errores del formulario.')
+    else:
+        form = PagoForm(pedido=pedido)
+
+    maximo_partes = max(pedido.comensales or 0, MAXIMO_PARTES)
+    try:
+        partes = min(max(int(request.GET.get('partes', 2)), 1), maximo_partes)
+    except ValueError:
+        partes = 2
+
+    return render(request, 'pago_pedido.html', {
+        'pedido': pedido,
+        'form': form,
+        'pagos': pedido.pagos.select_related('registrado_por'),
+        'partes': partes,
+        'maximo_partes': maximo_partes,
+        'a_devolver': -pedido.saldo if pedido.saldo < 0 else 0,
+        'cuotas': dividir_equitativo(pedido.saldo, partes) if pedido.saldo > 0 else [],
+        'por_asiento': sorted(dividir_por_asiento(pedido).items()),
+    })
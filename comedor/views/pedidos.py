@@ -4,11 +4,13 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, CreateView, UpdateView, DetailView
 from django.contrib import messages
 from django.urls import reverse_lazy
+from Proy_Itaka.routers import LecturaReplicaMixin
+from cocina.inventario import StockInsuficiente
 from ..models import Mesa, Reserva, Pedido, DetallePedido
 from ..forms import PedidoForm, DetallePedidoForm
 
 
-class PedidoListView(LoginRequiredMixin, ListView):
+class PedidoListView(LoginRequiredMixin, LecturaReplicaMixin, ListView):
     model = Pedido
     template_name = 'list_pedidos.html'
     context_object_name = 'pedidos'
@@ -38,7 +40,7 @@ class PedidoDetailView(LoginRequiredMixin, DetailView):
         # INNER JOIN comedor_mesa, comedor_cliente, auth_user
         # + SELECT * FROM comedor_detallepedido WHERE pedido_id IN (...)
         # + SELECT * FROM cocina_item WHERE id IN (...)
-        return Pedido.objects.select_related('mesa', 'cliente', 'atendido_por').prefetch_related('detalles__item')
+        return Pedido.objects.select_related('mesa', 'cliente', 'atendido_por').prefetch_related('detalles__item', 'detalles__promocion')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -101,7 +103,7 @@ def crear_pedido_mesa(request, mesa_id):
     # SELECT * FROM comedor_pedido WHERE mesa_id = mesa_id AND estado IN (...) LIMIT 1
     pedido_existente = Pedido.objects.filter(
         mesa=mesa,
-        estado__in=['pendiente', 'en_preparacion', 'listo', 'servido']
+        estado__in=Pedido.ESTADOS_ABIERTOS
     ).first()
 
     if request.method == 'POST':
@@ -156,13 +158,14 @@ def agregar_item_pedido(request, pedido_id):
             detalle = form.save(commit=False)
             detalle.pedido = pedido
             detalle.precio_unitario = detalle.item.precio  # Capturar precio actual del item
-            detalle.save()  # -> INSERT INTO comedor_detallepedido
-
-            # Recalcular total del pedido
-            pedido.calcular_total()
-
-            messages.success(request, f'Item "{detalle.item.nombre}" agregado al pedido.')
-            return redirect('comedor:ver_pedido', pk=pedido.pk)
+            try:
+                detalle.save()  # -> UPDATE cocina_ingrediente + INSERT INTO comedor_detallepedido + recálculo del total
+            except StockInsuficiente as error:
+                form.add_error('item', error)
+                messages.error(request, error.message)
+            else:
+                messages.success(request, f'Item "{detalle.item.nombre}" agregado al pedido.')
+                return redirect('comedor:ver_pedido', pk=pedido.pk)
         else:
             messages.error(request, 'Por favor, corrige los errores del formulario.')
     else:
@@ -176,7 +179,8 @@ def agregar_item_pedido(request, pedido_id):
 
 @login_required
 def editar_item_pedido(request, detalle_id):
-    detalle = get_object_or_404(DetallePedido, pk=detalle_id)  # -> SELECT * FROM comedor_detallepedido WHERE id = detalle_id LIMIT 1
+    # -> SELECT * FROM comedor_detallepedido JOIN comedor_pedido ... WHERE id = detalle_id AND pedido.sucursal_id = %s LIMIT 1
+    detalle = get_object_or_404(DetallePedido, pk=detalle_id)
     pedido = detalle.pedido
 
     if request.method == 'POST':
@@ -184,10 +188,7 @@ def editar_item_pedido(request, detalle_id):
         if form.is_valid():
             detalle = form.save(commit=False)
             detalle.precio_unitario = detalle.item.precio  # Actualizar precio al vigente
-            detalle.save()  # -> UPDATE comedor_detallepedido
-
-            # Recalcular total del pedido
-            pedido.calcular_total()
+            detalle.save()  # -> UPDATE comedor_detallepedido + recálculo del total del pedido
 
             messages.success(request, 'Item actualizado exitosamente.')
             return redirect('comedor:ver_pedido', pk=pedido.pk)
@@ -205,7 +206,8 @@ def editar_item_pedido(request, detalle_id):
 
 @login_required
 def eliminar_item_pedido(request, detalle_id):
-    detalle = get_object_or_404(DetallePedido, pk=detalle_id)  # -> SELECT * FROM comedor_detallepedido WHERE id = detalle_id LIMIT 1
+    # -> SELECT * FROM comedor_detallepedido JOIN comedor_pedido ... WHERE id = detalle_id AND pedido.sucursal_id = %s LIMIT 1
+    detalle = get_object_or_404(DetallePedido, pk=detalle_id)
     pedido = detalle.pedido
 
     item_nombre = detalle.item.nombre
@@ -1,14 +1,17 @@
-from django.shortcuts import get_object_or_404, redirect
+from django.core.exceptions import ValidationError
+from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, CreateView, UpdateView, DetailView
 from django.contrib import messages
 from django.urls import reverse_lazy
+from Proy_Itaka.routers import LecturaReplicaMixin
+from ..combinaciones import reservar_grupo
 from ..models import Mesa, Reserva
-from ..forms import ReservaForm
+from ..forms import ReservaForm, GrupoReservaForm
 
 
-class ReservaListView(LoginRequiredMixin, ListView):
+class ReservaListView(LoginRequiredMixin, LecturaReplicaMixin, ListView):
     model = Reserva
     template_name = 'list_reservas.html'
     context_object_name = 'reservas'
@@ -113,3 +116,24 @@ def confirmar_reserva(request, pk):
     reserva.save()
     messages.success(request, f'Reserva confirmada exitosamente. Mesa {reserva.mesa.numero} está reservada.')
     return redirect('comedor:listar_reservas')
+
+
+@login_required
+def crear_reserva_grupo(request):
+    """Reserva para un grupo grande: el sistema elige y junta las mesas"""
+    form = GrupoReservaForm(request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        try:
+            grupo = reservar_grupo(
+                form.cleaned_data['fecha_reserva'], form.cleaned_data['numero_personas'],
+                cliente=form.cleaned_data['cliente'], ubicacion=form.cleaned_data['ubicacion'] or None,
+                observaciones=form.cleaned_data['observaciones'], usuario=request.user,
+            )
+        except ValidationError as error:
+            form.add_error(None, error)
+        else:
+            # SELECT comedor_mesa.numero FROM comedor_reserva JOIN comedor_mesa WHERE grupo_id = %s
+            numeros = ', '.join(str(n) for n in grupo.reservas.order_by('mesa__numero').values_list('mesa__numero', flat=True))
+            messages.success(request, f'Reserva de grupo creada para {grupo.numero_personas} personas en las mesas {numeros}.')
+            return redirect('comedor:listar_reservas')
+    return render(request, 'form_reserva_grupo.html', {'form': form})
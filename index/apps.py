@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class IndexConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'index'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .metricas import registrar_conexion
+
+        connection_created.connect(registrar_conexion, dispatch_uid='index_metricas_conexion')
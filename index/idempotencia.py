@@ -0,0 +1,153 @@
+"""
+Claves de idempotencia para las solicitudes que escriben (POST, PUT, PATCH, DELETE).
+
+El cliente envía un token propio en la cabecera ``Idempotency-Key`` o en el
+campo oculto ``clave_idempotencia`` (``{% campo_idempotencia %}``). La primera
+solicitud con ese token ejecuta la vista y su respuesta se guarda; las
+repeticiones (doble toque, reintento tras un corte de red) reciben la misma
+respuesta sin volver a ejecutar la vista.
+
+- La clave combina usuario, método, ruta y token: el mismo token en otra ruta
+  o de otro usuario es otra solicitud. Las solicitudes anónimas no se tocan.
+- Sin token no se hace nada (ni una consulta), así que el middleware puede
+  cubrir todas las rutas.
+- Las respuestas se leen primero de la caché (``IDEMPOTENCIA_TTL`` segundos) y
+  si no están, de ``RespuestaIdempotente``. La fila se inserta antes de
+  ejecutar la vista y su clave única es el candado entre workers: una
+  repetición simultánea espera hasta ``IDEMPOTENCIA_ESPERA`` segundos la
+  respuesta de la primera y, si no llega, recibe 409.
+- Los errores 5xx y las respuestas en streaming no se guardan: se libera la
+  clave y el reintento vuelve a ejecutar la vista.
+"""
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+from Proy_Itaka.routers import METODOS_SEGUROS
+from .models import RespuestaIdempotente
+
+CABECERA = 'HTTP_IDEMPOTENCY_KEY'
+CAMPO = 'clave_idempotencia'
+CABECERAS_GUARDADAS = ('Content-Type', 'Location')
+PREFIJO_CACHE = 'idempotencia:'
+INTERVALO_ESPERA = 0.1
+TIPOS_FORMULARIO = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+
+def token_solicitud(request):
+    token = request.META.get(CABECERA)
+    if not token and request.content_type in TIPOS_FORMULARIO:
+        token = request.POST.get(CAMPO)
+    return (token or '').strip()[:255] or None
+
+
+def clave_solicitud(request, token):
+    texto = f'{request.user.pk}:{request.method}:{request.path}:{token}'
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def respuesta_guardada(datos):
+    response = HttpResponse(datos['contenido'], status=datos['status'])
+    for nombre, valor in datos['cabeceras'].items():
+        response[nombre] = valor
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def reservar(clave, espera):
+    """
+    Reserva ``clave`` para esta solicitud (devuelve ``None``) o devuelve la
+    respuesta guardada por la solicitud original. Si la original sigue en
+    curso pasado ``espera``, devuelve ``False``.
+    """
+    limite = time.monotonic() + espera
+    vencimiento = timezone.now() - timedelta(seconds=settings.IDEMPOTENCIA_TTL)
+    while True:
+        try:
+            with transaction.atomic():
+                # INSERT INTO index_respuestaidempotente (clave, ...) -> falla si la clave ya existe
+                RespuestaIdempotente.objects.create(clave=clave)
+            return None
+        except IntegrityError:
+            pass
+        # SELECT ... FROM index_respuestaidempotente WHERE clave = %s
+        fila = RespuestaIdempotente.objects.filter(clave=clave).first()
+        if fila is None:
+            continue  # La original falló y liberó la clave
+        if fila.fecha < vencimiento:
+            fila.delete()
+            continue
+        if fila.completa:
+            datos = fila.como_dict()
+            cache.set(PREFIJO_CACHE + clave, datos, settings.IDEMPOTENCIA_TTL)
+            return datos
+        if time.monotonic() >= limite:
+            return False
+        time.sleep(INTERVALO_ESPERA)
+
+
+def guardar(clave, response):
+    if response.streaming or response.status_code >= 500:
+        # DELETE FROM index_respuestaidempotente WHERE clave = %s
+        RespuestaIdempotente.objects.filter(clave=clave).delete()
+        return
+    datos = {
+        'status': response.status_code,
+        'cabeceras': {nombre: response[nombre] for nombre in CABECERAS_GUARDADAS if response.has_header(nombre)},
+        'contenido': response.content,
+    }
+    # UPDATE index_respuestaidempotente SET completa = true, status = %s, ... WHERE clave = %s
+    RespuestaIdempotente.objects.filter(clave=clave).update(completa=True, **datos)
+    cache.set(PREFIJO_CACHE + clave, datos, settings.IDEMPOTENCIA_TTL)
+
+
+def purgar_vencidas():
+    """Borra las respuestas más viejas que ``IDEMPOTENCIA_TTL``; devuelve cuántas"""
+    vencimiento = timezone.now() - timedelta(seconds=settings.IDEMPOTENCIA_TTL)
+    # DELETE FROM index_respuestaidempotente WHERE fecha < %s
+    borradas, _ = RespuestaIdempotente.objects.filter(fecha__lt=vencimiento).delete()
+    return borradas
+
+
+class IdempotenciaMiddleware:
+    """
+    Responde las repeticiones de una escritura con la respuesta original. Va
+    después de ``CsrfViewMiddleware`` y ``AuthenticationMiddleware``: la
+    verificación CSRF corre antes y el usuario ya está disponible.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        clave = getattr(request, '_clave_idempotencia', None)
+        if clave is not None:
+            guardar(clave, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in METODOS_SEGUROS:
+            return None
+        token = token_solicitud(request)
+        if token is None or not request.user.is_authenticated:
+            return None
+
+        clave = clave_solicitud(request, token)
+        datos = cache.get(PREFIJO_CACHE + clave)
+        if datos is None:
+            datos = reservar(clave, settings.IDEMPOTENCIA_ESPERA)
+            if datos is None:
+                request._clave_idempotencia = clave
+                return None
+        if datos is False:
+            response = HttpResponse('La solicitud original todavía se está procesando.', status=409)
+            response['Retry-After'] = '1'
+            return response
+        return respuesta_guardada(datos)
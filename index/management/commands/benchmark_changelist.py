@@ -0,0 +1,52 @@
+import statistics
+import time
+
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+MODELOS = ['comedor.reserva', 'comedor.pedido', 'comedor.detallepedido', 'comedor.cliente']
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia de los changelists del admin (usar tras generar_datos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modelo', action='append', dest='modelos',
+                            help=f'app.modelo a medir (repetible). Por defecto: {", ".join(MODELOS)}')
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--filtro', default='', help='Query string del changelist, ej: "estado=pendiente"')
+
+    def handle(self, *args, **options):
+        usuario = User.objects.filter(is_superuser=True, is_active=True).first()
+        if usuario is None:
+            usuario = User(username='benchmark', is_superuser=True, is_staff=True, is_active=True)
+        fabrica = RequestFactory()
+
+        self.stdout.write(f"{'modelo':<26}{'mediana ms':>12}{'máx ms':>10}{'consultas':>11}")
+        for etiqueta in options['modelos'] or MODELOS:
+            try:
+                modelo = apps.get_model(etiqueta)
+            except (LookupError, ValueError):
+                raise CommandError(f'Modelo desconocido: {etiqueta}')
+            model_admin = admin.site._registry.get(modelo)
+            if model_admin is None:
+                raise CommandError(f'{etiqueta} no está registrado en el admin')
+
+            tiempos = []
+            for _ in range(options['repeticiones']):
+                request = fabrica.get('/admin/', QueryDict(options['filtro']))
+                request.user = usuario
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    model_admin.changelist_view(request).render()
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+
+            self.stdout.write(
+                f'{etiqueta:<26}{statistics.median(tiempos):>12.1f}{max(tiempos):>10.1f}{len(consultas):>11}'
+            )
@@ -0,0 +1,122 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cocina.models import CategoriaItem, Item
+from comedor.models import Cliente, DetallePedido, Mesa, Pedido, Reserva
+
+
+class Command(BaseCommand):
+    help = 'Genera un volumen grande de datos de prueba (clientes, reservas, pedidos) con inserciones en bloque'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=10000)
+        parser.add_argument('--reservas', type=int, default=100000)
+        parser.add_argument('--pedidos', type=int, default=100000)
+        parser.add_argument('--lineas', type=int, default=3, help='Líneas máximas por pedido')
+        parser.add_argument('--dias', type=int, default=180, help='Días hacia atrás en que se reparten las fechas')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por INSERT')
+        parser.add_argument('--semilla', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.azar = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.dias = options['dias']
+        self.ahora = timezone.now()
+
+        mesas = self._mesas()
+        items = self._items()
+        clientes = self._clientes(options['clientes'])
+        self._reservas(options['reservas'], clientes, mesas)
+        self._pedidos(options['pedidos'], options['lineas'], clientes, mesas, items)
+        self.stdout.write(self.style.SUCCESS('Datos generados.'))
+
+    def _fecha(self):
+        return self.ahora - timedelta(days=self.azar.randint(0, self.dias), minutes=self.azar.randint(0, 24 * 60))
+
+    def _en_lotes(self, total, fabricar):
+        """Crea ``total`` objetos llamando a ``fabricar(n)`` por lote; devuelve los pks"""
+        pks = []
+        for inicio in range(0, total, self.lote):
+            pks += [obj.pk for obj in fabricar(min(self.lote, total - inicio))]
+        return pks
+
+    def _mesas(self):
+        if Mesa.objects.count() < 30:
+            ultimo = Mesa.objects.order_by('-numero').values_list('numero', flat=True).first() or 0
+            ubicaciones = [clave for clave, _ in Mesa.UBICACION_CHOICES]
+            Mesa.objects.bulk_create([
+                Mesa(numero=ultimo + i, capacidad=self.azar.choice([2, 4, 6, 8]),
+                     ubicacion=self.azar.choice(ubicaciones))
+                for i in range(1, 31)
+            ])
+        return list(Mesa.objects.values_list('pk', 'capacidad'))
+
+    def _items(self):
+        if not Item.objects.exists():
+            categoria, _ = CategoriaItem.objects.get_or_create(nombre='Generados')
+            Item.objects.bulk_create([
+                Item(nombre=f'Item {i}', descripcion='Generado', categoria=categoria,
+                     precio=Decimal(self.azar.randint(10, 200) * 100))
+                for i in range(1, 51)
+            ])
+        return list(Item.objects.values_list('pk', 'precio'))
+
+    def _clientes(self, total):
+        def fabricar(n):
+            return Cliente.objects.bulk_create([
+                Cliente(nombre=f'Cliente {self.azar.randint(1, 10 ** 9)}',
+                        telefono=f'+569{self.azar.randint(10 ** 7, 10 ** 8 - 1)}')
+                for _ in range(n)
+            ])
+        pks = self._en_lotes(total, fabricar)
+        self.stdout.write(f'{len(pks)} clientes')
+        return pks or list(Cliente.objects.values_list('pk', flat=True)[:1000])
+
+    def _reservas(self, total, clientes, mesas):
+        estados = [clave for clave, _ in Reserva.ESTADO_CHOICES]
+
+        def fabricar(n):
+            reservas = []
+            for _ in range(n):
+                mesa, capacidad = self.azar.choice(mesas)
+                reservas.append(Reserva(
+                    cliente_id=self.azar.choice(clientes), mesa_id=mesa,
+                    numero_personas=self.azar.randint(1, capacidad),
+                    fecha_reserva=self._fecha(), estado=self.azar.choice(estados),
+                ))
+            return Reserva.objects.bulk_create(reservas)
+        self.stdout.write(f'{len(self._en_lotes(total, fabricar))} reservas')
+
+    def _pedidos(self, total, max_lineas, clientes, mesas, items):
+        estados = [clave for clave, _ in Pedido.ESTADO_CHOICES]
+        lineas = 0
+
+        def fabricar(n):
+            nonlocal lineas
+            pedidos = Pedido.objects.bulk_create([
+                Pedido(mesa_id=self.azar.choice(mesas)[0], cliente_id=self.azar.choice(clientes),
+                       estado=self.azar.choice(estados))
+                for _ in range(n)
+            ])
+            detalles = []
+            for pedido in pedidos:
+                # auto_now_add pisa la fecha en el INSERT; se reparte con un UPDATE en bloque
+                pedido.fecha_pedido = self._fecha()
+                pedido.total = Decimal('0')
+                for _ in range(self.azar.randint(1, max_lineas)):
+                    item, precio = self.azar.choice(items)
+                    cantidad = self.azar.randint(1, 4)
+                    detalles.append(DetallePedido(
+                        pedido=pedido, item_id=item, cantidad=cantidad,
+                        precio_unitario=precio, subtotal=precio * cantidad,
+                    ))
+                    pedido.total += precio * cantidad
+            Pedido.objects.bulk_update(pedidos, ['fecha_pedido', 'total'], batch_size=1000)
+            DetallePedido.objects.bulk_create(detalles)
+            lineas += len(detalles)
+            return pedidos
+        self.stdout.write(f'{len(self._en_lotes(total, fabricar))} pedidos, {lineas} líneas')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from index.idempotencia import purgar_vencidas
+
+
+class Command(BaseCommand):
+    help = "Borra las respuestas idempotentes más viejas que IDEMPOTENCIA_TTL"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f'{purgar_vencidas()} respuestas idempotentes borradas.'))
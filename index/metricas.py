@@ -0,0 +1,67 @@
+"""Métricas de conexiones a base de datos por proceso (worker)."""
+import os
+import threading
+import time
+
+from django.db import connections
+
+_lock = threading.Lock()
+_conexiones_creadas = {}
+_inicio = time.monotonic()
+
+
+def registrar_conexion(sender, connection, **kwargs):
+    """Receptor de ``connection_created``: cuenta conexiones abiertas por alias."""
+    with _lock:
+        _conexiones_creadas[connection.alias] = _conexiones_creadas.get(connection.alias, 0) + 1
+
+
+def resumen_pool(stats):
+    """Normaliza ``ConnectionPool.get_stats()`` a las métricas que exponemos."""
+    tamano = stats.get('pool_size', 0)
+    disponibles = stats.get('pool_available', 0)
+    solicitudes = stats.get('requests_num', 0)
+    espera_ms = stats.get('requests_wait_ms', 0)
+    return {
+        'modo': 'pool',
+        'min': stats.get('pool_min'),
+        'max': stats.get('pool_max'),
+        'en_uso': tamano - disponibles,
+        'ociosas': disponibles,
+        'en_espera': stats.get('requests_waiting', 0),
+        'solicitudes': solicitudes,
+        'espera_total_ms': espera_ms,
+        'espera_media_ms': round(espera_ms / solicitudes, 2) if solicitudes else 0,
+        'timeouts': stats.get('requests_errors', 0),
+        'conexiones_perdidas': stats.get('connections_lost', 0),
+        'devueltas_invalidas': stats.get('returns_bad', 0),
+    }
+
+
+def estadisticas_alias(alias):
+    conexion = connections[alias]
+    pool = getattr(conexion, 'pool', None)
+    if pool is not None:
+        datos = resumen_pool(pool.get_stats())
+    else:
+        # Sin pool (SQLite, MySQL o PostgreSQL sin DB_POOL): conexión persistente por hilo
+        datos = {
+            'modo': 'persistente',
+            'conn_max_age': conexion.settings_dict.get('CONN_MAX_AGE'),
+            'en_uso': int(conexion.connection is not None and conexion.in_atomic_block),
+            'ociosas': int(conexion.connection is not None and not conexion.in_atomic_block),
+        }
+    datos['motor'] = conexion.vendor
+    datos['health_checks'] = bool(conexion.settings_dict.get('CONN_HEALTH_CHECKS'))
+    with _lock:
+        datos['conexiones_creadas'] = _conexiones_creadas.get(alias, 0)
+    return datos
+
+
+def estadisticas_db():
+    """Métricas de todas las bases configuradas para el proceso actual."""
+    return {
+        'pid': os.getpid(),
+        'uptime_s': round(time.monotonic() - _inicio, 1),
+        'bases': {alias: estadisticas_alias(alias) for alias in connections},
+    }
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespuestaIdempotente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True, verbose_name='Clave')),
+                ('completa', models.BooleanField(default=False, verbose_name='Completa')),
+                ('status', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Status')),
+                ('cabeceras', models.JSONField(blank=True, default=dict, verbose_name='Cabeceras')),
+                ('contenido', models.BinaryField(blank=True, default=b'', verbose_name='Contenido')),
+                ('fecha', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Respuesta Idempotente',
+                'verbose_name_plural': 'Respuestas Idempotentes',
+            },
+        ),
+    ]
@@ -1,3 +1,27 @@
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
+
+class RespuestaIdempotente(models.Model):
+    """
+    Respuesta de una solicitud con clave de idempotencia (index/idempotencia.py).
+    Mientras la vista se ejecuta la fila existe sin respuesta (``completa=False``)
+    y su clave única impide que una repetición simultánea la ejecute otra vez.
+    """
+    clave = models.CharField(max_length=64, unique=True, verbose_name='Clave')  # sha256(usuario, método, ruta, token)
+    completa = models.BooleanField(default=False, verbose_name='Completa')
+    status = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Status')
+    cabeceras = models.JSONField(default=dict, blank=True, verbose_name='Cabeceras')
+    contenido = models.BinaryField(default=b'', blank=True, verbose_name='Contenido')
+    fecha = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='Fecha')
+
+    class Meta:
+        verbose_name = 'Respuesta Idempotente'
+        verbose_name_plural = 'Respuestas Idempotentes'
+
+    def __str__(self):
+        return f"{self.clave[:12]} ({self.status or 'en proceso'})"
+
+    def como_dict(self):
+        return {'status': self.status, 'cabeceras': self.cabeceras, 'contenido': bytes(self.contenido)}
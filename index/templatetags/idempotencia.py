@@ -0,0 +1,14 @@
+import uuid
+
+from django import template
+from django.utils.html import format_html
+
+from index.idempotencia import CAMPO
+
+register = template.Library()
+
+
+@register.simple_tag
+def campo_idempotencia():
+    """Campo oculto con un token nuevo por cada vez que se muestra el formulario"""
+    return format_html('<input type="hidden" name="{}" value="{}">', CAMPO, uuid.uuid4().hex)
@@ -5,4 +5,5 @@ urlpatterns = [
     # Página principal
     path('', IndexView.as_view(), name='index'),
     path('admin/', sitio_admin, name='sitio_admin'),
+    path('metricas/db/', metricas_db, name='metricas_db'),
 ]
\ No newline at end of file
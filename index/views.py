@@ -1,8 +1,12 @@
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse
+from django.utils.crypto import constant_time_compare
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
+from .metricas import estadisticas_db
 
 # Create your views here.
 
@@ -17,5 +21,13 @@ class IndexView(LoginRequiredMixin, TemplateView):
 def sitio_admin(request):
     return redirect(reverse('admin:index'))
 
+def metricas_db(request):
+    """Métricas del pool de conexiones del worker que atiende la solicitud."""
+    token = settings.METRICAS_TOKEN
+    autorizacion = request.headers.get('Authorization', '')
+    if not (request.user.is_staff or (token and constant_time_compare(autorizacion, f'Bearer {token}'))):
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+    return JsonResponse(estadisticas_db())
+
 def handler404(request, exception):
     return render(request, 'error_404.html', status=404)
@@ -0,0 +1,109 @@
+/*
+ * Autocompletado para <select data-autocompletar="url">.
+ * El select solo trae la opción elegida; al escribir se consulta el endpoint
+ * JSON ({resultados: [{id, texto}]}) y la opción elegida se agrega al select,
+ * que es lo que se envía con el formulario.
+ * data-filtro-<param>="#selector" agrega el valor de otro campo a la consulta.
+ */
+(function () {
+    'use strict';
+
+    var ESPERA_MS = 250;
+
+    function filtros(select) {
+        var params = {};
+        Object.keys(select.dataset).forEach(function (clave) {
+            if (clave.indexOf('filtro') === 0) {
+                var campo = document.querySelector(select.dataset[clave]);
+                var nombre = clave.slice('filtro'.length).toLowerCase();
+                if (campo && campo.value) {
+                    params[nombre] = campo.value;
+                }
+            }
+        });
+        return params;
+    }
+
+    function elegir(select, buscador, lista, resultado) {
+        var opcion = Array.prototype.find.call(select.options, function (o) {
+            return o.value === String(resultado.id);
+        });
+        if (!opcion) {
+            opcion = new Option(resultado.texto, resultado.id);
+            select.add(opcion);
+        }
+        select.value = String(resultado.id);
+        select.dispatchEvent(new Event('change', { bubbles: true }));
+        buscador.value = '';
+        lista.innerHTML = '';
+    }
+
+    function iniciar(select) {
+        if (select.disabled) {
+            return;  // Campo pre-seleccionado por la vista
+        }
+        var buscador = document.createElement('input');
+        buscador.type = 'search';
+        buscador.className = 'form-control form-control-sm mb-1';
+        buscador.placeholder = 'Escriba para buscar...';
+        buscador.autocomplete = 'off';
+
+        var lista = document.createElement('div');
+        lista.className = 'list-group position-absolute w-100 shadow-sm';
+        lista.style.zIndex = 1050;
+
+        var contenedor = document.createElement('div');
+        contenedor.className = 'position-relative';
+        contenedor.appendChild(buscador);
+        contenedor.appendChild(lista);
+        select.parentNode.insertBefore(contenedor, select);
+
+        var temporizador = null;
+        var consulta = 0;
+
+        buscador.addEventListener('input', function () {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(function () {
+                var termino = buscador.value.trim();
+                if (!termino && !Object.keys(filtros(select)).length) {
+                    lista.innerHTML = '';
+                    return;
+                }
+                var params = new URLSearchParams(filtros(select));
+                params.set('q', termino);
+                var numero = ++consulta;
+                fetch(select.dataset.autocompletar + '?' + params.toString(), {
+                    headers: { 'Accept': 'application/json' },
+                    credentials: 'same-origin'
+                })
+                    .then(function (respuesta) { return respuesta.json(); })
+                    .then(function (datos) {
+                        if (numero !== consulta) {
+                            return;  // Llegó una respuesta más nueva
+                        }
+                        lista.innerHTML = '';
+                        datos.resultados.forEach(function (resultado) {
+                            var boton = document.createElement('button');
+                            boton.type = 'button';
+                            boton.className = 'list-group-item list-group-item-action py-1';
+                            boton.textContent = resultado.texto;
+                            boton.addEventListener('click', function () {
+                                elegir(select, buscador, lista, resultado);
+                            });
+                            lista.appendChild(boton);
+                        });
+                    });
+            }, ESPERA_MS);
+        });
+
+        buscador.addEventListener('keydown', function (evento) {
+            if (evento.key === 'Escape') {
+                lista.innerHTML = '';
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select[data-autocompletar]').forEach(iniciar);
+    });
+})();
@@ -0,0 +1,12 @@
+from django.contrib import admin
+from .models import Sucursal
+
+
+@admin.register(Sucursal)
+class SucursalAdmin(admin.ModelAdmin):
+    """Administración de Sucursales"""
+    list_display = ['nombre', 'codigo', 'direccion', 'activa']
+    list_filter = ['activa']
+    search_fields = ['nombre', 'codigo']
+    prepopulated_fields = {'codigo': ['nombre']}
+    filter_horizontal = ['usuarios']
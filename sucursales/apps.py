@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class SucursalesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sucursales'
+
+    def ready(self):
+        from django.db.models.signals import m2m_changed
+        from .models import Sucursal, usuarios_cambiados
+
+        m2m_changed.connect(usuarios_cambiados, sender=Sucursal.usuarios.through, dispatch_uid='sucursales_usuarios')
@@ -0,0 +1,96 @@
+"""
+Sucursal en curso.
+
+Cada solicitud corre dentro de una sucursal (``SucursalMiddleware``) y los
+modelos por sucursal (``PorSucursal``) filtran por ella en su manager y la
+asignan por defecto a las filas nuevas. Fuera de una solicitud (comandos,
+tareas, migraciones) no hay sucursal en curso: las consultas ven todas y las
+filas nuevas van a ``SUCURSAL_POR_DEFECTO``, salvo dentro de
+``usar_sucursal()`` o ``en_cada_sucursal()``.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+CLAVE_CACHE = 'sucursales'
+CLAVE_CACHE_USUARIO = 'sucursales:usuario:'
+VIGENCIA = 3600
+
+_sucursal = ContextVar('sucursal', default=None)
+
+
+def sucursal_actual():
+    """Id de la sucursal en curso o ``None``"""
+    return _sucursal.get()
+
+
+@contextmanager
+def usar_sucursal(sucursal):
+    """Corre el bloque dentro de ``sucursal`` (instancia o id)"""
+    token = _sucursal.set(getattr(sucursal, 'pk', sucursal))
+    try:
+        yield
+    finally:
+        _sucursal.reset(token)
+
+
+def sucursal_por_defecto():
+    """Default de ``PorSucursal.sucursal``: la sucursal en curso, sin consultar la base"""
+    return sucursal_actual() or settings.SUCURSAL_POR_DEFECTO
+
+
+def sucursales():
+    """``{id: (codigo, nombre)}`` de las sucursales activas, desde la caché"""
+    from .models import Sucursal
+
+    def armar():
+        # SELECT id, codigo, nombre FROM sucursales_sucursal WHERE activa ORDER BY nombre
+        return {
+            pk: (codigo, nombre)
+            for pk, codigo, nombre in Sucursal.objects.filter(activa=True).values_list('pk', 'codigo', 'nombre')
+        }
+
+    return cache.get_or_set(CLAVE_CACHE, armar, VIGENCIA)
+
+
+def invalidar_sucursales():
+    cache.delete(CLAVE_CACHE)
+
+
+def sucursales_de_usuario(usuario):
+    """
+    Ids de las sucursales activas en que puede trabajar ``usuario``: las
+    asignadas (``Sucursal.usuarios``, desde la caché), la por defecto si no
+    tiene ninguna asignada o todas si es superusuario.
+    """
+    from .models import Sucursal
+
+    activas = sucursales()
+    if usuario.is_superuser:
+        return set(activas)
+
+    def armar():
+        # SELECT sucursal_id FROM sucursales_sucursal_usuarios WHERE user_id = %s
+        return list(Sucursal.usuarios.through.objects.filter(user_id=usuario.pk).values_list('sucursal_id', flat=True))
+
+    asignadas = cache.get_or_set(f'{CLAVE_CACHE_USUARIO}{usuario.pk}', armar, VIGENCIA)
+    return {pk for pk in asignadas or [settings.SUCURSAL_POR_DEFECTO] if pk in activas}
+
+
+def invalidar_sucursales_de_usuarios(usuarios):
+    cache.delete_many([f'{CLAVE_CACHE_USUARIO}{pk}' for pk in usuarios])
+
+
+def codigo_sucursal(pk=None):
+    """Código de la sucursal ``pk`` (por defecto, la en curso)"""
+    pk = pk or sucursal_por_defecto()
+    return sucursales().get(pk, (str(pk), ''))[0]
+
+
+def en_cada_sucursal():
+    """Recorre las sucursales activas, cada vuelta dentro de su sucursal (para tareas y comandos)"""
+    for pk in list(sucursales()):
+        with usar_sucursal(pk):
+            yield pk
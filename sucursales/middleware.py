@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.http import HttpResponseForbidden, JsonResponse
+
+from .contexto import sucursales, sucursales_de_usuario, usar_sucursal
+
+CLAVE_SESION = 'sucursal'
+CABECERA = 'X-Sucursal'
+
+
+class SucursalMiddleware:
+    """
+    Corre cada solicitud dentro de su sucursal: la de la cabecera
+    ``X-Sucursal`` (código, para las tablets), la elegida en la sesión o
+    ``SUCURSAL_POR_DEFECTO`` (o, si el usuario no trabaja en ella, la primera
+    de las suyas). Un usuario autenticado solo entra a sus sucursales
+    (``sucursales_de_usuario``); si pide otra, 403. Va después de
+    ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        codigo = request.headers.get(CABECERA)
+        if codigo:
+            sucursal = next((pk for pk, (valor, _) in sucursales().items() if valor == codigo), None)
+            if sucursal is None:
+                return JsonResponse({'error': f'Sucursal desconocida: {codigo}'}, status=400)
+        else:
+            sucursal = request.session.get(CLAVE_SESION)
+        if request.user.is_authenticated:
+            # Desde la caché: no se consulta la base en cada solicitud
+            permitidas = sucursales_de_usuario(request.user)
+            if sucursal is None:
+                por_defecto = settings.SUCURSAL_POR_DEFECTO
+                sucursal = por_defecto if por_defecto in permitidas else min(permitidas, default=None)
+            if sucursal not in permitidas:
+                if codigo:
+                    return JsonResponse({'error': f'No tiene acceso a la sucursal {codigo}.'}, status=403)
+                # La sucursal de la sesión dejó de ser suya: se olvida y la próxima solicitud usa la por defecto
+                request.session.pop(CLAVE_SESION, None)
+                return HttpResponseForbidden('No tiene acceso a esta sucursal.')
+        sucursal = sucursal or settings.SUCURSAL_POR_DEFECTO
+        request.sucursal_id = sucursal
+        with usar_sucursal(sucursal):
+            return self.get_response(request)
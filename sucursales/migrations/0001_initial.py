@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:01
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+def crear_principal(apps, schema_editor):
+    """Sucursal a la que pasan las mesas, pedidos, items, etc. existentes"""
+    Sucursal = apps.get_model('sucursales', 'Sucursal')
+    Sucursal.objects.using(schema_editor.connection.alias).get_or_create(
+        pk=settings.SUCURSAL_POR_DEFECTO, defaults={'nombre': 'Principal', 'codigo': 'principal'},
+    )
+    # El id se fijó a mano: la secuencia (PostgreSQL) sigue desde el máximo
+    for sql in schema_editor.connection.ops.sequence_reset_sql(no_style(), [Sucursal]):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sucursal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('codigo', models.SlugField(help_text='Identifica la sucursal en la cabecera X-Sucursal y en las impresoras', max_length=30, unique=True, verbose_name='Código')),
+                ('direccion', models.CharField(blank=True, max_length=200, verbose_name='Dirección')),
+                ('activa', models.BooleanField(default=True, verbose_name='Activa')),
+            ],
+            options={
+                'verbose_name': 'Sucursal',
+                'verbose_name_plural': 'Sucursales',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.RunPython(crear_principal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sucursales', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sucursal',
+            name='usuarios',
+            field=models.ManyToManyField(blank=True, help_text='Quiénes trabajan en la sucursal. Un usuario sin sucursales trabaja solo en la por defecto; los superusuarios, en todas.', related_name='sucursales', to=settings.AUTH_USER_MODEL, verbose_name='Usuarios'),
+        ),
+    ]
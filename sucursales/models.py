@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.db import models
+
+from .contexto import invalidar_sucursales, invalidar_sucursales_de_usuarios, sucursal_actual, sucursal_por_defecto
+
+# Create your models here.
+
+
+class Sucursal(models.Model):
+    """Local del restaurante; todos se atienden desde el mismo despliegue y la misma base"""
+    nombre = models.CharField(max_length=100, unique=True, verbose_name='Nombre')
+    codigo = models.SlugField(max_length=30, unique=True, verbose_name='Código',
+                              help_text='Identifica la sucursal en la cabecera X-Sucursal y en las impresoras')
+    direccion = models.CharField(max_length=200, blank=True, verbose_name='Dirección')
+    activa = models.BooleanField(default=True, verbose_name='Activa')
+    usuarios = models.ManyToManyField(
+        settings.AUTH_USER_MODEL, blank=True, related_name='sucursales', verbose_name='Usuarios',
+        help_text='Quiénes trabajan en la sucursal. Un usuario sin sucursales trabaja solo en la por defecto; '
+                  'los superusuarios, en todas.',
+    )
+
+    class Meta:
+        verbose_name = 'Sucursal'
+        verbose_name_plural = 'Sucursales'
+        ordering = ['nombre']
+
+    def __str__(self):
+        return self.nombre
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidar_sucursales()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        invalidar_sucursales()
+        return resultado
+
+
+def usuarios_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+    """``m2m_changed`` de ``Sucursal.usuarios``: olvida las sucursales en caché de los usuarios tocados"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        usuarios = [instance.pk]
+    elif action == 'pre_clear':
+        usuarios = list(instance.usuarios.values_list('pk', flat=True))
+    else:
+        usuarios = pk_set
+    invalidar_sucursales_de_usuarios(usuarios)
+
+
+class PorSucursalManager(models.Manager):
+    """Filtra por la sucursal en curso; sin sucursal en curso devuelve todas las filas"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        sucursal = sucursal_actual()
+        return queryset if sucursal is None else queryset.filter(sucursal_id=sucursal)
+
+
+class DeSucursalManager(models.Manager):
+    """
+    Manager por defecto de los modelos sin sucursal propia que pertenecen a la
+    de otra fila (las líneas y los pagos, a la de su pedido): filtra por la
+    ruta ``RUTA_SUCURSAL`` del modelo (ej. ``'pedido__sucursal'``) con la
+    sucursal en curso; sin sucursal en curso devuelve todas las filas.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        sucursal = sucursal_actual()
+        return queryset if sucursal is None else queryset.filter(**{f'{self.model.RUTA_SUCURSAL}_id': sucursal})
+
+
+class PorSucursal(models.Model):
+    """
+    Modelo que pertenece a una sucursal. ``objects`` (el manager por defecto,
+    también en los related managers, formularios y el admin) ve solo la
+    sucursal en curso; ``todas`` ve todas. El campo no lleva índice propio:
+    cada modelo declara los suyos empezando por ``sucursal``.
+    """
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.PROTECT, default=sucursal_por_defecto, editable=False,
+                                 db_index=False, related_name='+', verbose_name='Sucursal')
+
+    objects = PorSucursalManager()
+    todas = models.Manager()
+
+    class Meta:
+        abstract = True
+
+    def _sin_excluir_sucursal(self, exclude):
+        # Los formularios no incluyen el campo, pero las restricciones únicas por sucursal se validan igual
+        return None if exclude is None else set(exclude) - {'sucursal'}
+
+    def validate_unique(self, exclude=None):
+        super().validate_unique(exclude=self._sin_excluir_sucursal(exclude))
+
+    def validate_constraints(self, exclude=None):
+        super().validate_constraints(exclude=self._sin_excluir_sucursal(exclude))
@@ -0,0 +1,230 @@
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import CheckConstraint
+from django.test import TestCase, Client as TestClient, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from cocina.inventario import descontar_stock
+from cocina.menu import items_disponibles
+from cocina.models import CategoriaItem, Item, EstacionCocina, Ingrediente, IngredienteItem
+from comedor.dashboard import calcular_kpis, obtener_kpis
+from comedor.forms import MesaForm
+from comedor.models import (Mesa, GrupoReserva, EsperaMesa, Reserva, Pedido, DetallePedido, CierreCaja, Ticket,
+                            RotacionMesa, Pronostico, Pago, EventoEstado, OperacionCliente)
+from comedor.pronosticos import pronosticar_demanda
+from comedor.rotacion import registrar_duracion
+from .contexto import sucursal_actual, usar_sucursal
+from .middleware import CLAVE_SESION
+from .models import Sucursal
+
+MODELOS_POR_SUCURSAL = [Mesa, GrupoReserva, EsperaMesa, Reserva, Pedido, CierreCaja, RotacionMesa, Pronostico, EventoEstado,
+                        OperacionCliente, CategoriaItem, Item, EstacionCocina, Ingrediente]
+
+
+class SucursalesTest(TestCase):
+    """Tests para el alcance por sucursal de mesas, reservas, pedidos y menú"""
+
+    def setUp(self):
+        cache.clear()
+        self.principal = Sucursal.objects.get(codigo='principal')
+        self.centro = Sucursal.objects.create(nombre='Centro', codigo='centro')
+        Mesa.objects.create(numero=1, capacidad=4, ubicacion='terraza')
+        with usar_sucursal(self.centro):
+            self.mesa_centro = Mesa.objects.create(numero=1, capacidad=2, ubicacion='barra')
+
+    def test_manager_filtra_y_asigna(self):
+        """Test: Dentro de una sucursal solo se ven sus filas y las nuevas quedan en ella"""
+        self.assertEqual(self.mesa_centro.sucursal_id, self.centro.pk)
+        self.assertEqual(Mesa.objects.count(), 2)  # Sin sucursal en curso: todas
+        with usar_sucursal(self.centro):
+            self.assertEqual(list(Mesa.objects.values_list('capacidad', flat=True)), [2])
+            self.assertEqual(Mesa.todas.count(), 2)
+        with usar_sucursal(self.principal):
+            self.assertEqual(Mesa.objects.get(numero=1).capacidad, 4)
+        self.assertIsNone(sucursal_actual())
+
+    def test_numero_unico_por_sucursal(self):
+        """Test: El número de mesa se repite entre sucursales pero no dentro de una"""
+        with usar_sucursal(self.centro):
+            form = MesaForm({'numero': 1, 'capacidad': 2, 'ubicacion': 'terraza'})
+            self.assertFalse(form.is_valid())
+            self.assertIn('Ya existe una mesa con ese número en esta sucursal.', str(form.errors))
+            self.assertTrue(MesaForm({'numero': 2, 'capacidad': 2, 'ubicacion': 'terraza'}).is_valid())
+
+    def test_indices_empiezan_por_sucursal(self):
+        """Test: Todo índice o restricción única de un modelo por sucursal empieza por la sucursal"""
+        for modelo in MODELOS_POR_SUCURSAL:
+            indices = [*modelo._meta.indexes, *modelo._meta.constraints]
+            self.assertTrue(indices, modelo.__name__)
+            for indice in indices:
+                if isinstance(indice, CheckConstraint):
+                    continue  # No es un índice
+                self.assertEqual(indice.fields[0], 'sucursal', f'{modelo.__name__}: {indice.name}')
+
+    def test_cabecera_y_sesion(self):
+        """Test: Las tablets eligen sucursal con X-Sucursal; el navegador, con la sesión"""
+        mozo = User.objects.create_user(username='mozo', password='mozo123')
+        self.principal.usuarios.add(mozo)
+        self.centro.usuarios.add(mozo)
+        client = TestClient()
+        client.login(username='mozo', password='mozo123')
+        url = reverse('api:leer_recurso', args=['mesas'])
+
+        datos = client.get(url, {'fields': 'capacidad'}).json()['data']
+        self.assertEqual([fila['capacidad'] for fila in datos], [4])  # Sucursal por defecto
+        datos = client.get(url, {'fields': 'capacidad'}, HTTP_X_SUCURSAL='centro').json()['data']
+        self.assertEqual([fila['capacidad'] for fila in datos], [2])
+        self.assertEqual(client.get(url, HTTP_X_SUCURSAL='norte').status_code, 400)
+
+        response = client.post(reverse('sucursales:cambiar_sucursal'), {'sucursal': self.centro.pk, 'next': url})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(client.session[CLAVE_SESION], self.centro.pk)
+        datos = client.get(url, {'fields': 'capacidad'}).json()['data']
+        self.assertEqual([fila['capacidad'] for fila in datos], [2])
+        client.post(reverse('sucursales:cambiar_sucursal'), {'sucursal': 9999})
+        self.assertEqual(client.session[CLAVE_SESION], self.centro.pk)
+
+    def test_solo_sus_sucursales(self):
+        """Test: Cada usuario entra solo a sus sucursales, por cabecera o por sesión; si no, 403"""
+        caja = User.objects.create_user(username='caja', password='caja123')
+        client = TestClient()
+        client.login(username='caja', password='caja123')
+        url = reverse('api:leer_recurso', args=['mesas'])
+
+        # Sin sucursales asignadas trabaja solo en la por defecto
+        datos = client.get(url, {'fields': 'capacidad'}).json()['data']
+        self.assertEqual([fila['capacidad'] for fila in datos], [4])
+        self.assertEqual(client.get(url, HTTP_X_SUCURSAL='centro').status_code, 403)
+        self.assertEqual(client.post(reverse('sucursales:cambiar_sucursal'), {'sucursal': self.centro.pk}).status_code, 403)
+        self.assertNotIn(CLAVE_SESION, client.session)
+
+        # Asignada solo al centro: esa es su sucursal por defecto y la principal le queda vedada
+        self.centro.usuarios.add(caja)
+        datos = client.get(url, {'fields': 'capacidad'}).json()['data']
+        self.assertEqual([fila['capacidad'] for fila in datos], [2])
+        self.assertEqual(client.get(url, HTTP_X_SUCURSAL='principal').status_code, 403)
+        client.post(reverse('sucursales:cambiar_sucursal'), {'sucursal': self.centro.pk})
+
+        # Al quitarle la sucursal elegida, la sesión la olvida
+        caja.sucursales.remove(self.centro)
+        self.assertEqual(client.get(url).status_code, 403)
+        self.assertNotIn(CLAVE_SESION, client.session)
+        self.assertEqual(client.get(url).status_code, 200)
+
+        caja.is_superuser = True
+        caja.save()
+        self.assertEqual(client.get(url, HTTP_X_SUCURSAL='centro').status_code, 200)
+
+    def test_claves_de_cache_por_sucursal(self):
+        """Test: El menú y los KPI en caché no se mezclan entre sucursales"""
+        Item.objects.create(nombre='Lomo', descripcion='', precio=Decimal('12000'))
+        with usar_sucursal(self.centro):
+            Item.objects.create(nombre='Chorrillana', descripcion='', precio=Decimal('9000'))
+            self.assertEqual([nombre for _, nombre, _ in items_disponibles()], ['Chorrillana'])
+            self.assertEqual(obtener_kpis()['ocupacion'][0]['nombre'], 'Barra')
+        with usar_sucursal(self.principal):
+            self.assertEqual([nombre for _, nombre, _ in items_disponibles()], ['Lomo'])
+            self.assertEqual(obtener_kpis()['ocupacion'][0]['nombre'], 'Terraza')
+
+    def test_lineas_de_otra_sucursal(self):
+        """Test: Las líneas de pedido no se leen, editan ni completan desde otra sucursal"""
+        item = Item.objects.create(nombre='Lomo', descripcion='', precio=Decimal('12000'))
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido = Pedido.objects.create(mesa=Mesa.objects.get(numero=1, sucursal=self.principal), estado='en_curso')
+        linea = DetallePedido.objects.create(pedido=pedido, item=item, cantidad=1, precio_unitario=item.precio)
+        self.centro.usuarios.add(User.objects.create_user(username='cocinero', password='cocinero123'))
+        client = TestClient()
+        client.login(username='cocinero', password='cocinero123')
+
+        response = client.get(reverse('api:leer_recurso', args=['detalles']), {'ids': str(linea.pk)}, HTTP_X_SUCURSAL='centro')
+        self.assertEqual(response.json()['data'], [])
+        operacion = {'recurso': 'detalles', 'accion': 'actualizar', 'id': linea.pk, 'datos': {'cantidad': 5}}
+        response = client.post(reverse('api:lote'), json.dumps({'operaciones': [operacion]}),
+                               content_type='application/json', HTTP_X_SUCURSAL='centro')
+        self.assertEqual(response.status_code, 400)
+
+        # Las líneas, pagos, tickets y eventos del pedido se ven solo desde su sucursal, sin filtrar a mano
+        Pago.objects.create(pedido=pedido, monto=Decimal('1000'))
+        Ticket.objects.create(pedido=pedido, tipo='cuenta', impresora='caja@principal')
+        with usar_sucursal(self.centro):
+            for modelo in [DetallePedido, Pago, Ticket, EventoEstado]:
+                self.assertFalse(modelo.objects.exists(), modelo.__name__)
+            self.assertFalse(pedido.detalles.exists())
+        with usar_sucursal(self.principal):
+            for modelo in [DetallePedido, Pago, Ticket, EventoEstado]:
+                self.assertTrue(modelo.objects.exists(), modelo.__name__)
+        self.assertEqual(EventoEstado.todas.get(entidad='pedido', entidad_id=pedido.pk).sucursal_id, self.principal.pk)
+        linea.refresh_from_db()
+        self.assertEqual((linea.cantidad, linea.estado_preparacion), (1, 'pendiente'))
+
+    def test_rotacion_por_sucursal(self):
+        """Test: Cada sucursal promedia la rotación de sus mesas por separado"""
+        registrar_duracion(2, 100, self.principal.pk)
+        with usar_sucursal(self.centro):
+            RotacionMesa.objects.create(capacidad=2, minutos=30, muestras=5)
+            self.mesa_centro.estado = 'ocupada'
+            self.mesa_centro.save()
+        self.assertEqual(self.mesa_centro.liberacion_estimada - self.mesa_centro.ocupada_desde, timedelta(minutes=30))
+        self.assertEqual(RotacionMesa.todas.get(sucursal=self.principal, capacidad=2).muestras, 1)
+        self.assertEqual(RotacionMesa.todas.get(sucursal=self.centro, capacidad=2).muestras, 5)
+
+    def test_pronostico_por_sucursal(self):
+        """Test: Cada sucursal se pronostica con su historial y reemplaza solo sus filas"""
+        ahora = timezone.make_aware(datetime(2026, 10, 19, 10, 0))
+        with usar_sucursal(self.centro):
+            item = Item.objects.create(nombre='Chorrillana', descripcion='', precio=Decimal('9000'))
+            pedido = Pedido.objects.create(mesa=self.mesa_centro, estado='pagado', comensales=3)
+            DetallePedido.objects.create(pedido=pedido, item=item, cantidad=2, precio_unitario=item.precio)
+        Pedido.todas.filter(pk=pedido.pk).update(fecha_pedido=ahora + timedelta(hours=1) - timedelta(weeks=1))
+
+        self.assertEqual(pronosticar_demanda(ahora=ahora, semanas=1, horizonte=1)['filas'], 2 * 24 + 1)
+        with usar_sucursal(self.principal):
+            pronosticar_demanda(ahora=ahora, semanas=1, horizonte=1)
+            self.assertFalse(Pronostico.objects.filter(item__isnull=False).exists())
+            self.assertEqual(calcular_kpis(ahora=ahora)['pronostico']['items'], [])
+        with usar_sucursal(self.centro):
+            self.assertEqual(Pronostico.objects.get(item=item).cantidad, 2)
+            self.assertEqual(calcular_kpis(ahora=ahora)['pronostico']['items'], [{'nombre': 'Chorrillana', 'cantidad': 2}])
+        self.assertEqual(Pronostico.todas.filter(item__isnull=True).count(), 2 * 24)
+
+    def test_ingredientes_por_sucursal(self):
+        """Test: Cada sucursal tiene su stock; las recetas y los agotados no cruzan sucursales"""
+        pan = Ingrediente.objects.create(nombre='Pan', stock=Decimal('5'))
+        sandwich = Item.objects.create(nombre='Sándwich', descripcion='', precio=Decimal('5000'))
+        with usar_sucursal(self.centro):
+            pan_centro = Ingrediente.objects.create(nombre='Pan', stock=Decimal('2'))
+            with self.assertRaises(ValidationError):
+                Ingrediente(nombre='Pan').validate_constraints()
+            burger = Item.objects.create(nombre='Burger', descripcion='', precio=Decimal('8000'))
+            IngredienteItem.objects.create(item=burger, ingrediente=pan_centro, cantidad=Decimal('1'))
+        with self.assertRaises(ValidationError):
+            IngredienteItem.objects.create(item=sandwich, ingrediente=pan_centro, cantidad=Decimal('2'))
+        # Una receta cruzada anterior a la validación tampoco agota items de otra sucursal
+        IngredienteItem.objects.bulk_create([IngredienteItem(item=sandwich, ingrediente=pan_centro, cantidad=Decimal('2'))])
+
+        with usar_sucursal(self.principal):
+            self.assertEqual(descontar_stock([(burger.pk, 1)]), 0)
+        pan.refresh_from_db()
+        pan_centro.refresh_from_db()
+        sandwich.refresh_from_db()
+        self.assertEqual((pan.stock, pan_centro.stock), (Decimal('5'), Decimal('1')))
+        self.assertTrue(sandwich.disponible)
+
+    @override_settings(TICKETS_IMPRESORAS={'default': {'BACKEND': 'comedor.tickets.MemoriaBackend'}})
+    def test_estaciones_e_impresoras_por_sucursal(self):
+        """Test: Cada sucursal planifica en sus estaciones e imprime en sus impresoras"""
+        with usar_sucursal(self.centro):
+            item = Item.objects.create(nombre='Chorrillana', descripcion='', precio=Decimal('9000'))
+            pedido = Pedido.objects.create(mesa=self.mesa_centro)
+            with self.captureOnCommitCallbacks(execute=True):
+                linea = DetallePedido.objects.create(pedido=pedido, item=item, cantidad=1, precio_unitario=item.precio)
+                pedido.estado = 'en_curso'
+                pedido.save()
+        self.assertEqual(linea.estacion.sucursal_id, self.centro.pk)
+        self.assertEqual(Ticket.objects.get(pedido=pedido).impresora, 'cocina@centro')
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import cambiar_sucursal
+
+app_name = 'sucursales'
+
+urlpatterns = [
+    path('cambiar/', cambiar_sucursal, name='cambiar_sucursal'),
+]
@@ -0,0 +1,30 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+from .contexto import sucursales, sucursales_de_usuario
+from .middleware import CLAVE_SESION
+
+
+@login_required
+@require_POST
+def cambiar_sucursal(request):
+    """Guarda en la sesión la sucursal elegida (si el usuario trabaja en ella); las solicitudes siguientes corren en ella"""
+    activas = sucursales()
+    try:
+        sucursal = int(request.POST.get('sucursal', ''))
+    except ValueError:
+        sucursal = None
+    if sucursal in activas and sucursal not in sucursales_de_usuario(request.user):
+        raise PermissionDenied
+    if sucursal in activas:
+        request.session[CLAVE_SESION] = sucursal
+        messages.success(request, f'Trabajando en la sucursal {activas[sucursal][1]}.')
+    else:
+        messages.error(request, 'Elige una sucursal activa.')
+    destino = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(destino, {request.get_host()}, request.is_secure()):
+        destino = 'comedor:comedor_index'
+    return redirect(destino)
@@ -0,0 +1,29 @@
+from django.contrib import admin
+from .models import Cola, Tarea
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    """Administración de la cola de tareas"""
+    list_display = ['id', 'nombre', 'cola', 'estado', 'intentos', 'max_intentos', 'ejecutar_desde', 'tomada_por', 'fecha_fin']
+    list_filter = ['estado', 'cola']
+    search_fields = ['nombre', 'tomada_por']
+    ordering = ['-fecha_creacion']
+    list_per_page = 50
+    readonly_fields = ['intentos', 'tomada_por', 'tomada_en', 'ultimo_error', 'fecha_creacion', 'fecha_fin']
+    actions = ['reintentar']
+
+    @admin.action(description='Reintentar tareas seleccionadas')
+    def reintentar(self, request, queryset):
+        actualizadas = queryset.exclude(estado='en_proceso').update(estado='pendiente', intentos=0, ultimo_error='')
+        self.message_user(request, f'{actualizadas} tareas devueltas a la cola.')
+
+
+@admin.register(Cola)
+class ColaAdmin(admin.ModelAdmin):
+    """Colas conocidas y su último reclamo (las crean los workers)"""
+    list_display = ['nombre', 'ultimo_reclamo']
+    readonly_fields = ['nombre', 'ultimo_reclamo']
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class TareasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tareas'
+
+    def ready(self):
+        # Registra las funciones decoradas con @tarea de cada app (<app>/tareas.py)
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tareas')
@@ -0,0 +1,176 @@
+"""
+Cola de trabajos en segundo plano sobre la base de datos del proyecto.
+
+Uso:
+    # comedor/tareas.py
+    from tareas.cola import tarea
+
+    @tarea(cola='reportes', max_intentos=5)
+    def generar_reporte(fecha):
+        ...
+
+    # En una vista: se inserta en la misma transacción que el cambio de negocio
+    encolar(generar_reporte, args=['2025-11-23'])
+
+Los trabajos se ejecutan con ``python manage.py procesar_tareas``.
+"""
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Cola, Tarea
+
+logger = logging.getLogger(__name__)
+
+_registro = {}
+
+
+def tarea(nombre=None, cola='default', max_intentos=3):
+    """Registra una función como tarea encolable."""
+    def decorador(funcion):
+        clave = nombre or f'{funcion.__module__}.{funcion.__name__}'
+        _registro[clave] = funcion
+        funcion.nombre_tarea = clave
+        funcion.cola = cola
+        funcion.max_intentos = max_intentos
+        return funcion
+    return decorador
+
+
+def encolar(funcion, args=None, kwargs=None, cola=None, retraso=None):
+    """
+    Inserta un trabajo. ``funcion`` es una función decorada con ``@tarea`` o su
+    nombre registrado; ``args``/``kwargs`` deben ser serializables a JSON.
+    """
+    if isinstance(funcion, str):
+        nombre, cola_defecto, max_intentos = funcion, 'default', 3
+    else:
+        nombre, cola_defecto, max_intentos = funcion.nombre_tarea, funcion.cola, funcion.max_intentos
+    ejecutar_desde = timezone.now() + (retraso or timedelta(0))
+    return Tarea.objects.create(
+        nombre=nombre,
+        cola=cola or cola_defecto,
+        argumentos={'args': list(args or []), 'kwargs': kwargs or {}},
+        max_intentos=max_intentos,
+        ejecutar_desde=ejecutar_desde,
+    )
+
+
+def espera_reintento(intentos):
+    """Backoff exponencial: base, 2·base, 4·base... con tope ``TAREAS_BACKOFF_MAX``."""
+    segundos = settings.TAREAS_BACKOFF_BASE * 2 ** max(intentos - 1, 0)
+    return timedelta(seconds=min(segundos, settings.TAREAS_BACKOFF_MAX))
+
+
+def limite_cola(cola):
+    return settings.TAREAS_CONCURRENCIA.get(cola, settings.TAREAS_CONCURRENCIA.get('default', 1))
+
+
+def identificador_trabajador():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def reclamar(cola, trabajador, maximo=None):
+    """
+    Marca como 'en_proceso' hasta ``maximo`` tareas vencidas de ``cola`` respetando
+    el límite de concurrencia de la cola entre todos los workers.
+
+    El conteo de 'en_proceso' y el reclamo corren con la fila de la cola
+    (``Cola``) bloqueada hasta el COMMIT: dos workers no ven a la vez el mismo
+    cupo libre. Entre colas distintas no se esperan.
+
+    PostgreSQL/MySQL: ``SELECT ... FOR UPDATE SKIP LOCKED``. SQLite: sin SKIP LOCKED,
+    cada fila se toma con un UPDATE condicional sobre ``estado = 'pendiente'``; solo
+    un worker obtiene filas afectadas = 1.
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        # UPDATE tareas_cola SET ultimo_reclamo = %s WHERE nombre = %s
+        # Bloquea la fila de la cola (en SQLite, la base) hasta el COMMIT; el siguiente worker espera aquí
+        if not Cola.objects.filter(nombre=cola).update(ultimo_reclamo=ahora):
+            # Primer reclamo de la cola: se crea su fila y se bloquea igual
+            Cola.objects.get_or_create(nombre=cola)
+            Cola.objects.filter(nombre=cola).update(ultimo_reclamo=ahora)
+        en_proceso = Tarea.objects.filter(cola=cola, estado='en_proceso').count()
+        libres = limite_cola(cola) - en_proceso
+        if maximo is not None:
+            libres = min(libres, maximo)
+        if libres <= 0:
+            return []
+
+        candidatas = Tarea.objects.filter(
+            cola=cola, estado='pendiente', ejecutar_desde__lte=ahora,
+        ).order_by('ejecutar_desde', 'id')
+        cambios = {
+            'estado': 'en_proceso', 'tomada_por': trabajador, 'tomada_en': ahora,
+            'intentos': F('intentos') + 1,
+        }
+
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(candidatas.select_for_update(skip_locked=True).values_list('id', flat=True)[:libres])
+            Tarea.objects.filter(id__in=ids).update(**cambios)
+        else:
+            ids = [
+                id_tarea for id_tarea in candidatas.values_list('id', flat=True)[:libres]
+                if Tarea.objects.filter(id=id_tarea, estado='pendiente').update(**cambios)
+            ]
+    return list(Tarea.objects.filter(id__in=ids))
+
+
+def ejecutar(tarea_db):
+    """Ejecuta una tarea reclamada y registra el resultado o programa el reintento."""
+    funcion = _registro.get(tarea_db.nombre)
+    try:
+        if funcion is None:
+            raise LookupError(f'Tarea no registrada: {tarea_db.nombre}')
+        funcion(*tarea_db.argumentos.get('args', []), **tarea_db.argumentos.get('kwargs', {}))
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Falló la tarea %s (intento %s)', tarea_db.pk, tarea_db.intentos)
+        if tarea_db.intentos >= tarea_db.max_intentos:
+            cambios = {'estado': 'fallida', 'fecha_fin': timezone.now()}
+        else:
+            cambios = {'estado': 'pendiente', 'ejecutar_desde': timezone.now() + espera_reintento(tarea_db.intentos)}
+        Tarea.objects.filter(pk=tarea_db.pk).update(ultimo_error=error, **cambios)
+        return False
+    Tarea.objects.filter(pk=tarea_db.pk).update(estado='completada', fecha_fin=timezone.now(), ultimo_error='')
+    return True
+
+
+def liberar_abandonadas(timeout=None):
+    """Devuelve a 'pendiente' las tareas cuyo worker murió sin terminarlas."""
+    timeout = timeout or timedelta(seconds=settings.TAREAS_TIMEOUT)
+    return Tarea.objects.filter(
+        estado='en_proceso', tomada_en__lt=timezone.now() - timeout,
+    ).update(estado='pendiente', tomada_por='', tomada_en=None)
+
+
+def procesar_lote(colas, trabajador=None, ejecutor=None):
+    """
+    Reclama y ejecuta una ronda de tareas de cada cola. Con ``ejecutor``
+    (ThreadPoolExecutor) las tareas corren en paralelo; sin él, en serie.
+    Devuelve la cantidad de tareas procesadas.
+    """
+    trabajador = trabajador or identificador_trabajador()
+    reclamadas = [t for cola in colas for t in reclamar(cola, trabajador)]
+    if ejecutor is None:
+        for tarea_db in reclamadas:
+            ejecutar(tarea_db)
+    else:
+        list(ejecutor.map(_ejecutar_en_hilo, reclamadas))
+    return len(reclamadas)
+
+
+def _ejecutar_en_hilo(tarea_db):
+    try:
+        return ejecutar(tarea_db)
+    finally:
+        # Cada hilo abre su propia conexión; se cierra al terminar la tarea
+        connections.close_all()
@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tareas.cola import identificador_trabajador, liberar_abandonadas, procesar_lote
+
+
+class Command(BaseCommand):
+    help = 'Worker de la cola de tareas en base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cola', action='append', dest='colas',
+                            help='Cola a procesar (repetible). Por defecto todas las de TAREAS_CONCURRENCIA.')
+        parser.add_argument('--hilos', type=int, default=1,
+                            help='Tareas ejecutadas en paralelo por este worker')
+        parser.add_argument('--intervalo', type=float, default=settings.TAREAS_INTERVALO,
+                            help='Segundos de espera cuando no hay trabajo')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesa una ronda y termina (útil para cron)')
+
+    def handle(self, *args, **options):
+        colas = options['colas'] or list(settings.TAREAS_CONCURRENCIA)
+        trabajador = identificador_trabajador()
+        ejecutor = ThreadPoolExecutor(max_workers=options['hilos']) if options['hilos'] > 1 else None
+        self.stdout.write(f'Worker {trabajador} procesando colas: {", ".join(colas)}')
+
+        try:
+            while True:
+                liberadas = liberar_abandonadas()
+                if liberadas:
+                    self.stdout.write(self.style.WARNING(f'{liberadas} tareas abandonadas devueltas a la cola'))
+                procesadas = procesar_lote(colas, trabajador, ejecutor)
+                if procesadas:
+                    self.stdout.write(f'{procesadas} tareas procesadas')
+                if options['una_vez']:
+                    break
+                if not procesadas:
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker detenido')
+        finally:
+            if ejecutor:
+                ejecutor.shutdown(wait=True)
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cola', models.CharField(default='default', max_length=50, verbose_name='Cola')),
+                ('nombre', models.CharField(max_length=200, verbose_name='Tarea')),
+                ('argumentos', models.JSONField(blank=True, default=dict, verbose_name='Argumentos')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('max_intentos', models.PositiveIntegerField(default=3, verbose_name='Máximo de Intentos')),
+                ('ejecutar_desde', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Ejecutar Desde')),
+                ('tomada_por', models.CharField(blank=True, max_length=100, verbose_name='Tomada por')),
+                ('tomada_en', models.DateTimeField(blank=True, null=True, verbose_name='Tomada en')),
+                ('ultimo_error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Término')),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'ordering': ['ejecutar_desde', 'id'],
+                'indexes': [models.Index(fields=['estado', 'cola', 'ejecutar_desde'], name='tarea_cola_idx')],
+            },
+        ),
+    ]
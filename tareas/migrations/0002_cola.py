@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tareas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cola',
+            fields=[
+                ('nombre', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Cola')),
+                ('ultimo_reclamo', models.DateTimeField(blank=True, null=True, verbose_name='Último Reclamo')),
+            ],
+            options={
+                'verbose_name': 'Cola',
+                'verbose_name_plural': 'Colas',
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import models
+from django.utils import timezone
+
+# Create your models here.
+
+class Tarea(models.Model):
+    """Trabajo diferido almacenado en la propia base de datos (sin broker externo)"""
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En Proceso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+
+    cola = models.CharField(max_length=50, default='default', verbose_name='Cola')
+    nombre = models.CharField(max_length=200, verbose_name='Tarea')
+    argumentos = models.JSONField(default=dict, blank=True, verbose_name='Argumentos')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name='Estado')
+    intentos = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    max_intentos = models.PositiveIntegerField(default=3, verbose_name='Máximo de Intentos')
+    ejecutar_desde = models.DateTimeField(default=timezone.now, verbose_name='Ejecutar Desde')
+    tomada_por = models.CharField(max_length=100, blank=True, verbose_name='Tomada por')
+    tomada_en = models.DateTimeField(null=True, blank=True, verbose_name='Tomada en')
+    ultimo_error = models.TextField(blank=True, verbose_name='Último Error')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Término')
+
+    class Meta:
+        verbose_name = 'Tarea'
+        verbose_name_plural = 'Tareas'
+        ordering = ['ejecutar_desde', 'id']
+        indexes = [
+            # Búsqueda de trabajo: WHERE estado = 'pendiente' AND cola = %s AND ejecutar_desde <= now()
+            models.Index(fields=['estado', 'cola', 'ejecutar_desde'], name='tarea_cola_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} [{self.cola}] ({self.estado})"
+
+
+class Cola(models.Model):
+    """Una fila por cola: los workers la bloquean para contar y reclamar sin pasarse del límite"""
+    nombre = models.CharField(max_length=50, primary_key=True, verbose_name='Cola')
+    ultimo_reclamo = models.DateTimeField(null=True, blank=True, verbose_name='Último Reclamo')
+
+    class Meta:
+        verbose_name = 'Cola'
+        verbose_name_plural = 'Colas'
+
+    def __str__(self):
+        return self.nombre
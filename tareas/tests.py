@@ -0,0 +1,113 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .cola import encolar, espera_reintento, liberar_abandonadas, procesar_lote, reclamar, tarea
+from .models import Cola, Tarea
+
+EJECUCIONES = []
+
+
+@tarea(cola='pruebas')
+def sumar(a, b):
+    EJECUCIONES.append(a + b)
+
+
+@tarea(cola='pruebas', max_intentos=2)
+def fallar():
+    raise RuntimeError('falla intencional')
+
+
+@override_settings(TAREAS_CONCURRENCIA={'default': 1, 'pruebas': 2}, TAREAS_BACKOFF_BASE=10)
+class ColaTareasTest(TestCase):
+    """Tests para la cola de tareas en base de datos"""
+
+    def setUp(self):
+        EJECUCIONES.clear()
+
+    def test_encolar_y_procesar(self):
+        """Test: Una tarea encolada se ejecuta y queda completada"""
+        tarea_db = encolar(sumar, args=[2, 3])
+        self.assertEqual(tarea_db.cola, 'pruebas')
+        self.assertEqual(procesar_lote(['pruebas'], 'worker-test'), 1)
+        tarea_db.refresh_from_db()
+        self.assertEqual(tarea_db.estado, 'completada')
+        self.assertEqual(EJECUCIONES, [5])
+
+    def test_retraso(self):
+        """Test: Las tareas con retraso no se reclaman antes de tiempo"""
+        encolar(sumar, args=[1, 1], retraso=timedelta(minutes=5))
+        self.assertEqual(procesar_lote(['pruebas'], 'worker-test'), 0)
+
+    def test_reintento_con_backoff(self):
+        """Test: Una tarea fallida se reprograma con backoff y luego queda fallida"""
+        tarea_db = encolar(fallar)
+        procesar_lote(['pruebas'], 'worker-test')
+        tarea_db.refresh_from_db()
+        self.assertEqual(tarea_db.estado, 'pendiente')
+        self.assertEqual(tarea_db.intentos, 1)
+        self.assertGreater(tarea_db.ejecutar_desde, timezone.now() + timedelta(seconds=5))
+        self.assertIn('falla intencional', tarea_db.ultimo_error)
+
+        Tarea.objects.filter(pk=tarea_db.pk).update(ejecutar_desde=timezone.now())
+        procesar_lote(['pruebas'], 'worker-test')
+        tarea_db.refresh_from_db()
+        self.assertEqual(tarea_db.estado, 'fallida')
+
+    def test_espera_exponencial(self):
+        """Test: El backoff se duplica en cada intento"""
+        self.assertEqual(espera_reintento(1), timedelta(seconds=10))
+        self.assertEqual(espera_reintento(3), timedelta(seconds=40))
+
+    def test_limite_de_concurrencia_por_cola(self):
+        """Test: No se reclaman más tareas que el límite de la cola"""
+        for i in range(5):
+            encolar(sumar, args=[i, i])
+        self.assertEqual(len(reclamar('pruebas', 'worker-a')), 2)
+        self.assertEqual(reclamar('pruebas', 'worker-b'), [])
+        self.assertEqual(Tarea.objects.filter(estado='en_proceso').count(), 2)
+
+    def test_reclamo_bloquea_la_cola(self):
+        """Test: Contar y reclamar ocurre con la fila de la cola bloqueada, el conteo va después del bloqueo"""
+        reclamar('pruebas', 'worker-b')  # Crea la fila de la cola
+        encolar(sumar, args=[1, 2])
+        with CaptureQueriesContext(connection) as consultas:
+            reclamar('pruebas', 'worker-a')
+        sql = [c['sql'] for c in consultas.captured_queries]
+        bloqueo = next(i for i, q in enumerate(sql) if q.startswith('UPDATE "tareas_cola"'))
+        conteo = next(i for i, q in enumerate(sql) if 'COUNT(*)' in q)
+        self.assertLess(bloqueo, conteo)
+        self.assertIsNotNone(Cola.objects.get(nombre='pruebas').ultimo_reclamo)
+
+    def test_sin_doble_reclamo(self):
+        """Test: Una tarea reclamada no vuelve a entregarse a otro worker"""
+        encolar(sumar, args=[1, 2], cola='default')
+        primera = reclamar('default', 'worker-a')
+        Tarea.objects.filter(pk=primera[0].pk).update(estado='completada')
+        self.assertEqual(reclamar('default', 'worker-b'), [])
+
+    def test_liberar_abandonadas(self):
+        """Test: Las tareas de un worker caído vuelven a la cola"""
+        encolar(sumar, args=[1, 2])
+        reclamar('pruebas', 'worker-a')
+        Tarea.objects.update(tomada_en=timezone.now() - timedelta(hours=1))
+        self.assertEqual(liberar_abandonadas(timedelta(minutes=15)), 1)
+        self.assertEqual(Tarea.objects.get().estado, 'pendiente')
+
+    def test_tarea_no_registrada(self):
+        """Test: Un nombre desconocido termina como fallo, no detiene al worker"""
+        tarea_db = encolar('no.existe')
+        Tarea.objects.filter(pk=tarea_db.pk).update(max_intentos=1)
+        procesar_lote(['default'], 'worker-test')
+        self.assertEqual(Tarea.objects.get(pk=tarea_db.pk).estado, 'fallida')
+
+    def test_comando_una_vez(self):
+        """Test: procesar_tareas --una-vez procesa y termina"""
+        encolar(sumar, args=[4, 4])
+        call_command('procesar_tareas', cola=['pruebas'], una_vez=True, stdout=StringIO())
+        self.assertEqual(EJECUCIONES, [8])
@@ -1,4 +1,6 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
 
 
 class BootstrapFormMixin:
@@ -20,3 +22,40 @@ class BootstrapFormMixin:
                 widget.attrs.setdefault('class', 'form-select')
             elif isinstance(widget, forms.CheckboxInput):
                 widget.attrs.setdefault('class', 'form-check-input')
+
+
+class AutocompletarSelect(forms.Select):
+    """
+    Select para FK con muchas filas: solo renderiza la opción seleccionada y el
+    resto se busca contra un endpoint JSON (static/js/autocompletar.js).
+    El campo sigue siendo un ModelChoiceField, así que el id enviado se valida
+    en el servidor contra su queryset.
+    """
+
+    def __init__(self, url, attrs=None, filtros=None):
+        # filtros: {'parametro': '#selector'} valores de otros campos que se envían al buscar
+        super().__init__(attrs)
+        self.url = url
+        self.filtros = filtros or {}
+
+    def get_context(self, name, value, attrs):
+        contexto = super().get_context(name, value, attrs)
+        atributos = contexto['widget']['attrs']
+        atributos['data-autocompletar'] = reverse(self.url)
+        for parametro, selector in self.filtros.items():
+            atributos[f'data-filtro-{parametro}'] = selector
+        return contexto
+
+    def optgroups(self, name, value, attrs=None):
+        seleccion = [v for v in value if v not in ('', None)]
+        opciones = [('', self.choices.field.empty_label or '')]
+        if seleccion:
+            try:
+                # SELECT ... WHERE id IN (seleccion): una fila, no la tabla completa
+                opciones += [self.choices.choice(obj) for obj in self.choices.queryset.filter(pk__in=seleccion)]
+            except (ValueError, ValidationError):
+                pass
+        return [
+            (None, [self.create_option(name, valor, etiqueta, str(valor) in seleccion, indice, attrs=attrs)], indice)
+            for indice, (valor, etiqueta) in enumerate(opciones)
+        ]